@@ -3,76 +3,38 @@
 import os
 import streamlit as st
 import pandas as pd
-import sqlite3
-
-def load_data(
-        csv_path, table_name, conn,
-        sep=";", decimal=",", encoding="utf-8", header=0
-):
-    """
-    Wczytuje plik CSV do DataFrame z zadanymi parametrami odczytu,
-    sprawdza zgodność kolumn (case-insensitive),
-    wykonuje konwersje typów oraz zapisuje do bazy SQLite.
-    """
-    df = pd.read_csv(
-        csv_path, delimiter=sep, decimal=decimal, encoding=encoding, header=header, dtype=str
-    )
-
-    # Mapowanie nazw kolumn do wersji lower-case
-    colmap = {c.lower(): c for c in df.columns}
-
-    # Konwersje liczbowe (dla FactOnlineSales)
-    if table_name == 'FactOnlineSales':
-        float_cols = ['CatalogPrice', 'DiscountAmount', 'DiscountPctg', 'TransactionPrice', 'DeliveryCost',
-                      'ProductCost']
-        int_cols = [
-            'Quantity', 'OrderLineNumber', 'CustomerKey', 'ProductKey',
-            'SalesTerritoryKey', 'ChannelKey', 'PaymentMethodKey',
-            'DeliveryMethodKey', 'OrderDateKey', 'ShipDateKey'
-        ]
-
-        # Konwersje float
-        for col in float_cols:
-            col_lower = col.lower()
-            if col_lower in colmap:
-                true_col = colmap[col_lower]
-                df[true_col] = df[true_col].str.replace(',', '.', regex=False).astype(float)
-            else:
-                raise ValueError(
-                    f"Kolumna '{col}' nie została znaleziona (ignorując wielkość liter) podczas konwersji do float.")
-
-        # Konwersje int
-        for col in int_cols:
-            col_lower = col.lower()
-            if col_lower in colmap:
-                true_col = colmap[col_lower]
-                df[true_col] = df[true_col].astype(int)
-            else:
-                raise ValueError(
-                    f"Kolumna '{col}' nie została znaleziona (ignorując wielkość liter) podczas konwersji do int.")
-
-    # Wstawienie danych do bazy
-    df.to_sql(table_name, conn, if_exists='replace', index=False)
-    return df
+from classes.data_loader import (load_data, load_data_chunked, load_tables_parallel, upsert_data, get_load_meta,
+                                 NATURAL_KEYS, SOURCE_FILES)
+from classes.compaction import compact_dataframe, enable_copy_on_write
+from classes.db_schema import session_connection
+from classes.flat_table import FLAT_TABLE, flat_columns, get_flat_fact_table, refresh_flat_table
+from classes.lineage import column_fingerprints, lineage_graph, remember_column_fingerprints
+from classes.parse_cache import PERSISTENT_CACHE_KEY, session_parse_cache
+from classes.result_cache import session_fingerprint, session_result_cache
+from classes.sampling import CI_COLUMNS, SampleEstimator, sample_flat_table, sample_frame, submit_exact
+from classes.instrumentation import session_tracer
 
 st.set_page_config(page_title="Aplikacja wielostronicowa - Jakość danych", layout="wide")
+enable_copy_on_write()
+# Pomiary czasu i pamięci każdego uruchomienia strony - podgląd na stronie "Diagnostyka wydajności"
+session_tracer(st.session_state).begin_run("Strona główna")
 st.title("Witaj w aplikacji do analizy danych!")
 
-# Tworzenie bazy SQLite
-conn = sqlite3.connect('sales.db')
+# Połączenie z bazą SQLite - otwierane i konfigurowane raz na sesję
+conn = session_connection(st.session_state)
+
+# Pamięć podręczna sparsowanych plików i wyników analiz - domyślnie tylko na czas sesji
+st.session_state[PERSISTENT_CACHE_KEY] = st.checkbox(
+    "Zachowuj pamięć podręczną na dysku między sesjami",
+    value=st.session_state.get(PERSISTENT_CACHE_KEY, False),
+    key="persistent_cache_checkbox",
+    help="Sparsowane tabele i wyniki analiz (mogą zawierać dane osobowe) zapisywane są wtedy w katalogu "
+         ".cache/ i usuwane po 7 dniach nieużywania. Domyślnie pamięć podręczna znika wraz z końcem sesji."
+)
+parse_cache = session_parse_cache(st.session_state)
 
 # Lista tabel i ścieżek
-tables = {
-    'DimCustomer': 'data/DimCustomer.csv',
-    'DimDate': 'data/DimDate.csv',
-    'DimDeliveryMethod': 'data/DimDeliveryMethod.csv',
-    'DimGeography': 'data/DimGeography.csv',
-    'DimOrderChannel': 'data/DimOrderChannel.csv',
-    'DimPaymentMethod': 'data/DimPaymentMethod.csv',
-    'DimProduct': 'data/DimProduct.csv',
-    'DimSalesTerritory': 'data/DimSalesterritory.csv',
-    'FactOnlineSales': 'data/FactOnlineSales.csv',
-}
+tables = {table_name: os.path.join('data', file_name) for table_name, file_name in SOURCE_FILES.items()}
 
 with st.form("csv_options_form"):
     st.markdown("#### Opcje odczytu pliku CSV")
@@ -97,55 +59,166 @@ with st.form("csv_options_form"):
         "Nagłówek w pierwszym wierszu?",
         value=1
     )
+    chunksize = col1.number_input(
+        "Rozmiar porcji (wiersze, 0 = wczytaj cały plik naraz)",
+        min_value=0,
+        value=100_000,
+        step=10_000
+    )
+    parallel = col2.checkbox(
+        "Wczytuj tabele równolegle",
+        value=True
+    )
+    use_cache = col1.checkbox(
+        "Używaj pamięci podręcznej sparsowanych plików",
+        value=True
+    )
+    load_mode = col2.radio(
+        "Tryb zapisu",
+        options=["replace", "upsert"],
+        format_func=lambda x: {"replace": "Zastąp tabele",
+                               "upsert": "Przyrostowo (tylko nowe i zmienione wiersze)"}[x],
+        index=0
+    )
+    since_watermark = col2.checkbox(
+        "Pomiń wiersze starsze niż ostatni znacznik (tryb przyrostowy)",
+        value=False
+    )
     submitted = st.form_submit_button("Wczytaj dane")
 
-if submitted:
+cache = parse_cache if use_cache else None
+
+if submitted and load_mode == "upsert":
+    for table_name, file_path in tables.items():
+        if not os.path.exists(file_path) or table_name not in NATURAL_KEYS:
+            continue
+        try:
+            progress = st.progress(0.0, text=f"Wczytywanie przyrostowe `{table_name}`...")
+
+            def on_progress(name, rows_seen, rows_total, progress=progress):
+                fraction = min(1.0, rows_seen / rows_total) if rows_total else 1.0
+                progress.progress(fraction, text=f"Wczytywanie przyrostowe `{name}`: {rows_seen} / {rows_total} rekordów")
+
+            stats = upsert_data(file_path, table_name, conn, sep, decimal, encoding,
+                                header=0 if header_row else None, chunksize=int(chunksize) or 100_000,
+                                since_watermark=since_watermark, progress_callback=on_progress, cache=cache)
+            st.success(f"Tabela `{table_name}`: nowe {stats['inserted']}, zaktualizowane {stats['updated']}, "
+                       f"bez zmian {stats['unchanged']}, pominięte {stats['skipped']} "
+                       f"(znacznik: {stats['watermark']})")
+            if stats["null_keys"]:
+                st.warning(f"Tabela `{table_name}`: {stats['null_keys']} wierszy bez wartości klucza naturalnego "
+                           f"({', '.join(NATURAL_KEYS[table_name])}) nie zostało zapisanych.")
+            if stats["duplicate_keys"]:
+                st.warning(f"Tabela `{table_name}`: {stats['duplicate_keys']} wierszy z powtórzonym kluczem "
+                           f"naturalnym w pliku zastąpiono ostatnim wystąpieniem.")
+        except Exception as e:
+            st.error(f"Błąd podczas wczytywania tabeli `{table_name}`: {e}")
+elif submitted and parallel:
+    existing = {name: path for name, path in tables.items() if os.path.exists(path)}
+    progress_bars = {name: st.progress(0.0, text=f"Oczekiwanie: `{name}`") for name in existing}
+
+    def on_progress(name, rows_loaded, rows_total):
+        fraction = min(1.0, rows_loaded / rows_total) if rows_total else 1.0
+        progress_bars[name].progress(fraction, text=f"Wczytywanie `{name}`: {rows_loaded} / {rows_total} rekordów")
+
+    results = load_tables_parallel(existing, conn, sep, decimal, encoding, header=0 if header_row else None,
+                                   chunksize=int(chunksize) or None, progress_callback=on_progress,
+                                   cache=cache)
+    for table_name, result in results.items():
+        if result["error"]:
+            st.error(f"Błąd podczas wczytywania tabeli `{table_name}`: {result['error']}")
+        else:
+            progress_bars[table_name].progress(1.0, text=f"`{table_name}` wczytana")
+            st.success(f"Załadowano tabelę `{table_name}` ({result['rows']} rekordów)")
+    st.dataframe(pd.DataFrame(results).T.rename(columns={
+        "rows": "Rekordy",
+        "duplicate_keys": "Powtórzone klucze",
+        "parse_seconds": "Parsowanie [s]",
+        "write_seconds": "Zapis [s]",
+        "total_seconds": "Czas całkowity [s]",
+        "error": "Błąd"
+    }))
+elif submitted:
     try:
         for table_name, file_path in tables.items():
             if os.path.exists(file_path):
-                df = load_data(file_path, table_name, conn,
-                               sep, decimal, encoding, header=0 if header_row else None)
-                st.success(f"Załadowano tabelę `{table_name}` ({len(df)} rekordów)")
+                if chunksize:
+                    progress = st.progress(0.0, text=f"Wczytywanie `{table_name}`...")
+
+                    def on_progress(name, rows_loaded, rows_total, progress=progress):
+                        fraction = min(1.0, rows_loaded / rows_total) if rows_total else 1.0
+                        progress.progress(fraction, text=f"Wczytywanie `{name}`: {rows_loaded} / {rows_total} rekordów")
+
+                    n_rows = load_data_chunked(file_path, table_name, conn,
+                                               sep, decimal, encoding, header=0 if header_row else None,
+                                               chunksize=int(chunksize), progress_callback=on_progress,
+                                               cache=cache)
+                else:
+                    n_rows = len(load_data(file_path, table_name, conn,
+                                           sep, decimal, encoding, header=0 if header_row else None,
+                                           cache=cache))
+                st.success(f"Załadowano tabelę `{table_name}` ({n_rows} rekordów)")
     except Exception as e:
         st.error(f"Błąd podczas wczytywania pliku: {e}")
 
+if submitted and load_mode == "replace":
+    for table_name, meta in get_load_meta(conn).items():
+        if table_name in tables and meta["duplicate_keys"]:
+            st.warning(f"Tabela `{table_name}`: pominięto {meta['duplicate_keys']} wierszy z powtórzonym "
+                       f"kluczem głównym (zachowano pierwsze wystąpienie każdego klucza).")
+
+with st.expander("Pamięć podręczna sparsowanych plików"):
+    cache_entries = parse_cache.entries()
+    st.caption(f"Wpisy: {len(cache_entries)}, rozmiar: {parse_cache.total_bytes() / 1024 ** 2:.1f} MB "
+               f"(limit {parse_cache.max_bytes / 1024 ** 2:.0f} MB)")
+    st.dataframe(cache_entries)
+    if st.button("Wyczyść pamięć podręczną"):
+        parse_cache.clear()
+        st.success("Pamięć podręczna została wyczyszczona.")
+
+with st.expander("Pamięć podręczna wyników analiz"):
+    result_cache = session_result_cache(st.session_state)
+    cache_stats = result_cache.stats()
+    col1, col2, col3 = st.columns(3)
+    col1.metric("Trafienia (pamięć / dysk)", f"{cache_stats['hits_memory']} / {cache_stats['hits_disk']}")
+    col2.metric("Chybienia", cache_stats["misses"])
+    col3.metric("Skuteczność", f"{cache_stats['hit_rate_%']:.1f}%")
+    st.caption(f"Pamięć: {cache_stats['memory_entries']} wpisów, {cache_stats['memory_bytes'] / 1024 ** 2:.1f} MB "
+               f"(limit {result_cache.memory_max_bytes / 1024 ** 2:.0f} MB); "
+               + (f"dysk: {cache_stats['disk_entries']} wpisów, {cache_stats['disk_bytes'] / 1024 ** 2:.1f} MB "
+                  f"(limit {result_cache.max_bytes / 1024 ** 2:.0f} MB)" if result_cache.cache_dir is not None
+                  else "bez zapisu na dysku"))
+    if st.button("Wyczyść pamięć podręczną wyników"):
+        result_cache.clear()
+        st.success("Pamięć podręczna wyników została wyczyszczona.")
+
 # --- Sekcja podglądu istniejących tabel ---
 st.subheader("Podgląd danych z bazy")
 
-# Pobierz listę tabel z bazy SQLite
-def get_flat_fact_table(conn):
-    query = """
-    SELECT
-      F.*,
-      (F.CATALOGPRICE * F.QUANTITY) AS TotalCatalogPrice,
-      (F.DISCOUNTAMOUNT * F.QUANTITY) AS TotalDiscountAmount,
-      (F.TRANSACTIONPRICE * F.QUANTITY) AS TotalTransactionPrice,
-      P.ProductName,
-      P.ProductSubcategoryName,
-      P.ProductCategoryName,
-      C.FIRSTNAME || ' ' || C.LASTNAME as CustomerName,
-      D.ChannelName,
-      PM.PaymentMethodName,
-      DM.DeliveryMethodName,
-      ST.COUNTRYNAME
-    FROM FactOnlineSales F
-    LEFT JOIN DimProduct P ON F.PRODUCTKEY = P.ProductKey
-    LEFT JOIN DimCustomer C ON F.CUSTOMERKEY = C.CUSTOMERKEY
-    LEFT JOIN DimOrderChannel D ON F.CHANNELKEY = D.ChannelKey
-    LEFT JOIN DimPaymentMethod PM ON F.PAYMENTMETHODKEY = PM.PaymentMethodKey
-    LEFT JOIN DimDeliveryMethod DM ON F.DELIVERYMETHODKEY = DM.DeliveryMethodKey
-    LEFT JOIN DimSalesterritory ST ON F.SALESTERRITORYKEY = ST.SALESTERRITORYKEY
-    """
-    df_flat = pd.read_sql(query, conn)
-    cols_to_drop = [col for col in df_flat.columns if 'key' in col.lower()]
-    df_flat = df_flat.drop(columns=cols_to_drop + ['CATALOGPRICE', 'DISCOUNTAMOUNT', 'TRANSACTIONPRICE', 'QUANTITY'])
-    return df_flat
+compact_types = st.checkbox(
+    "Kompaktuj typy kolumn (category, string[pyarrow], mniejsze typy liczbowe)",
+    value=True
+)
 
 if st.button("Załaduj i wyświetl spłaszczoną tabelę"):
     try:
-        df_flat = get_flat_fact_table(conn)
+        df_flat = get_flat_fact_table(conn, cache=parse_cache)
         if df_flat is not None:
+            if compact_types:
+                df_flat, compaction = compact_dataframe(df_flat)
+                col1, col2, col3 = st.columns(3)
+                col1.metric("Pamięć przed", f"{compaction['memory_before_bytes'] / 1024 ** 2:.1f} MB")
+                col2.metric("Pamięć po", f"{compaction['memory_after_bytes'] / 1024 ** 2:.1f} MB")
+                col3.metric("Oszczędność", f"{compaction['memory_saved_%']:.1f}%")
+                with st.expander("Zmiany typów kolumn"):
+                    st.dataframe(compaction["changes"])
             st.session_state["df"] = df_flat
+            session_fingerprint(st.session_state, df_flat)
+            # Odciski kolumn z grafu pochodzenia: po ponownym wczytaniu jednego wymiaru
+            # przeliczane są tylko wyniki jego kolumn
+            refresh_flat_table(conn)
+            remember_column_fingerprints(st.session_state, df_flat, column_fingerprints(
+                conn, df_flat.columns, df_flat.dtypes, lineage_graph(conn)))
             st.success("Spłaszczona tabela została załadowana do analizy!")
             st.dataframe(df_flat.head())
     except Exception as e:
@@ -156,6 +229,122 @@ else:
     else:
         st.dataframe(st.session_state["df"].head())
 
+st.subheader("Tryb obliczeń")
+execution_mode = st.radio(
+    "Gdzie liczyć KPI",
+    options=["pandas", "sql", "stream"],
+    format_func=lambda x: {"pandas": "W pamięci (pandas)",
+                           "sql": "W SQLite (bez ładowania pełnej tabeli do pamięci)",
+                           "stream": "Porcjami ze szkicami (profil strumieniowy)"}[x],
+    index=["pandas", "sql", "stream"].index(st.session_state.get("execution_mode", "pandas")),
+    help="SQL: braki, duplikaty, outliery, statystyki i analiza biasu są liczone zapytaniami SQL "
+         "na zmaterializowanej spłaszczonej tabeli; do aplikacji trafiają tylko wyniki. "
+         "Porcjami: jakość danych profilowana jest porcjami odczytywanymi kursorem, "
+         "kwartyle i mediana są przybliżone szkicem KLL."
+)
+if execution_mode != "pandas":
+    try:
+        refresh_flat_table(conn)
+        st.session_state["execution_mode"] = execution_mode
+    except Exception as e:
+        st.session_state["execution_mode"] = "pandas"
+        st.error("Brak danych w bazie. Wczytaj dane do bazy danych.")
+else:
+    st.session_state["execution_mode"] = "pandas"
+
+st.subheader("Tryb próbkowania")
+sampling_mode = st.toggle(
+    "Szybkie wyniki na próbie (z przedziałami ufności)",
+    value=False,
+    help="Podgląd KPI na tej stronie (braki, outliery, średnie w grupach, balans klas, korelacje) "
+         "liczony na losowej próbie (prostej lub warstwowej, pobieranej w SQLite); każdy wynik ma "
+         "przedział ufności. Przycisk „Oblicz dokładnie” liczy te same wskaźniki na pełnych danych "
+         "w tle. Strony analiz (1-3) zawsze liczą KPI na pełnych danych."
+)
+if sampling_mode:
+    # Źródło próby: ramka w sesji (tryb pandas) albo zmaterializowana tabela w bazie
+    use_frame = st.session_state.get("execution_mode", "pandas") == "pandas" and "df" in st.session_state
+    try:
+        columns = list(st.session_state["df"].columns) if use_frame else flat_columns(conn)
+    except Exception:
+        columns = []
+    if not columns:
+        st.info("Brak spłaszczonej tabeli w bazie danych. Wczytaj dane, aby pojawiły się tutaj.")
+    else:
+        with st.form("sampling_form"):
+            col1, col2, col3 = st.columns(3)
+            sample_size = col1.number_input("Liczebność próby", min_value=100, value=50_000, step=10_000)
+            sample_method = col2.radio(
+                "Metoda",
+                options=["reservoir", "stratified"],
+                format_func=lambda x: {"reservoir": "Prosta próba losowa (reservoir)",
+                                       "stratified": "Próba warstwowa"}[x]
+            )
+            default_strata = "COUNTRYNAME" if "COUNTRYNAME" in columns else columns[0]
+            strata = col3.selectbox("Kolumna warstw", columns, index=columns.index(default_strata))
+            confidence = col1.select_slider("Poziom ufności", options=[0.8, 0.9, 0.95, 0.99], value=0.95)
+            group_col = col2.selectbox("Grupy (średnie w grupach)", [None] + columns,
+                                       index=columns.index(default_strata) + 1)
+            target = col3.selectbox("Zmienna (średnie w grupach)", [None] + columns,
+                                    index=columns.index("TotalTransactionPrice") + 1
+                                    if "TotalTransactionPrice" in columns else 0)
+            class_col = col3.selectbox("Kolumna klas (balans klas)", [None] + columns,
+                                       index=columns.index("ChannelName") + 1 if "ChannelName" in columns else 0)
+            sample_submitted = st.form_submit_button("Pobierz próbę")
+
+        params = (int(sample_size), sample_method, strata if sample_method == "stratified" else None,
+                  use_frame, group_col, target, class_col)
+        if sample_submitted or st.session_state.get("sample_params") != params:
+            with st.spinner("Pobieranie próby..."):
+                if use_frame:
+                    sample, population = sample_frame(st.session_state["df"], params[0], sample_method, params[2])
+                else:
+                    refresh_flat_table(conn)
+                    sample, population = sample_flat_table(conn, FLAT_TABLE, params[0], sample_method, params[2])
+            st.session_state["sample"] = (sample, population)
+            st.session_state["sample_params"] = params
+            stale = st.session_state.pop("exact_future", None)
+            if stale is not None:
+                stale[1].cancel()
+        sample, population = st.session_state["sample"]
+
+        estimator = SampleEstimator(sample, population, params[2], confidence=confidence)
+        estimates = estimator.report(group_col=group_col, target=target, class_col=class_col)
+        st.caption(f"Próba: {len(sample)} z {estimator.population_rows} wierszy, "
+                   f"poziom ufności {confidence:.0%}.")
+
+        if st.button("Oblicz dokładnie"):
+            source = st.session_state["df"] if use_frame else ("sales.db", FLAT_TABLE)
+            previous = st.session_state.get("exact_future")
+            if previous is not None:
+                previous[1].cancel()
+            st.session_state["exact_future"] = (params, submit_exact(st.session_state, source,
+                                                                     group_col, target, class_col))
+        exact = None
+        stored = st.session_state.get("exact_future")
+        if stored and stored[0] == params:
+            future = stored[1]
+            if not future.done():
+                st.info("Trwa obliczanie wartości dokładnych w tle...")
+                st.button("Odśwież")
+            elif future.exception() is not None:
+                st.error(f"Błąd obliczeń dokładnych: {future.exception()}")
+            else:
+                exact = future.result()
+
+        titles = {
+            "missing_values": "Braki [%]",
+            "outliers": "Outliery [%]",
+            "group_means": f"Średnia {target} wg {group_col}",
+            "class_balance": f"Balans klas {class_col}",
+            "correlations": "Korelacje (Pearson)",
+        }
+        for name, frame in estimates.items():
+            with st.expander(titles[name], expanded=name in ("missing_values", "outliers")):
+                if exact is not None and name in exact:
+                    frame = frame.assign(Dokładnie=exact[name].reindex(frame.index))
+                st.dataframe(frame[CI_COLUMNS + (["Dokładnie"] if "Dokładnie" in frame.columns else [])])
+
 required_keys = ["kpi_data_quality", "kpi_ai_compliance", "kpi_ai_readiness"]
 
 if all(k in st.session_state for k in required_keys):
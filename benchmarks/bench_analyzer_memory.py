@@ -0,0 +1,102 @@
+# benchmarks/bench_analyzer_memory.py
+"""
+Pamięć zajmowana przy tworzeniu analizatorów: dotychczasowa głęboka kopia (df.copy())
+w porównaniu z płytkim widokiem copy-on-write (classes.compaction.shared_view).
+
+Jeden przebieg odpowiada uruchomieniu stron aplikacji: DataQualityAnalyzer,
+AIComplianceAnalyzer i dwukrotnie AIReadinessAnalyzer (strona 3 tworzy go dwa razy).
+
+Uruchomienie z katalogu głównego repozytorium:
+    python -m benchmarks.bench_analyzer_memory --rows 1000000
+"""
+
+import argparse
+import gc
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+from classes.ai_compliance import AIComplianceAnalyzer
+from classes.ai_readiness_analyzer import AIReadinessAnalyzer
+from classes.compaction import enable_copy_on_write
+from classes.data_quality import DataQualityAnalyzer
+
+
+def make_frame(rows, seed=0):
+    """
+    Ramka przypominająca spłaszczoną tabelę: kolumny liczbowe i tekstowe o niskiej liczności.
+    """
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        "ORDERKEY": np.arange(rows, dtype=np.int64),
+        "QUANTITY": rng.integers(1, 10, rows),
+        "TRANSACTIONPRICE": rng.gamma(2.0, 150.0, rows),
+        "DISCOUNTPCTG": rng.uniform(0, 0.3, rows),
+        "DELIVERYCOST": rng.uniform(0, 40, rows),
+        "PRODUCTCOST": rng.gamma(2.0, 100.0, rows),
+    })
+    for col, n_values in [("COUNTRYNAME", 30), ("ChannelName", 4), ("PaymentMethodName", 6), ("ProductName", 500)]:
+        labels = np.array([f"{col}_{i}" for i in range(n_values)], dtype=object)
+        df[col] = labels[rng.integers(0, n_values, rows)]
+    return df
+
+
+def _construct_all(df):
+    return [
+        DataQualityAnalyzer(df),
+        AIComplianceAnalyzer(df),
+        AIReadinessAnalyzer(df),
+        AIReadinessAnalyzer(df, "ChannelName"),
+    ]
+
+
+def measure(df, deep_copy):
+    """
+    Szczytowy przyrost pamięci (tracemalloc) przy tworzeniu kompletu analizatorów.
+    """
+    gc.collect()
+    tracemalloc.start()
+    analyzers = _construct_all(df)
+    if deep_copy:
+        for analyzer in analyzers:
+            analyzer.df = analyzer.df.copy(deep=True)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del analyzers
+    return peak
+
+
+def check_snapshot(df):
+    """
+    Analizator nie widzi zmian wprowadzonych w ramce wywołującego po jego utworzeniu
+    i sam nie modyfikuje ramki wejściowej.
+    """
+    source = df.head(1000).copy()
+    before = source.copy(deep=True)
+    analyzer = DataQualityAnalyzer(source)
+    analyzer.generate_report()
+    pd.testing.assert_frame_equal(source, before)
+    source.loc[0, "TRANSACTIONPRICE"] = -1.0
+    return analyzer.df.loc[0, "TRANSACTIONPRICE"] == before.loc[0, "TRANSACTIONPRICE"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    args = parser.parse_args()
+    enable_copy_on_write()
+
+    df = make_frame(args.rows)
+    frame_bytes = int(df.memory_usage(deep=True).sum())
+    deep = measure(df, deep_copy=True)
+    view = measure(df, deep_copy=False)
+
+    print(f"Wiersze: {args.rows}, rozmiar ramki: {frame_bytes / 1024 ** 2:.1f} MB")
+    print(f"Głęboka kopia (df.copy()):     {deep / 1024 ** 2:10.1f} MB")
+    print(f"Widok copy-on-write:           {view / 1024 ** 2:10.1f} MB")
+    print(f"Migawka i brak mutacji wejścia: {'OK' if check_snapshot(df) else 'BŁĄD'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,364 @@
+# benchmarks/bench_pipeline.py
+"""
+Benchmark całego potoku na syntetycznym schemacie gwiazdy: czas (wall time) i szczytowe
+zużycie pamięci (peak RSS) dla load_data, load_data_chunked, get_flat_fact_table oraz każdej
+publicznej metody analizatorów (także wariantów SQL i strumieniowego).
+
+Każdy pomiar wykonywany jest w osobnym procesie potomnym (fork) utworzonym po przygotowaniu
+danych, więc szczyt RSS dotyczy tylko mierzonej operacji: rss_delta_mb to przyrost ponad
+pamięć odziedziczoną po procesie głównym. Wyniki zapisywane są w JSON razem z metadanymi
+(commit, wersje bibliotek, parametry danych), a --compare porównuje je z wcześniejszym plikiem.
+
+Uruchomienie z katalogu głównego repozytorium:
+    python -m benchmarks.bench_pipeline --scale 1M --null-rate 0.01 --output bench_results/1M.json
+    python -m benchmarks.bench_pipeline --data-dir bench_data/1M --compare bench_results/1M.json
+"""
+
+import argparse
+import datetime
+import inspect
+import json
+import multiprocessing
+import os
+import platform
+import re
+import shutil
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+import sklearn
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+from benchmarks.synthetic_data import FACT_TABLE, SCALES, write_dataset
+from classes.ai_compliance import AIComplianceAnalyzer
+from classes.ai_readiness_analyzer import AIReadinessAnalyzer
+from classes.compaction import compact_dataframe, enable_copy_on_write
+from classes.data_loader import SOURCE_FILES, load_data, load_data_chunked
+from classes.data_quality import DataQualityAnalyzer
+from classes.db_schema import apply_pragmas
+from classes.flat_table import get_flat_fact_table
+from classes.sql_pushdown import SQLAIComplianceAnalyzer, SQLDataQualityAnalyzer
+from classes.streaming_profile import StreamingDataQualityAnalyzer, sql_chunks
+
+RESULTS_FORMAT_VERSION = 1
+
+# Argumenty metod, które ich wymagają (pozostałe wywoływane są bez argumentów)
+METHOD_ARGS = {
+    "conditional_distribution_plot": ("TotalTransactionPrice",),
+}
+
+
+# --- Pomiar ---
+
+def _current_rss():
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError, AttributeError):
+        pass
+    return psutil.Process().memory_info().rss if psutil is not None else None
+
+
+def _peak_rss():
+    if resource is not None:
+        # ru_maxrss: KiB w Linuksie, bajty w macOS
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+    if psutil is not None:
+        # Windows: szczytowy zestaw roboczy (peak_wset)
+        return getattr(psutil.Process().memory_info(), "peak_wset", None)
+    return None
+
+
+# Bez odczytu szczytu RSS (brak resource i psutil) mierzony jest szczyt alokacji tracemalloc
+MEMORY_SOURCE = "rss" if _peak_rss() is not None else "tracemalloc"
+
+
+def _run(fn, repeat, setup=None):
+    timings, rss_start = [], None
+    if MEMORY_SOURCE == "tracemalloc":
+        tracemalloc.start()
+    for i in range(repeat):
+        # Przygotowanie (np. utworzenie analizatora) poza pomiarem czasu, świeże w każdym powtórzeniu
+        state = setup() if setup is not None else None
+        if i == 0:
+            rss_start = _current_rss() if MEMORY_SOURCE == "rss" else tracemalloc.get_traced_memory()[0]
+        start = time.perf_counter()
+        fn(state) if setup is not None else fn()
+        timings.append(time.perf_counter() - start)
+    if MEMORY_SOURCE == "tracemalloc":
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    else:
+        peak = _peak_rss()
+    return {
+        "wall_seconds": min(timings),
+        "wall_seconds_all": timings,
+        "peak_rss_mb": peak / 1024 ** 2,
+        "rss_delta_mb": (peak - rss_start) / 1024 ** 2 if rss_start is not None else None,
+        "error": None,
+    }
+
+
+def _child(fn, repeat, setup, out):
+    try:
+        result = _run(fn, repeat, setup)
+    except Exception as e:
+        result = {"error": f"{type(e).__name__}: {e}"}
+    out.send(result)
+    out.close()
+
+
+def measure(fn, repeat=1, setup=None):
+    """
+    Czas (minimum z repeat powtórzeń) i szczyt RSS wywołania fn() w procesie potomnym.
+    Jeśli podano setup, w każdym powtórzeniu mierzone jest fn(setup()) bez czasu setup().
+    Bez fork (np. Windows) pomiar wykonywany jest w bieżącym procesie - szczyt RSS obejmuje
+    wtedy także wcześniejsze operacje.
+    """
+    if "fork" not in multiprocessing.get_all_start_methods():
+        try:
+            return _run(fn, repeat, setup)
+        except Exception as e:
+            return {"error": f"{type(e).__name__}: {e}"}
+
+    ctx = multiprocessing.get_context("fork")
+    receiver, sender = ctx.Pipe(duplex=False)
+    process = ctx.Process(target=_child, args=(fn, repeat, setup, sender))
+    process.start()
+    sender.close()
+    try:
+        result = receiver.recv()
+    except EOFError:
+        result = None
+    process.join()
+    if result is None:
+        result = {"error": f"Proces pomiaru zakończony bez wyniku (kod {process.exitcode})"}
+    return result
+
+
+# --- Operacje ---
+
+def public_methods(cls):
+    return [name for name, _ in inspect.getmembers(cls, inspect.isfunction) if not name.startswith("_")]
+
+
+def analyzer_factories(df, db_path, target_column):
+    """
+    Fabryki analizatorów: obiekty tworzone są w procesie pomiaru (połączenia SQLite
+    nie mogą być dziedziczone przez fork).
+    """
+    return {
+        "DataQualityAnalyzer": (DataQualityAnalyzer, lambda: DataQualityAnalyzer(df)),
+        "AIComplianceAnalyzer": (AIComplianceAnalyzer, lambda: AIComplianceAnalyzer(df)),
+        "AIReadinessAnalyzer": (AIReadinessAnalyzer, lambda: AIReadinessAnalyzer(df, target_column)),
+        "SQLDataQualityAnalyzer": (SQLDataQualityAnalyzer,
+                                   lambda: SQLDataQualityAnalyzer(sqlite3.connect(db_path))),
+        "SQLAIComplianceAnalyzer": (SQLAIComplianceAnalyzer,
+                                    lambda: SQLAIComplianceAnalyzer(sqlite3.connect(db_path))),
+        "StreamingDataQualityAnalyzer": (StreamingDataQualityAnalyzer,
+                                         lambda: StreamingDataQualityAnalyzer(sql_chunks(sqlite3.connect(db_path)))),
+    }
+
+
+def _load_dimensions(db_path, data_dir):
+    conn = sqlite3.connect(db_path)
+    apply_pragmas(conn)
+    for table_name, file_name in SOURCE_FILES.items():
+        if table_name != FACT_TABLE:
+            load_data(os.path.join(data_dir, file_name), table_name, conn)
+    conn.close()
+
+
+def run_benchmarks(data_dir, work_dir, repeat=1, ops=None, target_column="ChannelName", chunksize=100_000,
+                   log=print):
+    """
+    Wykonuje wszystkie pomiary i zwraca listę wyników {name, wall_seconds, peak_rss_mb, rss_delta_mb, error}.
+    ops - wyrażenie regularne filtrujące nazwy operacji.
+    """
+    pattern = re.compile(ops) if ops else None
+    results = []
+
+    def record(name, fn, n=repeat, setup=None):
+        if pattern is not None and not pattern.search(name):
+            return
+        result = {"name": name, **measure(fn, n, setup)}
+        results.append(result)
+        if result["error"]:
+            log(f"{name:<58} BŁĄD: {result['error']}")
+        else:
+            log(f"{name:<58} {result['wall_seconds']:9.3f} s  {result['peak_rss_mb']:9.1f} MB "
+                f"({result['rss_delta_mb'] or 0:+.1f} MB)")
+
+    fact_csv = os.path.join(data_dir, SOURCE_FILES[FACT_TABLE])
+    dims_db = os.path.join(work_dir, "dims.db")
+    _load_dimensions(dims_db, data_dir)
+
+    # Wczytanie tabeli faktów: każdy wariant do własnej kopii bazy z wymiarami (jedno powtórzenie -
+    # ponowne wczytanie zastępuje tabelę, więc mierzyłoby to samo)
+    chunked_db = os.path.join(work_dir, "chunked.db")
+    shutil.copyfile(dims_db, chunked_db)
+    record("load_data_chunked[FactOnlineSales]",
+           lambda: load_data_chunked(fact_csv, FACT_TABLE, sqlite3.connect(chunked_db), chunksize=chunksize), 1)
+    db_path = os.path.join(work_dir, "sales.db")
+    shutil.copyfile(dims_db, db_path)
+    record("load_data[FactOnlineSales]", lambda: load_data(fact_csv, FACT_TABLE, sqlite3.connect(db_path)), 1)
+
+    conn = sqlite3.connect(db_path)
+    apply_pragmas(conn)
+    if not conn.execute("SELECT COUNT(*) FROM sqlite_master WHERE name = ?", (FACT_TABLE,)).fetchone()[0]:
+        # Pomiar load_data pominięty filtrem - tabelę faktów trzeba wczytać poza pomiarem
+        load_data(fact_csv, FACT_TABLE, conn)
+    conn.close()
+
+    # Pierwsze wywołanie materializuje spłaszczoną tabelę w bazie, kolejne tylko ją odczytuje
+    record("get_flat_fact_table (materializacja)", lambda: get_flat_fact_table(sqlite3.connect(db_path)), 1)
+    record("get_flat_fact_table", lambda: get_flat_fact_table(sqlite3.connect(db_path)))
+
+    conn = sqlite3.connect(db_path)
+    df = get_flat_fact_table(conn)
+    conn.close()
+    record("compact_dataframe", lambda: compact_dataframe(df))
+    df, _ = compact_dataframe(df)
+
+    for analyzer_name, (cls, factory) in analyzer_factories(df, db_path, target_column).items():
+        record(f"{analyzer_name}.__init__", factory)
+        for method in public_methods(cls):
+            args = METHOD_ARGS.get(method, ())
+            record(f"{analyzer_name}.{method}",
+                   lambda analyzer, method=method, args=args: getattr(analyzer, method)(*args), setup=factory)
+    return results
+
+
+# --- Metadane i porównanie ---
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def metadata(data_dir, dataset_options):
+    fact_csv = os.path.join(data_dir, SOURCE_FILES[FACT_TABLE])
+    return {
+        "format_version": RESULTS_FORMAT_VERSION,
+        "timestamp": datetime.datetime.now().isoformat(timespec="seconds"),
+        "commit": _git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "versions": {"pandas": pd.__version__, "numpy": np.__version__, "sklearn": sklearn.__version__,
+                     "sqlite": sqlite3.sqlite_version},
+        "isolation": "fork" if "fork" in multiprocessing.get_all_start_methods() else "none",
+        "memory": MEMORY_SOURCE,
+        "fact_csv_bytes": os.path.getsize(fact_csv),
+        "dataset": dataset_options,
+    }
+
+
+def compare(results, baseline, tolerance=0.1, min_seconds=0.05):
+    """
+    Zestawienie z wcześniejszym plikiem wyników: stosunek czasu i szczytu RSS dla operacji
+    obecnych w obu plikach; regression = True, gdy czas wzrósł o więcej niż tolerance
+    (względnie) i o więcej niż min_seconds (bardzo krótkie operacje mają duży szum).
+    """
+    previous = {r["name"]: r for r in baseline["results"] if not r.get("error")}
+    rows = []
+    for r in results:
+        old = previous.get(r["name"])
+        if old is None or r.get("error"):
+            continue
+        time_ratio = r["wall_seconds"] / old["wall_seconds"] if old["wall_seconds"] else None
+        rows.append({
+            "name": r["name"],
+            "wall_seconds": r["wall_seconds"],
+            "baseline_wall_seconds": old["wall_seconds"],
+            "time_ratio": time_ratio,
+            "rss_delta_mb": r["rss_delta_mb"],
+            "baseline_rss_delta_mb": old["rss_delta_mb"],
+            "regression": (time_ratio is not None and time_ratio > 1 + tolerance
+                           and r["wall_seconds"] - old["wall_seconds"] > min_seconds),
+        })
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark potoku: czas i szczyt pamięci każdej operacji.")
+    source = parser.add_mutually_exclusive_group()
+    source.add_argument("--data-dir", help="gotowy zbiór (wymiary + FactOnlineSales.csv), np. z benchmarks.synthetic_data")
+    source.add_argument("--scale", choices=list(SCALES), help="wygeneruj zbiór 1M, 10M albo 50M wierszy")
+    source.add_argument("--rows", type=int, default=100_000, help="wygeneruj zbiór o podanej liczbie wierszy")
+    parser.add_argument("--null-rate", type=float, default=0.01)
+    parser.add_argument("--duplicate-rate", type=float, default=0.005)
+    parser.add_argument("--outlier-rate", type=float, default=0.002)
+    parser.add_argument("--skew", type=float, default=1.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=1, help="liczba powtórzeń pomiaru (wynik = minimum)")
+    parser.add_argument("--ops", help="wyrażenie regularne wybierające operacje, np. 'DataQuality|flat'")
+    parser.add_argument("--target-column", default="ChannelName", help="kolumna klas dla AIReadinessAnalyzer")
+    parser.add_argument("--output", default="bench_results/pipeline.json", help="plik wyników JSON")
+    parser.add_argument("--compare", help="wcześniejszy plik wyników do porównania")
+    parser.add_argument("--tolerance", type=float, default=0.1, help="dopuszczalny względny wzrost czasu")
+    parser.add_argument("--fail-on-regression", action="store_true", help="kod wyjścia 1 przy regresji")
+    args = parser.parse_args()
+    enable_copy_on_write()
+
+    with tempfile.TemporaryDirectory(prefix="bench_pipeline_") as work_dir:
+        if args.data_dir:
+            data_dir = args.data_dir
+            dataset_options = {"data_dir": data_dir}
+        else:
+            rows = SCALES[args.scale] if args.scale else args.rows
+            dataset_options = {"rows": rows, "null_rate": args.null_rate, "duplicate_rate": args.duplicate_rate,
+                               "outlier_rate": args.outlier_rate, "skew": args.skew, "seed": args.seed}
+            data_dir = os.path.join(work_dir, "data")
+            print(f"Generowanie danych: {rows:,} wierszy faktów...")
+            write_dataset(data_dir, **dataset_options)
+
+        meta = metadata(data_dir, dataset_options)
+        results = run_benchmarks(data_dir, work_dir, repeat=args.repeat, ops=args.ops,
+                                 target_column=args.target_column)
+
+    document = {"meta": meta, "results": results}
+    if os.path.dirname(args.output):
+        os.makedirs(os.path.dirname(args.output), exist_ok=True)
+
+    regressions = []
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        comparison = compare(results, baseline, args.tolerance)
+        document["comparison"] = {"baseline": args.compare, "baseline_commit": baseline["meta"].get("commit"),
+                                  "tolerance": args.tolerance, "rows": comparison}
+        print(f"\nPorównanie z {args.compare} (commit {baseline['meta'].get('commit')}):")
+        for row in comparison:
+            flag = "  REGRESJA" if row["regression"] else ""
+            ratio = f"x{row['time_ratio']:.2f}" if row["time_ratio"] is not None else "—"
+            print(f"{row['name']:<58} {ratio}{flag}")
+        regressions = [row for row in comparison if row["regression"]]
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(document, f, ensure_ascii=False, indent=2)
+    print(f"\nZapisano {args.output}")
+    if regressions and args.fail_on_regression:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+# benchmarks/bench_star_schema.py
+"""
+Porównanie czasu joinu spłaszczonej tabeli (FLAT_QUERY) dla bazy tworzonej niejawnie
+przez df.to_sql (bez typów, kluczy i indeksów) oraz bazy z jawnym schematem
+(classes.db_schema: typy, klucze główne wymiarów, PRAGMA).
+
+Uruchomienie z katalogu głównego repozytorium:
+    python -m benchmarks.bench_star_schema --rows 200000
+"""
+
+import argparse
+import os
+import sqlite3
+import tempfile
+import time
+
+import pandas as pd
+
+from benchmarks.synthetic_data import DATA_DIR, FACT_TABLE, write_fact_csv
+from classes.data_loader import SOURCE_FILES, convert_types, load_data
+from classes.db_schema import apply_pragmas
+from classes.flat_table import FLAT_QUERY
+
+DIM_FILES = {name: file_name for name, file_name in SOURCE_FILES.items() if name != FACT_TABLE}
+
+
+def build_legacy_db(db_path, fact_csv):
+    """
+    Odtwarza dawne ładowanie: dtype=str + df.to_sql(if_exists='replace'), bez schematu.
+    """
+    conn = sqlite3.connect(db_path)
+    files = {name: os.path.join(DATA_DIR, f) for name, f in DIM_FILES.items()}
+    files['FactOnlineSales'] = fact_csv
+    for table_name, path in files.items():
+        df = pd.read_csv(path, delimiter=";", decimal=",", dtype=str)
+        convert_types(df, table_name).to_sql(table_name, conn, if_exists='replace', index=False)
+    return conn
+
+
+def build_typed_db(db_path, fact_csv):
+    conn = sqlite3.connect(db_path)
+    apply_pragmas(conn)
+    for table_name, file_name in DIM_FILES.items():
+        load_data(os.path.join(DATA_DIR, file_name), table_name, conn)
+    load_data(fact_csv, 'FactOnlineSales', conn)
+    return conn
+
+
+def time_join(conn, repeats):
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        rows = conn.execute(FLAT_QUERY).fetchall()
+        timings.append(time.perf_counter() - start)
+    return min(timings), len(rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark joinu spłaszczonej tabeli faktów.")
+    parser.add_argument("--rows", type=int, default=100_000, help="liczba wierszy tabeli faktów")
+    parser.add_argument("--repeats", type=int, default=3, help="liczba powtórzeń pomiaru (wynik = minimum)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        fact_csv = os.path.join(tmp, "FactOnlineSales.csv")
+        write_fact_csv(fact_csv, args.rows)
+
+        results = {}
+        for label, builder in [("to_sql (bez schematu)", build_legacy_db), ("jawny schemat", build_typed_db)]:
+            conn = builder(os.path.join(tmp, f"{len(results)}.db"), fact_csv)
+            results[label] = time_join(conn, args.repeats)
+            conn.close()
+
+    base = results["to_sql (bez schematu)"][0]
+    print(f"Wiersze faktów: {args.rows}")
+    for label, (seconds, n_rows) in results.items():
+        print(f"{label:<24} {seconds:8.3f} s  ({n_rows} wierszy, przyspieszenie x{base / seconds:.1f})")
+
+
+if __name__ == "__main__":
+    main()
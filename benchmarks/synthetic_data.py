@@ -0,0 +1,209 @@
+# benchmarks/synthetic_data.py
+"""
+Generator syntetycznej tabeli faktów FactOnlineSales zgodnej z plikami wymiarów z katalogu data/.
+
+Zachowane są zależności kluczy: wszystkie klucze obce istnieją w wymiarach, wiersze jednego
+zamówienia mają wspólnego klienta, daty, kanał, metodę płatności i dostawy, terytorium
+sprzedaży wynika z geografii klienta, a data wysyłki nie jest wcześniejsza niż data zamówienia.
+Sterowane są: udział braków, duplikatów i wartości odstających oraz skośność kluczy (Zipf).
+
+Plik zapisywany jest porcjami, więc rozmiar tabeli (np. 50 mln wierszy) nie jest ograniczony RAM.
+
+Uruchomienie z katalogu głównego repozytorium:
+    python -m benchmarks.synthetic_data --scale 1M --out bench_data/1M --null-rate 0.01 --skew 1.1
+"""
+
+import argparse
+import os
+import shutil
+import time
+
+import numpy as np
+import pandas as pd
+
+from classes.data_loader import SOURCE_FILES
+
+DATA_DIR = "data"
+FACT_TABLE = "FactOnlineSales"
+
+SCALES = {"1M": 1_000_000, "10M": 10_000_000, "50M": 50_000_000}
+
+FACT_COLUMNS = [
+    'ORDERKEY', 'ORDERLINENUMBER', 'ORDERDATEKEY', 'SHIPDATEKEY', 'CUSTOMERKEY', 'PRODUCTKEY',
+    'SALESTERRITORYKEY', 'CHANNELKEY', 'PAYMENTMETHODKEY', 'DELIVERYMETHODKEY', 'QUANTITY',
+    'CATALOGPRICE', 'DISCOUNTAMOUNT', 'DISCOUNTPCTG', 'TRANSACTIONPRICE', 'DELIVERYCOST', 'PRODUCTCOST',
+]
+
+# Braki tylko w kolumnach zmiennoprzecinkowych - kolumny całkowite są konwertowane przez astype(int)
+NULLABLE_COLUMNS = ['CATALOGPRICE', 'DISCOUNTAMOUNT', 'DISCOUNTPCTG', 'TRANSACTIONPRICE', 'DELIVERYCOST',
+                    'PRODUCTCOST']
+
+
+def _read_dimension(data_dir, table_name):
+    # utf-8-sig: część plików wymiarów zaczyna się znacznikiem BOM
+    df = pd.read_csv(os.path.join(data_dir, SOURCE_FILES[table_name]), sep=";", dtype=str, encoding="utf-8-sig")
+    df.columns = [c.upper() for c in df.columns]
+    return df
+
+
+class DimensionKeys:
+    """
+    Klucze wymiarów i relacje między nimi odczytane z plików CSV oraz rozkłady losowania
+    (jednostajne albo Zipfa z wykładnikiem skew, ranking kluczy losowy, ale stały dla ziarna).
+    """
+
+    def __init__(self, data_dir=DATA_DIR, skew: float = 0.0, seed=0):
+        rng = np.random.default_rng(seed)
+        customers = _read_dimension(data_dir, 'DimCustomer')
+        geography = _read_dimension(data_dir, 'DimGeography')
+        territory_of_geography = geography.set_index('GEOGRAPHYKEY')['SALESTERRITORYKEY']
+
+        self.customers = customers['CUSTOMERKEY'].astype(np.int64).to_numpy()
+        territory = customers['GEOGRAPHYKEY'].map(territory_of_geography)
+        self.territories = _read_dimension(data_dir, 'DimSalesTerritory')['SALESTERRITORYKEY'].astype(np.int64).to_numpy()
+        # Klient bez geografii otrzymuje losowe terytorium
+        fallback = rng.choice(self.territories, len(territory))
+        self.customer_territory = np.where(territory.isna(), fallback,
+                                           pd.to_numeric(territory, errors="coerce").fillna(0)).astype(np.int64)
+
+        self.dates = np.sort(_read_dimension(data_dir, 'DimDate')['DATEKEY'].astype(np.int64).to_numpy())
+        self.products = _read_dimension(data_dir, 'DimProduct')['PRODUCTKEY'].astype(np.int64).to_numpy()
+        self.channels = _read_dimension(data_dir, 'DimOrderChannel')['CHANNELKEY'].astype(np.int64).to_numpy()
+        self.payments = _read_dimension(data_dir, 'DimPaymentMethod')['PAYMENTMETHODKEY'].astype(np.int64).to_numpy()
+        self.deliveries = _read_dimension(data_dir, 'DimDeliveryMethod')['DELIVERYMETHODKEY'].astype(np.int64).to_numpy()
+
+        def weights(n):
+            if skew <= 0:
+                return None
+            p = (rng.permutation(n) + 1.0) ** -skew
+            return p / p.sum()
+
+        self.p_customers = weights(len(self.customers))
+        self.p_products = weights(len(self.products))
+        self.p_channels = weights(len(self.channels))
+        self.p_payments = weights(len(self.payments))
+        self.p_deliveries = weights(len(self.deliveries))
+
+
+def fact_chunk(keys: DimensionKeys, rows: int, first_order: int, rng, null_rate=0.0, duplicate_rate=0.0,
+               outlier_rate=0.0, max_lines=5):
+    """
+    Jedna porcja tabeli faktów (rows wierszy, numery zamówień od first_order).
+    Zwraca (DataFrame, numer następnego zamówienia).
+    """
+    lines_per_order = rng.integers(1, max_lines + 1, rows)
+    order_of_row = np.repeat(np.arange(rows), lines_per_order)[:rows]
+    n_orders = int(order_of_row[-1]) + 1 if rows else 0
+    line = np.arange(rows) - np.searchsorted(order_of_row, order_of_row) + 1
+
+    # Atrybuty zamówienia (wspólne dla jego wierszy)
+    customer_idx = rng.choice(len(keys.customers), n_orders, p=keys.p_customers)
+    date_idx = rng.integers(0, len(keys.dates), n_orders)
+    ship_idx = np.minimum(date_idx + rng.integers(0, 8, n_orders), len(keys.dates) - 1)
+    order = {
+        'ORDERDATEKEY': keys.dates[date_idx],
+        'SHIPDATEKEY': keys.dates[ship_idx],
+        'CUSTOMERKEY': keys.customers[customer_idx],
+        'SALESTERRITORYKEY': keys.customer_territory[customer_idx],
+        'CHANNELKEY': rng.choice(keys.channels, n_orders, p=keys.p_channels),
+        'PAYMENTMETHODKEY': rng.choice(keys.payments, n_orders, p=keys.p_payments),
+        'DELIVERYMETHODKEY': rng.choice(keys.deliveries, n_orders, p=keys.p_deliveries),
+    }
+
+    price = rng.lognormal(np.log(150), 0.8, rows)
+    if outlier_rate > 0:
+        price = np.where(rng.random(rows) < outlier_rate, price * rng.uniform(20, 50, rows), price)
+    pctg = rng.choice([0.0, 0.05, 0.1, 0.15, 0.2, 0.3], rows, p=[0.5, 0.15, 0.15, 0.1, 0.05, 0.05])
+    delivery = rng.gamma(2.0, 4.0, rows)
+    if outlier_rate > 0:
+        delivery = np.where(rng.random(rows) < outlier_rate, delivery * rng.uniform(10, 30, rows), delivery)
+
+    fact = pd.DataFrame({
+        'ORDERKEY': first_order + order_of_row,
+        'ORDERLINENUMBER': line,
+        **{col: values[order_of_row] for col, values in order.items()},
+        'PRODUCTKEY': rng.choice(keys.products, rows, p=keys.p_products),
+        'QUANTITY': rng.integers(1, 5, rows),
+        'CATALOGPRICE': price,
+        'DISCOUNTAMOUNT': price * pctg,
+        'DISCOUNTPCTG': pctg,
+        'TRANSACTIONPRICE': price * (1 - pctg),
+        'DELIVERYCOST': delivery,
+        'PRODUCTCOST': price * rng.uniform(0.4, 0.8, rows),
+    }, columns=FACT_COLUMNS)
+
+    if null_rate > 0:
+        for col in NULLABLE_COLUMNS:
+            fact.loc[rng.random(rows) < null_rate, col] = np.nan
+    if duplicate_rate > 0 and rows > 1:
+        # Pełne kopie wcześniejszych wierszy tej samej porcji (łącznie z kluczem zamówienia)
+        n_duplicates = min(rng.binomial(rows, duplicate_rate), rows - 1)
+        targets = rng.choice(np.arange(1, rows), n_duplicates, replace=False)
+        sources = (rng.random(n_duplicates) * targets).astype(np.int64)
+        fact.iloc[targets] = fact.iloc[sources].to_numpy()
+        fact = fact.astype({c: np.int64 for c in FACT_COLUMNS if c not in NULLABLE_COLUMNS})
+    return fact, first_order + n_orders
+
+
+def write_fact_csv(path, rows, seed=0, data_dir=DATA_DIR, null_rate=0.0, duplicate_rate=0.0, outlier_rate=0.0,
+                   skew=0.0, chunk_rows=1_000_000, progress=None):
+    """
+    Zapisuje porcjami syntetyczną tabelę faktów (separator ';', przecinek dziesiętny - jak pliki
+    z data/). progress(rows_written, rows) wywoływany jest po każdej porcji.
+    """
+    rng = np.random.default_rng(seed)
+    keys = DimensionKeys(data_dir, skew=skew, seed=seed)
+    written, next_order = 0, 1
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        while written < rows:
+            n = min(chunk_rows, rows - written)
+            chunk, next_order = fact_chunk(keys, n, next_order, rng, null_rate, duplicate_rate, outlier_rate)
+            chunk.to_csv(f, sep=";", decimal=",", index=False, header=written == 0, float_format="%.2f")
+            written += n
+            if progress is not None:
+                progress(written, rows)
+
+
+def write_dataset(out_dir, rows, data_dir=DATA_DIR, **options):
+    """
+    Kompletny zbiór danych: kopie plików wymiarów i syntetyczna tabela faktów w out_dir
+    (układ jak w data/, gotowy do wczytania przez aplikację lub classes.batch_runner).
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    for table_name, file_name in SOURCE_FILES.items():
+        if table_name != FACT_TABLE:
+            shutil.copyfile(os.path.join(data_dir, file_name), os.path.join(out_dir, file_name))
+    fact_path = os.path.join(out_dir, SOURCE_FILES[FACT_TABLE])
+    write_fact_csv(fact_path, rows, data_dir=data_dir, **options)
+    return fact_path
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generator syntetycznego schematu gwiazdy (FactOnlineSales).")
+    size = parser.add_mutually_exclusive_group()
+    size.add_argument("--scale", choices=list(SCALES), help="liczba wierszy faktów: 1M, 10M albo 50M")
+    size.add_argument("--rows", type=int, default=1_000_000, help="liczba wierszy faktów")
+    parser.add_argument("--out", required=True, help="katalog docelowy (wymiary + FactOnlineSales.csv)")
+    parser.add_argument("--data-dir", default=DATA_DIR, help="katalog z plikami wymiarów")
+    parser.add_argument("--null-rate", type=float, default=0.0, help="udział braków w kolumnach kwot")
+    parser.add_argument("--duplicate-rate", type=float, default=0.0, help="udział zduplikowanych wierszy")
+    parser.add_argument("--outlier-rate", type=float, default=0.0, help="udział wartości odstających cen i kosztów dostawy")
+    parser.add_argument("--skew", type=float, default=0.0, help="wykładnik Zipfa kluczy wymiarów (0 = jednostajnie)")
+    parser.add_argument("--chunk-rows", type=int, default=1_000_000, help="wiersze na porcję zapisu")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rows = SCALES[args.scale] if args.scale else args.rows
+    start = time.perf_counter()
+
+    def progress(written, total):
+        print(f"\r{written:,} / {total:,} wierszy ({time.perf_counter() - start:.0f} s)", end="", flush=True)
+
+    path = write_dataset(args.out, rows, data_dir=args.data_dir, seed=args.seed, null_rate=args.null_rate,
+                         duplicate_rate=args.duplicate_rate, outlier_rate=args.outlier_rate, skew=args.skew,
+                         chunk_rows=args.chunk_rows, progress=progress)
+    print(f"\nZapisano {path} ({os.path.getsize(path) / 1024 ** 2:.0f} MB)")
+
+
+if __name__ == "__main__":
+    main()
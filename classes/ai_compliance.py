@@ -1,37 +1,202 @@
 # classes/ai_compliance.py
 
+import os
+from concurrent.futures import ThreadPoolExecutor
+
 import numpy as np
 import pandas as pd
-import re
-
+from classes.bias_cube import DEFAULT_MIN_CELL, BiasCube, bias_summary, category_codes
+from classes.bias_tests import anova_from_statistics, bootstrap_spreads, chi_square_shares, kruskal_from_rank_sums
+from classes.compaction import TEXT_DTYPES, shared_view
+from classes.instrumentation import instrument
+from classes.lineage import lineage_graph
+from classes.pii_scan import (DEFAULT_MIN_RATE, DEFAULT_SAMPLE_ROWS, classify_column_names, privacy_risk_level,
+                              scan_columns)
+from classes.task_graph import run_tasks
+
+@instrument("zgodność z AI Act")
 class AIComplianceAnalyzer:
-    def __init__(self, df: pd.DataFrame):
-        self.df = df.copy()
-
-    def analyze_bias(self, group_cols=None, target_cols=None):
+    DEFAULT_GROUP_COLS = ["COUNTRYNAME", "ChannelName", "PaymentMethodName"]
+    DEFAULT_TARGET_COLS = ["TRANSACTIONPRICE", "DISCOUNTPCTG"]
+
+    # Kolumny grupujące analizowane równolegle (wątki); False, gdy źródło danych nie jest
+    # bezpieczne dla wielu wątków (np. jedno połączenie SQLite)
+    parallel_groups = True
+
+    def __init__(self, df: pd.DataFrame, memo: dict = None):
+        self.df = shared_view(df)
+        # Wyniki analiz zapamiętane na instancji (klucz: analiza i jej argumenty) - evaluate_risk
+        # korzysta z wyników policzonych wcześniej. memo może być słownikiem współdzielonym między
+        # analizatorami tych samych danych (np. kolejnymi uruchomieniami strony)
+        self.memo = {} if memo is None else memo
+
+    def _memoized(self, key, compute):
+        if key not in self.memo:
+            self.memo[key] = compute()
+        return self.memo[key]
+
+    def analyze_bias(self, group_cols=None, target_cols=None, significance: bool = True,
+                     n_boot: int = 1000, confidence: float = 0.95, seed=0):
         """
         Wykrywa potencjalne uprzedzenia (bias) względem kolumn grupujących.
+        Każda kolumna grupująca to jedna agregacja (group_statistics), niezależne kolumny
+        liczone są równolegle.
+
+        significance=True dołącza testy istotności (χ² dla udziałów, ANOVA i Kruskal-Wallis
+        dla średnich) oraz bootstrapowe przedziały ufności (confidence) rozstępów z n_boot powtórzeń.
+        Wynik każdej kolumny grupującej zapamiętywany jest w memo - liczone są tylko brakujące.
         """
         if group_cols is None:
-            group_cols = ["COUNTRYNAME", "ChannelName", "PaymentMethodName"]
+            group_cols = self.DEFAULT_GROUP_COLS
         if target_cols is None:
-            target_cols = ["TRANSACTIONPRICE", "DISCOUNTPCTG"]
-
-        report = {}
+            target_cols = self.DEFAULT_TARGET_COLS
+
+        group_cols = [c for c in dict.fromkeys(group_cols) if c in self.df.columns]
+        n_boot = n_boot if significance else None
+        keys = {c: ("analyze_bias", c, tuple(target_cols), n_boot, confidence, seed) for c in group_cols}
+
+        def compute(group_col):
+            try:
+                report = self._compute_bias_for_column(group_col, target_cols, n_boot, confidence, seed)
+            except Exception as e:
+                return f"Błąd analizy: {e}"
+            self._remember_bias(keys[group_col], group_col, report)
+            return report
+
+        todo = [c for c in group_cols if keys[c] not in self.memo]
+        if self.parallel_groups and len(todo) > 1:
+            with ThreadPoolExecutor(max_workers=min(len(todo), os.cpu_count() or 1)) as executor:
+                computed = dict(zip(todo, executor.map(compute, todo)))
+        else:
+            computed = {c: compute(c) for c in todo}
+        return {c: computed[c] if c in computed else self.memo[keys[c]] for c in group_cols}
 
-        for group_col in group_cols:
-            if group_col in self.df.columns:
-                try:
-                    report[group_col] = self._compute_bias_for_column(group_col, target_cols)
-                except Exception as e:
-                    report[group_col] = f"Błąd analizy: {e}"
+    def _remember_bias(self, key, group_col, report):
+        self.memo[key] = report
+        # Rozkład kategorii nie zależy od zmiennych celu ani testów istotności
+        self.memo[("Rozkład kategorii", group_col)] = report["Rozkład kategorii"]
 
-        return report
+    def remember_bias(self, group_col, report, target_cols=None, significance: bool = True,
+                      n_boot: int = 1000, confidence: float = 0.95, seed=0):
+        """
+        Zapisuje w memo wynik analyze_bias dla kolumny grupującej policzony poza analizatorem
+        (np. odczytany z pamięci podręcznej) - argumenty jak w analyze_bias.
+        """
+        if target_cols is None:
+            target_cols = self.DEFAULT_TARGET_COLS
+        if isinstance(report, dict):
+            key = ("analyze_bias", group_col, tuple(target_cols), n_boot if significance else None, confidence, seed)
+            self._remember_bias(key, group_col, report)
 
-    def _compute_bias_for_column(self, group_col, target_cols):
+    def category_distributions(self, group_cols=None):
+        """
+        Rozkład kategorii (udziały grup) kolumn grupujących - z wyników analyze_bias w memo
+        (dowolne zmienne celu), a dla brakujących kolumn z analizy bez testów istotności.
+        """
+        if group_cols is None:
+            group_cols = self.DEFAULT_GROUP_COLS
+        group_cols = [c for c in dict.fromkeys(group_cols) if c in self.df.columns]
+        missing = [c for c in group_cols if ("Rozkład kategorii", c) not in self.memo]
+        errors = {c: report for c, report in self.analyze_bias(group_cols=missing, significance=False).items()
+                  if not isinstance(report, dict)} if missing else {}
+        return {c: errors.get(c, self.memo.get(("Rozkład kategorii", c))) for c in group_cols}
+
+    def group_statistics(self, group_col, target_cols):
+        """
+        Statystyki dostateczne grup w jednym przebiegu: liczebności grup (Series) oraz dla
+        każdej zmiennej celu średnia, liczba wartości niepustych i wariancja (DataFrame
+        z kolumnami (zmienna, mean/count/var)). Grupy w kolejności sortowania, bez braków.
+        Agregacja wykonywana jest na kodach kategorii zamiast na wartościach kolumny.
+        """
+        targets = [t for t in dict.fromkeys(target_cols) if t in self.df.columns]
+        codes, uniques = category_codes(self.df[group_col])
+        valid = codes >= 0
+        if not valid.all():
+            codes = codes[valid]
+
+        sizes = np.bincount(codes, minlength=len(uniques))
+        observed = np.flatnonzero(sizes)
+        index = pd.Index(uniques[observed], name=group_col)
+        sizes = pd.Series(sizes[observed], index=index, name="count")
+
+        if not targets:
+            return sizes, pd.DataFrame(index=index)
+        values = self.df[targets]
+        if not valid.all():
+            values = values[valid]
+        # Jeden podział na grupy współdzielony przez wszystkie statystyki (agg z listą funkcji
+        # liczy każdą kolumnę osobno i jest wolniejsze)
+        grouped = values.groupby(codes, sort=True)
+        stats = pd.concat({"mean": grouped.mean(), "count": grouped.count(), "var": grouped.var()}, axis=1)
+        stats = stats.swaplevel(axis=1)[pd.MultiIndex.from_product([targets, ["mean", "count", "var"]])]
+        stats.index = index
+        return sizes, stats
+
+    def rank_statistics(self, group_col, target_cols):
+        """
+        Sumy rang (rangi średnie dla remisów) zmiennych celu w grupach - do testu Kruskala-Wallisa.
+        Rangi liczone są wśród wierszy z niepustą grupą i zmienną; jedno sortowanie na zmienną.
+        Zwraca (DataFrame grupy × zmienne, Series zmienna -> Σ (t³ - t) po remisach).
+        """
+        targets = [t for t in dict.fromkeys(target_cols) if t in self.df.columns]
+        codes, uniques = category_codes(self.df[group_col])
+        valid = codes >= 0
+        observed = np.flatnonzero(np.bincount(codes[valid], minlength=len(uniques)))
+        rank_sums, ties = {}, {}
+        for target in targets:
+            x = self.df[target].to_numpy(dtype=np.float64, na_value=np.nan)
+            present = valid & ~np.isnan(x)
+            order = np.argsort(x[present], kind="stable")
+            values = x[present][order]
+            starts = np.flatnonzero(np.r_[True, values[1:] != values[:-1]])
+            lengths = np.diff(np.r_[starts, len(values)])
+            ranks = np.repeat(starts + (lengths + 1) / 2, lengths)
+            sums = np.bincount(codes[present][order], weights=ranks, minlength=len(uniques))
+            rank_sums[target] = sums[observed]
+            ties[target] = float(np.sum(lengths.astype(np.float64) ** 3 - lengths))
+        index = pd.Index(uniques[observed], name=group_col)
+        return pd.DataFrame(rank_sums, index=index, columns=targets), pd.Series(ties, dtype=float)
+
+    def _add_significance(self, bias_report, group_col, sizes, stats, n_boot, confidence, seed):
+        """
+        Dołącza do raportu kolumny grupującej testy istotności i przedziały ufności rozstępów.
+        """
+        targets = list(stats.columns.get_level_values(0).unique())
+        rank_sums, ties = self.rank_statistics(group_col, targets)
+        rank_sums = rank_sums.reindex(sizes.index, fill_value=0.0)
+        share_ci, mean_cis = bootstrap_spreads(
+            sizes.to_numpy(),
+            [stats[(t, "mean")].to_numpy() for t in targets],
+            [stats[(t, "var")].to_numpy() for t in targets],
+            [stats[(t, "count")].to_numpy() for t in targets],
+            n_boot=n_boot, confidence=confidence, seed=seed,
+        )
+
+        _, chi_p = chi_square_shares(sizes.to_numpy())
+        bias_report["Rozkład kategorii"].update({
+            "p-value χ² (równe udziały)": chi_p,
+            "Rozstęp udziałów - dolna granica": round(share_ci[0], 4),
+            "Rozstęp udziałów - górna granica": round(share_ci[1], 4),
+        })
+        for target, ci in zip(targets, mean_cis):
+            count = stats[(target, "count")].to_numpy()
+            f_stat, f_p = anova_from_statistics(count, stats[(target, "mean")], stats[(target, "var")])
+            h_stat, h_p = kruskal_from_rank_sums(count, rank_sums[target], ties[target])
+            bias_report[f"Istotność różnic {target}"] = {
+                "ANOVA F": round(f_stat, 4),
+                "ANOVA p-value": f_p,
+                "Kruskal-Wallis H": round(h_stat, 4),
+                "Kruskal-Wallis p-value": h_p,
+                "Rozstęp średnich - dolna granica": round(ci[0], 4),
+                "Rozstęp średnich - górna granica": round(ci[1], 4),
+            }
+
+    def _compute_bias_for_column(self, group_col, target_cols, n_boot=None, confidence=0.95, seed=0):
+        sizes, stats = self.group_statistics(group_col, target_cols)
         bias_report = {}
 
-        value_counts = self.df[group_col].value_counts(normalize=True)
+        # Kolejność jak w value_counts (malejąco), aby sumowanie entropii dawało identyczny wynik
+        value_counts = (sizes / sizes.sum()).sort_values(ascending=False, kind="stable")
         entropia = -np.sum(value_counts * np.log2(value_counts + 1e-9))
         prop_diff = value_counts.max() - value_counts.min()
 
@@ -43,88 +208,91 @@ class AIComplianceAnalyzer:
             "Liczba grup": len(value_counts)
         }
 
-        for target in target_cols:
-            if target in self.df.columns:
-                grouped = self.df.groupby(group_col)[target].mean()
-                bias_report[f"Średnia {target} wg grup"] = grouped.to_dict()
-                bias_report[f"Rozstęp średnich {target}"] = round(grouped.max() - grouped.min(), 4)
+        for target in stats.columns.get_level_values(0).unique():
+            grouped = stats[(target, "mean")]
+            bias_report[f"Średnia {target} wg grup"] = grouped.to_dict()
+            bias_report[f"Rozstęp średnich {target}"] = round(grouped.max() - grouped.min(), 4)
 
+        if n_boot is not None:
+            self._add_significance(bias_report, group_col, sizes, stats, n_boot, confidence, seed)
         return bias_report
 
-    def analyze_sensitive_data(self):
+    def bias_cube(self, group_cols, target_cols):
         """
-        Wykrywa dane osobowe i wrażliwe oraz ocenia poziom ryzyka, z uwzględnieniem wyjątków.
+        Komórki bazowe kostki biasu (BiasCube) - przekrój wszystkich kolumn grupujących naraz.
         """
-        sensitive_keywords = ['health', 'gender', 'religion', 'ethnicity', 'politics', 'income', 'disability', 'sexual']
-        personal_keywords = ['name', 'firstname', 'lastname', 'email', 'phone', 'address', 'dob', 'pesel', 'nip', 'user', 'ip']
-
-        # Kolumny, które mają słowo 'name', ale nie są osobowe
-        name_exceptions = ['productname', 'paymentmethodname', 'deliverymethodname', 
-                        'channelname', 'productsubcategoryname', 'productcategoryname']
+        return BiasCube.from_frame(self.df, group_cols, target_cols)
 
-        sensitive_cols = []
-        personal_cols = []
+    def analyze_intersectional_bias(self, group_cols=None, target_cols=None, max_order=None,
+                                    min_cell: int = DEFAULT_MIN_CELL):
+        """
+        Bias w przekrojach kolumn grupujących (np. kraj × metoda płatności × kanał).
+        Dane czytane są raz (kostka komórek bazowych), a wszystkie kombinacje kolumn do
+        max_order wyliczane są z niej bez ponownego grupowania. Komórki o liczności poniżej
+        min_cell są ukrywane. Zwraca {"Komórki": tabela biasu, "Podsumowanie": tabela na przekrój}.
+        """
+        if group_cols is None:
+            group_cols = self.DEFAULT_GROUP_COLS
+        if target_cols is None:
+            target_cols = self.DEFAULT_TARGET_COLS
 
-        for col in self.df.columns:
-            col_lower = col.lower()
+        group_cols = [c for c in dict.fromkeys(group_cols) if c in self.df.columns]
+        if not group_cols:
+            raise ValueError("Żadna z kolumn grupujących nie występuje w danych.")
+        cube = self.bias_cube(group_cols, target_cols)
+        table = cube.bias_table(max_order, min_cell)
+        return {"Komórki": table, "Podsumowanie": bias_summary(table, cube.targets)}
 
-            if col_lower in name_exceptions:
-                continue  # pomijamy mylące nazwy
+    def pii_samples(self, columns, sample_rows: int = DEFAULT_SAMPLE_ROWS):
+        """
+        Losowa próba (w losowej kolejności) wartości kolumn do skanowania zawartości: {kolumna: Series}.
+        """
+        frame = self.df[columns]
+        sample = frame.sample(n=min(sample_rows, len(frame)), random_state=0)
+        return {c: sample[c] for c in columns}
 
-            if any(kw in col_lower for kw in sensitive_keywords):
-                sensitive_cols.append(col)
-            if any(kw in col_lower for kw in personal_keywords):
-                personal_cols.append(col)
+    def analyze_sensitive_data(self, scan_content: bool = True, sample_rows: int = DEFAULT_SAMPLE_ROWS,
+                               min_rate: float = DEFAULT_MIN_RATE):
+        """
+        Wykrywa dane osobowe i wrażliwe oraz ocenia poziom ryzyka, z uwzględnieniem wyjątków.
+        Oprócz nazw kolumn (scan_content=True) sprawdzana jest zawartość kolumn tekstowych
+        (e-mail, telefon, IP, PESEL, NIP, IBAN) na próbie sample_rows wierszy; kolumna, w której
+        udział dopasowań jakiegoś typu wynosi co najmniej min_rate, trafia do danych osobowych.
+        Wynik zapamiętywany jest w memo.
+        """
+        return self._memoized(("analyze_sensitive_data", scan_content, sample_rows, min_rate),
+                              lambda: self._sensitive_data(scan_content, sample_rows, min_rate))
 
-        high_risk = bool(sensitive_cols or personal_cols)
+    def _sensitive_data(self, scan_content, sample_rows, min_rate):
+        personal_cols, sensitive_cols = classify_column_names(self.df.columns)
 
-        if high_risk:
-            risk_level = "🚨 Wysokie - dane wrażliwe lub identyfikujące"
-        elif any("id" in col.lower() for col in self.df.columns if col.lower() not in name_exceptions):
-            risk_level = "⚠️ Średnie - dane pseudonimizowane"
-        else:
-            risk_level = "✅ Niskie - brak danych osobowych/wrażliwych"
+        content_scan = []
+        if scan_content:
+            text_cols = self.df.select_dtypes(include=TEXT_DTYPES).columns.tolist()
+            if text_cols:
+                content_scan = scan_columns(self.pii_samples(text_cols, sample_rows), min_rate=min_rate)
+            personal_cols += [row["Kolumna"] for row in content_scan
+                              if row["Wykryte typy"] and row["Kolumna"] not in personal_cols]
 
         return {
             "Dane osobowe": personal_cols,
             "Dane wrażliwe": sensitive_cols,
-            "Poziom ryzyka": risk_level
+            "Poziom ryzyka": privacy_risk_level(self.df.columns, personal_cols, sensitive_cols),
+            "Skan zawartości": content_scan,
         }
     
-    def get_data_lineage(self):
-        """
-        Zwraca informacje o pochodzeniu danych: źródło kolumny i typ pochodzenia (oryginalna, join, wyliczona).
-        """
-        lineage_map = {
-            # Oryginalne kolumny z tabeli faktów
-            "ORDERKEY": ("FactOnlineSales", "oryginalna"),
-            "ORDERLINENUMBER": ("FactOnlineSales", "oryginalna"),
-            "TRANSACTIONPRICE": ("FactOnlineSales", "oryginalna"),
-            "QUANTITY": ("FactOnlineSales", "oryginalna"),
-            "DISCOUNTPCTG": ("FactOnlineSales", "oryginalna"),
-            "DELIVERYCOST": ("FactOnlineSales", "oryginalna"),
-            "PRODUCTCOST": ("FactOnlineSales", "oryginalna"),
-
-            # Kolumny z joinów
-            "CustomerName": ("DimCustomer", "join przez CustomerKey + przekształcenie (imię + nazwisko)"),
-            "ProductName": ("DimProduct", "join przez ProductKey"),
-            "ProductCategoryName": ("DimProduct", "join przez ProductKey"),
-            "ChannelName": ("DimOrderChannel", "join przez ChannelKey"),
-            "PaymentMethodName": ("DimPaymentMethod", "join przez PaymentMethodKey"),
-            "DeliveryMethodName": ("DimDeliveryMethod", "join przez DeliveryMethodKey"),
-            "COUNTRYNAME": ("DimSalesTerritory", "join przez SalesTerritoryKey"),
-            "ProductSubcategoryName": ("DimProduct", "join przez ProductKey"),
-
-            # Kolumny wyliczone
-            "TotalTransactionPrice": ("FactOnlineSales", "wyliczona (TransactionPrice x Quantity)"),
-            "TotalDiscountAmount": ("FactOnlineSales", "wyliczona (DiscountAmount x Quantity)"),
-            "TotalCatalogPrice": ("FactOnlineSales", "wyliczona (CatalogPrice x Quantity)")
-        }
+    def get_data_lineage(self, graph=None):
+        """
+        Zwraca informacje o pochodzeniu danych: źródło kolumny i typ pochodzenia (oryginalna, join, wyliczona),
+        odczytane z grafu pochodzenia zapytania spłaszczającego (domyślnie FLAT_QUERY).
+        """
+        graph = graph or lineage_graph()
+        return self._memoized(("get_data_lineage", graph.query), lambda: self._lineage(graph))
 
+    def _lineage(self, graph):
         lineage_info = []
         for col in self.df.columns:
-            source, col_type = lineage_map.get(
-                col, ("❓ Nieznane", "❓ Nieokreślone"))
+            source, col_type = graph.describe(col)
             lineage_info.append({
                 "Kolumna": col,
                 "Źródło": source,
@@ -133,57 +301,72 @@ class AIComplianceAnalyzer:
 
         return lineage_info
     
-    def evaluate_risk(self):
-        """
-        Ocena końcowego ryzyka zgodności danych z AI Act.
-        Analizuje: prywatność, stronniczość i pochodzenie danych.
-        """
-        # --- Prywatność
-        privacy = self.analyze_sensitive_data()
-        privacy_level = privacy["Poziom ryzyka"]
-
-        if "wysokie" in privacy_level.lower():
-            privacy_score = 2
-        elif "średnie" in privacy_level.lower():
-            privacy_score = 1
-        else:
-            privacy_score = 0
-
-        # --- Stronniczość (na podstawie rozstępów udziałów)
-        bias = self.analyze_bias()
-        bias_scores = []
-
-        for col, report in bias.items():
-            if isinstance(report, dict):
-                spread = report["Rozkład kategorii"]["Rozstęp udziałów"]
-                if spread > 0.5:
-                    bias_scores.append(2)
-                elif spread > 0.2:
-                    bias_scores.append(1)
-                else:
-                    bias_scores.append(0)
-
-        bias_score = max(bias_scores) if bias_scores else 0
-
-        # --- Pochodzenie danych
-        lineage = self.get_data_lineage()
-        unknowns = [entry for entry in lineage if "❓" in entry["Źródło"]]
-        lineage_score = 2 if len(unknowns) > 3 else 1 if unknowns else 0
-
-        total_score = privacy_score + bias_score + lineage_score
-
-        if total_score >= 5:
-            overall = "🚨 Wysokie ryzyko"
-        elif total_score >= 3:
-            overall = "⚠️ Średnie ryzyko"
-        else:
-            overall = "✅ Niskie ryzyko"
-
+    def _risk_tasks(self, graph=None):
+        # Trzy niezależne analizy i ocena końcowa zależna od wszystkich
         return {
-            "Ocena ogólna": overall,
-            "Prywatność": privacy_level,
-            "Stronniczość": f"{['✅ Niska', '⚠️ Średnia', '🚨 Wysoka'][bias_score]}",
-            "Pochodzenie danych": f"{['✅ Znane', '⚠️ Częściowo nieznane', '🚨 Braki w definicji'][lineage_score]}"
+            "Prywatność": (self.analyze_sensitive_data, []),
+            "Stronniczość": (self.category_distributions, []),
+            "Pochodzenie danych": (lambda: self.get_data_lineage(graph), []),
+            "Ocena": (risk_summary, ["Prywatność", "Stronniczość", "Pochodzenie danych"]),
         }
 
-
+    def evaluate_risk(self, graph=None):
+        """
+        Ocena końcowego ryzyka zgodności danych z AI Act.
+        Analizuje: prywatność, stronniczość i pochodzenie danych (graph - graf pochodzenia, jak w get_data_lineage).
+        Analizy są zadaniami grafu (run_tasks) wykonywanymi równolegle (po kolei, gdy
+        parallel_groups=False); wyniki policzone już wcześniej pochodzą z memo.
+        """
+        tasks = self._risk_tasks(graph)
+        return run_tasks(tasks, ["Ocena"], max_workers=None if self.parallel_groups else 1)["Ocena"]
+
+
+def risk_summary(privacy, distributions, lineage):
+    """
+    Ocena ryzyka z wyników analiz: danych wrażliwych (analyze_sensitive_data), rozkładów
+    kategorii (category_distributions - na podstawie rozstępów udziałów) i pochodzenia danych.
+    """
+    # --- Prywatność
+    privacy_level = privacy["Poziom ryzyka"]
+
+    if "wysokie" in privacy_level.lower():
+        privacy_score = 2
+    elif "średnie" in privacy_level.lower():
+        privacy_score = 1
+    else:
+        privacy_score = 0
+
+    # --- Stronniczość (na podstawie rozstępów udziałów)
+    bias_scores = []
+
+    for col, distribution in distributions.items():
+        if isinstance(distribution, dict):
+            spread = distribution["Rozstęp udziałów"]
+            if spread > 0.5:
+                bias_scores.append(2)
+            elif spread > 0.2:
+                bias_scores.append(1)
+            else:
+                bias_scores.append(0)
+
+    bias_score = max(bias_scores) if bias_scores else 0
+
+    # --- Pochodzenie danych
+    unknowns = [entry for entry in lineage if "❓" in entry["Źródło"]]
+    lineage_score = 2 if len(unknowns) > 3 else 1 if unknowns else 0
+
+    total_score = privacy_score + bias_score + lineage_score
+
+    if total_score >= 5:
+        overall = "🚨 Wysokie ryzyko"
+    elif total_score >= 3:
+        overall = "⚠️ Średnie ryzyko"
+    else:
+        overall = "✅ Niskie ryzyko"
+
+    return {
+        "Ocena ogólna": overall,
+        "Prywatność": privacy_level,
+        "Stronniczość": f"{['✅ Niska', '⚠️ Średnia', '🚨 Wysoka'][bias_score]}",
+        "Pochodzenie danych": f"{['✅ Znane', '⚠️ Częściowo nieznane', '🚨 Braki w definicji'][lineage_score]}"
+    }
@@ -7,13 +7,20 @@ from sklearn.linear_model import LogisticRegression
 from sklearn.metrics import accuracy_score, classification_report
 from sklearn.preprocessing import LabelEncoder
 from sklearn.utils.multiclass import type_of_target
+from classes.compaction import TEXT_DTYPES, shared_view
+from classes.instrumentation import instrument, span
+from classes.model_training import train_sgd_classifier
 import matplotlib.pyplot as plt
 import seaborn as sns
 import io
 
+# Od tej liczby wierszy tryb "auto" trenuje model porcjami (SGD) zamiast LogisticRegression na całości
+SGD_MIN_ROWS = 100_000
+
+@instrument("przydatność do AI")
 class AIReadinessAnalyzer:
     def __init__(self, df: pd.DataFrame, target_column: str = None):
-        self.df = df.copy()
+        self.df = shared_view(df)
         self.target_column = target_column
         self.class_labels = None  # Dodane: etykiety klas
 
@@ -37,9 +44,20 @@ class AIReadinessAnalyzer:
         desc["skośność"] = numeric.skew()
         return desc
 
-    def train_simple_model(self):
+    def train_simple_model(self, mode: str = "full", max_train_rows=None):
+        """
+        Prosty klasyfikator kolumny celu. mode="full" - LogisticRegression na 70% wierszy bez braków,
+        "sgd" - regresja logistyczna uczona porcjami na próbie warstwowej z rzadkimi cechami
+        (train_sgd_classifier) wraz z tabelą zbieżności dokładności, "auto" - "sgd" od SGD_MIN_ROWS wierszy.
+        """
+        if mode == "auto":
+            mode = "sgd" if len(self.df) >= SGD_MIN_ROWS else "full"
+        if mode not in ("full", "sgd"):
+            raise ValueError(f"Nieznany tryb trenowania modelu: {mode}")
         if self.target_column is None:
             return "Brak kolumny celu."
+        if mode == "sgd":
+            return self._train_sgd_model(max_train_rows)
 
         df_model = self.df.dropna()
         if self.target_column not in df_model.columns:
@@ -52,12 +70,13 @@ class AIReadinessAnalyzer:
         if target_type not in ["binary", "multiclass"]:
             return f"Kolumna celu ma typ '{target_type}' – wygląda na regresyjną, nie klasyfikacyjną."
 
-        for col in X.select_dtypes(include="object").columns:
-            X[col] = LabelEncoder().fit_transform(X[col].astype(str))
+        with span("LabelEncoder (kolumny tekstowe)", "model"):
+            for col in X.select_dtypes(include=TEXT_DTYPES).columns:
+                X[col] = LabelEncoder().fit_transform(X[col].astype(str))
 
-        if y.dtype == "object":
+        if not pd.api.types.is_numeric_dtype(y.dtype):
             le = LabelEncoder()
-            y = le.fit_transform(y)
+            y = le.fit_transform(y.astype(str))
             self.class_labels = le.classes_
         else:
             self.class_labels = np.unique(y)
@@ -65,30 +84,69 @@ class AIReadinessAnalyzer:
         try:
             X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.3, random_state=0)
             model = LogisticRegression(max_iter=500)
-            model.fit(X_train, y_train)
-            y_pred = model.predict(X_test)
+            with span("LogisticRegression.fit", "model") as s:
+                s.set(rows=X_train.shape[0], cols=X_train.shape[1])
+                model.fit(X_train, y_train)
+            with span("LogisticRegression.predict", "model"):
+                y_pred = model.predict(X_test)
+        except Exception as e:
+            return f"Błąd podczas trenowania modelu: {str(e)}"
+
+        return {
+            "accuracy": accuracy_score(y_test, y_pred),
+            "report": classification_report(y_test, y_pred, output_dict=True),
+            "mode": "full",
+        }
+
+    def _train_sgd_model(self, max_train_rows=None):
+        if self.target_column not in self.df.columns:
+            return "Wybrana kolumna celu nie istnieje w danych."
+
+        y = self.df[self.target_column]
+        target_type = type_of_target(y.dropna())
+        if target_type not in ["binary", "multiclass"]:
+            return f"Kolumna celu ma typ '{target_type}' – wygląda na regresyjną, nie klasyfikacyjną."
+
+        # Kody klas zamiast LabelEncoder; braki etykiety mają kod -1 i są pomijane
+        codes, classes = pd.factorize(y, sort=True)
+        if pd.api.types.is_numeric_dtype(y.dtype):
+            self.class_labels = np.asarray(classes)
+        else:
+            self.class_labels = np.asarray(classes).astype(str)
+        features = [c for c in self.df.columns if c != self.target_column]
+
+        try:
+            with span("SGDClassifier.partial_fit (porcje)", "model") as s:
+                _, y_test, y_pred, convergence, converged = train_sgd_classifier(
+                    self.df, codes, len(classes), features, max_train_rows=max_train_rows)
+                s.set(rows=int(convergence["Wiersze treningowe"].iloc[-1]), cols=len(features))
         except Exception as e:
             return f"Błąd podczas trenowania modelu: {str(e)}"
 
         return {
             "accuracy": accuracy_score(y_test, y_pred),
-            "report": classification_report(y_test, y_pred, output_dict=True)
+            "report": classification_report(y_test, y_pred, output_dict=True),
+            "mode": "sgd",
+            "convergence": convergence,
+            "converged": converged,
         }
 
     def conditional_distribution_plot(self, feature: str):
         if not self.target_column or feature not in self.df.columns:
             return None
 
-        if self.df[feature].dtype not in ["int64", "float64"]:
+        if not pd.api.types.is_numeric_dtype(self.df[feature].dtype) or pd.api.types.is_bool_dtype(self.df[feature].dtype):
             return None
 
-        fig, ax = plt.subplots(figsize=(10, 6))
-        sns.boxplot(x=self.target_column, y=feature, data=self.df, ax=ax)
-        plt.xticks(rotation=45)
-        plt.tight_layout()
+        with span("seaborn.boxplot", "wykres"):
+            fig, ax = plt.subplots(figsize=(10, 6))
+            sns.boxplot(x=self.target_column, y=feature, data=self.df, ax=ax)
+            plt.xticks(rotation=45)
+            plt.tight_layout()
 
         buf = io.BytesIO()
-        fig.savefig(buf, format="png")
+        with span("savefig (PNG)", "wykres"):
+            fig.savefig(buf, format="png")
         buf.seek(0)
         return buf
 
@@ -97,18 +155,22 @@ class AIReadinessAnalyzer:
         if numeric.shape[1] < 2:
             return None
     
-        fig, ax = plt.subplots(figsize=figsize)
-        sns.heatmap(numeric.corr(), annot=True, cmap="coolwarm", ax=ax,
-                    linewidths=0.5, linecolor='gray', cbar=True,
-                    annot_kws={"color": "white"})
-        ax.set_facecolor("#0e1117")  # tło dopasowane do Streamlit
-        fig.patch.set_facecolor("#0e1117")
-        plt.xticks(rotation=45, color="white")
-        plt.yticks(rotation=0, color="white")
-        plt.tight_layout()
+        with span("DataFrame.corr", "obliczenia"):
+            corr = numeric.corr()
+        with span("seaborn.heatmap", "wykres"):
+            fig, ax = plt.subplots(figsize=figsize)
+            sns.heatmap(corr, annot=True, cmap="coolwarm", ax=ax,
+                        linewidths=0.5, linecolor='gray', cbar=True,
+                        annot_kws={"color": "white"})
+            ax.set_facecolor("#0e1117")  # tło dopasowane do Streamlit
+            fig.patch.set_facecolor("#0e1117")
+            plt.xticks(rotation=45, color="white")
+            plt.yticks(rotation=0, color="white")
+            plt.tight_layout()
     
         buf = io.BytesIO()
-        fig.savefig(buf, format="png", facecolor=fig.get_facecolor())
+        with span("savefig (PNG)", "wykres"):
+            fig.savefig(buf, format="png", facecolor=fig.get_facecolor())
         buf.seek(0)
         return buf
 
@@ -0,0 +1,592 @@
+# classes/batch_runner.py
+"""
+Uruchomienie wsadowe (bez Streamlit i przeglądarki): wczytanie źródeł, budowa spłaszczonej
+tabeli i raporty wszystkich trzech etapów analizy dla jednego lub wielu zbiorów danych.
+
+Uruchomienie z katalogu głównego repozytorium:
+    python -m classes.batch_runner data/ --output wyniki --max-missing 5 --max-risk średnie
+
+Zbiór danych to katalog z plikami CSV (nazwy jak w SOURCE_FILES) albo gotowa baza SQLite (.db).
+Wyniki: <output>/<zbiór>/report.json, tabele w Parquet oraz zbiorcze <output>/summary.json.
+Z opcją --trace dla każdego zbioru zapisywany jest też <output>/<zbiór>/trace.json (Chrome Trace).
+Kod wyjścia: 0 - w porządku, 1 - przekroczony próg KPI, 2 - błąd wczytywania lub analizy.
+"""
+
+import argparse
+import json
+import logging
+import math
+import multiprocessing
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+import time
+import urllib.parse
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+
+from classes.ai_compliance import AIComplianceAnalyzer
+from classes.ai_readiness_analyzer import AIReadinessAnalyzer
+from classes.catalog_scan import scan_catalog
+from classes.compaction import compact_dataframe, enable_copy_on_write
+from classes.data_loader import SOURCE_FILES, load_tables_parallel
+from classes.data_quality import DataQualityAnalyzer
+from classes.db_schema import apply_pragmas
+from classes.flat_table import FLAT_TABLE, flat_columns, get_flat_fact_table, refresh_flat_table
+from classes.instrumentation import default_tracer, span
+from classes.lineage import LineageResults, column_fingerprints, lineage_graph
+from classes.parse_cache import PERSISTENT_MAX_AGE, ParseCache
+from classes.result_cache import CachedAnalyzer, ResultCache, dataset_fingerprint, db_fingerprint
+from classes.sql_pushdown import SQLAIComplianceAnalyzer, SQLDataQualityAnalyzer
+from classes.streaming_profile import StreamingDataQualityAnalyzer, sql_chunks
+
+EXIT_OK = 0
+EXIT_BREACH = 1
+EXIT_ERROR = 2
+
+STAGES = ["quality", "compliance", "readiness"]
+
+# Poziomy ryzyka z AIComplianceAnalyzer.evaluate_risk (w kolejności rosnącej)
+RISK_LEVELS = ["niskie", "średnie", "wysokie"]
+
+logger = logging.getLogger("batch_runner")
+
+
+# --- Serializacja wyników ---
+
+def to_jsonable(value):
+    """
+    Zamienia wynik analizatora na strukturę zgodną z JSON: DataFrame -> lista rekordów
+    (z indeksem), Series -> słownik, typy numpy -> typy Pythona, NaN/inf -> None.
+    Bufory obrazków (wykresy) są pomijane.
+    """
+    if isinstance(value, pd.DataFrame):
+        frame = value.reset_index() if not isinstance(value.index, pd.RangeIndex) else value
+        return [to_jsonable(row) for row in frame.to_dict(orient="records")]
+    if isinstance(value, pd.Series):
+        return {str(k): to_jsonable(v) for k, v in value.items()}
+    if isinstance(value, dict):
+        return {str(k): to_jsonable(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [to_jsonable(v) for v in value]
+    if isinstance(value, np.ndarray):
+        return [to_jsonable(v) for v in value.tolist()]
+    if isinstance(value, np.generic):
+        value = value.item()
+    if isinstance(value, float) and not math.isfinite(value):
+        return None
+    if isinstance(value, (pd.Timestamp, pd.Timedelta)):
+        return value.isoformat()
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+    if value is pd.NA or value is pd.NaT:
+        return None
+    if hasattr(value, "read"):
+        return None
+    if isinstance(value, type):
+        return value.__name__
+    return str(value)
+
+
+def write_parquet(frame: pd.DataFrame, path: str):
+    """
+    Zapis tabeli wyników do Parquet. Indeks staje się kolumną, nazwy kolumn napisami,
+    a kolumny object o mieszanych typach zapisywane są jako tekst.
+    """
+    frame = frame.reset_index() if not isinstance(frame.index, pd.RangeIndex) else frame.copy()
+    frame.columns = [str(c) for c in frame.columns]
+    for col in frame.columns:
+        if frame[col].dtype == object:
+            kinds = {type(v) for v in frame[col].dropna()}
+            if len(kinds) > 1 or kinds - {str}:
+                frame[col] = frame[col].map(lambda v: None if v is None or v is pd.NA else str(v))
+    frame.to_parquet(path, index=False)
+
+
+# --- Etapy ---
+
+@contextmanager
+def _timed(timings, name):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings[name] = round(time.perf_counter() - start, 3)
+
+
+def prepare_database(source, work_dir, csv_options, parse_cache=None, max_workers=None):
+    """
+    Zwraca ścieżkę bazy SQLite zbioru danych. Katalog z plikami CSV wczytywany jest
+    równolegle (load_tables_parallel) do <work_dir>/sales.db; plik .db kopiowany jest tam
+    (API kopii zapasowej SQLite), bo analiza zapisuje w bazie (PRAGMA WAL, spłaszczona tabela,
+    wyzwalacze) - plik źródłowy pozostaje niezmieniony.
+    """
+    db_path = os.path.join(work_dir, "sales.db")
+    if os.path.isfile(source):
+        if os.path.abspath(source) == os.path.abspath(db_path):
+            raise ValueError(f"Baza źródłowa '{source}' nie może leżeć w katalogu wyników zbioru.")
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(db_path + suffix):
+                os.remove(db_path + suffix)
+        src = sqlite3.connect(f"file:{urllib.parse.quote(os.path.abspath(source))}?mode=ro", uri=True)
+        dst = sqlite3.connect(db_path)
+        try:
+            src.backup(dst)
+        finally:
+            dst.close()
+            src.close()
+        return db_path, {}
+    if not os.path.isdir(source):
+        raise ValueError(f"Źródło '{source}' nie jest katalogiem z plikami CSV ani plikiem bazy.")
+
+    existing = {name: os.path.join(source, file_name) for name, file_name in SOURCE_FILES.items()
+                if os.path.exists(os.path.join(source, file_name))}
+    if not existing:
+        raise ValueError(f"W katalogu '{source}' nie znaleziono plików źródłowych ({', '.join(SOURCE_FILES.values())}).")
+
+    conn = sqlite3.connect(db_path)
+    try:
+        apply_pragmas(conn)
+        results = load_tables_parallel(existing, conn, max_workers=max_workers, cache=parse_cache, **csv_options)
+    finally:
+        conn.close()
+    errors = {name: r["error"] for name, r in results.items() if r["error"]}
+    if errors:
+        raise ValueError(f"Błąd podczas wczytywania tabel: {errors}")
+    return db_path, {name: r["rows"] for name, r in results.items()}
+
+
+def _cached(analyzer, cache, fingerprint, key_attrs=()):
+    return CachedAnalyzer(analyzer, cache, fingerprint, key_attrs) if cache is not None else analyzer
+
+
+def run_quality(source, mode, cache, fingerprint, column_fps=None):
+    """
+    Raport jakości danych (jak na stronie 01_Data_Quality) i tabele do zapisu w Parquet.
+    source to DataFrame (tryb pandas) albo ścieżka bazy (tryby sql i stream).
+    column_fps - odciski kolumn z grafu pochodzenia (lineage): części raportu zapamiętywane są
+    per grupa kolumn, więc po ponownym wczytaniu wymiaru przeliczane są tylko jego kolumny.
+    """
+    conn = None
+    if mode == "pandas":
+        analyzer = DataQualityAnalyzer(source)
+    else:
+        conn = sqlite3.connect(source)
+        analyzer = (StreamingDataQualityAnalyzer(sql_chunks(conn)) if mode == "stream"
+                    else SQLDataQualityAnalyzer(conn))
+    try:
+        if cache is not None and column_fps is not None:
+            report = LineageResults(cache, column_fps, scope=mode).quality_report(analyzer)
+        else:
+            report = _cached(analyzer, cache, fingerprint).generate_report(with_type_conformance=False)
+    finally:
+        if conn is not None:
+            conn.close()
+
+    tables = {
+        "quality_missing": report["missing_values"]["missing_per_column_%"].to_frame("Procent braków"),
+        "quality_outliers": pd.DataFrame(report["outliers"]["outliers_per_column"]).T,
+        "quality_basic_stats": report["basic_stats"],
+    }
+    if len(report["duplicates"]["examples"]):
+        tables["quality_duplicate_examples"] = report["duplicates"]["examples"]
+    kpi = {
+        "Braki [%]": report["missing_values"]["percent_missing_total"],
+        "Duplikaty [%]": report["duplicates"]["percent_duplicates"],
+        "Outliery [%]": report["outliers"]["percent_outliers_total"],
+    }
+    return {"kpi": kpi, "report": report}, tables
+
+
+def run_compliance(source, mode, cache, fingerprint, group_cols=None, target_cols=None, db_path=None,
+                   column_fps=None):
+    """
+    Analiza zgodności z AI Act (bias, także w przekrojach grup, dane wrażliwe, pochodzenie, ocena ryzyka).
+    Jeśli podano db_path, dane osobowe i wrażliwe szukane są także we wszystkich tabelach bazy.
+    column_fps - jak w run_quality; bias zapamiętywany jest osobno dla każdej kolumny grupującej.
+    """
+    conn = None
+    if mode == "pandas":
+        analyzer = AIComplianceAnalyzer(source)
+    else:
+        conn = sqlite3.connect(source)
+        analyzer = SQLAIComplianceAnalyzer(conn)
+    try:
+        if cache is not None and column_fps is not None:
+            bias = LineageResults(cache, column_fps, scope=mode).analyze_bias(
+                analyzer, group_cols=group_cols, target_cols=target_cols)
+            analyzer = _cached(analyzer, cache, fingerprint)
+        else:
+            analyzer = _cached(analyzer, cache, fingerprint)
+            bias = analyzer.analyze_bias(group_cols=group_cols, target_cols=target_cols)
+        try:
+            intersectional = analyzer.analyze_intersectional_bias(group_cols=group_cols, target_cols=target_cols)
+        except ValueError as e:
+            logger.warning("Pominięto analizę biasu w przekrojach: %s", e)
+            intersectional = {"Komórki": pd.DataFrame(), "Podsumowanie": pd.DataFrame()}
+        sensitive = analyzer.analyze_sensitive_data()
+        lineage = analyzer.get_data_lineage()
+        risk = analyzer.evaluate_risk()
+    finally:
+        if conn is not None:
+            conn.close()
+
+    catalog = scan_catalog(db_path, cache=cache) if db_path is not None else None
+
+    summary_rows, mean_rows, test_rows = [], [], []
+    for group_col, results in bias.items():
+        if not isinstance(results, dict):
+            continue
+        summary_rows.append({"Kolumna": group_col, **results["Rozkład kategorii"]})
+        for key, val in results.items():
+            if key.startswith("Istotność różnic "):
+                test_rows.append({"Kolumna": group_col, "Zmienna": key[len("Istotność różnic "):], **val})
+            elif key.startswith("Średnia"):
+                target = key[len("Średnia "):-len(" wg grup")]
+                mean_rows.extend({"Kolumna": group_col, "Zmienna": target, "Grupa": str(group), "Średnia": mean}
+                                 for group, mean in val.items())
+    tables = {
+        "compliance_bias_summary": pd.DataFrame(summary_rows),
+        "compliance_bias_means": pd.DataFrame(mean_rows, columns=["Kolumna", "Zmienna", "Grupa", "Średnia"]),
+        "compliance_bias_tests": pd.DataFrame(test_rows),
+        "compliance_intersectional_cells": intersectional["Komórki"],
+        "compliance_intersectional_summary": intersectional["Podsumowanie"],
+        "compliance_pii_scan": pd.DataFrame(sensitive.get("Skan zawartości", [])),
+        "compliance_lineage": pd.DataFrame(lineage),
+    }
+    report = {"bias": bias, "intersectional_bias": intersectional["Podsumowanie"].to_dict(orient="records"),
+              "sensitive_data": sensitive, "lineage": lineage, "risk": risk}
+    if catalog is not None:
+        tables["compliance_catalog_tables"] = catalog["Tabele"]
+        tables["compliance_catalog_columns"] = catalog["Kolumny"]
+        report["catalog_scan"] = catalog["Tabele"].to_dict(orient="records")
+    return {"kpi": dict(risk), "report": report}, tables
+
+
+def run_readiness(df, cache, fingerprint, target_column=None, model_mode="auto"):
+    """
+    Analiza przydatności do trenowania AI (bez wykresów): reprezentatywność, metadane,
+    silne korelacje oraz - jeśli podano kolumnę celu - balans klas i prosty model
+    (model_mode jak w AIReadinessAnalyzer.train_simple_model).
+    """
+    analyzer = _cached(AIReadinessAnalyzer(df, target_column), cache, fingerprint, key_attrs=("target_column",))
+    representativeness = analyzer.check_representativeness()
+    metadata = analyzer.check_metadata_quality()
+    insights = analyzer.get_correlation_insights()
+    report = {
+        "representativeness": representativeness,
+        "metadata_quality": metadata,
+        "correlation_insights": [{"Zmienna 1": a, "Zmienna 2": b, "Korelacja": v} for a, b, v in insights],
+    }
+    kpi = {
+        "Reprezentatywność": float(abs(representativeness["skośność"]).mean())
+        if "skośność" in representativeness.columns else None,
+        "Jakość metadanych": 100.0 * (metadata["nulls"] == 0).sum() / len(metadata) if len(metadata) else None,
+        "Zbilansowanie klas": None,
+        "Wydajność modelu": None,
+    }
+    if target_column:
+        balance = analyzer.check_class_balance()
+        model = analyzer.train_simple_model(mode=model_mode)
+        report["class_balance"] = balance
+        report["model"] = model
+        if balance is not None and len(balance):
+            kpi["Zbilansowanie klas"] = {"max": float(balance.max()), "min": float(balance.min())}
+        if isinstance(model, dict):
+            kpi["Wydajność modelu"] = float(model["accuracy"])
+    tables = {
+        "readiness_representativeness": representativeness,
+        "readiness_metadata": metadata,
+    }
+    if isinstance(report.get("model"), dict) and report["model"].get("convergence") is not None:
+        tables["readiness_model_convergence"] = report["model"]["convergence"]
+    return {"kpi": kpi, "report": report}, tables
+
+
+# --- Progi ---
+
+def check_thresholds(kpis, thresholds):
+    """
+    Porównuje KPI z progami; zwraca listę przekroczeń {kpi, value, threshold}.
+    Progi o wartości None są pomijane, podobnie jak KPI etapów, które nie były uruchamiane.
+    """
+    checks = [
+        ("quality", "Braki [%]", "max_missing", lambda v, t: v > t),
+        ("quality", "Duplikaty [%]", "max_duplicates", lambda v, t: v > t),
+        ("quality", "Outliery [%]", "max_outliers", lambda v, t: v > t),
+        ("readiness", "Wydajność modelu", "min_accuracy", lambda v, t: v < t),
+    ]
+    breaches = []
+    for stage, name, key, breached in checks:
+        threshold = thresholds.get(key)
+        value = kpis.get(stage, {}).get(name)
+        if threshold is not None and value is not None and breached(value, threshold):
+            breaches.append({"kpi": name, "value": value, "threshold": threshold})
+
+    max_risk = thresholds.get("max_risk")
+    overall = kpis.get("compliance", {}).get("Ocena ogólna")
+    if max_risk is not None and overall is not None:
+        level = next((i for i, name in enumerate(RISK_LEVELS) if name in overall.lower()), None)
+        if level is not None and level > RISK_LEVELS.index(max_risk):
+            breaches.append({"kpi": "Ocena ogólna", "value": overall, "threshold": max_risk})
+    return breaches
+
+
+# --- Zbiór danych ---
+
+def dataset_name(source):
+    name = os.path.basename(os.path.normpath(source))
+    return os.path.splitext(name)[0] if os.path.isfile(source) else name
+
+
+def run_dataset(source, output_dir, options):
+    """
+    Pełne przetwarzanie jednego zbioru: wczytanie, spłaszczenie, trzy etapy analizy
+    (równolegle w wątkach - są od siebie niezależne), zapis wyników i sprawdzenie progów.
+    Zwraca podsumowanie: dataset, status (ok / breach / error), breaches, error, output, timings.
+    """
+    name = dataset_name(source)
+    out = os.path.join(output_dir, name)
+    os.makedirs(out, exist_ok=True)
+    timings = {}
+    summary = {"dataset": name, "source": source, "status": "ok", "breaches": [], "error": None,
+               "output": out, "timings": timings}
+    stages = options["stages"]
+    mode = options["mode"]
+    if options.get("trace"):
+        # Wątki etapów nie mają przypiętego Tracera, więc ich spany trafiają do tego samego wykonania
+        default_tracer.enabled = True
+        default_tracer.begin_run(name)
+    # Bez --cache-dir pamięć podręczna istnieje tylko na czas przetwarzania zbioru (katalog tymczasowy)
+    cache_dir = options["cache_dir"]
+    temporary_cache_dir = tempfile.mkdtemp(prefix="batch_cache_") if options["cache"] and not cache_dir else None
+    try:
+        parse_cache = cache = None
+        if options["cache"]:
+            max_age = PERSISTENT_MAX_AGE if cache_dir else None
+            parse_cache = ParseCache(os.path.join(cache_dir or temporary_cache_dir, "parsed"), max_age=max_age)
+            cache = ResultCache(os.path.join(cache_dir, "results") if cache_dir else None, max_age=max_age)
+
+        with _timed(timings, "load"), span("etap: load", "etap"):
+            db_path, loaded = prepare_database(source, out, options["csv"], parse_cache, options["load_workers"])
+        with _timed(timings, "flatten"), span("etap: flatten", "etap"):
+            conn = sqlite3.connect(db_path)
+            try:
+                apply_pragmas(conn)
+                refresh_flat_table(conn)
+                db_fp = db_fingerprint(conn, FLAT_TABLE)
+                # Pełna ramka potrzebna jest w trybie pandas oraz zawsze dla etapu readiness
+                df = None
+                if mode == "pandas" or "readiness" in stages:
+                    df = get_flat_fact_table(conn, cache=parse_cache)
+                    if options["compact"]:
+                        df, _ = compact_dataframe(df)
+                # Odciski kolumn z grafu pochodzenia: ramki w pamięci (pandas) i tabeli w bazie (sql)
+                column_fps = None
+                if cache is not None:
+                    graph = lineage_graph(conn)
+                    column_fps = (column_fingerprints(conn, df.columns, df.dtypes, graph) if mode == "pandas"
+                                  else column_fingerprints(conn, flat_columns(conn), graph=graph))
+            finally:
+                conn.close()
+        df_fp = dataset_fingerprint(df) if df is not None and cache is not None else None
+
+        data = df if mode == "pandas" else db_path
+        fingerprint = df_fp if mode == "pandas" else f"{mode}:{db_fp}"
+        jobs = {
+            "quality": lambda: run_quality(data, mode, cache, fingerprint,
+                                           column_fps if mode != "stream" else None),
+            "compliance": lambda: run_compliance(data, mode if mode == "pandas" else "sql", cache,
+                                                 fingerprint if mode == "pandas" else f"sql:{db_fp}",
+                                                 options["group_cols"], options["target_cols"], db_path,
+                                                 column_fps),
+            "readiness": lambda: run_readiness(df, cache, df_fp, options["target_column"],
+                                                options["model_mode"]),
+        }
+
+        def timed_job(stage):
+            with _timed(timings, stage), span(f"etap: {stage}", "etap"):
+                return jobs[stage]()
+
+        results, kpis, errors = {}, {}, {}
+        with ThreadPoolExecutor(max_workers=len(stages)) as executor:
+            futures = {stage: executor.submit(timed_job, stage) for stage in stages}
+            for stage, future in futures.items():
+                try:
+                    result, tables = future.result()
+                except Exception as e:
+                    logger.exception("%s: błąd etapu %s", name, stage)
+                    errors[stage] = str(e)
+                    continue
+                results[stage] = result["report"]
+                kpis[stage] = result["kpi"]
+                if "parquet" in options["formats"]:
+                    for table_name, frame in tables.items():
+                        write_parquet(frame, os.path.join(out, f"{table_name}.parquet"))
+
+        summary["breaches"] = check_thresholds(kpis, options["thresholds"])
+        if errors:
+            summary["status"] = "error"
+            summary["error"] = errors
+        elif summary["breaches"]:
+            summary["status"] = "breach"
+
+        if "json" in options["formats"]:
+            document = {"dataset": name, "source": source, "mode": mode, "rows_loaded": loaded,
+                        "rows": int(len(df)) if df is not None else None, "kpi": kpis, "results": results,
+                        "breaches": summary["breaches"], "errors": errors, "timings": timings}
+            with open(os.path.join(out, "report.json"), "w", encoding="utf-8") as f:
+                json.dump(to_jsonable(document), f, ensure_ascii=False, indent=2)
+    except Exception as e:
+        logger.exception("%s: przetwarzanie przerwane", name)
+        summary["status"] = "error"
+        summary["error"] = str(e)
+    finally:
+        if temporary_cache_dir is not None:
+            shutil.rmtree(temporary_cache_dir, ignore_errors=True)
+
+    if options.get("trace"):
+        default_tracer.export_chrome_trace(os.path.join(out, "trace.json"), runs=[default_tracer.runs[-1]])
+        default_tracer.end_run()
+
+    # Baza robocza (zbudowana z plików CSV albo kopia pliku .db) nie jest zachowywana,
+    # chyba że poproszono o to wprost
+    work_db = os.path.join(out, "sales.db")
+    if not options["keep_db"] and os.path.exists(work_db):
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(work_db + suffix):
+                os.remove(work_db + suffix)
+    return summary
+
+
+def run_batch(sources, output_dir, options, jobs=1):
+    """
+    Przetwarza wiele zbiorów danych; przy jobs > 1 zbiory trafiają do osobnych procesów.
+    Zwraca (lista podsumowań, kod wyjścia).
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    if jobs > 1 and len(sources) > 1:
+        with ProcessPoolExecutor(max_workers=jobs, initializer=enable_copy_on_write) as executor:
+            summaries = list(executor.map(run_dataset, sources, [output_dir] * len(sources),
+                                          [options] * len(sources)))
+    else:
+        summaries = [run_dataset(source, output_dir, options) for source in sources]
+
+    exit_code = EXIT_OK
+    if any(s["status"] == "error" for s in summaries):
+        exit_code = EXIT_ERROR
+    elif any(s["status"] == "breach" for s in summaries):
+        exit_code = EXIT_BREACH
+    with open(os.path.join(output_dir, "summary.json"), "w", encoding="utf-8") as f:
+        json.dump(to_jsonable({"exit_code": exit_code, "datasets": summaries}), f, ensure_ascii=False, indent=2)
+    return summaries, exit_code
+
+
+# --- Wiersz poleceń ---
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog="python -m classes.batch_runner",
+        description="Wsadowe raporty jakości danych, zgodności z AI Act i przydatności do AI (bez Streamlit)."
+    )
+    parser.add_argument("sources", nargs="+",
+                        help="Katalogi z plikami CSV schematu gwiazdy lub pliki baz SQLite (.db).")
+    parser.add_argument("--output", default="batch_results", help="Katalog wyników (domyślnie batch_results).")
+    parser.add_argument("--format", choices=["json", "parquet", "both"], default="both",
+                        help="Format wyników: report.json, tabele Parquet lub oba.")
+    parser.add_argument("--mode", choices=["pandas", "sql", "stream"], default="pandas",
+                        help="Gdzie liczyć jakość danych i bias (jak tryb obliczeń w aplikacji).")
+    parser.add_argument("--stages", default=",".join(STAGES),
+                        help=f"Etapy rozdzielone przecinkami (domyślnie {','.join(STAGES)}).")
+    parser.add_argument("--jobs", type=int, default=1, help="Liczba zbiorów przetwarzanych równolegle (procesy).")
+
+    csv = parser.add_argument_group("odczyt CSV")
+    csv.add_argument("--sep", default=";")
+    csv.add_argument("--decimal", default=",")
+    csv.add_argument("--encoding", default="utf-8")
+    csv.add_argument("--no-header", action="store_true", help="Pliki CSV bez wiersza nagłówka.")
+    csv.add_argument("--chunksize", type=int, default=100_000, help="Rozmiar porcji (0 = cały plik naraz).")
+
+    analysis = parser.add_argument_group("analiza")
+    analysis.add_argument("--group-cols", help="Kolumny grupujące analizy biasu (rozdzielone przecinkami).")
+    analysis.add_argument("--target-cols", help="Kolumny celu analizy biasu (rozdzielone przecinkami).")
+    analysis.add_argument("--target-column", help="Kolumna klas dla balansu klas i prostego modelu.")
+    analysis.add_argument("--model-mode", choices=["auto", "sgd", "full"], default="auto",
+                          help="Trenowanie prostego modelu: porcjami na próbie warstwowej (sgd), "
+                               "LogisticRegression na całości (full) lub sgd dla dużych zbiorów (auto).")
+    analysis.add_argument("--no-compact", action="store_true", help="Bez kompaktowania typów kolumn.")
+    analysis.add_argument("--no-cache", action="store_true",
+                          help="Bez pamięci podręcznej sparsowanych plików i wyników analiz.")
+    analysis.add_argument("--cache-dir",
+                          help="Trwała pamięć podręczna w podanym katalogu (zawiera dane źródłowe; wpisy nieużywane "
+                               "przez 7 dni są usuwane). Domyślnie pamięć podręczna jest usuwana po każdym zbiorze.")
+    analysis.add_argument("--keep-db", action="store_true",
+                          help="Zachowaj bazę roboczą (zbudowaną z plików CSV lub kopię pliku .db) w katalogu wyników.")
+    analysis.add_argument("--trace", action="store_true",
+                          help="Zapisz pomiary etapów (czas, CPU, pamięć) do trace.json w formacie Chrome Trace.")
+
+    thresholds = parser.add_argument_group("progi (przekroczenie = kod wyjścia 1)")
+    thresholds.add_argument("--max-missing", type=float, help="Maksymalny procent braków.")
+    thresholds.add_argument("--max-duplicates", type=float, help="Maksymalny procent duplikatów.")
+    thresholds.add_argument("--max-outliers", type=float, help="Maksymalny procent outlierów.")
+    thresholds.add_argument("--max-risk", choices=RISK_LEVELS, help="Najwyższy dopuszczalny poziom ryzyka AI Act.")
+    thresholds.add_argument("--min-accuracy", type=float, help="Minimalna dokładność prostego modelu (0-1).")
+    return parser
+
+
+def _split(value):
+    return [v.strip() for v in value.split(",") if v.strip()] if value else None
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    enable_copy_on_write()
+
+    stages = _split(args.stages) or []
+    unknown = [s for s in stages if s not in STAGES]
+    if unknown or not stages:
+        parser.error(f"nieznane etapy: {unknown} (dozwolone: {', '.join(STAGES)}).")
+
+    jobs = max(1, args.jobs)
+    options = {
+        "stages": [s for s in STAGES if s in stages],
+        "mode": args.mode,
+        "formats": ["json", "parquet"] if args.format == "both" else [args.format],
+        "csv": {"sep": args.sep, "decimal": args.decimal, "encoding": args.encoding,
+                "header": None if args.no_header else 0, "chunksize": args.chunksize or None},
+        # Procesy parsujące dzielone między zbiory przetwarzane równolegle
+        "load_workers": max(1, multiprocessing.cpu_count() // jobs),
+        "group_cols": _split(args.group_cols),
+        "target_cols": _split(args.target_cols),
+        "target_column": args.target_column,
+        "model_mode": args.model_mode,
+        "compact": not args.no_compact,
+        "cache": not args.no_cache,
+        "cache_dir": args.cache_dir,
+        "keep_db": args.keep_db,
+        "trace": args.trace,
+        "thresholds": {
+            "max_missing": args.max_missing,
+            "max_duplicates": args.max_duplicates,
+            "max_outliers": args.max_outliers,
+            "max_risk": args.max_risk,
+            "min_accuracy": args.min_accuracy,
+        },
+    }
+
+    summaries, exit_code = run_batch(args.sources, args.output, options, jobs=jobs)
+    for s in summaries:
+        logger.info("%s: %s%s", s["dataset"], s["status"],
+                    "".join(f"; {b['kpi']} = {b['value']} (próg {b['threshold']})" for b in s["breaches"]))
+    return exit_code
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,226 @@
+# classes/bias_cube.py
+"""
+Kostka statystyk biasu dla przekrojów kolumn grupujących (np. COUNTRYNAME × PaymentMethodName
+× ChannelName).
+
+Dane przeglądane są raz: wiersze grupowane są po całkowitych kodach kategorii wszystkich
+kolumn naraz (najdrobniejsze komórki), a dla każdej komórki zapamiętywane są liczność oraz
+liczba wartości, suma i suma kwadratów każdej zmiennej celu. Statystyki te są addytywne, więc
+każdy grubszy przekrój (rollup) wyliczany jest z komórek bazowych bez ponownego czytania danych.
+"""
+
+from itertools import combinations
+
+import numpy as np
+import pandas as pd
+
+# Komórki mniej liczne są ukrywane w tabeli wyników (statystyki nie są ujawniane)
+DEFAULT_MIN_CELL = 10
+
+# Statystyki zmiennych celu w tabeli biasu (kolumny "<statystyka> <zmienna>")
+STAT_PREFIXES = ("Średnia", "Odch. std.", "Różnica od średniej")
+
+# Powyżej tej liczby możliwych komórek klucze kompresowane są przez np.unique zamiast bincount
+_DENSE_CELLS_LIMIT = 1 << 22
+
+
+def category_codes(column: pd.Series):
+    """
+    Kody całkowite i poziomy kolumny grupującej (braki = -1), w kolejności sortowania
+    (dla typu category - w kolejności kategorii).
+    """
+    if isinstance(column.dtype, pd.CategoricalDtype):
+        return column.cat.codes.to_numpy().astype(np.int64), column.cat.categories
+    codes, uniques = pd.factorize(column, sort=True)
+    return codes.astype(np.int64), pd.Index(uniques)
+
+
+def _cell_keys(codes, sizes):
+    """
+    Łączy kody kolumn w jeden klucz komórki (zapis pozycyjny o podstawach sizes).
+    Zwraca (klucze, liczba możliwych kluczy); przy groźbie przepełnienia int64 klucz
+    częściowy jest najpierw kompresowany do kolejnych liczb.
+    """
+    key = np.zeros(len(codes[0]) if codes else 0, dtype=np.int64)
+    space = 1
+    for c, size in zip(codes, sizes):
+        size = max(int(size), 1)
+        if space * size >= 2 ** 62:
+            uniques, key = np.unique(key, return_inverse=True)
+            space = len(uniques)
+        key = key * size + c
+        space *= size
+    return key, space
+
+
+class BiasCube:
+    """
+    Komórki bazowe kostki: kody kolumn grupujących (cells × wymiary), liczności oraz dla
+    zmiennych celu liczba wartości niepustych, suma i suma kwadratów odchyleń od przesunięcia
+    (shifts - średnia zmiennej, co ogranicza utratę precyzji przy wariancji z sum).
+    """
+
+    def __init__(self, dims, levels, cell_codes, counts, targets, n, sums, sumsqs, shifts=None):
+        self.dims = list(dims)
+        self.levels = [pd.Index(level) for level in levels]
+        self.cell_codes = np.asarray(cell_codes, dtype=np.int64).reshape(len(counts), len(self.dims))
+        self.counts = np.asarray(counts, dtype=np.int64)
+        self.targets = list(targets)
+        shape = (len(self.counts), len(self.targets))
+        self.n = np.asarray(n, dtype=np.float64).reshape(shape)
+        self.sums = np.asarray(sums, dtype=np.float64).reshape(shape)
+        self.sumsqs = np.asarray(sumsqs, dtype=np.float64).reshape(shape)
+        self.shifts = np.zeros(len(self.targets)) if shifts is None else np.asarray(shifts, dtype=np.float64)
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame, group_cols, target_cols):
+        """
+        Buduje komórki bazowe z ramki w jednym przebiegu po kodach kategorii.
+        Wiersze z brakiem w którejkolwiek kolumnie grupującej są pomijane.
+        """
+        if not group_cols:
+            raise ValueError("Podaj co najmniej jedną kolumnę grupującą.")
+        codes, levels = zip(*(category_codes(df[c]) for c in group_cols))
+        valid = np.logical_and.reduce([c >= 0 for c in codes])
+        codes = [c[valid] for c in codes]
+        key, space = _cell_keys(codes, [len(level) for level in levels])
+
+        if space <= max(_DENSE_CELLS_LIMIT, len(key)):
+            # Mało możliwych komórek: zliczanie bezpośrednio po kluczu (bez sortowania)
+            dense_counts = np.bincount(key, minlength=space)
+            cells = np.flatnonzero(dense_counts)
+            # Dowolny wiersz komórki wystarcza do odczytania jej kodów
+            first = np.zeros(space, dtype=np.int64)
+            first[key] = np.arange(len(key))
+            first = first[cells]
+            counts = dense_counts[cells]
+
+            def accumulate(weights):
+                return np.bincount(key, weights=weights, minlength=space)[cells]
+        else:
+            cells, first, inverse = np.unique(key, return_index=True, return_inverse=True)
+            counts = np.bincount(inverse, minlength=len(cells))
+
+            def accumulate(weights):
+                return np.bincount(inverse, weights=weights, minlength=len(cells))
+
+        cell_codes = np.column_stack([c[first] for c in codes]) if len(cells) else np.empty((0, len(codes)))
+        targets = [t for t in dict.fromkeys(target_cols) if t in df.columns]
+        n, sums, sumsqs, shifts = [], [], [], []
+        for target in targets:
+            x = df[target].to_numpy(dtype=np.float64, na_value=np.nan)[valid]
+            present = ~np.isnan(x)
+            shift = x[present].mean() if present.any() else 0.0
+            d = np.where(present, x - shift, 0.0)
+            n.append(accumulate(present.astype(np.float64)))
+            sums.append(accumulate(d))
+            sumsqs.append(accumulate(d * d))
+            shifts.append(shift)
+
+        def stack(columns):
+            return np.column_stack(columns) if columns else np.empty((len(cells), 0))
+        return cls(group_cols, levels, cell_codes, counts, targets, stack(n), stack(sums), stack(sumsqs), shifts)
+
+    @classmethod
+    def from_aggregates(cls, keys: pd.DataFrame, counts, targets, n, sums, sumsqs):
+        """
+        Buduje komórki bazowe z gotowych agregatów (np. z zapytania GROUP BY w SQLite):
+        keys - wartości kolumn grupujących w komórkach, counts - liczności, n/sums/sumsqs -
+        tablice (komórki × zmienne) liczby wartości, sum i sum kwadratów (bez przesunięcia).
+        """
+        codes, levels = zip(*(category_codes(keys[c]) for c in keys.columns))
+        return cls(keys.columns, levels, np.column_stack(codes), counts, targets, n, sums, sumsqs)
+
+    # --- Przekroje ---
+
+    def rollup(self, dims=()):
+        """
+        Statystyki przekroju po podzbiorze wymiarów, wyliczone z komórek bazowych.
+        Zwraca DataFrame: kolumny wymiarów, "Liczność" oraz (zmienna, "mean"/"count"/"var").
+        """
+        positions = [self.dims.index(d) for d in dims]
+        if positions:
+            groups, inverse = np.unique(self.cell_codes[:, positions], axis=0, return_inverse=True)
+            inverse = inverse.reshape(-1)
+        else:
+            groups, inverse = np.empty((1 if len(self.counts) else 0, 0), dtype=np.int64), np.zeros(len(self.counts), np.int64)
+        k = len(groups)
+
+        frame = {d: self.levels[p][groups[:, i]] for i, (d, p) in enumerate(zip(dims, positions))}
+        frame["Liczność"] = np.bincount(inverse, weights=self.counts, minlength=k).astype(np.int64)
+        result = pd.DataFrame(frame)
+        for j, target in enumerate(self.targets):
+            n = np.bincount(inverse, weights=self.n[:, j], minlength=k)
+            s = np.bincount(inverse, weights=self.sums[:, j], minlength=k)
+            ss = np.bincount(inverse, weights=self.sumsqs[:, j], minlength=k)
+            with np.errstate(invalid="ignore", divide="ignore"):
+                mean = np.where(n > 0, self.shifts[j] + s / n, np.nan)
+                var = np.where(n > 1, np.maximum(ss - s * s / n, 0.0) / (n - 1), np.nan)
+            result[(target, "mean")] = mean
+            result[(target, "count")] = n.astype(np.int64)
+            result[(target, "var")] = var
+        return result
+
+    def combinations(self, max_order=None):
+        """
+        Wszystkie przekroje od pojedynczych kolumn do max_order kolumn (domyślnie wszystkich).
+        """
+        max_order = len(self.dims) if max_order is None else min(max_order, len(self.dims))
+        for order in range(1, max_order + 1):
+            yield from combinations(self.dims, order)
+
+    def bias_table(self, max_order=None, min_cell: int = DEFAULT_MIN_CELL):
+        """
+        Tabela biasu dla AI Act: jeden wiersz na komórkę każdego przekroju, z udziałem w danych,
+        średnią i odchyleniem standardowym zmiennych celu oraz różnicą średniej od średniej
+        ogólnej. Komórki o liczności < min_cell są oznaczone jako ukryte, a ich statystyki
+        zmiennych celu nie są podawane.
+        """
+        overall = self.rollup(())
+        total = int(overall["Liczność"].sum())
+        stat_columns = [f"{stat} {t}" for t in self.targets for stat in STAT_PREFIXES]
+        columns = ["Przekrój", "Rząd", *self.dims, "Liczność", "Udział", "Ukryta", *stat_columns]
+        parts = []
+        for dims in self.combinations(max_order):
+            cells = self.rollup(dims)
+            part = pd.DataFrame({
+                "Przekrój": " × ".join(dims),
+                "Rząd": len(dims),
+                **{d: cells[d] if d in dims else None for d in self.dims},
+                "Liczność": cells["Liczność"],
+                "Udział": cells["Liczność"] / total if total else np.nan,
+                "Ukryta": cells["Liczność"] < min_cell,
+            })
+            for target in self.targets:
+                mean = cells[(target, "mean")]
+                part[f"Średnia {target}"] = mean
+                part[f"Odch. std. {target}"] = np.sqrt(cells[(target, "var")])
+                part[f"Różnica od średniej {target}"] = mean - overall[(target, "mean")].iloc[0]
+            part.loc[part["Ukryta"], stat_columns] = np.nan
+            parts.append(part)
+        return pd.concat(parts, ignore_index=True) if parts else pd.DataFrame(columns=columns)
+
+
+def bias_summary(table: pd.DataFrame, targets) -> pd.DataFrame:
+    """
+    Podsumowanie tabeli biasu po przekrojach: liczba komórek (w tym ukrytych), skrajne udziały
+    oraz rozstęp i największe odchylenie średnich - wyłącznie z komórek nieukrytych.
+    """
+    rows = []
+    for (name, order), cells in table.groupby(["Przekrój", "Rząd"], sort=False):
+        shown = cells[~cells["Ukryta"]]
+        row = {
+            "Przekrój": name,
+            "Rząd": order,
+            "Liczba komórek": len(cells),
+            "Ukryte komórki": int(cells["Ukryta"].sum()),
+            "Min udział": round(cells["Udział"].min(), 4),
+            "Max udział": round(cells["Udział"].max(), 4),
+        }
+        for target in targets:
+            means = shown[f"Średnia {target}"]
+            row[f"Rozstęp średnich {target}"] = round(means.max() - means.min(), 4) if means.notna().any() else np.nan
+            row[f"Max |różnica| {target}"] = (round(shown[f"Różnica od średniej {target}"].abs().max(), 4)
+                                             if means.notna().any() else np.nan)
+        rows.append(row)
+    return pd.DataFrame(rows)
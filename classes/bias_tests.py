@@ -0,0 +1,141 @@
+# classes/bias_tests.py
+"""
+Testy istotności i przedziały ufności dla analizy biasu, liczone ze statystyk dostatecznych
+grup (liczności, średnie, wariancje, sumy rang) zamiast z pojedynczych wierszy:
+- jednoczynnikowa ANOVA i test Kruskala-Wallisa dla różnic średnich między grupami,
+- test zgodności χ² dla udziałów kategorii (hipoteza: równe udziały),
+- bootstrap rozstępu udziałów i rozstępu średnich.
+
+Bootstrap losuje całe tablice naraz (powtórzenia × grupy): liczności grup z rozkładu
+wielomianowego, a średnie w grupach z rozkładu normalnego N(średnia, wariancja / liczność)
+(twierdzenie graniczne). Koszt nie zależy więc od liczby wierszy, tylko od liczby grup
+i powtórzeń; duże zadania dzielone są między procesy.
+"""
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from scipy.stats import chi2, f as f_dist
+
+# Od tej liczby losowanych wartości (powtórzenia × grupy × (zmienne + 1)) bootstrap
+# rozdzielany jest między procesy - dla mniejszych start puli kosztuje więcej niż obliczenia
+PARALLEL_MIN_VALUES = 20_000_000
+
+
+def chi_square_shares(sizes):
+    """
+    Test zgodności χ² liczności grup z równym podziałem. Zwraca (statystyka, p-value).
+    """
+    sizes = np.asarray(sizes, dtype=np.float64)
+    k = len(sizes)
+    if k < 2 or sizes.sum() == 0:
+        return np.nan, np.nan
+    expected = sizes.sum() / k
+    statistic = float(np.sum((sizes - expected) ** 2) / expected)
+    return statistic, float(chi2.sf(statistic, k - 1))
+
+
+def anova_from_statistics(n, mean, var):
+    """
+    Jednoczynnikowa ANOVA z liczności, średnich i wariancji (nieobciążonych) grup.
+    Grupy bez wartości są pomijane. Zwraca (F, p-value).
+    """
+    n, mean, var = (np.asarray(a, dtype=np.float64) for a in (n, mean, var))
+    present = n > 0
+    n, mean, var = n[present], mean[present], np.nan_to_num(var[present])
+    k, total = len(n), n.sum()
+    if k < 2 or total <= k:
+        return np.nan, np.nan
+    grand = np.sum(n * mean) / total
+    between = np.sum(n * (mean - grand) ** 2) / (k - 1)
+    within = np.sum((n - 1) * var) / (total - k)
+    if within == 0:
+        return (np.inf, 0.0) if between > 0 else (np.nan, np.nan)
+    statistic = float(between / within)
+    return statistic, float(f_dist.sf(statistic, k - 1, total - k))
+
+
+def kruskal_from_rank_sums(n, rank_sums, tie_term):
+    """
+    Test Kruskala-Wallisa z liczności i sum rang (rangi średnie dla remisów) w grupach.
+    tie_term = Σ (t³ - t) po grupach remisów całej próby. Zwraca (H, p-value).
+    """
+    n, rank_sums = np.asarray(n, dtype=np.float64), np.asarray(rank_sums, dtype=np.float64)
+    present = n > 0
+    n, rank_sums = n[present], rank_sums[present]
+    k, total = len(n), n.sum()
+    if k < 2 or total < 2:
+        return np.nan, np.nan
+    statistic = 12.0 / (total * (total + 1)) * np.sum(rank_sums ** 2 / n) - 3 * (total + 1)
+    correction = 1 - tie_term / (total ** 3 - total)
+    if correction <= 0:
+        return np.nan, np.nan
+    statistic = float(statistic / correction)
+    return statistic, float(chi2.sf(statistic, k - 1))
+
+
+def _spread(values):
+    with np.errstate(invalid="ignore"):
+        return np.nanmax(values, axis=1) - np.nanmin(values, axis=1)
+
+
+def _bootstrap_chunk(sizes, means, variances, present, repeats, seed):
+    """
+    repeats powtórzeń bootstrapu: rozstęp udziałów (repeats,) i rozstępy średnich (repeats, zmienne).
+    """
+    rng = np.random.default_rng(seed)
+    total = int(sizes.sum())
+    counts = rng.multinomial(total, sizes / total, size=repeats).astype(np.float64)
+    share_spread = _spread(np.where(counts > 0, counts / total, np.nan))
+    mean_spreads = np.empty((repeats, len(means)))
+    for j, (mean, var, ratio) in enumerate(zip(means, variances, present)):
+        # Wartości niepuste zmiennej w grupie - proporcjonalnie do wylosowanej liczności grupy
+        n = counts * ratio
+        with np.errstate(invalid="ignore", divide="ignore"):
+            scale = np.sqrt(np.nan_to_num(var) / n)
+            sample = mean + scale * rng.standard_normal(counts.shape)
+        mean_spreads[:, j] = _spread(np.where(n >= 1, sample, np.nan))
+    return share_spread, mean_spreads
+
+
+def bootstrap_spreads(sizes, means=(), variances=(), counts=(), n_boot: int = 1000,
+                      confidence: float = 0.95, seed=0, max_workers=None):
+    """
+    Przedziały ufności (percentylowe) rozstępu udziałów grup i rozstępu średnich każdej zmiennej.
+    sizes - liczności grup; means/variances/counts - dla każdej zmiennej tablice po grupach
+    (średnia, wariancja, liczba wartości niepustych). Zwraca ((dolna, górna), [(dolna, górna), ...]).
+    """
+    if n_boot < 1:
+        raise ValueError("Liczba powtórzeń bootstrapu musi być dodatnia.")
+    sizes = np.asarray(sizes, dtype=np.float64)
+    if len(sizes) == 0 or sizes.sum() == 0:
+        return (np.nan, np.nan), [(np.nan, np.nan)] * len(means)
+    means = [np.asarray(m, dtype=np.float64) for m in means]
+    variances = [np.asarray(v, dtype=np.float64) for v in variances]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        present = [np.where(sizes > 0, np.asarray(c, dtype=np.float64) / sizes, 0.0) for c in counts]
+
+    workers = max_workers or os.cpu_count() or 1
+    values = n_boot * len(sizes) * (len(means) + 1)
+    chunks = workers if workers > 1 and values >= PARALLEL_MIN_VALUES else 1
+    repeats = [n_boot // chunks + (i < n_boot % chunks) for i in range(chunks)]
+    seeds = np.random.SeedSequence(seed).spawn(chunks)
+    args = [(sizes, means, variances, present, r, s) for r, s in zip(repeats, seeds)]
+    if chunks > 1:
+        with ProcessPoolExecutor(max_workers=chunks) as executor:
+            parts = list(executor.map(_bootstrap_chunk, *zip(*args)))
+    else:
+        parts = [_bootstrap_chunk(*args[0])]
+
+    share_spread = np.concatenate([p[0] for p in parts])
+    mean_spreads = np.concatenate([p[1] for p in parts])
+    alpha = (1 - confidence) / 2
+
+    def interval(values):
+        values = values[~np.isnan(values)]
+        if not len(values):
+            return np.nan, np.nan
+        low, high = np.quantile(values, [alpha, 1 - alpha])
+        return float(low), float(high)
+    return interval(share_spread), [interval(mean_spreads[:, j]) for j in range(len(means))]
@@ -0,0 +1,201 @@
+# classes/catalog_scan.py
+"""
+Skan danych osobowych i wrażliwych we wszystkich tabelach bazy SQLite (także w tabelach
+wymiarów, których kolumny nie trafiają do spłaszczonej tabeli, np. DimCustomer).
+
+Z każdej tabeli czytana jest ograniczona próba: kilka losowych zakresów rowid (odczyt po
+indeksie rowid, bez przeglądania całej tabeli). Tabele skanowane są równolegle - każdy wątek
+ma własne połączenie tylko do odczytu. Wynik tabeli zapamiętywany jest w ResultCache pod
+kluczem z wersji wczytania, zakresu rowid i skrótu schematu, więc ponowny skan pomija
+niezmienione tabele bez liczenia ich wierszy.
+"""
+
+import hashlib
+import json
+import math
+import os
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from classes.compaction import TEXT_DTYPES
+from classes.data_loader import LOAD_META_TABLE
+from classes.flat_table import FLAT_TABLE, flat_state
+from classes.instrumentation import span, traced
+from classes.pii_scan import (DEFAULT_MIN_RATE, DEFAULT_SAMPLE_ROWS, PII_TYPES, classify_column_names,
+                              privacy_risk_level, scan_columns)
+
+# Liczba losowych zakresów rowid, z których składana jest próba tabeli
+DEFAULT_SAMPLE_RANGES = 8
+
+
+def _quote(name):
+    return '"' + str(name).replace('"', '""') + '"'
+
+
+def catalog_tables(conn):
+    """
+    Tabele użytkownika w bazie (bez tabel wewnętrznych SQLite i technicznych z prefiksem '_').
+    """
+    rows = conn.execute("SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite\\_%' ESCAPE '\\' "
+                        "ORDER BY name").fetchall()
+    return [name for (name,) in rows if not name.startswith("_")]
+
+
+def table_signature(conn, table):
+    """
+    (stan tabeli, skrót schematu) - zmiana którejkolwiek wartości unieważnia wynik skanu tabeli.
+    Stan to wersja z _load_meta (dla spłaszczonej tabeli - stan jej odświeżenia) i zakres rowid:
+    bez COUNT(*), więc ponowny skan niezmienionej tabeli nie przegląda jej wierszy.
+    """
+    schema = conn.execute(f"PRAGMA table_info({_quote(table)})").fetchall()
+    # Połączenie tylko do odczytu - _load_meta czytana bez tworzenia (get_load_meta ją zakłada)
+    has_meta = conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?",
+                            (LOAD_META_TABLE,)).fetchone()
+    version = (conn.execute(f"SELECT version FROM {LOAD_META_TABLE} WHERE lower(table_name) = lower(?)",
+                            (table,)).fetchone() if has_meta else None)
+    try:
+        # MIN/MAX(rowid) to odczyt skrajnych stron drzewa, nie przegląd tabeli
+        bounds = conn.execute(f"SELECT MIN(rowid), MAX(rowid) FROM {_quote(table)}").fetchone()
+    except sqlite3.OperationalError:
+        # Tabela WITHOUT ROWID
+        bounds = conn.execute(f"SELECT COUNT(*) FROM {_quote(table)}").fetchone()
+    state = json.dumps({
+        "version": version[0] if version else None,
+        "rowid": list(bounds),
+        "flat_state": flat_state(conn) if table.lower() == FLAT_TABLE.lower() else None,
+    }, sort_keys=True, default=str)
+    return state, hashlib.sha256(json.dumps(schema, default=str).encode("utf-8")).hexdigest()
+
+
+def sample_table(conn, table, columns, rows, sample_rows: int = DEFAULT_SAMPLE_ROWS,
+                 ranges: int = DEFAULT_SAMPLE_RANGES, seed=None):
+    """
+    Próba do sample_rows wierszy w losowej kolejności. Mniejsze tabele czytane są w całości,
+    większe - jako ranges zakresów kolejnych rowid od losowych początków (tabele WITHOUT ROWID:
+    ORDER BY random() LIMIT).
+    """
+    select = ", ".join(_quote(c) for c in columns)
+    source = _quote(table)
+    if rows <= sample_rows:
+        sample = pd.read_sql(f"SELECT {select} FROM {source}", conn)
+    else:
+        try:
+            low, high = conn.execute(f"SELECT MIN(rowid), MAX(rowid) FROM {source}").fetchone()
+        except sqlite3.OperationalError:
+            low = high = None
+        if low is None:
+            sample = pd.read_sql(f"SELECT {select} FROM {source} ORDER BY random() LIMIT ?", conn,
+                                 params=(int(sample_rows),))
+        else:
+            chunk = math.ceil(sample_rows / ranges)
+            starts = np.random.default_rng(seed).integers(low, high + 1, size=ranges)
+            parts = [pd.read_sql(f"SELECT rowid AS _rowid, {select} FROM {source} WHERE rowid >= ? "
+                                 f"ORDER BY rowid LIMIT ?", conn, params=(int(start), chunk))
+                     for start in starts]
+            # Zakresy mogą na siebie zachodzić
+            sample = pd.concat(parts, ignore_index=True).drop_duplicates("_rowid").drop(columns="_rowid")
+    # Losowa kolejność - warunek wcześniejszego zakończenia skanu kolumny; zakresy zaokrąglone
+    # w górę mogą dać kilka wierszy ponad sample_rows
+    return sample.sample(frac=1, random_state=seed).head(sample_rows).reset_index(drop=True)
+
+
+@traced(category="zgodność z AI Act")
+def scan_table(conn, table, sample_rows: int = DEFAULT_SAMPLE_ROWS, min_rate: float = DEFAULT_MIN_RATE,
+               rows=None, seed=0):
+    """
+    Klasyfikacja kolumn jednej tabeli: reguły po nazwach i skan zawartości kolumn tekstowych
+    na próbie. rows - liczba wierszy tabeli, jeśli jest już znana. Zwraca (wiersz podsumowania
+    tabeli, wiersze kolumn).
+    """
+    columns = [row[1] for row in conn.execute(f"PRAGMA table_info({_quote(table)})") if not row[1].startswith("_")]
+    if rows is None:
+        rows = conn.execute(f"SELECT COUNT(*) FROM {_quote(table)}").fetchone()[0]
+    sample = sample_table(conn, table, columns, rows, sample_rows, seed=seed) if columns else pd.DataFrame()
+    text_cols = sample.select_dtypes(include=TEXT_DTYPES).columns.tolist()
+    # Tabele skanowane są równolegle, więc kolumny tabeli - po kolei
+    content = {row["Kolumna"]: row for row in
+               scan_columns({c: sample[c] for c in text_cols}, min_rate=min_rate, max_workers=1)}
+
+    # Słowa kluczowe jako całe słowa nazwy - reguły fragmentów nazw dotyczą kolumn spłaszczonej tabeli
+    personal, sensitive = classify_column_names(columns, by_tokens=True)
+    personal += [c for c, row in content.items() if row["Wykryte typy"] and c not in personal]
+    column_rows = []
+    for col in columns:
+        row = content.get(col, {})
+        column_rows.append({
+            "Tabela": table,
+            "Kolumna": col,
+            "Dane osobowe": col in personal,
+            "Dane wrażliwe": col in sensitive,
+            "Wykryte typy": ", ".join(row.get("Wykryte typy", [])),
+            "Przeskanowane wiersze": row.get("Przeskanowane wiersze", 0),
+            **{f"Udział {label}": row.get(f"Udział {label}", np.nan) for label in PII_TYPES.values()},
+        })
+    summary = {
+        "Tabela": table,
+        "Wiersze": rows,
+        "Kolumny": len(columns),
+        "Próba": len(sample),
+        "Kolumny osobowe": personal,
+        "Kolumny wrażliwe": sensitive,
+        "Poziom ryzyka": privacy_risk_level(columns, personal, sensitive, by_tokens=True),
+    }
+    return summary, column_rows
+
+
+def scan_catalog(db_path, cache=None, tables=None, sample_rows: int = DEFAULT_SAMPLE_ROWS,
+                 min_rate: float = DEFAULT_MIN_RATE, max_workers=None):
+    """
+    Skan wszystkich tabel bazy (lub podanych w tables). Zwraca {"Tabele": DataFrame podsumowań
+    (z kolumną "Z pamięci podręcznej"), "Kolumny": DataFrame klasyfikacji kolumn}.
+    """
+    uri = f"file:{os.path.abspath(db_path)}?mode=ro"
+    local = threading.local()
+    opened = []
+    lock = threading.Lock()
+
+    def connection():
+        # Jedno połączenie tylko do odczytu na wątek roboczy
+        if not hasattr(local, "conn"):
+            local.conn = sqlite3.connect(uri, uri=True, check_same_thread=False)
+            with lock:
+                opened.append(local.conn)
+        return local.conn
+
+    def scan(table):
+        conn = connection()
+        if cache is None:
+            return scan_table(conn, table, sample_rows, min_rate), False
+        state, schema_hash = table_signature(conn, table)
+        key = cache.make_key(f"{os.path.abspath(db_path)}:{table}:{state}:{schema_hash}", "scan_table",
+                             sample_rows=sample_rows, min_rate=min_rate, name_rules="tokens")
+        computed = []
+
+        def compute():
+            computed.append(True)
+            return scan_table(conn, table, sample_rows, min_rate)
+        with span(f"pamięć podręczna: scan_table {table}", "pamięć podręczna") as s:
+            result = cache.get_or_compute(key, compute)
+            s.set(hit=not computed)
+        return result, not computed
+
+    try:
+        if tables is None:
+            tables = catalog_tables(connection())
+        workers = max_workers or min(len(tables), os.cpu_count() or 1) or 1
+        if workers > 1 and len(tables) > 1:
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                results = list(executor.map(scan, tables))
+        else:
+            results = [scan(t) for t in tables]
+    finally:
+        for conn in opened:
+            conn.close()
+
+    summaries = [{**summary, "Z pamięci podręcznej": hit} for (summary, _), hit in results]
+    column_rows = [row for (_, rows), _ in results for row in rows]
+    return {"Tabele": pd.DataFrame(summaries), "Kolumny": pd.DataFrame(column_rows)}
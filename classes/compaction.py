@@ -0,0 +1,88 @@
+# classes/compaction.py
+
+import numpy as np
+import pandas as pd
+
+from classes.instrumentation import traced
+
+# Typy kolumn tekstowych rozpoznawane przez analizatory i strony (zamiast samego "object")
+TEXT_DTYPES = ["object", "category", "string"]
+
+
+def enable_copy_on_write():
+    """
+    Włącza copy-on-write w pandas: kopie i wycinki DataFrame współdzielą dane do pierwszej
+    modyfikacji, dzięki czemu analizatory nie muszą wykonywać głębokiej kopii ramki z sesji.
+    Ustawienie dotyczy całego procesu, dlatego wywoływane jest jawnie w punktach wejścia
+    (strona główna aplikacji, batch_runner.main), a nie przy imporcie modułu.
+    """
+    pd.set_option("mode.copy_on_write", True)
+
+
+def shared_view(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Płytka kopia DataFrame bez kopiowania danych. Przy copy-on-write zachowuje się jak migawka:
+    modyfikacja po stronie wywołującego lub analizatora kopiuje tylko zmieniane kolumny.
+    Bez włączonego copy-on-write (enable_copy_on_write) wykonywana jest głęboka kopia.
+    """
+    return df.copy(deep=not pd.get_option("mode.copy_on_write"))
+
+
+def _memory(df):
+    return int(df.memory_usage(deep=True).sum())
+
+
+def _downcast_float(series):
+    """
+    float64 -> float32 tylko wtedy, gdy konwersja jest bezstratna dla wszystkich wartości.
+    """
+    if series.dtype != np.float64:
+        return series
+    candidate = series.astype(np.float32)
+    if np.array_equal(candidate.to_numpy(dtype=np.float64), series.to_numpy(), equal_nan=True):
+        return candidate
+    return series
+
+
+@traced(category="kompaktowanie", shape=lambda result, *args, **kwargs: result[0].shape)
+def compact_dataframe(df: pd.DataFrame, category_max_ratio: float = 0.5):
+    """
+    Zmniejsza zużycie pamięci przez DataFrame:
+    - kolumny tekstowe o niskiej liczności (unikalne / wiersze <= category_max_ratio) -> category,
+    - pozostałe kolumny tekstowe -> łańcuchy przechowywane w Apache Arrow (string[pyarrow]),
+    - liczby całkowite i zmiennoprzecinkowe -> najmniejszy typ, o ile bez utraty wartości.
+
+    Zwraca (skompaktowany DataFrame, raport z pamięcią przed/po i zmianami typów kolumn).
+    """
+    before = _memory(df)
+    compact = {}
+    changes = []
+
+    for col in df.columns:
+        series = df[col]
+        old_dtype = str(series.dtype)
+
+        if series.dtype == object:
+            n_unique = series.nunique(dropna=True)
+            if len(series) and n_unique / len(series) <= category_max_ratio:
+                series = series.astype("category")
+            else:
+                series = series.astype("string[pyarrow]")
+        elif pd.api.types.is_integer_dtype(series.dtype) and not pd.api.types.is_extension_array_dtype(series.dtype):
+            series = pd.to_numeric(series, downcast="integer")
+        elif pd.api.types.is_float_dtype(series.dtype):
+            series = _downcast_float(series)
+
+        compact[col] = series
+        if str(series.dtype) != old_dtype:
+            changes.append({"Kolumna": col, "Typ przed": old_dtype, "Typ po": str(series.dtype)})
+
+    df_compact = pd.DataFrame(compact, index=df.index)
+    after = _memory(df_compact)
+
+    return df_compact, {
+        "memory_before_bytes": before,
+        "memory_after_bytes": after,
+        "memory_saved_%": (1 - after / before) * 100 if before else 0.0,
+        "changes": pd.DataFrame(changes, columns=["Kolumna", "Typ przed", "Typ po"]),
+    }
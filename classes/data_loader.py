@@ -0,0 +1,769 @@
+# classes/data_loader.py
+
+import itertools
+import multiprocessing
+import queue
+import sqlite3
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from classes.db_schema import analyze_table, create_table_sql
+from classes.instrumentation import traced
+
+# Kolumny tabeli faktów wymagające konwersji typów
+FACT_FLOAT_COLS = ['CatalogPrice', 'DiscountAmount', 'DiscountPctg', 'TransactionPrice', 'DeliveryCost',
+                   'ProductCost']
+FACT_INT_COLS = [
+    'Quantity', 'OrderLineNumber', 'CustomerKey', 'ProductKey',
+    'SalesTerritoryKey', 'ChannelKey', 'PaymentMethodKey',
+    'DeliveryMethodKey', 'OrderDateKey', 'ShipDateKey'
+]
+
+
+def convert_types(df, table_name):
+    """
+    Wykonuje konwersje liczbowe (dla FactOnlineSales) na wczytanym DataFrame
+    lub pojedynczej porcji pliku. Nazwy kolumn dopasowywane są bez względu na wielkość liter.
+    """
+    if table_name != 'FactOnlineSales':
+        return df
+
+    # Mapowanie nazw kolumn do wersji lower-case
+    colmap = {c.lower(): c for c in df.columns}
+
+    # Konwersje float
+    for col in FACT_FLOAT_COLS:
+        col_lower = col.lower()
+        if col_lower in colmap:
+            true_col = colmap[col_lower]
+            df[true_col] = df[true_col].str.replace(',', '.', regex=False).astype(float)
+        else:
+            raise ValueError(
+                f"Kolumna '{col}' nie została znaleziona (ignorując wielkość liter) podczas konwersji do float.")
+
+    # Konwersje int
+    for col in FACT_INT_COLS:
+        col_lower = col.lower()
+        if col_lower in colmap:
+            true_col = colmap[col_lower]
+            df[true_col] = df[true_col].astype(int)
+        else:
+            raise ValueError(
+                f"Kolumna '{col}' nie została znaleziona (ignorując wielkość liter) podczas konwersji do int.")
+
+    return df
+
+
+# Pliki źródłowe tabel schematu gwiazdy (względem katalogu z danymi)
+SOURCE_FILES = {
+    'DimCustomer': 'DimCustomer.csv',
+    'DimDate': 'DimDate.csv',
+    'DimDeliveryMethod': 'DimDeliveryMethod.csv',
+    'DimGeography': 'DimGeography.csv',
+    'DimOrderChannel': 'DimOrderChannel.csv',
+    'DimPaymentMethod': 'DimPaymentMethod.csv',
+    'DimProduct': 'DimProduct.csv',
+    'DimSalesTerritory': 'DimSalesterritory.csv',
+    'FactOnlineSales': 'FactOnlineSales.csv',
+}
+
+LOAD_META_TABLE = "_load_meta"
+
+# Klucze naturalne tabel - rozpoznają już wczytane wiersze przy ładowaniu przyrostowym
+NATURAL_KEYS = {
+    'FactOnlineSales': ['OrderKey', 'OrderLineNumber'],
+    'DimCustomer': ['CustomerKey'],
+    'DimDate': ['DateKey'],
+    'DimDeliveryMethod': ['DeliveryMethodKey'],
+    'DimGeography': ['GeographyKey'],
+    'DimOrderChannel': ['ChannelKey'],
+    'DimPaymentMethod': ['PaymentMethodKey'],
+    'DimProduct': ['ProductKey'],
+    'DimSalesTerritory': ['SalesTerritoryKey'],
+}
+
+# Kolumny wyznaczające znacznik (watermark) ostatniego wczytania
+WATERMARK_COLUMNS = {
+    'FactOnlineSales': 'OrderDateKey',
+}
+
+_LOAD_META_COLUMNS = {
+    "table_name": "TEXT PRIMARY KEY",
+    "source_key": "TEXT",
+    "rows": "INTEGER",
+    "loaded_at": "TEXT",
+    "mode": "TEXT",
+    "watermark": "",
+    "version": "INTEGER",
+    "duplicate_keys": "INTEGER",
+}
+
+
+def _ensure_load_meta(conn):
+    columns = ",\n".join(f"{name} {decl}".strip() for name, decl in _LOAD_META_COLUMNS.items())
+    conn.execute(f"CREATE TABLE IF NOT EXISTS {LOAD_META_TABLE} (\n{columns}\n)")
+    # Uzupełnienie kolumn w bazach utworzonych przez starsze wersje
+    existing = {row[1] for row in conn.execute(f"PRAGMA table_info({LOAD_META_TABLE})")}
+    for name, decl in _LOAD_META_COLUMNS.items():
+        if name not in existing:
+            conn.execute(f"ALTER TABLE {LOAD_META_TABLE} ADD COLUMN {name} {decl}".strip())
+
+
+def record_load(conn, table_name, rows, source_key=None, mode="replace", watermark=None, duplicate_keys=0):
+    """
+    Zapisuje w bazie metadane ostatniego wczytania tabeli (bez zatwierdzania transakcji).
+    source_key to klucz wpisu w pamięci podręcznej plików (None, gdy jej nie użyto),
+    watermark - największa wartość kolumny znacznika wśród wczytanych wierszy,
+    duplicate_keys - liczba pominiętych wierszy z powtórzonym kluczem głównym.
+    Każde wczytanie zwiększa numer wersji tabeli (version).
+    """
+    _ensure_load_meta(conn)
+    conn.execute(f"""
+        INSERT INTO {LOAD_META_TABLE} (table_name, source_key, rows, loaded_at, mode, watermark, version,
+                                       duplicate_keys)
+        VALUES (?, ?, ?, datetime('now'), ?, ?, 1, ?)
+        ON CONFLICT(table_name) DO UPDATE SET
+            source_key = excluded.source_key,
+            rows = excluded.rows,
+            loaded_at = excluded.loaded_at,
+            mode = excluded.mode,
+            watermark = excluded.watermark,
+            version = IFNULL({LOAD_META_TABLE}.version, 0) + 1,
+            duplicate_keys = excluded.duplicate_keys
+    """, (table_name, source_key, rows, mode, watermark, duplicate_keys))
+
+
+def get_load_meta(conn):
+    """
+    Zwraca metadane wczytań jako słownik
+    nazwa_tabeli -> {source_key, rows, loaded_at, mode, watermark, version, duplicate_keys}.
+    """
+    _ensure_load_meta(conn)
+    cursor = conn.execute(
+        f"SELECT table_name, source_key, rows, loaded_at, mode, watermark, version, duplicate_keys "
+        f"FROM {LOAD_META_TABLE}"
+    )
+    return {
+        name: {"source_key": key, "rows": rows, "loaded_at": loaded_at, "mode": mode,
+               "watermark": watermark, "version": version, "duplicate_keys": duplicate_keys or 0}
+        for name, key, rows, loaded_at, mode, watermark, version, duplicate_keys in cursor.fetchall()
+    }
+
+
+def _resolve_column(df, col):
+    """
+    Zwraca rzeczywistą nazwę kolumny (dopasowanie bez względu na wielkość liter) lub None.
+    """
+    colmap = {str(c).lower(): c for c in df.columns}
+    return colmap.get(col.lower())
+
+
+def _max_watermark(df, table_name, current=None):
+    """
+    Aktualizuje znacznik tabeli o największą wartość kolumny znacznika w porcji danych.
+    """
+    col = WATERMARK_COLUMNS.get(table_name)
+    true_col = _resolve_column(df, col) if col else None
+    if true_col is None or df.empty:
+        return current
+    value = df[true_col].max()
+    if pd.isna(value):
+        return current
+    value = value.item() if hasattr(value, "item") else value
+    return value if current is None or value > current else current
+
+
+def read_options_for(sep=";", decimal=",", encoding="utf-8", header=0):
+    return {"delimiter": sep, "decimal": decimal, "encoding": encoding, "header": header}
+
+
+def iter_converted_chunks(csv_path, table_name, read_options, chunksize=None, cache=None, cache_key=None):
+    """
+    Zwraca kolejne porcje sparsowanego i skonwertowanego pliku (jedną porcję, gdy chunksize=None).
+    Plik z samym nagłówkiem daje jedną pustą porcję, więc tabela i tak zostanie utworzona.
+    Jeśli podano pamięć podręczną (ParseCache), niezmieniony plik odczytywany jest z niej
+    zamiast z CSV, a nowo sparsowany plik jest do niej dopisywany porcja po porcji.
+    """
+    if cache is not None and cache_key is None:
+        cache_key = cache.make_key(csv_path, table_name, read_options)
+
+    if cache is not None and cache.contains(cache_key):
+        if chunksize:
+            yield from cache.iter_batches(cache_key, chunksize)
+            return
+        df = cache.get(cache_key)
+        if df is not None:
+            yield df
+            return
+
+    if chunksize:
+        def parsed():
+            empty = True
+            with pd.read_csv(csv_path, dtype=str, chunksize=chunksize, **read_options) as reader:
+                for chunk in reader:
+                    empty = False
+                    yield convert_types(chunk, table_name)
+            if empty:
+                yield convert_types(pd.read_csv(csv_path, dtype=str, nrows=0, **read_options), table_name)
+    else:
+        def parsed():
+            yield convert_types(pd.read_csv(csv_path, dtype=str, **read_options), table_name)
+
+    if cache is None:
+        yield from parsed()
+        return
+
+    with cache.writer(cache_key) as writer:
+        for chunk in parsed():
+            writer.write(chunk)
+            yield chunk
+
+
+@traced(category="wczytywanie")
+def load_data(
+        csv_path, table_name, conn,
+        sep=";", decimal=",", encoding="utf-8", header=0, cache=None
+):
+    """
+    Wczytuje plik CSV do DataFrame z zadanymi parametrami odczytu,
+    sprawdza zgodność kolumn (case-insensitive),
+    wykonuje konwersje typów oraz zapisuje do bazy SQLite.
+    Opcjonalnie korzysta z pamięci podręcznej sparsowanych plików (ParseCache).
+    """
+    read_options = read_options_for(sep, decimal, encoding, header)
+    cache_key = cache.make_key(csv_path, table_name, read_options) if cache is not None else None
+    # Bez podziału na porcje generator zwraca dokładnie jeden DataFrame
+    (df,) = iter_converted_chunks(csv_path, table_name, read_options, cache=cache, cache_key=cache_key)
+
+    # Wstawienie danych do bazy
+    with conn:
+        create_table(conn, table_name, df)
+        inserted = insert_chunk(conn, table_name, df)
+        record_load(conn, table_name, inserted, cache_key, watermark=_max_watermark(df, table_name),
+                    duplicate_keys=len(df) - inserted)
+    analyze_table(conn, table_name)
+    conn.commit()
+    return df
+
+
+def count_csv_rows(csv_path, header=0, block_size=1 << 20, quotechar=b'"'):
+    """
+    Zlicza wiersze danych w pliku CSV, czytając go blokami o stałym rozmiarze
+    (bez wczytywania całego pliku do pamięci). Służy do raportowania postępu.
+    Znaki końca linii wewnątrz pól w cudzysłowie nie są liczone (podwojony cudzysłów
+    w polu nie zmienia parzystości, więc wystarcza parzystość liczby cudzysłowów).
+    """
+    lines = 0
+    last = b"\n"
+    quoted = 0
+    with open(csv_path, "rb") as f:
+        while True:
+            block = f.read(block_size)
+            if not block:
+                break
+            if quotechar not in block and not quoted:
+                lines += block.count(b"\n")
+            else:
+                data = np.frombuffer(block, dtype=np.uint8)
+                quotes = data == ord(quotechar)
+                inside = (np.cumsum(quotes) + quoted) % 2 == 1
+                lines += int(np.count_nonzero((data == ord(b"\n")) & ~inside))
+                quoted = (quoted + int(quotes.sum())) % 2
+            last = block[-1:]
+    if last != b"\n":
+        lines += 1  # ostatni wiersz bez znaku końca linii
+    return max(0, lines - (1 if header is not None else 0))
+
+
+def _quote(name):
+    return '"' + str(name).replace('"', '""') + '"'
+
+
+def create_table(conn, table_name, df, schema_name=None):
+    """
+    Tworzy (od nowa) tabelę o typach i kluczu głównym z jawnego schematu (classes.db_schema);
+    kolumny spoza schematu otrzymują typ wywnioskowany z podanej porcji danych.
+    """
+    conn.execute(f"DROP TABLE IF EXISTS {_quote(table_name)}")
+    conn.execute(create_table_sql(table_name, df, schema_name))
+
+
+def insert_chunk(conn, table_name, df):
+    """
+    Wstawia porcję danych do istniejącej tabeli (bez zatwierdzania transakcji).
+    Brakujące wartości zapisywane są jako NULL. Wiersze z kluczem głównym, który już
+    występuje w tabeli, są pomijane (zachowywane jest pierwsze wystąpienie klucza).
+    Zwraca liczbę faktycznie wstawionych wierszy - różnica względem len(df) to duplikaty klucza.
+    """
+    columns = ", ".join(_quote(c) for c in df.columns)
+    placeholders = ", ".join("?" for _ in df.columns)
+    rows = df.astype(object).where(df.notna(), None).to_numpy().tolist()
+    cursor = conn.executemany(
+        f"INSERT OR IGNORE INTO {_quote(table_name)} ({columns}) VALUES ({placeholders})", rows
+    )
+    return cursor.rowcount if rows else 0
+
+
+@traced(category="wczytywanie", shape=lambda rows, *args, **kwargs: (rows, None))
+def load_data_chunked(
+        csv_path, table_name, conn,
+        sep=";", decimal=",", encoding="utf-8", header=0,
+        chunksize=100_000, progress_callback=None, cache=None
+):
+    """
+    Strumieniowy odpowiednik load_data: wczytuje plik CSV porcjami po `chunksize` wierszy,
+    konwertuje typy w każdej porcji i zapisuje je do bazy w ramach jednej transakcji SQLite.
+    Zużycie pamięci zależy od rozmiaru porcji, a nie od rozmiaru pliku.
+    Opcjonalnie korzysta z pamięci podręcznej sparsowanych plików (ParseCache).
+
+    progress_callback(table_name, rows_loaded, rows_total) wywoływany jest po każdej porcji.
+    Zwraca liczbę zapisanych rekordów.
+    """
+    if chunksize is None or chunksize <= 0:
+        raise ValueError("Rozmiar porcji musi być dodatnią liczbą wierszy.")
+
+    read_options = read_options_for(sep, decimal, encoding, header)
+    cache_key = cache.make_key(csv_path, table_name, read_options) if cache is not None else None
+    rows_total = count_csv_rows(csv_path, header) if progress_callback else None
+    chunks = iter_converted_chunks(csv_path, table_name, read_options, chunksize, cache, cache_key)
+
+    if conn.in_transaction:
+        conn.commit()
+    conn.execute("BEGIN")
+    rows_loaded = 0
+    rows_read = 0
+    watermark = None
+    try:
+        for i, chunk in enumerate(chunks):
+            if i == 0:
+                create_table(conn, table_name, chunk)
+            rows_loaded += insert_chunk(conn, table_name, chunk)
+            rows_read += len(chunk)
+            watermark = _max_watermark(chunk, table_name, watermark)
+            if progress_callback:
+                progress_callback(table_name, rows_read, rows_total)
+        record_load(conn, table_name, rows_loaded, cache_key, watermark=watermark,
+                    duplicate_keys=rows_read - rows_loaded)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+
+    # Statystyki planisty odświeżane raz, po zakończeniu ładowania wsadowego
+    analyze_table(conn, table_name)
+    conn.commit()
+    return rows_loaded
+
+
+# Kolejka porcji procesu roboczego - przekazywana przy starcie procesu (initializer puli)
+_out_queue = None
+
+
+def _init_parse_worker(out_queue):
+    global _out_queue
+    _out_queue = out_queue
+
+
+def _parse_worker(table_name, csv_path, read_options, chunksize, report_total, cache):
+    """
+    Proces roboczy: parsuje plik CSV (w całości lub porcjami), konwertuje typy
+    i przekazuje gotowe porcje bezpośrednio do procesu zapisującego przez kolejkę.
+    """
+    out_queue = _out_queue
+    start = time.perf_counter()
+    try:
+        if report_total:
+            out_queue.put(("total", table_name, count_csv_rows(csv_path, read_options.get("header", 0))))
+        cache_key = cache.make_key(csv_path, table_name, read_options) if cache is not None else None
+        if cache_key is not None:
+            out_queue.put(("key", table_name, cache_key))
+        for chunk in iter_converted_chunks(csv_path, table_name, read_options, chunksize, cache, cache_key):
+            out_queue.put(("chunk", table_name, chunk))
+        out_queue.put(("done", table_name, time.perf_counter() - start))
+    except Exception as e:
+        out_queue.put(("error", table_name, str(e)))
+
+
+def _staging_name(table_name):
+    return f"{table_name}__staging"
+
+
+def _publish_staging(conn, table_name, rows, source_key=None, watermark=None, duplicate_keys=0):
+    """
+    Atomowo zastępuje tabelę docelową tabelą tymczasową (staging).
+    """
+    if conn.in_transaction:
+        conn.commit()
+    conn.execute("BEGIN")
+    try:
+        conn.execute(f"DROP TABLE IF EXISTS {_quote(table_name)}")
+        conn.execute(f"ALTER TABLE {_quote(_staging_name(table_name))} RENAME TO {_quote(table_name)}")
+        record_load(conn, table_name, rows, source_key, watermark=watermark, duplicate_keys=duplicate_keys)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    analyze_table(conn, table_name)
+    conn.commit()
+
+
+def _drop_staging(conn, table_name):
+    if conn.in_transaction:
+        conn.rollback()
+    conn.execute(f"DROP TABLE IF EXISTS {_quote(_staging_name(table_name))}")
+    conn.commit()
+
+
+@traced(category="wczytywanie",
+        shape=lambda results, *args, **kwargs: (sum(r["rows"] for r in results.values()), None))
+def load_tables_parallel(
+        tables, conn,
+        sep=";", decimal=",", encoding="utf-8", header=0,
+        chunksize=100_000, max_workers=None, progress_callback=None, cache=None
+):
+    """
+    Wczytuje wiele tabel równocześnie: parsowanie i konwersja typów odbywają się
+    w osobnych procesach, a jedyny proces zapisujący (bieżący) strumieniowo zapisuje
+    porcje do SQLite, które dopuszcza tylko jednego pisarza.
+
+    Każda tabela ładowana jest najpierw do tabeli tymczasowej i podmieniana dopiero
+    po poprawnym wczytaniu całego pliku - błąd w jednym pliku nie przerywa
+    pozostałych i nie niszczy poprzedniej wersji tabeli.
+
+    tables: słownik nazwa_tabeli -> ścieżka do pliku CSV.
+    progress_callback(table_name, rows_loaded, rows_total) wywoływany jest po każdej porcji.
+    cache (ParseCache) pozwala pominąć parsowanie niezmienionych plików.
+    Zwraca słownik nazwa_tabeli -> {rows, duplicate_keys, parse_seconds, write_seconds, total_seconds, error}.
+    """
+    read_options = read_options_for(sep, decimal, encoding, header)
+    results = {
+        name: {"rows": 0, "duplicate_keys": 0, "parse_seconds": None, "write_seconds": 0.0,
+               "total_seconds": None, "error": None}
+        for name in tables
+    }
+    if not tables:
+        return results
+
+    max_workers = max_workers or min(len(tables), multiprocessing.cpu_count())
+    totals = {}
+    source_keys = {}
+    watermarks = {}
+    created = set()
+    pending = set(tables)
+    start = time.perf_counter()
+
+    # Ograniczona kolejka zapewnia przeciwciśnienie - parsery czekają na zapis. Porcje trafiają
+    # z procesu roboczego wprost do procesu zapisującego (bez pośredniczącego procesu Managera).
+    context = multiprocessing.get_context()
+    out_queue = context.Queue(maxsize=2 * max_workers)
+    with ProcessPoolExecutor(max_workers=max_workers, mp_context=context,
+                             initializer=_init_parse_worker, initargs=(out_queue,)) as pool:
+        futures = {
+            pool.submit(_parse_worker, name, path, read_options, chunksize,
+                        progress_callback is not None, cache): name
+            for name, path in tables.items()
+        }
+        try:
+            _write_parsed_chunks(conn, out_queue, futures, pending, results, totals, source_keys,
+                                 watermarks, created, start, progress_callback)
+        finally:
+            # Opróżnienie kolejki, aby procesy zablokowane na put mogły się zakończyć
+            while not all(future.done() for future in futures):
+                try:
+                    out_queue.get(timeout=0.1)
+                except queue.Empty:
+                    pass
+    out_queue.close()
+    return results
+
+
+def _write_parsed_chunks(conn, out_queue, futures, pending, results, totals, source_keys, watermarks, created,
+                         start, progress_callback):
+    """
+    Pętla procesu zapisującego: odbiera komunikaty parserów i zapisuje porcje do tabel tymczasowych.
+    """
+    while pending:
+        try:
+            kind, name, payload = out_queue.get(timeout=1)
+        except queue.Empty:
+            # Proces roboczy mógł zakończyć się awaryjnie bez wysłania komunikatu
+            for future, name in futures.items():
+                if name in pending and future.done() and future.exception() is not None:
+                    results[name]["error"] = str(future.exception())
+                    _drop_staging(conn, name)
+                    pending.discard(name)
+            continue
+
+        if name not in pending:
+            continue
+        result = results[name]
+
+        if kind == "total":
+            totals[name] = payload
+        elif kind == "key":
+            source_keys[name] = payload
+        elif kind == "chunk":
+            write_start = time.perf_counter()
+            try:
+                with conn:
+                    if name not in created:
+                        create_table(conn, _staging_name(name), payload, schema_name=name)
+                        created.add(name)
+                    inserted = insert_chunk(conn, _staging_name(name), payload)
+                    result["rows"] += inserted
+                    result["duplicate_keys"] += len(payload) - inserted
+                    watermarks[name] = _max_watermark(payload, name, watermarks.get(name))
+            except Exception as e:
+                result["error"] = str(e)
+                _drop_staging(conn, name)
+                pending.discard(name)
+            result["write_seconds"] += time.perf_counter() - write_start
+            if progress_callback and result["error"] is None:
+                progress_callback(name, result["rows"] + result["duplicate_keys"], totals.get(name))
+        elif kind == "done":
+            result["parse_seconds"] = payload
+            write_start = time.perf_counter()
+            try:
+                if name in created:
+                    _publish_staging(conn, name, result["rows"], source_keys.get(name), watermarks.get(name),
+                                     result["duplicate_keys"])
+            except Exception as e:
+                result["error"] = str(e)
+                _drop_staging(conn, name)
+            result["write_seconds"] += time.perf_counter() - write_start
+            result["total_seconds"] = time.perf_counter() - start
+            pending.discard(name)
+        elif kind == "error":
+            result["error"] = payload
+            result["total_seconds"] = time.perf_counter() - start
+            _drop_staging(conn, name)
+            pending.discard(name)
+
+
+UPSERT_STAGE = "_upsert_stage"
+# Skróty wierszy zapisanych ostatnim wczytaniem przyrostowym (klucz naturalny -> zawartość wiersza)
+UPSERT_HASHES = "_upsert_hashes"
+UPSERT_HASHES_VERSION = "_upsert_hashes_version"
+# Dwa niezależne 64-bitowe skróty wiersza - niezmieniony wiersz rozpoznawany jest po 128 bitach
+_ROW_HASH_KEYS = ("0123456789123456", "upsert-row-hash2")
+
+
+def _ensure_row_hashes(conn):
+    conn.execute(f"""
+        CREATE TABLE IF NOT EXISTS {UPSERT_HASHES} (
+            table_name TEXT NOT NULL,
+            key_hash INTEGER NOT NULL,
+            row_hash INTEGER NOT NULL,
+            row_hash2 INTEGER NOT NULL,
+            PRIMARY KEY (table_name, key_hash)
+        ) WITHOUT ROWID
+    """)
+    conn.execute(f"CREATE TABLE IF NOT EXISTS {UPSERT_HASHES_VERSION} (table_name TEXT PRIMARY KEY, version INTEGER)")
+
+
+def _load_row_hashes(conn, table_name, version):
+    """
+    Zwraca posortowane tablice (key_hash, row_hash, row_hash2) z poprzedniego wczytania
+    przyrostowego. Skróty są ważne tylko wtedy, gdy od tamtej pory tabeli nie zmieniło inne
+    wczytanie (zgodny numer wersji z _load_meta); nieaktualne są usuwane.
+    """
+    _ensure_row_hashes(conn)
+    stored = conn.execute(f"SELECT version FROM {UPSERT_HASHES_VERSION} WHERE table_name = ?",
+                          (table_name,)).fetchone()
+    if stored is None or version is None or stored[0] != version:
+        conn.execute(f"DELETE FROM {UPSERT_HASHES} WHERE table_name = ?", (table_name,))
+        return np.empty(0, np.int64), np.empty(0, np.int64), np.empty(0, np.int64)
+    rows = np.array(conn.execute(
+        f"SELECT key_hash, row_hash, row_hash2 FROM {UPSERT_HASHES} WHERE table_name = ? ORDER BY key_hash",
+        (table_name,)).fetchall(), dtype=np.int64).reshape(-1, 3)
+    return rows[:, 0], rows[:, 1], rows[:, 2]
+
+
+def _row_hashes(chunk, key_cols):
+    """
+    Skrót klucza naturalnego i dwa skróty całego wiersza (int64, jak INTEGER w SQLite).
+    """
+    key_hash = pd.util.hash_pandas_object(chunk[key_cols], index=False).to_numpy().view(np.int64)
+    row_hashes = [pd.util.hash_pandas_object(chunk, index=False, hash_key=k).to_numpy().view(np.int64)
+                  for k in _ROW_HASH_KEYS]
+    return key_hash, row_hashes[0], row_hashes[1]
+
+
+def _unchanged_rows(stored, key_hash, row_hash, row_hash2):
+    """
+    Maska wierszy, których klucz i zawartość zgadzają się ze skrótami poprzedniego wczytania.
+    """
+    keys, hashes, hashes2 = stored
+    if not len(keys):
+        return np.zeros(len(key_hash), dtype=bool)
+    pos = np.minimum(np.searchsorted(keys, key_hash), len(keys) - 1)
+    return (keys[pos] == key_hash) & (hashes[pos] == row_hash) & (hashes2[pos] == row_hash2)
+
+
+def _ensure_natural_key_index(conn, table_name, key_cols):
+    """
+    Tworzy unikalny indeks na kluczu naturalnym (wymagany przez INSERT ... ON CONFLICT).
+    """
+    index_name = f"ux_{table_name}_natural_key".lower()
+    columns = ", ".join(_quote(c) for c in key_cols)
+    try:
+        conn.execute(f"CREATE UNIQUE INDEX IF NOT EXISTS {_quote(index_name)} ON {_quote(table_name)} ({columns})")
+    except sqlite3.IntegrityError:
+        raise ValueError(
+            f"Tabela '{table_name}' zawiera powtórzone wartości klucza naturalnego "
+            f"({', '.join(key_cols)}) - wczytanie przyrostowe jest niemożliwe.")
+
+
+def _table_exists(conn, table_name):
+    return conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ? COLLATE NOCASE", (table_name,)
+    ).fetchone() is not None
+
+
+@traced(category="wczytywanie", shape=lambda stats, *args, **kwargs: (
+        stats["inserted"] + stats["updated"] + stats["unchanged"] + stats["skipped"] + stats["duplicate_keys"], None))
+def upsert_data(
+        csv_path, table_name, conn,
+        sep=";", decimal=",", encoding="utf-8", header=0,
+        chunksize=100_000, since_watermark=False, progress_callback=None, cache=None
+):
+    """
+    Wczytanie przyrostowe: zamiast nadpisywać tabelę, rozpoznaje już wczytane wiersze
+    po kluczu naturalnym (NATURAL_KEYS, np. ORDERKEY + ORDERLINENUMBER), wstawia tylko nowe
+    i aktualizuje zmienione. Całość wykonywana jest w jednej transakcji.
+
+    Wiersze niezmienione od poprzedniego wczytania przyrostowego odrzucane są jeszcze w pandas
+    na podstawie zapisanych skrótów wierszy (UPSERT_HASHES), więc do SQLite trafiają tylko nowe
+    i zmienione wiersze. Wiersze bez wartości klucza naturalnego nie są zapisywane (null_keys).
+    Z wierszy o tym samym kluczu w jednej porcji zapisywany jest ostatni (duplicate_keys - liczba
+    pominiętych); powtórzenie klucza w późniejszej porcji to zwykła aktualizacja.
+
+    since_watermark=True pomija wiersze starsze niż zapisany znacznik tabeli (WATERMARK_COLUMNS);
+    wiersze z samym znacznikiem są sprawdzane, bo mogły dojść później tego samego dnia.
+    Zwraca słownik {inserted, updated, unchanged, skipped, null_keys, duplicate_keys, watermark}.
+    """
+    if table_name not in NATURAL_KEYS:
+        raise ValueError(f"Brak zdefiniowanego klucza naturalnego dla tabeli '{table_name}'.")
+
+    read_options = read_options_for(sep, decimal, encoding, header)
+    rows_total = count_csv_rows(csv_path, header) if progress_callback else None
+    chunks = iter_converted_chunks(csv_path, table_name, read_options, chunksize, cache)
+
+    previous = get_load_meta(conn).get(table_name, {})
+    watermark = previous.get("watermark")
+    watermark_col = WATERMARK_COLUMNS.get(table_name)
+    min_watermark = watermark if since_watermark else None
+    stats = {"inserted": 0, "updated": 0, "unchanged": 0, "skipped": 0, "null_keys": 0, "duplicate_keys": 0,
+             "watermark": watermark}
+
+    if conn.in_transaction:
+        conn.commit()
+    conn.execute("BEGIN")
+    try:
+        stored_hashes = _load_row_hashes(conn, table_name, previous.get("version"))
+        rows_seen = 0
+        statement = None
+        for chunk in chunks:
+            rows_seen += len(chunk)
+            if statement is None:
+                key_cols = []
+                for col in NATURAL_KEYS[table_name]:
+                    true_col = _resolve_column(chunk, col)
+                    if true_col is None:
+                        raise ValueError(
+                            f"Kolumna klucza '{col}' nie została znaleziona (ignorując wielkość liter) "
+                            f"w pliku tabeli '{table_name}'.")
+                    key_cols.append(true_col)
+                if not _table_exists(conn, table_name):
+                    create_table(conn, table_name, chunk)
+                _ensure_natural_key_index(conn, table_name, key_cols)
+
+                # Porcje trafiają najpierw do tabeli tymczasowej, z której liczone są nowe klucze
+                conn.execute(f"DROP TABLE IF EXISTS temp.{_quote(UPSERT_STAGE)}")
+                conn.execute(create_table_sql(UPSERT_STAGE, chunk, schema_name=table_name,
+                                              with_primary_key=False, temporary=True))
+
+                columns = ", ".join(_quote(c) for c in chunk.columns)
+                value_cols = [c for c in chunk.columns if c not in key_cols]
+                updates = ", ".join(f"{_quote(c)} = excluded.{_quote(c)}" for c in value_cols)
+                changed = " OR ".join(f"{_quote(c)} IS NOT excluded.{_quote(c)}" for c in value_cols)
+                conflict = (f"DO UPDATE SET {updates} WHERE {changed}" if value_cols else "DO NOTHING")
+                # "WHERE true" rozstrzyga niejednoznaczność składni INSERT ... SELECT ... ON CONFLICT
+                statement = (
+                    f"INSERT INTO {_quote(table_name)} ({columns}) "
+                    f"SELECT {columns} FROM temp.{_quote(UPSERT_STAGE)} WHERE true "
+                    f"ON CONFLICT ({', '.join(_quote(c) for c in key_cols)}) {conflict}"
+                )
+                key_match = " AND ".join(f"t.{_quote(c)} = s.{_quote(c)}" for c in key_cols)
+                count_new = (
+                    f"SELECT COUNT(*) FROM temp.{_quote(UPSERT_STAGE)} s WHERE NOT EXISTS "
+                    f"(SELECT 1 FROM {_quote(table_name)} t WHERE {key_match})"
+                )
+                watermark_true_col = _resolve_column(chunk, watermark_col) if watermark_col else None
+
+            if min_watermark is not None and watermark_true_col is not None:
+                keep = chunk[watermark_true_col] >= min_watermark
+                stats["skipped"] += int((~keep).sum())
+                chunk = chunk[keep]
+
+            # Bez klucza naturalnego nie da się rozpoznać wiersza (NULL nie powoduje konfliktu),
+            # więc taki wiersz byłby dopisywany przy każdym wczytaniu
+            null_key = chunk[key_cols].isna().any(axis=1).to_numpy()
+            if null_key.any():
+                stats["null_keys"] += int(null_key.sum())
+                chunk = chunk[~null_key]
+
+            # Powtórzony klucz w porcji: bez tego count_new liczyłby każde powtórzenie jako nowy wiersz
+            repeated = chunk.duplicated(subset=key_cols, keep="last").to_numpy()
+            if repeated.any():
+                stats["duplicate_keys"] += int(repeated.sum())
+                chunk = chunk[~repeated]
+
+            key_hash, row_hash, row_hash2 = _row_hashes(chunk, key_cols)
+            unchanged = _unchanged_rows(stored_hashes, key_hash, row_hash, row_hash2)
+            stats["unchanged"] += int(unchanged.sum())
+            stats["watermark"] = _max_watermark(chunk, table_name, stats["watermark"])
+            if unchanged.all():
+                if progress_callback:
+                    progress_callback(table_name, rows_seen, rows_total)
+                continue
+            chunk = chunk[~unchanged]
+            conn.executemany(
+                f"INSERT OR REPLACE INTO {UPSERT_HASHES} VALUES (?, ?, ?, ?)",
+                zip(itertools.repeat(table_name), key_hash[~unchanged].tolist(), row_hash[~unchanged].tolist(),
+                    row_hash2[~unchanged].tolist()))
+
+            conn.execute(f"DELETE FROM temp.{_quote(UPSERT_STAGE)}")
+            staged = insert_chunk(conn, UPSERT_STAGE, chunk)
+            inserted = conn.execute(count_new).fetchone()[0]
+            conn.execute(statement)
+            # changes() pomija zmiany wykonane przez wyzwalacze (np. kolejkę odświeżania spłaszczonej tabeli)
+            updated = conn.execute("SELECT changes()").fetchone()[0] - inserted
+
+            stats["inserted"] += inserted
+            stats["updated"] += updated
+            stats["unchanged"] += staged - inserted - updated
+
+            if progress_callback:
+                progress_callback(table_name, rows_seen, rows_total)
+
+        rows = (previous.get("rows") or 0) + stats["inserted"] if previous else None
+        if rows is None:
+            rows = conn.execute(f"SELECT COUNT(*) FROM {_quote(table_name)}").fetchone()[0]
+        record_load(conn, table_name, rows, None, mode="upsert", watermark=stats["watermark"],
+                    duplicate_keys=stats["duplicate_keys"])
+        # Skróty pozostają ważne, dopóki tabeli nie zmieni inne wczytanie
+        conn.execute(f"INSERT OR REPLACE INTO {UPSERT_HASHES_VERSION} SELECT table_name, version "
+                     f"FROM {LOAD_META_TABLE} WHERE table_name = ?", (table_name,))
+        conn.execute(f"DROP TABLE IF EXISTS temp.{_quote(UPSERT_STAGE)}")
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    analyze_table(conn, table_name)
+    conn.commit()
+
+    return stats
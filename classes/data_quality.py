@@ -3,10 +3,14 @@
 import pandas as pd
 import numpy as np
 from scipy.stats import zscore, skew
+from classes.compaction import shared_view
+from classes.duplicates import exact_duplicates, example_rows, find_duplicates
+from classes.instrumentation import instrument
 
+@instrument("jakość danych")
 class DataQualityAnalyzer:
     def __init__(self, df: pd.DataFrame, expected_types: dict = None):
-        self.df = df.copy()
+        self.df = shared_view(df)
         self.expected_types = expected_types if expected_types is not None else {}
 
     def missing_values(self):
@@ -19,12 +23,21 @@ class DataQualityAnalyzer:
             'percent_missing_total': percent_missing_total
         }
 
-    def duplicate_rows(self):
-        num_duplicates = self.df.duplicated().sum()
-        percent_duplicates = (num_duplicates / len(self.df)) * 100 if len(self.df) > 0 else 0
+    def duplicate_rows(self, subset=None, mode='exact', max_examples=5):
+        """
+        Duplikaty wierszy (classes.duplicates): mode='exact' porównuje wartości (jak DataFrame.duplicated),
+        mode='approx' korzysta z filtru Blooma. subset - kolumny klucza (domyślnie cały wiersz).
+        Oprócz liczby i procentu zwraca liczbę grup duplikatów i wiersze grup przykładowych.
+        """
+        if mode == 'exact':
+            result = exact_duplicates(self.df, subset=subset, max_examples=max_examples)
+        else:
+            result = find_duplicates([self.df], subset=subset, mode=mode, max_examples=max_examples)
         return {
-            'num_duplicates': num_duplicates,
-            'percent_duplicates': percent_duplicates
+            'num_duplicates': result['num_duplicates'],
+            'percent_duplicates': result['percent_duplicates'],
+            'duplicate_groups': result['duplicate_groups'],
+            'examples': example_rows([self.df], result['example_groups'])
         }
 
     def outliers(self, method='iqr', zscore_threshold=3):
@@ -66,13 +79,27 @@ class DataQualityAnalyzer:
             'percent_outliers_total': percent_total_outliers
         }
 
+    @staticmethod
+    def _numpy_dtype(dtype):
+        """
+        Odpowiednik numpy dla typów rozszerzonych pandas (category, string[pyarrow], Int64...),
+        aby skompaktowane kolumny były oceniane tak jak ich pierwotne wersje.
+        """
+        if isinstance(dtype, pd.CategoricalDtype):
+            return DataQualityAnalyzer._numpy_dtype(dtype.categories.dtype)
+        if isinstance(dtype, pd.StringDtype):
+            return np.dtype(object)
+        if pd.api.types.is_extension_array_dtype(dtype):
+            return getattr(dtype, "numpy_dtype", np.dtype(object))
+        return dtype
+
     def type_conformance(self):
         results = {}
         for col, expected_type in self.expected_types.items():
             if col in self.df.columns:
                 actual_type = self.df[col].dtype
                 # Zwracaj nazwy typów zamiast klasy!
-                conformance = np.issubdtype(actual_type, expected_type)
+                conformance = np.issubdtype(self._numpy_dtype(actual_type), expected_type)
                 results[col] = {
                     'Oczekiwany typ': str(expected_type),
                     'Rzeczywisty typ': str(actual_type),
@@ -111,13 +138,207 @@ class DataQualityAnalyzer:
         desc.insert(0, "typ", self.df.dtypes.astype(str))
         return desc
 
-    def generate_report(self):
-        report = {
+    # --- Zintegrowane profilowanie (jeden przebieg po bloku liczbowym) ---
+
+    @staticmethod
+    def _histograms(block, bins, bin_range=None, dtypes=None):
+        """
+        Histogramy wszystkich kolumn bloku (n_wierszy x n_kolumn) jednocześnie.
+        Przedziały i przypisanie wartości odtwarzają np.histogram(data, bins) dla danych
+        w typie podanym w dtypes (lista typów kolumn; domyślnie float64) - np.histogram
+        wyznacza krawędzie przedziałów w typie danych, np. float32.
+        bin_range=(min, max) - tablice zakresów kolumn znane z góry (np. z całej tabeli
+        przy profilowaniu porcjami); domyślnie zakres wyznaczany jest z bloku.
+        """
+        n_cols = block.shape[1]
+        valid = ~np.isnan(block)
+        if bin_range is None:
+            has_data = valid.any(axis=0)
+            vmin = np.nanmin(np.where(valid, block, np.inf), axis=0)
+            vmax = np.nanmax(np.where(valid, block, -np.inf), axis=0)
+        else:
+            vmin, vmax = (np.asarray(v, dtype=np.float64) for v in bin_range)
+            has_data = ~np.isnan(vmin)
+        first = np.where(has_data, vmin, 0.0)
+        last = np.where(has_data, vmax, 1.0)
+        equal = first == last
+        first = np.where(equal, first - 0.5, first)
+        last = np.where(equal, last + 0.5, last)
+        edges = np.linspace(first, last, bins + 1, axis=1)  # (n_kolumn, bins + 1)
+        for j, dtype in enumerate(dtypes or ()):
+            if np.issubdtype(dtype, np.floating) and np.finfo(dtype).bits < 64:
+                edges[j] = np.linspace(dtype.type(first[j]), dtype.type(last[j]), bins + 1)
+
+        rows, cols = np.nonzero(valid)
+        values = block[rows, cols]
+        norm = bins / (last - first)
+        indices = ((values - first[cols]) * norm[cols]).astype(np.intp)
+        indices[indices == bins] -= 1
+        decrement = values < edges[cols, indices]
+        indices[decrement] -= 1
+        increment = (values >= edges[cols, indices + 1]) & (indices != bins - 1)
+        indices[increment] += 1
+
+        counts = np.bincount(cols * bins + indices, minlength=n_cols * bins).reshape(n_cols, bins)
+        return counts, edges
+
+    def _fused_profile(self, bins=20):
+        """
+        Wyodrębnia blok kolumn liczbowych raz jako tablicę 2-D NumPy i w kilku
+        zwektoryzowanych przebiegach liczy: braki, momenty, kwantyle, outliery (IQR),
+        skośność oraz histogramy wszystkich kolumn.
+        """
+        numeric = self.df.select_dtypes(include=np.number)
+        columns = list(numeric.columns)
+        block = numeric.to_numpy(dtype=np.float64, na_value=np.nan)
+        valid = ~np.isnan(block)
+        n = valid.sum(axis=0)
+        present = n > 0
+
+        with np.errstate(invalid='ignore', divide='ignore'):
+            sums = np.where(valid, block, 0.0).sum(axis=0)
+            mean = np.where(present, sums / np.maximum(n, 1), np.nan)
+            dev = np.where(valid, block - mean, 0.0)
+            m2 = (dev ** 2).sum(axis=0)
+            m3 = (dev ** 3).sum(axis=0)
+            variance = m2 / n
+            std = np.where(n > 1, np.sqrt(m2 / np.maximum(n - 1, 1)), np.nan)
+            skewness = np.where(variance > 0, (m3 / n) / variance ** 1.5, np.nan)
+
+            quantiles = np.full((3, len(columns)), np.nan)
+            if present.any():
+                quantiles[:, present] = np.nanquantile(block[:, present], [0.25, 0.5, 0.75], axis=0)
+            q1, median, q3 = quantiles
+            iqr = q3 - q1
+            iqr_outliers = ((block < q1 - 1.5 * iqr) | (block > q3 + 1.5 * iqr)).sum(axis=0)
+
+            vmin = np.where(present, np.nanmin(np.where(valid, block, np.inf), axis=0), np.nan)
+            vmax = np.where(present, np.nanmax(np.where(valid, block, -np.inf), axis=0), np.nan)
+
+        dtypes = [self._numpy_dtype(dtype) for dtype in numeric.dtypes]
+        float_cols = [i for i, dtype in enumerate(dtypes) if np.issubdtype(dtype, np.floating)]
+        counts, edges = self._histograms(block[:, float_cols], bins, dtypes=[dtypes[i] for i in float_cols])
+
+        return {
+            'columns': columns, 'n': n, 'mean': mean, 'std': std, 'min': vmin, 'max': vmax,
+            'q1': q1, 'median': median, 'q3': q3, 'skewness': skewness,
+            'iqr_outliers': iqr_outliers,
+            'float_cols': float_cols, 'hist_counts': counts, 'hist_edges': edges,
+        }
+
+    def _fused_report(self, bins=20):
+        profile = self._fused_profile(bins=bins)
+        columns, n = profile['columns'], profile['n']
+
+        # Braki: jedno wywołanie isnull() dla całej ramki
+        null_counts = self.df.isnull().sum()
+        total_values = self.df.size
+        missing = {
+            'missing_per_column_%': null_counts / len(self.df) * 100,
+            'percent_missing_total': (null_counts.sum() / total_values) * 100
+        }
+
+        outlier_summary = {}
+        for i, col in enumerate(columns):
+            if n[i] == 0:
+                continue
+            outlier_summary[col] = {
+                'Liczba obserwacji odstających': profile['iqr_outliers'][i],
+                'Procent obserwacji odstających': (profile['iqr_outliers'][i] / n[i]) * 100
+            }
+        total_values_numeric = n.sum()
+        total_outliers = sum(v['Liczba obserwacji odstających'] for v in outlier_summary.values())
+        outliers = {
+            'outliers_per_column': outlier_summary,
+            'percent_outliers_total': (total_outliers / total_values_numeric) * 100 if total_values_numeric > 0 else 0
+        }
+
+        distributions = {}
+        for j, i in enumerate(profile['float_cols']):
+            has_data = n[i] > 0
+            distributions[columns[i]] = {
+                'counts': profile['hist_counts'][j].tolist(),
+                'bin_edges': profile['hist_edges'][j].tolist(),
+                'min': float(profile['min'][i]) if has_data else None,
+                'max': float(profile['max'][i]) if has_data else None,
+                'mean': float(profile['mean'][i]) if has_data else None,
+                'median': float(profile['median'][i]) if has_data else None,
+                'skewness': profile['skewness'][i]
+            }
+
+        return {
+            'missing_values': missing,
+            'outliers': outliers,
+            'basic_stats': self._fused_basic_stats(profile),
+            'distributions': distributions
+        }
+
+    def _fused_basic_stats(self, profile):
+        """
+        Statystyki opisowe w układzie describe(include='all'); część liczbowa pochodzi z profilu.
+        """
+        other = self.df.select_dtypes(exclude=np.number)
+        if any(pd.api.types.is_datetime64_any_dtype(dtype) or isinstance(dtype, pd.PeriodDtype)
+               for dtype in other.dtypes):
+            return self.basic_stats()
+
+        numeric_stats = pd.DataFrame({
+            'count': profile['n'].astype(float),
+            'mean': profile['mean'],
+            'std': profile['std'],
+            'min': profile['min'],
+            '25%': profile['q1'],
+            '50%': profile['median'],
+            '75%': profile['q3'],
+            'max': profile['max'],
+        }, index=profile['columns'])
+        parts = [numeric_stats] if len(profile['columns']) else []
+        if other.shape[1]:
+            parts.append(other.describe().transpose())
+        if not parts:
+            return self.basic_stats()
+
+        order = ['count', 'unique', 'top', 'freq', 'mean', 'std', 'min', '25%', '50%', '75%', 'max']
+        desc = pd.concat(parts, axis=0) if len(parts) > 1 else parts[0]
+        if len(parts) > 1:
+            desc = desc.astype(object)
+        desc = desc.reindex(index=self.df.columns, columns=[c for c in order if c in desc.columns])
+        desc.insert(0, "typ", self.df.dtypes.astype(str))
+        return desc
+
+    def column_report(self, fused=True):
+        """
+        Części raportu liczone osobno dla każdej kolumny (braki, outliery, statystyki, rozkłady),
+        bez duplikatów, które zależą od całych wierszy. fused jak w generate_report.
+        """
+        if fused:
+            return self._fused_report()
+        return {
             'missing_values': self.missing_values(),
-            'duplicates': self.duplicate_rows(),
             'outliers': self.outliers(),
-            'type_conformance': self.type_conformance(),
             'basic_stats': self.basic_stats(),
             'distributions': self.distributions()
         }
+
+    def generate_report(self, fused=True, with_type_conformance=True):
+        """
+        Pełny raport jakości. Domyślnie braki, outliery, statystyki i rozkłady liczone są
+        zintegrowanym jądrem profilującym (jedno wyodrębnienie bloku liczbowego zamiast
+        osobnego skanu w każdej metodzie); fused=False wywołuje metody pojedynczo.
+        with_type_conformance=False pomija zgodność typów - zależy ona tylko od expected_types,
+        więc może być liczona osobno (np. gdy raport pochodzi z pamięci podręcznej).
+        """
+        columns = self.column_report(fused=fused)
+        report = {
+            'missing_values': columns['missing_values'],
+            'duplicates': self.duplicate_rows(),
+            'outliers': columns['outliers'],
+            'type_conformance': None,
+            'basic_stats': columns['basic_stats'],
+            'distributions': columns['distributions']
+        }
+        if with_type_conformance:
+            report['type_conformance'] = self.type_conformance()
+        else:
+            del report['type_conformance']
         return report
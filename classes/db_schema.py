@@ -0,0 +1,173 @@
+# classes/db_schema.py
+
+import sqlite3
+
+import pandas as pd
+
+# Jawny schemat bazy sales.db: typy kolumn i klucze główne tabel gwiazdy.
+# Nazwy kolumn dopasowywane są bez względu na wielkość liter (jak w SQLite).
+TABLE_SCHEMAS = {
+    'DimCustomer': {
+        'columns': {
+            'CustomerKey': 'INTEGER', 'FirstName': 'TEXT', 'LastName': 'TEXT', 'GeographyKey': 'INTEGER',
+        },
+        'primary_key': ['CustomerKey'],
+    },
+    'DimDate': {
+        'columns': {
+            'DateKey': 'INTEGER', 'FullDate': 'TEXT', 'CalendarYear': 'INTEGER', 'CalendarQuarter': 'INTEGER',
+            'MonthNumberOfYear': 'INTEGER', 'MonthName': 'TEXT', 'WeekNumberOfYear': 'INTEGER',
+            'DayNumberOfYear': 'INTEGER', 'DayNumberOfMonth': 'INTEGER', 'DayNumberOfWeek': 'INTEGER',
+            'DayNameOfWeek': 'TEXT',
+        },
+        'primary_key': ['DateKey'],
+    },
+    'DimDeliveryMethod': {
+        'columns': {'DeliveryMethodKey': 'INTEGER', 'DeliveryMethodName': 'TEXT'},
+        'primary_key': ['DeliveryMethodKey'],
+    },
+    'DimGeography': {
+        'columns': {
+            'GeographyKey': 'INTEGER', 'CountryKey': 'INTEGER', 'CountryName': 'TEXT', 'CountryCode': 'TEXT',
+            'CityKey': 'INTEGER', 'CityName': 'TEXT', 'SalesTerritoryKey': 'INTEGER',
+        },
+        'primary_key': ['GeographyKey'],
+    },
+    'DimOrderChannel': {
+        'columns': {'ChannelKey': 'INTEGER', 'ChannelName': 'TEXT'},
+        'primary_key': ['ChannelKey'],
+    },
+    'DimPaymentMethod': {
+        'columns': {'PaymentMethodKey': 'INTEGER', 'PaymentMethodName': 'TEXT'},
+        'primary_key': ['PaymentMethodKey'],
+    },
+    'DimProduct': {
+        'columns': {
+            'ProductKey': 'INTEGER', 'ProductCode': 'TEXT', 'ProductName': 'TEXT',
+            'ProductSubcategoryKey': 'INTEGER', 'ProductSubcategoryName': 'TEXT',
+            'ProductCategoryKey': 'INTEGER', 'ProductCategoryName': 'TEXT',
+        },
+        'primary_key': ['ProductKey'],
+    },
+    'DimSalesTerritory': {
+        'columns': {
+            'SalesTerritoryKey': 'INTEGER', 'SalesTerritoryName': 'TEXT', 'CountryKey': 'INTEGER',
+            'CountryName': 'TEXT', 'CountryCode': 'TEXT',
+        },
+        'primary_key': ['SalesTerritoryKey'],
+    },
+    # Tabela faktów nie ma klucza głównego - powtórzone wiersze są przedmiotem analizy jakości
+    'FactOnlineSales': {
+        'columns': {
+            'OrderKey': 'INTEGER', 'OrderLineNumber': 'INTEGER', 'OrderDateKey': 'INTEGER',
+            'ShipDateKey': 'INTEGER', 'CustomerKey': 'INTEGER', 'ProductKey': 'INTEGER',
+            'SalesTerritoryKey': 'INTEGER', 'ChannelKey': 'INTEGER', 'PaymentMethodKey': 'INTEGER',
+            'DeliveryMethodKey': 'INTEGER', 'Quantity': 'INTEGER', 'CatalogPrice': 'REAL',
+            'DiscountAmount': 'REAL', 'DiscountPctg': 'REAL', 'TransactionPrice': 'REAL',
+            'DeliveryCost': 'REAL', 'ProductCost': 'REAL',
+        },
+        'primary_key': [],
+    },
+}
+
+# Indeksy kluczy obcych tworzone przez wcześniejsze wersje - LEFT JOIN z tabeli faktów
+# do wymiarów skanuje fakty i wyszukuje wymiary po kluczu głównym, więc nie były używane
+# (benchmarks.bench_star_schema: 2,37 s z indeksami vs 1,77 s bez, 200 tys. wierszy)
+_LEGACY_FACT_INDEXES = {
+    'FactOnlineSales': [
+        'ProductKey', 'CustomerKey', 'ChannelKey', 'PaymentMethodKey',
+        'DeliveryMethodKey', 'SalesTerritoryKey',
+    ],
+}
+
+SESSION_CONNECTION_KEY = "db_conn"
+
+# Ustawienia SQLite dla obciążeń analitycznych (duże odczyty, rzadkie zapisy wsadowe)
+ANALYTICS_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'cache_size': -256 * 1024,      # 256 MB (wartość ujemna = KiB)
+    'mmap_size': 1024 ** 3,         # 1 GB
+    'temp_store': 'MEMORY',
+}
+
+
+def _quote(name):
+    return '"' + str(name).replace('"', '""') + '"'
+
+
+def _schema_for(table_name):
+    for name, schema in TABLE_SCHEMAS.items():
+        if name.lower() == str(table_name).lower():
+            return schema
+    return None
+
+
+def _inferred_type(dtype):
+    if pd.api.types.is_bool_dtype(dtype) or pd.api.types.is_integer_dtype(dtype):
+        return 'INTEGER'
+    if pd.api.types.is_float_dtype(dtype):
+        return 'REAL'
+    if pd.api.types.is_datetime64_any_dtype(dtype):
+        return 'TIMESTAMP'
+    return 'TEXT'
+
+
+def create_table_sql(table_name, df, schema_name=None, with_primary_key=True, temporary=False):
+    """
+    Buduje polecenie CREATE TABLE dla kolumn DataFrame: typy i klucz główny pochodzą
+    z TABLE_SCHEMAS (schema_name pozwala wskazać schemat innej tabeli, np. dla tabeli
+    tymczasowej), a kolumny spoza schematu otrzymują typ wywnioskowany z danych.
+    """
+    schema = _schema_for(schema_name or table_name)
+    declared = {c.lower(): t for c, t in schema['columns'].items()} if schema else {}
+
+    column_defs = [
+        f"{_quote(col)} {declared.get(str(col).lower(), _inferred_type(dtype))}"
+        for col, dtype in df.dtypes.items()
+    ]
+
+    present = {str(c).lower(): c for c in df.columns}
+    primary_key = schema['primary_key'] if schema else []
+    if with_primary_key and primary_key and all(c.lower() in present for c in primary_key):
+        column_defs.append(f"PRIMARY KEY ({', '.join(_quote(present[c.lower()]) for c in primary_key)})")
+
+    create = "CREATE TEMP TABLE" if temporary else "CREATE TABLE"
+    return f"{create} {_quote(table_name)} (\n  " + ",\n  ".join(column_defs) + "\n)"
+
+
+def session_connection(session_state, db_path="sales.db"):
+    """
+    Zwraca połączenie z bazą przechowywane w stanie sesji Streamlit - otwierane
+    (i konfigurowane przez apply_pragmas) raz na sesję, a nie przy każdym przebiegu skryptu.
+    Kolejne przebiegi sesji mogą działać w różnych wątkach, stąd check_same_thread=False.
+    """
+    conn = session_state.get(SESSION_CONNECTION_KEY)
+    if conn is None:
+        conn = sqlite3.connect(db_path, check_same_thread=False)
+        apply_pragmas(conn)
+        session_state[SESSION_CONNECTION_KEY] = conn
+    return conn
+
+
+def apply_pragmas(conn, pragmas=None):
+    """
+    Ustawia parametry połączenia SQLite (WAL, synchronous, cache_size, mmap_size).
+    Zwraca słownik z wartościami faktycznie obowiązującymi po zmianie.
+    """
+    applied = {}
+    for name, value in (pragmas or ANALYTICS_PRAGMAS).items():
+        conn.execute(f"PRAGMA {name} = {value}")
+        applied[name] = conn.execute(f"PRAGMA {name}").fetchone()[0]
+    return applied
+
+
+def analyze_table(conn, table_name):
+    """
+    Odświeża statystyki planisty po zakończeniu ładowania wsadowego i usuwa
+    nieużywane indeksy kluczy obcych pozostawione przez wcześniejsze wersje.
+    """
+    index_cols = next((cols for name, cols in _LEGACY_FACT_INDEXES.items() if name.lower() == table_name.lower()), [])
+    for col in index_cols:
+        conn.execute(f"DROP INDEX IF EXISTS {_quote(f'ix_{table_name}_{col}'.lower())}")
+    conn.execute(f"ANALYZE {_quote(table_name)}")
@@ -0,0 +1,308 @@
+# classes/duplicates.py
+
+import os
+import shutil
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+# Klucze funkcji skrótu pandas (16 znaków); drugi daje niezależne 64 bity dla skrótów 128-bitowych
+HASH_KEYS = ("0123456789123456", "fedcba9876543210")
+
+
+def row_hashes(df: pd.DataFrame, subset=None, bits: int = 64) -> np.ndarray:
+    """
+    Skróty wierszy liczone kolumnowo i wektorowo (pd.util.hash_pandas_object).
+    Kolumny liczbowe sprowadzane są do float64, aby ta sama wartość miała ten sam skrót
+    niezależnie od typu (int/float, typy skompaktowane); category i string[pyarrow]
+    mają skróty zgodne z object. Zwraca tablicę (n,) dla 64 bitów lub (n, 2) dla 128 bitów.
+    """
+    if bits not in (64, 128):
+        raise ValueError("Obsługiwane długości skrótu to 64 i 128 bitów.")
+    columns = list(df.columns) if subset is None else list(subset)
+    missing = [c for c in columns if c not in df.columns]
+    if missing:
+        raise ValueError(f"Brak kolumn w danych: {missing}")
+
+    normalized = {}
+    for col in columns:
+        series = df[col]
+        if pd.api.types.is_numeric_dtype(series.dtype) and not pd.api.types.is_bool_dtype(series.dtype):
+            # + 0.0 zamienia -0.0 na 0.0 (w porównaniu wartości są równe)
+            series = series.astype(np.float64) + 0.0
+        normalized[col] = series
+    frame = pd.DataFrame(normalized, index=df.index)
+
+    words = [pd.util.hash_pandas_object(frame, index=False, hash_key=key).to_numpy()
+             for key in HASH_KEYS[:bits // 64]]
+    return words[0] if bits == 64 else np.column_stack(words)
+
+
+def _group(hashes, rows, limit):
+    """
+    Grupy identycznych skrótów: (liczba wierszy, liczba unikalnych, liczba grup > 1,
+    numery wierszy `limit` najwcześniejszych grup > 1).
+    """
+    if len(rows) == 0:
+        return 0, 0, 0, []
+    keys = hashes.reshape(len(rows), -1)
+    order = np.lexsort(keys.T[::-1])
+    sorted_keys, sorted_rows = keys[order], rows[order]
+    starts = np.flatnonzero(np.concatenate([[True], (sorted_keys[1:] != sorted_keys[:-1]).any(axis=1)]))
+    counts = np.diff(np.append(starts, len(rows)))
+    duplicated = np.flatnonzero(counts > 1)
+    first_rows = np.minimum.reduceat(sorted_rows, starts)[duplicated]
+    earliest = duplicated[np.argsort(first_rows, kind="stable")[:limit]]
+    groups = [np.sort(sorted_rows[starts[g]:starts[g] + counts[g]]) for g in earliest]
+    return len(rows), len(starts), len(duplicated), groups
+
+
+def exact_duplicates(df: pd.DataFrame, subset=None, max_examples: int = 5):
+    """
+    Dokładne wykrywanie duplikatów dla ramki w pamięci - porównanie wartości (jak DataFrame.duplicated),
+    bez skrótów. Zwraca słownik w układzie DuplicateDetector.result().
+    """
+    columns = list(df.columns) if subset is None else list(subset)
+    missing = [c for c in columns if c not in df.columns]
+    if missing:
+        raise ValueError(f"Brak kolumn w danych: {missing}")
+    rows = len(df)
+    if rows == 0 or not columns:
+        return {'num_duplicates': 0, 'percent_duplicates': 0, 'duplicate_groups': 0,
+                'example_groups': [], 'example_sizes': []}
+
+    # Numery grup w kolejności pierwszego wystąpienia - najwcześniejsze grupy mają najmniejsze numery
+    group_ids = df.groupby(columns, dropna=False, sort=False, observed=True).ngroup().to_numpy()
+    counts = np.bincount(group_ids)
+    duplicated = np.flatnonzero(counts > 1)
+    examples = [np.flatnonzero(group_ids == g).tolist() for g in duplicated[:max_examples]]
+    num_duplicates = rows - len(counts)
+    return {
+        'num_duplicates': num_duplicates,
+        'percent_duplicates': (num_duplicates / rows) * 100,
+        'duplicate_groups': len(duplicated),
+        'example_groups': examples,
+        'example_sizes': [len(g) for g in examples],
+    }
+
+
+class DuplicateDetector:
+    """
+    Wykrywanie duplikatów na podstawie skrótów wierszy, porcja po porcji (dane, które nie mieszczą
+    się w pamięci; ramki w pamięci - exact_duplicates).
+
+    mode="exact"  - zliczanie na podstawie 128-bitowych skrótów (kolizja dla n wierszy
+                    z prawdopodobieństwem ok. n^2 / 2^129, praktycznie wykluczona); gdy liczba zbuforowanych skrótów przekroczy memory_rows,
+                    skróty rozdzielane są na partycje (wg skrótu) zapisywane na dysk i liczone
+                    po jednej partycji, więc tabela może być większa niż RAM.
+    mode="approx" - filtr Blooma (stała pamięć dla capacity wierszy); wynik może być zawyżony
+                    o ok. error_rate * liczba unikalnych wierszy. Wielkość grup przykładowych
+                    szacowana jest szkicem count-min, a ich wiersze zbierane są od chwili
+                    wykrycia duplikatu (pierwsze wystąpienie może nie zostać zapamiętane).
+
+    subset - kolumny klucza (np. ORDERKEY + ORDERLINENUMBER); domyślnie wszystkie kolumny.
+    """
+
+    def __init__(self, subset=None, mode: str = "exact", bits: int = 128, max_examples: int = 5,
+                 memory_rows: int = 5_000_000, partitions: int = 64, spill_dir: str = None,
+                 capacity: int = 10_000_000, error_rate: float = 0.001):
+        if mode not in ("exact", "approx"):
+            raise ValueError("Nieznany tryb wykrywania duplikatów (dozwolone: 'exact', 'approx').")
+        self.subset = subset
+        self.mode = mode
+        self.bits = bits if mode == "exact" else 64
+        self.max_examples = max_examples
+        self.memory_rows = memory_rows
+        self.partitions = partitions
+        self.spill_dir = spill_dir
+        self.rows = 0
+        self._buffer = []
+        self._buffered = 0
+        self._spill_path = None
+
+        if mode == "approx":
+            self._n_bits = max(64, int(np.ceil(-capacity * np.log(error_rate) / np.log(2) ** 2)))
+            self._n_hashes = max(1, int(round(self._n_bits / capacity * np.log(2))))
+            self._bloom = np.zeros((self._n_bits + 7) // 8, dtype=np.uint8)
+            # Błąd szacunku liczności count-min: ok. e * liczba wierszy / szerokość
+            self._cms_width = max(1024, capacity // 8)
+            self._cms = np.zeros((4, self._cms_width), dtype=np.int32)
+            self._duplicates = 0
+            self._examples = {}
+
+    # --- Tryb dokładny ---
+
+    def _record_dtype(self):
+        return np.dtype([("h", np.uint64, (self.bits // 64,)), ("row", np.int64)])
+
+    def _spill(self):
+        if self._spill_path is None:
+            self._spill_path = tempfile.mkdtemp(prefix="dup_", dir=self.spill_dir)
+        records = np.concatenate(self._buffer)
+        partition = (records["h"][:, 0] % np.uint64(self.partitions)).astype(np.int64)
+        order = np.argsort(partition, kind="stable")
+        records, partition = records[order], partition[order]
+        bounds = np.searchsorted(partition, np.arange(self.partitions + 1))
+        for p in range(self.partitions):
+            if bounds[p + 1] > bounds[p]:
+                with open(os.path.join(self._spill_path, f"part_{p:04d}.bin"), "ab") as f:
+                    records[bounds[p]:bounds[p + 1]].tofile(f)
+        self._buffer, self._buffered = [], 0
+
+    def _partitions(self):
+        if self._spill_path is None:
+            yield np.concatenate(self._buffer) if self._buffer else np.empty(0, dtype=self._record_dtype())
+            return
+        if self._buffer:
+            self._spill()
+        for name in sorted(os.listdir(self._spill_path)):
+            yield np.fromfile(os.path.join(self._spill_path, name), dtype=self._record_dtype())
+
+    # --- Tryb przybliżony ---
+
+    def _bloom_positions(self, hashes):
+        h1 = hashes & np.uint64(0xFFFFFFFF)
+        h2 = (hashes >> np.uint64(32)) | np.uint64(1)
+        steps = np.arange(self._n_hashes, dtype=np.uint64)[:, None]
+        return ((h1[None, :] + steps * h2[None, :]) % np.uint64(self._n_bits)).astype(np.int64)
+
+    def _cms_positions(self, hashes):
+        return [((hashes * np.uint64(2 * i + 1) + np.uint64(i)) >> np.uint64(17)) % np.uint64(self._cms_width)
+                for i in range(self._cms.shape[0])]
+
+    def _update_approx(self, hashes, rows):
+        unique, counts = np.unique(hashes, return_counts=True)
+        positions = self._bloom_positions(unique)
+        seen = ((self._bloom[positions >> 3] >> (positions & 7).astype(np.uint8)) & 1).all(axis=0)
+        self._duplicates += int(len(hashes) - len(unique) + seen.sum())
+        np.bitwise_or.at(self._bloom, (positions >> 3).ravel(), (1 << (positions & 7)).astype(np.uint8).ravel())
+        for i, cols in enumerate(self._cms_positions(unique)):
+            np.add.at(self._cms[i], cols.astype(np.int64), counts)
+
+        # Grupy przykładowe: pierwsze wykryte skróty zduplikowane i wszystkie kolejne ich wystąpienia
+        flagged = unique[seen | (counts > 1)]
+        for h in flagged[:max(0, self.max_examples - len(self._examples))]:
+            self._examples.setdefault(int(h), [])
+        if self._examples:
+            tracked = np.fromiter(self._examples.keys(), dtype=np.uint64)
+            mask = np.isin(hashes, tracked)
+            for h, row in zip(hashes[mask], rows[mask]):
+                group = self._examples[int(h)]
+                if len(group) < 100:
+                    group.append(int(row))
+
+    # --- Wspólne API ---
+
+    def update(self, chunk: pd.DataFrame):
+        hashes = row_hashes(chunk, self.subset, self.bits)
+        rows = np.arange(self.rows, self.rows + len(chunk), dtype=np.int64)
+        self.rows += len(chunk)
+        if self.mode == "approx":
+            self._update_approx(hashes, rows)
+            return self
+        records = np.empty(len(rows), dtype=self._record_dtype())
+        records["h"] = hashes.reshape(len(rows), -1)
+        records["row"] = rows
+        self._buffer.append(records)
+        self._buffered += len(rows)
+        if self._buffered > self.memory_rows:
+            self._spill()
+        return self
+
+    def result(self):
+        """
+        Słownik: num_duplicates, percent_duplicates, duplicate_groups (liczba grup z więcej niż
+        jednym wierszem; w trybie przybliżonym None), example_groups (listy numerów wierszy,
+        najwcześniejsze grupy), example_sizes (liczności grup; w trybie przybliżonym szacowane).
+        """
+        if self.mode == "approx":
+            num_duplicates, duplicate_groups = self._duplicates, None
+            examples = [rows for rows in self._examples.values()][:self.max_examples]
+            sizes = []
+            for h in list(self._examples.keys())[:self.max_examples]:
+                cols = self._cms_positions(np.array([h], dtype=np.uint64))
+                sizes.append(int(min(self._cms[i, int(c[0])] for i, c in enumerate(cols))))
+        else:
+            num_duplicates, duplicate_groups, candidates = 0, 0, []
+            for records in self._partitions():
+                n, n_unique, n_groups, groups = _group(records["h"], records["row"], self.max_examples)
+                num_duplicates += n - n_unique
+                duplicate_groups += n_groups
+                candidates.extend(groups)
+                candidates = sorted(candidates, key=lambda g: g[0])[:self.max_examples]
+            examples = [g.tolist() for g in candidates]
+            sizes = [len(g) for g in examples]
+            self.close()
+
+        return {
+            'num_duplicates': num_duplicates,
+            'percent_duplicates': (num_duplicates / self.rows) * 100 if self.rows > 0 else 0,
+            'duplicate_groups': duplicate_groups,
+            'example_groups': examples,
+            'example_sizes': sizes,
+        }
+
+    def close(self):
+        if self._spill_path is not None:
+            shutil.rmtree(self._spill_path, ignore_errors=True)
+            self._spill_path = None
+
+
+class ExampleRows:
+    """
+    Zbiera wiersze grup przykładowych (numery wierszy z DuplicateDetector.result()) porcja po porcji,
+    np. w przebiegu po danych wykonywanym i tak w innym celu; kolumna "Grupa" wskazuje numer grupy.
+    """
+
+    def __init__(self, groups, max_rows_per_group: int = 5):
+        self.wanted = {}
+        for g, rows in enumerate(groups):
+            for row in rows[:max_rows_per_group]:
+                self.wanted[row] = g
+        self.positions = np.array(sorted(self.wanted), dtype=np.int64)
+        self.parts = []
+        self.offset = 0
+
+    def done(self):
+        return len(self.positions) == 0 or self.offset > self.positions[-1]
+
+    def update(self, chunk: pd.DataFrame):
+        if not self.done():
+            positions = self.positions
+            local = positions[(positions >= self.offset) & (positions < self.offset + len(chunk))] - self.offset
+            if len(local):
+                part = chunk.iloc[local]
+                part.insert(0, "Grupa", [self.wanted[self.offset + i] + 1 for i in local])
+                self.parts.append(part)
+        self.offset += len(chunk)
+        return self
+
+    def result(self) -> pd.DataFrame:
+        return pd.concat(self.parts).sort_values("Grupa", kind="stable") if self.parts else pd.DataFrame()
+
+
+def example_rows(chunks, groups, max_rows_per_group: int = 5) -> pd.DataFrame:
+    """
+    Wiersze grup przykładowych (numery wierszy z DuplicateDetector.result()) odczytane z porcji
+    danych; kolumna "Grupa" wskazuje numer grupy.
+    """
+    collector = ExampleRows(groups, max_rows_per_group)
+    for chunk in chunks:
+        if collector.done():
+            break
+        collector.update(chunk)
+    return collector.result()
+
+
+def find_duplicates(chunks, subset=None, mode: str = "exact", max_examples: int = 5, **options):
+    """
+    Jeden przebieg wykrywania duplikatów po iterowalnym zbiorze porcji (np. [df]).
+    """
+    detector = DuplicateDetector(subset=subset, mode=mode, max_examples=max_examples, **options)
+    try:
+        for chunk in chunks:
+            detector.update(chunk)
+        return detector.result()
+    finally:
+        detector.close()
@@ -0,0 +1,280 @@
+# classes/flat_table.py
+
+import hashlib
+import json
+
+import pandas as pd
+
+from classes.data_loader import get_load_meta
+from classes.instrumentation import traced
+
+FACT_TABLE = 'FactOnlineSales'
+
+# Joiny spłaszczonej tabeli: (alias, tabela wymiaru, klucz w faktach, klucz w wymiarze, [(kolumna, wyrażenie)])
+FLAT_JOINS = [
+    ('P', 'DimProduct', 'PRODUCTKEY', 'ProductKey', [
+        ('ProductName', 'P.ProductName'),
+        ('ProductSubcategoryName', 'P.ProductSubcategoryName'),
+        ('ProductCategoryName', 'P.ProductCategoryName'),
+    ]),
+    ('C', 'DimCustomer', 'CUSTOMERKEY', 'CUSTOMERKEY', [
+        ('CustomerName', "C.FIRSTNAME || ' ' || C.LASTNAME"),
+    ]),
+    ('D', 'DimOrderChannel', 'CHANNELKEY', 'ChannelKey', [
+        ('ChannelName', 'D.ChannelName'),
+    ]),
+    ('PM', 'DimPaymentMethod', 'PAYMENTMETHODKEY', 'PaymentMethodKey', [
+        ('PaymentMethodName', 'PM.PaymentMethodName'),
+    ]),
+    ('DM', 'DimDeliveryMethod', 'DELIVERYMETHODKEY', 'DeliveryMethodKey', [
+        ('DeliveryMethodName', 'DM.DeliveryMethodName'),
+    ]),
+    ('ST', 'DimSalesTerritory', 'SALESTERRITORYKEY', 'SALESTERRITORYKEY', [
+        ('COUNTRYNAME', 'ST.COUNTRYNAME'),
+    ]),
+]
+
+# Kolumny wyliczane z tabeli faktów
+COMPUTED_COLUMNS = [
+    ('TotalCatalogPrice', '(F.CATALOGPRICE * F.QUANTITY)'),
+    ('TotalDiscountAmount', '(F.DISCOUNTAMOUNT * F.QUANTITY)'),
+    ('TotalTransactionPrice', '(F.TRANSACTIONPRICE * F.QUANTITY)'),
+]
+
+# Kolumny faktów zastąpione kolumnami wyliczanymi
+DROPPED_FACT_COLUMNS = ['CATALOGPRICE', 'DISCOUNTAMOUNT', 'TRANSACTIONPRICE', 'QUANTITY']
+
+# Tabele źródłowe spłaszczonej tabeli faktów
+FLAT_SOURCE_TABLES = [FACT_TABLE] + [table for _, table, _, _, _ in FLAT_JOINS]
+
+# Zmaterializowana spłaszczona tabela i jej metadane
+FLAT_TABLE = 'FlatFactOnlineSales'
+FLAT_STATE_TABLE = '_flat_state'
+FLAT_PENDING_TABLE = '_flat_pending'
+FLAT_ROWID = '_fact_rowid'
+
+
+def _quote(name):
+    return '"' + str(name).replace('"', '""') + '"'
+
+
+def _fk_column(fact_key):
+    return f"_fk_{fact_key.lower()}"
+
+
+def _build_query(fact_select, where=None):
+    select = list(fact_select)
+    select += [f"{expr} AS {name}" for name, expr in COMPUTED_COLUMNS]
+    select += [f"{expr} AS {name}" for _, _, _, _, columns in FLAT_JOINS for name, expr in columns]
+    joins = [
+        f"LEFT JOIN {table} {alias} ON F.{fact_key} = {alias}.{dim_key}"
+        for alias, table, fact_key, dim_key, _ in FLAT_JOINS
+    ]
+    query = "SELECT\n  " + ",\n  ".join(select) + f"\nFROM {FACT_TABLE} F\n" + "\n".join(joins)
+    if where:
+        query += f"\nWHERE {where}"
+    return query
+
+
+# Zapytanie spłaszczające w pierwotnej postaci (wszystkie kolumny faktów, łącznie z kluczami)
+FLAT_QUERY = _build_query(["F.*"])
+
+
+def _is_dropped(column):
+    return 'key' in column.lower() or column.upper() in DROPPED_FACT_COLUMNS
+
+
+def fact_columns(conn):
+    return [row[1] for row in conn.execute(f"PRAGMA table_info({FACT_TABLE})")]
+
+
+def flat_select_sql(conn, where=None):
+    """
+    Zapytanie spłaszczające z jawną listą kolumn: kolumny kluczy i kolumny zastąpione
+    wyliczeniami są pomijane już w SQL. Dodatkowo zwraca rowid faktu oraz klucze obce
+    (kolumny techniczne z prefiksem '_'), potrzebne do przyrostowego odświeżania.
+    """
+    fact_select = [f"F.rowid AS {FLAT_ROWID}"]
+    fact_select += [f"F.{fact_key} AS {_fk_column(fact_key)}" for _, _, fact_key, _, _ in FLAT_JOINS]
+    fact_select += [f"F.{_quote(col)}" for col in fact_columns(conn) if not _is_dropped(col)]
+    return _build_query(fact_select, where)
+
+
+def _flat_cache_key(conn):
+    """
+    Klucz spłaszczonej tabeli w pamięci podręcznej: kombinacja kluczy plików źródłowych.
+    Zwraca None, jeśli któraś tabela źródłowa nie została wczytana przez pamięć podręczną.
+    """
+    meta = {name.lower(): info for name, info in get_load_meta(conn).items()}
+    source_keys = {}
+    for table_name in FLAT_SOURCE_TABLES:
+        info = meta.get(table_name.lower())
+        if not info or not info["source_key"]:
+            return None
+        source_keys[table_name] = info["source_key"]
+    payload = json.dumps({"query": FLAT_QUERY, "sources": source_keys}, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _source_versions(conn):
+    meta = {name.lower(): info for name, info in get_load_meta(conn).items()}
+    return {table: (meta.get(table.lower()) or {}).get("version") for table in FLAT_SOURCE_TABLES}
+
+
+def _stored_versions(conn):
+    conn.execute(f"CREATE TABLE IF NOT EXISTS {FLAT_STATE_TABLE} (source_table TEXT PRIMARY KEY, version INTEGER)")
+    return dict(conn.execute(f"SELECT source_table, version FROM {FLAT_STATE_TABLE}").fetchall())
+
+
+def _store_versions(conn, versions):
+    conn.execute(f"DELETE FROM {FLAT_STATE_TABLE}")
+    conn.executemany(f"INSERT INTO {FLAT_STATE_TABLE} (source_table, version) VALUES (?, ?)", versions.items())
+
+
+def _triggers_installed(conn):
+    names = {row[0] for row in conn.execute(
+        "SELECT name FROM sqlite_master WHERE type = 'trigger' AND tbl_name = ? COLLATE NOCASE", (FACT_TABLE,)
+    )}
+    return {f"trg_{FACT_TABLE}_{event}_flat".lower() for event in ("insert", "update", "delete")} <= names
+
+
+def _install_triggers(conn):
+    """
+    Wyzwalacze na tabeli faktów zapisują rowid wstawionych, zmienionych i usuniętych wierszy.
+    Zastąpienie tabeli faktów (DROP) usuwa je - to sygnał do pełnej przebudowy.
+    """
+    conn.execute(f"CREATE TABLE IF NOT EXISTS {FLAT_PENDING_TABLE} (fact_rowid INTEGER PRIMARY KEY)")
+    conn.execute(f"DELETE FROM {FLAT_PENDING_TABLE}")
+    for event, row in (("insert", "NEW"), ("update", "NEW"), ("delete", "OLD")):
+        conn.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS trg_{FACT_TABLE.lower()}_{event}_flat
+            AFTER {event.upper()} ON {FACT_TABLE}
+            BEGIN
+                INSERT OR IGNORE INTO {FLAT_PENDING_TABLE} (fact_rowid) VALUES ({row}.rowid);
+            END
+        """)
+
+
+@traced("spłaszczanie: pełna przebudowa", "spłaszczanie")
+def _rebuild(conn):
+    conn.execute(f"DROP TABLE IF EXISTS {FLAT_TABLE}")
+    conn.execute(f"CREATE TABLE {FLAT_TABLE} AS {flat_select_sql(conn)}")
+    conn.execute(f"CREATE UNIQUE INDEX ux_{FLAT_TABLE.lower()}_rowid ON {FLAT_TABLE} ({FLAT_ROWID})")
+    for _, _, fact_key, _, _ in FLAT_JOINS:
+        fk = _fk_column(fact_key)
+        conn.execute(f"CREATE INDEX ix_{FLAT_TABLE.lower()}{fk} ON {FLAT_TABLE} ({fk})")
+    _install_triggers(conn)
+
+
+@traced("spłaszczanie: zmienione fakty", "spłaszczanie", shape=lambda n, *args: (n, None))
+def _apply_pending_facts(conn):
+    pending = f"SELECT fact_rowid FROM {FLAT_PENDING_TABLE}"
+    n_pending = conn.execute(f"SELECT COUNT(*) FROM {FLAT_PENDING_TABLE}").fetchone()[0]
+    if n_pending:
+        conn.execute(f"DELETE FROM {FLAT_TABLE} WHERE {FLAT_ROWID} IN ({pending})")
+        conn.execute(f"INSERT INTO {FLAT_TABLE} {flat_select_sql(conn, where=f'F.rowid IN ({pending})')}")
+        conn.execute(f"DELETE FROM {FLAT_PENDING_TABLE}")
+    return n_pending
+
+
+@traced("spłaszczanie: aktualizacja wymiaru", "spłaszczanie")
+def _refresh_dimension(conn, table_name):
+    """
+    Aktualizuje w zmaterializowanej tabeli wyłącznie kolumny pochodzące z danego wymiaru.
+    """
+    for alias, table, fact_key, dim_key, columns in FLAT_JOINS:
+        if table.lower() != table_name.lower():
+            continue
+        assignments = ", ".join(
+            f"{name} = (SELECT {expr} FROM {table} {alias} "
+            f"WHERE {alias}.{dim_key} = {FLAT_TABLE}.{_fk_column(fact_key)})"
+            for name, expr in columns
+        )
+        conn.execute(f"UPDATE {FLAT_TABLE} SET {assignments}")
+
+
+@traced(category="spłaszczanie")
+def refresh_flat_table(conn):
+    """
+    Odświeża zmaterializowaną spłaszczoną tabelę (FLAT_TABLE) w bazie:
+    - pełna przebudowa, gdy tabela nie istnieje lub tabela faktów została zastąpiona,
+    - dopisane/zmienione wiersze faktów (wyłapane wyzwalaczami) są przeliczane pojedynczo,
+    - po ponownym wczytaniu wymiaru aktualizowane są tylko jego kolumny.
+    Zwraca słownik {mode, fact_rows, dimensions}.
+    """
+    if conn.in_transaction:
+        conn.commit()
+    conn.execute("BEGIN")
+    try:
+        current = _source_versions(conn)
+        stored = _stored_versions(conn)
+        flat_exists = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (FLAT_TABLE,)
+        ).fetchone() is not None
+
+        if not flat_exists or not _triggers_installed(conn):
+            _rebuild(conn)
+            summary = {"mode": "full", "fact_rows": None, "dimensions": []}
+        else:
+            fact_rows = _apply_pending_facts(conn)
+            dimensions = [
+                table for table in FLAT_SOURCE_TABLES[1:]
+                if current.get(table) != stored.get(table)
+            ]
+            for table in dimensions:
+                _refresh_dimension(conn, table)
+            changed = bool(fact_rows or dimensions)
+            summary = {"mode": "incremental" if changed else "none", "fact_rows": fact_rows,
+                       "dimensions": dimensions}
+
+        _store_versions(conn, current)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return summary
+
+
+def flat_state(conn):
+    """
+    Stan odświeżenia zmaterializowanej tabeli (bez zapisu do bazy): wersje tabel źródłowych
+    z ostatniego odświeżenia i liczba zmienionych wierszy faktów oczekujących na odświeżenie.
+    """
+    existing = {row[0] for row in conn.execute(
+        "SELECT name FROM sqlite_master WHERE type = 'table' AND name IN (?, ?)", (FLAT_STATE_TABLE, FLAT_PENDING_TABLE)
+    )}
+    versions = (dict(conn.execute(f"SELECT source_table, version FROM {FLAT_STATE_TABLE}").fetchall())
+                if FLAT_STATE_TABLE in existing else {})
+    pending = (conn.execute(f"SELECT COUNT(*) FROM {FLAT_PENDING_TABLE}").fetchone()[0]
+               if FLAT_PENDING_TABLE in existing else 0)
+    return {"versions": versions, "pending": pending}
+
+
+def flat_columns(conn):
+    """
+    Kolumny analityczne zmaterializowanej tabeli (bez kolumn technicznych z prefiksem '_').
+    """
+    return [row[1] for row in conn.execute(f"PRAGMA table_info({FLAT_TABLE})") if not row[1].startswith('_')]
+
+
+@traced(category="spłaszczanie")
+def get_flat_fact_table(conn, cache=None):
+    """
+    Zwraca spłaszczoną tabelę faktów (join z wymiarami, bez kolumn kluczy).
+    Join jest zmaterializowany w bazie i odświeżany przyrostowo, więc zwykle wykonywany
+    jest jedynie odczyt. Jeśli podano pamięć podręczną (ParseCache), a wszystkie tabele
+    źródłowe pochodzą z niezmienionych plików, wynik odczytywany jest z pamięci.
+    """
+    cache_key = _flat_cache_key(conn) if cache is not None else None
+    if cache_key is not None:
+        df_flat = cache.get(cache_key)
+        if df_flat is not None:
+            return df_flat
+
+    refresh_flat_table(conn)
+    columns = ", ".join(_quote(c) for c in flat_columns(conn))
+    df_flat = pd.read_sql(f"SELECT {columns} FROM {FLAT_TABLE} ORDER BY {FLAT_ROWID}", conn)
+
+    if cache_key is not None:
+        cache.put(cache_key, df_flat)
+    return df_flat
@@ -0,0 +1,450 @@
+# classes/instrumentation.py
+"""
+Lekkie pomiary etapów: wczytywania, spłaszczania i metod analizatorów.
+
+Każdy pomiar (span) zapisuje czas (wall), czas CPU wątku, zmianę pamięci oraz liczbę
+wierszy i kolumn przetwarzanych danych; spany zagnieżdżają się w drzewo. Spany trafiają do
+aktywnego Tracera: w aplikacji jest to Tracer sesji przypięty do wątku skryptu
+(begin_run), poza nią - globalny Tracer procesu (default_tracer). Wyłączony Tracer kosztuje
+jedno sprawdzenie flagi na wywołanie.
+
+Pomiar pamięci:
+    memory="rss"         - zmiana RSS procesu (odczyt /proc/self/statm) i przyrost szczytu RSS
+                           procesu; tani, ale szczyt widoczny jest tylko, gdy span ustanowi nowe
+                           maksimum dla procesu. Bez modułu resource (Windows) odczyt przez psutil,
+                           jeśli jest zainstalowany; bez obu domyślnym trybem jest tracemalloc.
+    memory="tracemalloc" - dokładny szczyt alokacji Pythona i numpy w obrębie spanu; spowalnia
+                           obliczenia intensywnie alokujące pamięć.
+"""
+
+import functools
+import json
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from collections import deque
+
+import pandas as pd
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+MEMORY_MODES = ("rss", "tracemalloc")
+# Tryb rss wymaga odczytu szczytu RSS (resource albo psutil)
+DEFAULT_MEMORY_MODE = "rss" if resource is not None or psutil is not None else "tracemalloc"
+
+_local = threading.local()
+
+
+def _current_rss():
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError, AttributeError):
+        pass
+    return psutil.Process().memory_info().rss if psutil is not None else None
+
+
+def _peak_rss():
+    """
+    Szczyt RSS procesu w bajtach; None, gdy system go nie udostępnia.
+    """
+    if resource is not None:
+        # ru_maxrss: KiB w Linuksie, bajty w macOS
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+    if psutil is not None:
+        # Windows: szczytowy zestaw roboczy (peak_wset)
+        return getattr(psutil.Process().memory_info(), "peak_wset", None)
+    return None
+
+
+class Span:
+    """
+    Pojedynczy pomiar. Czasy w sekundach (start względem perf_counter), pamięć w bajtach.
+    """
+
+    __slots__ = ("name", "category", "thread", "start", "wall", "cpu", "memory_delta", "memory_peak",
+                 "rows", "cols", "attrs", "children", "_cpu_start", "_rss_start", "_peak_start", "_peak_seen",
+                 "_memory")
+
+    def __init__(self, name, category, attrs):
+        self.name = name
+        self.category = category
+        self.thread = threading.get_ident()
+        self.attrs = attrs
+        self.children = []
+        self.wall = None
+        self.cpu = None
+        self.memory_delta = None
+        self.memory_peak = None
+        self.rows = None
+        self.cols = None
+        self.start = None
+        self._cpu_start = None
+        self._rss_start = None
+        self._peak_start = None
+        self._peak_seen = 0
+        self._memory = None
+
+    def set(self, rows=None, cols=None, **attrs):
+        """
+        Uzupełnia liczbę wierszy i kolumn oraz dodatkowe atrybuty (np. trafienie w cache).
+        """
+        if rows is not None:
+            self.rows = int(rows)
+        if cols is not None:
+            self.cols = int(cols)
+        self.attrs.update(attrs)
+        return self
+
+    def set_shape(self, df):
+        if isinstance(df, pd.DataFrame):
+            self.set(rows=df.shape[0], cols=df.shape[1])
+        return self
+
+    def walk(self, depth=0):
+        yield depth, self
+        for child in self.children:
+            yield from child.walk(depth + 1)
+
+
+class _NullSpan:
+    """
+    Span wyłączonego Tracera - wszystkie operacje są puste.
+    """
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def set(self, *args, **kwargs):
+        return self
+
+    def set_shape(self, df):
+        return self
+
+
+NULL_SPAN = _NullSpan()
+
+
+class Run:
+    """
+    Jedno wykonanie skryptu strony (rerun) lub zadania wsadowego: lista spanów najwyższego poziomu.
+    """
+
+    def __init__(self, label):
+        self.label = label
+        self.started_at = time.time()
+        self.start = time.perf_counter()
+        self.spans = []
+
+    def walk(self):
+        for span in self.spans:
+            yield from span.walk()
+
+    @property
+    def wall(self):
+        ends = [s.start + s.wall for _, s in self.walk() if s.wall is not None]
+        return max(ends) - self.start if ends else 0.0
+
+
+class _SpanContext:
+    __slots__ = ("tracer", "span")
+
+    def __init__(self, tracer, span):
+        self.tracer = tracer
+        self.span = span
+
+    def __enter__(self):
+        self.tracer._open(self.span)
+        return self.span
+
+    def __exit__(self, *exc):
+        self.tracer._close(self.span)
+        return False
+
+
+class Tracer:
+    """
+    Zbiera spany w kolejnych wykonaniach (Run); przechowuje max_runs ostatnich.
+    Stos otwartych spanów prowadzony jest osobno dla każdego wątku.
+    """
+
+    def __init__(self, enabled: bool = False, memory: str = DEFAULT_MEMORY_MODE, max_runs: int = 20):
+        if memory not in MEMORY_MODES:
+            raise ValueError(f"Nieznany tryb pomiaru pamięci (dozwolone: {', '.join(MEMORY_MODES)}).")
+        self.enabled = enabled
+        self.memory = memory
+        self.runs = deque(maxlen=max_runs)
+        self._stacks = threading.local()
+        self._lock = threading.Lock()
+
+    # --- Wykonania ---
+
+    def begin_run(self, label):
+        """
+        Rozpoczyna nowe wykonanie i przypina Tracer do bieżącego wątku (spany z wątku trafią tutaj).
+        """
+        _local.tracer = self
+        self._stacks.stack = []
+        if self.enabled:
+            with self._lock:
+                self.runs.append(Run(label))
+        return self
+
+    def end_run(self):
+        if getattr(_local, "tracer", None) is self:
+            _local.tracer = None
+
+    def clear(self):
+        with self._lock:
+            self.runs.clear()
+
+    def set_memory_mode(self, memory):
+        """
+        Zmienia tryb pomiaru pamięci; po wyłączeniu trybu tracemalloc śledzenie alokacji jest
+        zatrzymywane (jest wspólne dla procesu, więc dotyczy też innych sesji).
+        """
+        if memory not in MEMORY_MODES:
+            raise ValueError(f"Nieznany tryb pomiaru pamięci (dozwolone: {', '.join(MEMORY_MODES)}).")
+        if self.memory == "tracemalloc" and memory != "tracemalloc" and tracemalloc.is_tracing():
+            tracemalloc.stop()
+        self.memory = memory
+
+    # --- Spany ---
+
+    def span(self, name, category="", **attrs):
+        if not self.enabled:
+            return NULL_SPAN
+        return _SpanContext(self, Span(name, category, attrs))
+
+    def _stack(self):
+        stack = getattr(self._stacks, "stack", None)
+        if stack is None:
+            stack = self._stacks.stack = []
+        return stack
+
+    def _open(self, span):
+        stack = self._stack()
+        span._memory = self.memory
+        if self.memory == "tracemalloc":
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+            current, peak = tracemalloc.get_traced_memory()
+            # Szczyt jest globalny: przed wyzerowaniem zapamiętujemy go w spanie nadrzędnym
+            if stack:
+                stack[-1]._peak_seen = max(stack[-1]._peak_seen, peak)
+            tracemalloc.reset_peak()
+            span._rss_start = current
+            span._peak_seen = current
+        else:
+            span._rss_start = _current_rss()
+            span._peak_start = _peak_rss()
+        span._cpu_start = time.thread_time()
+        span.start = time.perf_counter()
+        stack.append(span)
+
+    def _close(self, span):
+        span.wall = time.perf_counter() - span.start
+        span.cpu = time.thread_time() - span._cpu_start
+        stack = self._stack()
+        # Tryb pamięci ustalony przy otwarciu spanu
+        if span._memory == "tracemalloc" and tracemalloc.is_tracing():
+            current, peak = tracemalloc.get_traced_memory()
+            peak = max(peak, span._peak_seen)
+            span.memory_delta = current - span._rss_start
+            span.memory_peak = peak - span._rss_start
+            if len(stack) > 1:
+                parent = stack[-2]
+                parent._peak_seen = max(parent._peak_seen, peak)
+        elif span._memory == "rss":
+            rss = _current_rss()
+            if rss is not None and span._rss_start is not None:
+                span.memory_delta = rss - span._rss_start
+            peak = _peak_rss()
+            if peak is not None and span._peak_start is not None:
+                span.memory_peak = peak - span._peak_start
+
+        if stack and stack[-1] is span:
+            stack.pop()
+        if stack:
+            stack[-1].children.append(span)
+            return
+        with self._lock:
+            if not self.runs:
+                self.runs.append(Run("(poza wykonaniem strony)"))
+            self.runs[-1].spans.append(span)
+
+    # --- Eksport ---
+
+    def to_chrome_trace(self, runs=None):
+        """
+        Spany w formacie Chrome Trace Event (chrome://tracing, Perfetto): zdarzenia "X"
+        z czasem w mikrosekundach; każde wykonanie to osobny proces (pid) z nazwą etykiety.
+        """
+        runs = list(self.runs) if runs is None else list(runs)
+        origin = min((r.start for r in runs), default=0.0)
+        events = []
+        for pid, run in enumerate(runs, start=1):
+            events.append({"name": "process_name", "ph": "M", "pid": pid, "tid": 0,
+                           "args": {"name": f"{run.label} ({time.strftime('%H:%M:%S', time.localtime(run.started_at))})"}})
+            for _, span in run.walk():
+                if span.wall is None:
+                    continue
+                args = {"cpu_ms": round(span.cpu * 1000, 3)}
+                if span.memory_delta is not None:
+                    args["memory_delta_mb"] = round(span.memory_delta / 1024 ** 2, 3)
+                if span.memory_peak is not None:
+                    args["memory_peak_mb"] = round(span.memory_peak / 1024 ** 2, 3)
+                if span.rows is not None:
+                    args["rows"] = span.rows
+                if span.cols is not None:
+                    args["cols"] = span.cols
+                args.update({k: v if isinstance(v, (int, float, bool, str)) or v is None else str(v)
+                             for k, v in span.attrs.items()})
+                events.append({"name": span.name, "cat": span.category or "span", "ph": "X",
+                               "ts": round((span.start - origin) * 1e6, 1), "dur": round(span.wall * 1e6, 1),
+                               "pid": pid, "tid": span.thread, "args": args})
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def export_chrome_trace(self, path, runs=None):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.to_chrome_trace(runs), f, ensure_ascii=False)
+
+
+# Tracer procesu - używany przez wątki bez przypiętego Tracera (np. batch_runner, pule wątków)
+default_tracer = Tracer(enabled=False)
+
+
+def get_tracer() -> Tracer:
+    return getattr(_local, "tracer", None) or default_tracer
+
+
+def span(name, category="", **attrs):
+    """
+    Kontekst pomiaru w aktywnym Tracerze: with span("LogisticRegression.fit", "model") as s: ...
+    """
+    return get_tracer().span(name, category, **attrs)
+
+
+def traced(name=None, category="", shape=None):
+    """
+    Dekorator funkcji: każde wywołanie to span. Liczba wierszy i kolumn pochodzi z wyniku
+    (DataFrame) albo z shape(wynik, *args, **kwargs) -> (wiersze, kolumny), jeśli podano.
+    """
+    def decorator(fn):
+        span_name = name or fn.__qualname__
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            tracer = get_tracer()
+            if not tracer.enabled:
+                return fn(*args, **kwargs)
+            with tracer.span(span_name, category) as s:
+                result = fn(*args, **kwargs)
+                if isinstance(result, pd.DataFrame):
+                    s.set_shape(result)
+                elif shape is not None:
+                    rows, cols = shape(result, *args, **kwargs)
+                    s.set(rows=rows, cols=cols)
+                return result
+        return wrapper
+    return decorator
+
+
+def frame_shape(analyzer):
+    """
+    Wiersze i kolumny danych analizatora: z metody _span_shape(), jeśli klasa ją definiuje
+    (np. warianty SQL, w których self.df to tylko próbka), w przeciwnym razie z self.df.
+    """
+    custom = getattr(analyzer, "_span_shape", None)
+    if custom is not None:
+        return custom()
+    df = getattr(analyzer, "df", None)
+    return df.shape if isinstance(df, pd.DataFrame) else (None, None)
+
+
+def instrument(category="analiza"):
+    """
+    Dekorator klasy: każda metoda publiczna i __init__ zdefiniowane w tej klasie stają się
+    spanami o nazwie Klasa.metoda (klasa obiektu; jeśli metoda pochodzi z klasy bazowej,
+    jej nazwa podawana jest w nawiasie). Liczba wierszy i kolumn pochodzi z frame_shape.
+    """
+    def decorator(cls):
+        for attr, fn in list(vars(cls).items()):
+            if not callable(fn) or isinstance(fn, (staticmethod, classmethod, type)):
+                continue
+            if attr.startswith("_") and attr != "__init__":
+                continue
+            setattr(cls, attr, _traced_method(fn, cls, attr, category))
+        return cls
+    return decorator
+
+
+def _traced_method(fn, owner, method, category):
+    @functools.wraps(fn)
+    def wrapper(self, *args, **kwargs):
+        tracer = get_tracer()
+        if not tracer.enabled:
+            return fn(self, *args, **kwargs)
+        cls = type(self)
+        name = f"{cls.__name__}.{method}" if cls is owner else f"{cls.__name__}.{method} ({owner.__name__})"
+        with tracer.span(name, category) as s:
+            result = fn(self, *args, **kwargs)
+            rows, cols = frame_shape(self)
+            s.set(rows=rows, cols=cols)
+            return result
+    return wrapper
+
+
+def session_tracer(session_state) -> Tracer:
+    """
+    Tracer sesji aplikacji (zapamiętany w session_state); domyślnie wyłączony.
+    """
+    tracer = session_state.get("tracer")
+    if tracer is None:
+        tracer = session_state["tracer"] = Tracer(enabled=False)
+    return tracer
+
+
+def span_table(run: Run) -> pd.DataFrame:
+    """
+    Drzewo spanów wykonania jako tabela (nazwy wcięte wg zagnieżdżenia).
+    Czas własny to czas spanu pomniejszony o czas spanów podrzędnych.
+    """
+    rows = []
+    for depth, s in run.walk():
+        if s.wall is None:
+            continue
+        child_wall = sum(c.wall for c in s.children if c.wall is not None)
+        rows.append({
+            "Span": " " * depth + s.name,
+            "Kategoria": s.category,
+            "Start [ms]": (s.start - run.start) * 1000,
+            "Czas [ms]": s.wall * 1000,
+            "Czas własny [ms]": max(0.0, s.wall - child_wall) * 1000,
+            "CPU [ms]": s.cpu * 1000,
+            "Pamięć Δ [MB]": s.memory_delta / 1024 ** 2 if s.memory_delta is not None else None,
+            "Szczyt Δ [MB]": s.memory_peak / 1024 ** 2 if s.memory_peak is not None else None,
+            "Wiersze": s.rows,
+            "Kolumny": s.cols,
+            "Atrybuty": ", ".join(f"{k}={v}" for k, v in s.attrs.items()) or None,
+            "Wątek": s.thread,
+            "Głębokość": depth,
+            "Nazwa": s.name,
+        })
+    table = pd.DataFrame(rows)
+    if not table.empty:
+        table = table.astype({"Wiersze": "Int64", "Kolumny": "Int64"})
+    return table
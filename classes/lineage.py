@@ -0,0 +1,383 @@
+# classes/lineage.py
+"""
+Pochodzenie kolumn spłaszczonej tabeli (data lineage) jako graf zależności kolumna -> tabele
+i kolumny źródłowe, odczytany z zapytania spłaszczającego (flat_table), a nie ze słownika.
+
+Graf służy też do unieważniania wyników: odcisk kolumny zależy tylko od wersji jej tabel
+źródłowych, więc po ponownym wczytaniu jednego wymiaru przeliczane są wyłącznie KPI, grupy
+biasu i histogramy kolumn z tego wymiaru - pozostałe wyniki pochodzą z pamięci podręcznej.
+"""
+
+import copy
+import functools
+import hashlib
+import json
+import re
+import weakref
+
+import numpy as np
+import pandas as pd
+
+from classes.data_loader import get_load_meta
+from classes.flat_table import FLAT_QUERY, FLAT_SOURCE_TABLES, FLAT_TABLE, flat_select_sql
+from classes.instrumentation import span
+
+_SELECT_RE = re.compile(r"^\s*SELECT\s+(?P<select>.*?)\s+FROM\s+(?P<table>\w+)\s+(?P<alias>\w+)\s*(?P<rest>.*)$",
+                        re.IGNORECASE | re.DOTALL)
+_JOIN_RE = re.compile(r"JOIN\s+(?P<table>\w+)\s+(?P<alias>\w+)\s+ON\s+(?P<left>\w+)\.(?P<left_col>\w+)\s*=\s*"
+                      r"(?P<right>\w+)\.(?P<right_col>\w+)", re.IGNORECASE)
+_ALIAS_RE = re.compile(r"^(?P<expr>.*?)\s+AS\s+(?P<name>\"(?:[^\"]|\"\")+\"|\w+)$", re.IGNORECASE | re.DOTALL)
+_REF_RE = re.compile(r"\b(?P<alias>[A-Za-z_]\w*)\.(?P<column>\"(?:[^\"]|\"\")+\"|\w+|\*)")
+_STRING_RE = re.compile(r"'(?:[^']|'')*'")
+
+
+def _unquote(name):
+    return name[1:-1].replace('""', '"') if name.startswith('"') else name
+
+
+def _split_select(text):
+    """
+    Dzieli listę SELECT po przecinkach najwyższego poziomu (poza nawiasami i napisami).
+    """
+    items, depth, quote, start = [], 0, None, 0
+    for i, ch in enumerate(text):
+        if quote:
+            quote = None if ch == quote else quote
+        elif ch in "'\"":
+            quote = ch
+        elif ch == "(":
+            depth += 1
+        elif ch == ")":
+            depth -= 1
+        elif ch == "," and depth == 0:
+            items.append(text[start:i].strip())
+            start = i + 1
+    items.append(text[start:].strip())
+    return [item for item in items if item]
+
+
+class LineageGraph:
+    """
+    Graf pochodzenia: dla każdej kolumny wyrażenie z zapytania, kolumny źródłowe (tabela, kolumna)
+    oraz klucze joinów, przez które kolumna trafia do tabeli. wildcard - tabela, z której
+    pochodzą pozostałe kolumny (F.* w zapytaniu bez jawnej listy kolumn), query - zapytanie źródłowe.
+    """
+
+    def __init__(self, fact_table, columns, joins, wildcard=None, query=None):
+        self.fact_table = fact_table
+        self.columns = columns
+        self.joins = joins
+        self.wildcard = wildcard
+        self.query = query
+
+    def column(self, name):
+        """
+        Opis kolumny: {"expression", "refs": [(tabela, kolumna)], "keys": [(tabela, kolumna)]}.
+        Kolumny spoza zapytania przypisywane są tabeli z F.* (jeśli jest).
+        """
+        if name in self.columns:
+            return self.columns[name]
+        if self.wildcard is not None:
+            return {"expression": f"{self.wildcard}.{name}", "refs": [(self.wildcard, name)], "keys": []}
+        return None
+
+    def sources(self, name):
+        """
+        Tabele, od których zależy kolumna (także przez klucz joinu); nieznana kolumna zależy od wszystkich.
+        """
+        info = self.column(name)
+        if info is None:
+            return tuple(sorted(FLAT_SOURCE_TABLES))
+        return tuple(sorted({table for table, _ in info["refs"] + info["keys"]}))
+
+    def dependents(self, table):
+        """
+        Kolumny zależne od tabeli (jawne kolumny zapytania).
+        """
+        return [name for name in self.columns if table.lower() in (t.lower() for t in self.sources(name))]
+
+    def describe(self, name):
+        """
+        (tabela źródłowa, typ pochodzenia) do raportu pochodzenia danych.
+        """
+        info = self.column(name)
+        if info is None:
+            return "❓ Nieznane", "❓ Nieokreślone"
+        tables = [table for table, _ in info["refs"]]
+        dimensions = [table for table in dict.fromkeys(tables) if table != self.fact_table]
+        plain = _REF_RE.fullmatch(info["expression"].strip()) is not None
+        if dimensions:
+            keys = ", ".join(self.joins[table][1] for table in dimensions)
+            kind = f"join przez {keys}"
+            if not plain:
+                kind += f" + przekształcenie ({_display(info['expression'])})"
+            return ", ".join(dimensions), kind
+        if plain:
+            return self.fact_table, "oryginalna"
+        return self.fact_table, f"wyliczona ({_display(info['expression'])})"
+
+    def edges(self, columns=None):
+        """
+        Krawędzie grafu: kolumna -> (tabela, kolumna źródłowa) z rolą "wartość" lub "klucz joinu".
+        """
+        rows = []
+        for name in (self.columns if columns is None else columns):
+            info = self.column(name)
+            if info is None:
+                continue
+            rows += [{"Kolumna": name, "Tabela źródłowa": t, "Kolumna źródłowa": c, "Rola": "wartość"}
+                     for t, c in info["refs"]]
+            rows += [{"Kolumna": name, "Tabela źródłowa": t, "Kolumna źródłowa": c, "Rola": "klucz joinu"}
+                     for t, c in info["keys"]]
+        return pd.DataFrame(rows, columns=["Kolumna", "Tabela źródłowa", "Kolumna źródłowa", "Rola"])
+
+
+def _display(expression):
+    return re.sub(r"\b[A-Za-z_]\w*\.", "", expression).replace('"', "").strip().removeprefix("(").removesuffix(")")
+
+
+def parse_flat_query(query):
+    """
+    Buduje LineageGraph z zapytania SELECT ... FROM fakty F LEFT JOIN wymiar X ON F.klucz = X.klucz.
+    Kolumny techniczne (z prefiksem '_') są pomijane.
+    """
+    match = _SELECT_RE.match(query)
+    if match is None:
+        raise ValueError("Nie rozpoznano zapytania spłaszczającego (oczekiwano SELECT ... FROM tabela alias).")
+    fact_table, fact_alias = match["table"], match["alias"]
+    aliases = {fact_alias: fact_table}
+    joins = {}
+    for join in _JOIN_RE.finditer(match["rest"]):
+        aliases[join["alias"]] = join["table"]
+        # Klucz po stronie faktów i po stronie wymiaru (niezależnie od kolejności w ON)
+        fact_side, dim_side = ((join["left"], join["left_col"]), (join["right"], join["right_col"]))
+        if fact_side[0] == join["alias"]:
+            fact_side, dim_side = dim_side, fact_side
+        joins[join["table"]] = (fact_side[1], dim_side[1])
+
+    columns, wildcard = {}, None
+    for item in _split_select(match["select"]):
+        alias_match = _ALIAS_RE.match(item)
+        expression = alias_match["expr"].strip() if alias_match else item
+        refs = [(aliases.get(ref["alias"], ref["alias"]), _unquote(ref["column"]))
+                for ref in _REF_RE.finditer(_STRING_RE.sub("''", expression))]
+        if not alias_match and len(refs) == 1 and refs[0][1] == "*":
+            wildcard = refs[0][0]
+            continue
+        name = _unquote(alias_match["name"]) if alias_match else (refs[0][1] if refs else expression)
+        if name.startswith("_"):
+            continue
+        keys = [(fact_table, joins[table][0]) for table in dict.fromkeys(t for t, _ in refs) if table in joins]
+        columns[name] = {"expression": expression, "refs": refs, "keys": keys}
+    return LineageGraph(fact_table, columns, joins, wildcard, query)
+
+
+@functools.lru_cache(maxsize=None)
+def _default_graph():
+    return parse_flat_query(FLAT_QUERY)
+
+
+def lineage_graph(conn=None):
+    """
+    Graf pochodzenia spłaszczonej tabeli: z zapytania z jawną listą kolumn faktów (conn podane)
+    lub z zapytania FLAT_QUERY (kolumny faktów przez F.*).
+    """
+    return parse_flat_query(flat_select_sql(conn)) if conn is not None else _default_graph()
+
+
+# --- Odciski kolumn ---
+
+def column_fingerprints(conn, columns, dtypes=None, graph=None):
+    """
+    Odcisk każdej kolumny spłaszczonej tabeli: jej wyrażenie oraz metadane wczytań (wersja,
+    klucz pliku, liczba wierszy, czas) tabel źródłowych, a także liczba wierszy tabeli
+    spłaszczonej. dtypes - typy kolumn ramki w pamięci (inne typy = inne wyniki).
+    Zakłada, że tabela spłaszczona jest odświeżona (refresh_flat_table).
+    """
+    graph = graph or lineage_graph()
+    meta = {name.lower(): info for name, info in get_load_meta(conn).items()}
+    rows = conn.execute(f'SELECT COUNT(*) FROM "{FLAT_TABLE}"').fetchone()[0]
+    fingerprints = {}
+    for col in columns:
+        info = graph.column(col)
+        payload = json.dumps({
+            "column": col,
+            "expression": info["expression"] if info else None,
+            "sources": {table: meta.get(table.lower()) for table in graph.sources(col)},
+            "rows": rows,
+            "dtype": str(dtypes[col]) if dtypes is not None else None,
+        }, sort_keys=True, default=str)
+        fingerprints[col] = hashlib.sha256(payload.encode("utf-8")).hexdigest()
+    return fingerprints
+
+
+def session_column_fingerprints(session_state, df: pd.DataFrame):
+    """
+    Odciski kolumn ramki z sesji zapisane przy jej wczytaniu (session_state["df_lineage"]).
+    None, jeśli ramka w sesji nie pochodzi z tego wczytania.
+    """
+    stored = session_state.get("df_lineage")
+    if stored is None or stored[0]() is not df:
+        return None
+    return stored[1]
+
+
+def remember_column_fingerprints(session_state, df: pd.DataFrame, fingerprints):
+    """
+    Zapisuje odciski kolumn wczytanej ramki; ramka rozpoznawana jest przez słabą referencję
+    (id(df) zwolnionej ramki może zostać ponownie użyte).
+    """
+    session_state["df_lineage"] = (weakref.ref(df), fingerprints)
+
+
+def _restricted(analyzer, columns):
+    """
+    Płytka kopia analizatora ograniczona do podanych kolumn (metody iterują po self.df).
+    """
+    restricted = copy.copy(analyzer)
+    restricted.df = analyzer.df[list(columns)]
+    return restricted
+
+
+@functools.lru_cache(maxsize=None)
+def _describe_labels(dtype_name):
+    try:
+        dtype = pd.api.types.pandas_dtype(dtype_name)
+    except TypeError:
+        dtype = object
+    return tuple(pd.Series([], dtype=dtype).describe().index)
+
+
+def _describe_order(dtype_names):
+    """
+    Kolejność statystyk jak w describe(include='all'): etykiety kolumn od najkrótszej listy
+    (tekstowe, daty, liczbowe), więc zależy od typów wszystkich kolumn razem.
+    """
+    names = []
+    for labels in sorted((_describe_labels(str(t)) for t in dtype_names.dropna()), key=len):
+        names += [label for label in labels if label not in names]
+    return names
+
+
+def merge_column_reports(parts, columns):
+    """
+    Łączy części column_report policzone dla rozłącznych grup kolumn w raport całej tabeli.
+    Wskaźniki łączne liczone są ze składowych: braki - średnia po kolumnach (ta sama liczba
+    wierszy), outliery - suma outlierów przez sumę niepustych wartości kolumn liczbowych.
+    """
+    missing = pd.concat([p['missing_values']['missing_per_column_%'] for p in parts]).reindex(columns)
+    outliers_per_column, distributions = {}, {}
+    for part in parts:
+        outliers_per_column.update(part['outliers']['outliers_per_column'])
+        distributions.update(part['distributions'])
+    outliers_per_column = {c: outliers_per_column[c] for c in columns if c in outliers_per_column}
+    distributions = {c: distributions[c] for c in columns if c in distributions}
+
+    stats = pd.concat([p['basic_stats'] for p in parts]).reindex(index=columns)
+    order = ['typ'] + _describe_order(stats['typ']) if 'typ' in stats.columns else []
+    basic_stats = stats.reindex(columns=order + [c for c in stats.columns if c not in order])
+
+    n = basic_stats.loc[list(outliers_per_column), 'count'].astype(float).sum() if outliers_per_column else 0
+    total_outliers = sum(v['Liczba obserwacji odstających'] for v in outliers_per_column.values())
+    return {
+        'missing_values': {
+            'missing_per_column_%': missing,
+            'percent_missing_total': missing.mean() if len(missing) else np.nan,
+        },
+        'outliers': {
+            'outliers_per_column': outliers_per_column,
+            'percent_outliers_total': (total_outliers / n) * 100 if n > 0 else 0,
+        },
+        'basic_stats': basic_stats,
+        'distributions': distributions,
+    }
+
+
+class LineageResults:
+    """
+    Wyniki analiz w ResultCache z kluczem z odcisków użytych kolumn (column_fingerprints)
+    zamiast odcisku całego zbioru. scope rozdziela wyniki różnych trybów obliczeń.
+    hits/misses - liczba wyników z pamięci i przeliczonych w ostatnich wywołaniach.
+    """
+
+    def __init__(self, cache, fingerprints: dict, scope: str = "", graph=None):
+        self.cache = cache
+        self.fingerprints = fingerprints
+        self.scope = scope
+        self.graph = graph or lineage_graph()
+        self.hits = []
+        self.misses = []
+
+    def key(self, name, columns, *args, **kwargs):
+        scoped = {c: self.fingerprints.get(c) for c in columns}
+        return self.cache.make_key(scoped, f"{self.scope}:{name}", list(columns), *args, **kwargs)
+
+    def groups(self, columns):
+        """
+        Kolumny pogrupowane według zbioru tabel źródłowych (kolejność pierwszego wystąpienia).
+        """
+        groups = {}
+        for col in columns:
+            groups.setdefault(self.graph.sources(col), []).append(col)
+        return list(groups.values())
+
+    def get_or_compute(self, name, columns, compute, *args, **kwargs):
+        missing = object()
+        key = self.key(name, columns, *args, **kwargs)
+        with span(f"pamięć podręczna: {name} ({len(columns)} kol.)", "pamięć podręczna") as s:
+            value = self.cache.get(key, missing)
+            s.set(hit=value is not missing)
+        if value is missing:
+            value = compute()
+            self.cache.put(key, value)
+            self.misses.append((name, tuple(columns)))
+        else:
+            self.hits.append((name, tuple(columns)))
+        return value
+
+    def quality_report(self, analyzer, columns=None):
+        """
+        Raport jakości (jak generate_report(with_type_conformance=False)) składany z części
+        dla grup kolumn o wspólnych tabelach źródłowych; duplikaty zależą od wszystkich kolumn.
+        """
+        columns = list(analyzer.df.columns) if columns is None else list(columns)
+        parts = [self.get_or_compute("column_report", group, lambda group=group: _restricted(analyzer, group).column_report())
+                 for group in self.groups(columns)]
+        merged = merge_column_reports(parts, columns)
+        return {
+            'missing_values': merged['missing_values'],
+            'duplicates': self.get_or_compute("duplicate_rows", columns, analyzer.duplicate_rows),
+            'outliers': merged['outliers'],
+            'basic_stats': merged['basic_stats'],
+            'distributions': merged['distributions'],
+        }
+
+    def analyze_bias(self, analyzer, group_cols=None, target_cols=None, **kwargs):
+        """
+        analyze_bias z wynikiem zapamiętanym osobno dla każdej kolumny grupującej (klucz: odciski
+        kolumny grupującej i kolumn celu). Brakujące grupy liczone są jednym wywołaniem.
+        """
+        group_cols = analyzer.DEFAULT_GROUP_COLS if group_cols is None else group_cols
+        target_cols = analyzer.DEFAULT_TARGET_COLS if target_cols is None else target_cols
+        group_cols = [c for c in dict.fromkeys(group_cols) if c in analyzer.df.columns]
+        targets = [t for t in target_cols if t in analyzer.df.columns]
+        missing = object()
+        keys = {g: self.key("analyze_bias", [g, *targets], list(target_cols), **kwargs) for g in group_cols}
+        with span(f"pamięć podręczna: analyze_bias ({len(group_cols)} grup)", "pamięć podręczna") as s:
+            results = {g: self.cache.get(key, missing) for g, key in keys.items()}
+            todo = [g for g, value in results.items() if value is missing]
+            s.set(hit=not todo)
+        if todo:
+            computed = analyzer.analyze_bias(group_cols=todo, target_cols=target_cols, **kwargs)
+            for g in todo:
+                results[g] = computed[g]
+                # Błędy analizy (napisy) nie są zapamiętywane
+                if isinstance(computed[g], dict):
+                    self.cache.put(keys[g], computed[g])
+        for g in group_cols:
+            # Wyniki z pamięci trafiają też do memo analizatora (np. dla evaluate_risk)
+            if g not in todo and hasattr(analyzer, "remember_bias"):
+                analyzer.remember_bias(g, results[g], target_cols, **kwargs)
+        self.misses += [("analyze_bias", (g,)) for g in todo]
+        self.hits += [("analyze_bias", (g,)) for g in group_cols if g not in todo]
+        return {g: results[g] for g in group_cols}
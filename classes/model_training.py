@@ -0,0 +1,218 @@
+# classes/model_training.py
+"""
+Skalowalne trenowanie prostego klasyfikatora (tryb "sgd" w AIReadinessAnalyzer.train_simple_model).
+
+Zamiast gęstej macierzy wszystkich wierszy i LogisticRegression model dostaje porcje wierszy
+(partial_fit regresji logistycznej uczonej SGD) w kolejności warstwowej - każdy początkowy
+fragment ma w przybliżeniu rozkład klas całego zbioru, więc jest próbą warstwową. Cechy są
+rzadkie: kolumny liczbowe standaryzowane, kategoryczne o małej liczbie wartości jako one-hot,
+a o dużej - haszowane do stałej liczby kolumn. Po każdym podwojeniu liczby wierszy dokładność
+sprawdzana jest na zbiorze walidacyjnym (wydzielonym z wierszy treningowych); trenowanie
+kończy się, gdy przestaje rosnąć. Zbiór testowy służy wyłącznie do końcowej oceny modelu
+z najlepszego punktu kontrolnego.
+"""
+
+import copy
+import time
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+from sklearn.linear_model import SGDClassifier
+from sklearn.model_selection import train_test_split
+
+# Kolumny kategoryczne o większej liczbie wartości są haszowane zamiast kodowania one-hot
+DEFAULT_MAX_ONEHOT = 50
+# Liczba kolumn haszowanych na jedną kolumnę kategoryczną
+DEFAULT_HASH_FEATURES = 256
+DEFAULT_BATCH_ROWS = 5_000
+# Górne ograniczenie zbioru testowego (i walidacyjnego) oraz próby do wyznaczenia kodowania cech
+DEFAULT_TEST_ROWS = 50_000
+DEFAULT_VALIDATION_SIZE = 0.1
+DEFAULT_FIT_ROWS = 100_000
+# Zbieżność: zmiana dokładności mniejsza niż tol w patience kolejnych punktach kontrolnych
+DEFAULT_TOL = 0.005
+DEFAULT_PATIENCE = 2
+DEFAULT_MAX_EPOCHS = 5
+
+
+class SparseFeatureEncoder:
+    """
+    Kodowanie ramki do rzadkiej macierzy cech (CSR). Braki: w kolumnach liczbowych średnia
+    (0 po standaryzacji), w kategorycznych - brak aktywnej cechy; wartości nieznane przy
+    fit kodowane są tak samo jak braki (one-hot) albo trafiają do swojego kubełka (haszowanie).
+    """
+
+    def __init__(self, max_onehot: int = DEFAULT_MAX_ONEHOT, hash_features: int = DEFAULT_HASH_FEATURES):
+        self.max_onehot = max_onehot
+        self.hash_features = hash_features
+        self._category_lookups = {}
+
+    def fit(self, X: pd.DataFrame):
+        self.numeric = [c for c in X.columns if pd.api.types.is_numeric_dtype(X[c].dtype)]
+        self.categories = {}
+        self.hashed = []
+        for col in X.columns:
+            if col in self.numeric:
+                continue
+            uniques = X[col].dropna().unique()
+            if len(uniques) <= self.max_onehot:
+                self.categories[col] = pd.Index(uniques)
+            else:
+                self.hashed.append(col)
+        values = X[self.numeric].to_numpy(dtype=np.float64, na_value=np.nan)
+        with np.errstate(invalid="ignore"):
+            self.mean = np.nan_to_num(np.nanmean(values, axis=0)) if len(values) else np.zeros(len(self.numeric))
+            std = np.nanstd(values, axis=0) if len(values) else np.ones(len(self.numeric))
+        self.std = np.where(np.isfinite(std) & (std > 0), std, 1.0)
+
+        self.offsets = {}
+        offset = len(self.numeric)
+        for col, levels in self.categories.items():
+            self.offsets[col] = offset
+            offset += len(levels)
+        for col in self.hashed:
+            self.offsets[col] = offset
+            offset += self.hash_features
+        self.n_features = offset
+        return self
+
+    def _positions(self, col, values: pd.Series, compute):
+        """
+        Pozycje cech kolumny (-1 = brak cechy). Dla typu category liczone raz na kategorię
+        i odczytywane przez kody - bez zamiany wartości porcji na napisy.
+        """
+        if not isinstance(values.dtype, pd.CategoricalDtype):
+            return compute(values)
+        cached = self._category_lookups.get(col)
+        if cached is None or not (cached[0] is values.dtype or cached[0] == values.dtype):
+            cached = (values.dtype, compute(pd.Series(values.cat.categories)))
+            self._category_lookups[col] = cached
+        codes = values.cat.codes.to_numpy()
+        return np.where(codes >= 0, cached[1][codes], -1)
+
+    def _hash(self, values: pd.Series):
+        present = values.notna().to_numpy()
+        positions = np.full(len(values), -1, dtype=np.int64)
+        strings = values[present].astype(str).to_numpy(dtype=object)
+        positions[present] = (pd.util.hash_array(strings) % self.hash_features).astype(np.int64)
+        return positions
+
+    def transform(self, X: pd.DataFrame):
+        n = len(X)
+        rows, cols, data = [], [], []
+        if self.numeric:
+            values = (X[self.numeric].to_numpy(dtype=np.float64, na_value=np.nan) - self.mean) / self.std
+            values = np.nan_to_num(values, nan=0.0, posinf=0.0, neginf=0.0)
+            rows.append(np.repeat(np.arange(n), len(self.numeric)))
+            cols.append(np.tile(np.arange(len(self.numeric)), n))
+            data.append(values.ravel())
+        for col in [*self.categories, *self.hashed]:
+            if col in self.categories:
+                positions = self._positions(col, X[col], self.categories[col].get_indexer)
+            else:
+                positions = self._positions(col, X[col], self._hash)
+            present = positions >= 0
+            rows.append(np.flatnonzero(present))
+            cols.append(self.offsets[col] + positions[present])
+            data.append(np.ones(int(present.sum())))
+        if not rows:
+            return sparse.csr_matrix((n, self.n_features))
+        return sparse.csr_matrix((np.concatenate(data), (np.concatenate(rows), np.concatenate(cols))),
+                                 shape=(n, self.n_features))
+
+
+def stratified_order(y_codes, seed=0):
+    """
+    Losowa kolejność wierszy, w której każdy początkowy fragment ma w przybliżeniu rozkład
+    klas całego zbioru: wiersz klasy c o losowej pozycji r w tej klasie ma klucz (r + u) / n_c,
+    u ~ U(0, 1).
+    """
+    y_codes = np.asarray(y_codes)
+    rng = np.random.default_rng(seed)
+    permutation = rng.permutation(len(y_codes))
+    classes = y_codes[permutation]
+    rank = pd.Series(classes).groupby(classes).cumcount().to_numpy()
+    counts = np.bincount(classes)
+    key = (rank + rng.random(len(classes))) / counts[classes]
+    return permutation[np.argsort(key, kind="stable")]
+
+
+def stratified_split(y_codes, test_rows, seed=0):
+    """
+    Podział indeksów na (treningowe, testowe) z zachowaniem udziałów klas; przy klasach zbyt
+    rzadkich do warstwowania - podział losowy.
+    """
+    index = np.arange(len(y_codes))
+    try:
+        return train_test_split(index, test_size=test_rows, random_state=seed, stratify=y_codes)
+    except ValueError:
+        return train_test_split(index, test_size=test_rows, random_state=seed)
+
+
+def train_sgd_classifier(X: pd.DataFrame, y_codes, n_classes: int, columns=None, batch_rows: int = DEFAULT_BATCH_ROWS,
+                         test_size: float = 0.3, max_test_rows: int = DEFAULT_TEST_ROWS,
+                         validation_size: float = DEFAULT_VALIDATION_SIZE,
+                         fit_rows: int = DEFAULT_FIT_ROWS, max_train_rows=None, tol: float = DEFAULT_TOL,
+                         patience: int = DEFAULT_PATIENCE, max_epochs: int = DEFAULT_MAX_EPOCHS,
+                         max_onehot: int = DEFAULT_MAX_ONEHOT, hash_features: int = DEFAULT_HASH_FEATURES, seed=0):
+    """
+    Regresja logistyczna uczona SGD porcjami po batch_rows wierszy w kolejności warstwowej
+    (max_train_rows - górne ograniczenie próby treningowej). y_codes - kody klas 0..n_classes-1
+    dla wierszy X (-1 = brak etykiety, wiersz pomijany), columns - kolumny cech (domyślnie
+    wszystkie); wiersze wybierane są porcjami, bez kopiowania całej ramki. Punkty kontrolne
+    po 1, 2, 4, ... porcjach; trenowanie kończy się po zbieżności dokładności na zbiorze
+    walidacyjnym (validation_size wierszy treningowych, nie więcej niż max_test_rows) albo po
+    max_epochs przebiegach. Na zbiorze testowym oceniany jest tylko model z punktu kontrolnego
+    o najlepszej dokładności walidacyjnej. Zwraca (model, y_test, y_pred, tabela zbieżności, czy zbieżne).
+    """
+    y_codes = np.asarray(y_codes)
+    labelled = np.flatnonzero(y_codes >= 0)
+    test_rows = max(1, min(int(round(len(labelled) * test_size)), max_test_rows))
+    if len(labelled) - test_rows < 1:
+        raise ValueError("Za mało wierszy do podziału na zbiór treningowy i testowy.")
+    columns = list(X.columns) if columns is None else list(columns)
+    train_idx, test_idx = (labelled[i] for i in stratified_split(y_codes[labelled], test_rows, seed))
+    order = train_idx[stratified_order(y_codes[train_idx], seed)]
+    # Końcowy fragment kolejności warstwowej też ma rozkład klas całego zbioru
+    validation_rows = min(int(round(len(order) * validation_size)), max_test_rows, len(order) - 1)
+    if validation_rows < 1:
+        raise ValueError("Za mało wierszy do wydzielenia zbioru walidacyjnego.")
+    order, validation_idx = order[:-validation_rows], order[-validation_rows:]
+    if max_train_rows is not None:
+        order = order[:max_train_rows]
+
+    encoder = SparseFeatureEncoder(max_onehot, hash_features).fit(X.iloc[order[:fit_rows]][columns])
+    X_validation = encoder.transform(X.iloc[validation_idx][columns])
+    y_validation = y_codes[validation_idx]
+
+    classes = np.arange(n_classes)
+    # Uśrednianie wag (ASGD) tłumi szum pojedynczych porcji - dokładność stabilizuje się szybciej
+    model = SGDClassifier(loss="log_loss", average=True, random_state=seed)
+    convergence = []
+    start = time.perf_counter()
+    seen, checkpoint, stable, converged = 0, batch_rows, 0, False
+    best, best_accuracy = None, -1.0
+    batches = [order[i:i + batch_rows] for i in range(0, len(order), batch_rows)]
+    for epoch in range(1, max_epochs + 1):
+        for number, batch in enumerate(batches, start=1):
+            model.partial_fit(encoder.transform(X.iloc[batch][columns]), y_codes[batch], classes=classes)
+            seen += len(batch)
+            if seen < checkpoint and number < len(batches):
+                continue
+            checkpoint = max(checkpoint * 2, seen + 1)
+            accuracy = float((model.predict(X_validation) == y_validation).mean())
+            previous = convergence[-1]["Dokładność walidacyjna"] if convergence else None
+            stable = stable + 1 if previous is not None and abs(accuracy - previous) < tol else 0
+            if accuracy > best_accuracy:
+                best, best_accuracy = copy.deepcopy(model), accuracy
+            convergence.append({"Epoka": epoch, "Wiersze treningowe": seen, "Dokładność walidacyjna": accuracy,
+                                "Czas [s]": round(time.perf_counter() - start, 3)})
+            if stable >= patience:
+                converged = True
+                break
+        if converged:
+            break
+    y_test = y_codes[test_idx]
+    y_pred = best.predict(encoder.transform(X.iloc[test_idx][columns]))
+    return best, y_test, y_pred, pd.DataFrame(convergence), converged
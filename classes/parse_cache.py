@@ -0,0 +1,258 @@
+# classes/parse_cache.py
+
+import functools
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import time
+import uuid
+import weakref
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+# Zmiana wersji unieważnia wszystkie wpisy (np. po zmianie reguł konwersji typów)
+CACHE_FORMAT_VERSION = 1
+
+# Klucz sesji z decyzją użytkownika o zapisie pamięci podręcznej na dysku (domyślnie wyłączony)
+PERSISTENT_CACHE_KEY = "persistent_cache"
+
+# Wpisy trwałej pamięci podręcznej nieużywane dłużej niż tydzień są usuwane
+PERSISTENT_MAX_AGE = 7 * 24 * 3600
+
+
+class ParseCache:
+    """
+    Kolumnowa (Parquet) pamięć podręczna sparsowanych i skonwertowanych tabel.
+    Klucz wpisu to skrót zawartości pliku źródłowego, opcje odczytu CSV oraz nazwa tabeli.
+    Rozmiar na dysku jest ograniczony - najdawniej używane wpisy są usuwane (LRU), podobnie
+    jak wpisy nieużywane dłużej niż max_age sekund (None - bez limitu wieku).
+    """
+
+    def __init__(self, cache_dir=".cache/parsed", max_bytes=2 * 1024 ** 3, max_age=None):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        os.makedirs(self.cache_dir, exist_ok=True)
+        if self.max_age is not None:
+            self.evict()
+
+    # --- Klucze ---
+
+    def _hash_index_path(self):
+        return os.path.join(self.cache_dir, "file_hashes.json")
+
+    def file_hash(self, path, block_size=1 << 20):
+        """
+        Skrót SHA-256 zawartości pliku. Wynik jest zapamiętywany dla (ścieżka, rozmiar, mtime),
+        więc niezmieniony plik nie jest ponownie czytany.
+        """
+        stat = os.stat(path)
+        stamp = [stat.st_size, stat.st_mtime_ns]
+        index_path = self._hash_index_path()
+        try:
+            with open(index_path, encoding="utf-8") as f:
+                index = json.load(f)
+        except (OSError, ValueError):
+            index = {}
+
+        abs_path = os.path.abspath(path)
+        entry = index.get(abs_path)
+        if entry and entry["stamp"] == stamp:
+            return entry["sha256"]
+
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(block_size), b""):
+                digest.update(block)
+        index[abs_path] = {"stamp": stamp, "sha256": digest.hexdigest()}
+
+        tmp_path = f"{index_path}.{uuid.uuid4().hex}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(index, f)
+        os.replace(tmp_path, index_path)
+        return digest.hexdigest()
+
+    def make_key(self, csv_path, table_name, read_options):
+        """
+        Buduje klucz wpisu na podstawie zawartości pliku, opcji formularza CSV i nazwy tabeli.
+        """
+        payload = json.dumps({
+            "version": CACHE_FORMAT_VERSION,
+            "file": self.file_hash(csv_path),
+            "table": table_name,
+            "options": read_options,
+        }, sort_keys=True)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    # --- Odczyt i zapis ---
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.parquet")
+
+    def _touch(self, path):
+        now = time.time()
+        os.utime(path, (now, now))
+
+    def contains(self, key):
+        return os.path.exists(self._path(key))
+
+    def get(self, key):
+        """
+        Zwraca DataFrame z pamięci podręcznej lub None, jeśli wpisu nie ma.
+        """
+        path = self._path(key)
+        try:
+            df = pd.read_parquet(path)
+        except FileNotFoundError:
+            return None
+        self._touch(path)
+        return df
+
+    def iter_batches(self, key, batch_size):
+        """
+        Odczytuje wpis porcjami po `batch_size` wierszy (stałe zużycie pamięci).
+        Wpis bez wierszy daje jedną pustą porcję z kolumnami pliku.
+        """
+        path = self._path(key)
+        parquet_file = pq.ParquetFile(path)
+        self._touch(path)
+        empty = True
+        for batch in parquet_file.iter_batches(batch_size=batch_size):
+            empty = False
+            yield batch.to_pandas()
+        if empty:
+            yield parquet_file.schema_arrow.empty_table().to_pandas()
+
+    def put(self, key, df):
+        with self.writer(key) as writer:
+            writer.write(df)
+
+    def writer(self, key):
+        """
+        Zwraca obiekt zapisujący wpis porcjami; wpis staje się widoczny dopiero po
+        poprawnym zamknięciu (przy błędzie plik tymczasowy jest usuwany).
+        """
+        return _ChunkWriter(self, key)
+
+    # --- Zarządzanie ---
+
+    def entries(self):
+        """
+        Zwraca listę wpisów: klucz, rozmiar w bajtach, liczbę wierszy i czas ostatniego użycia.
+        """
+        rows = []
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith(".parquet"):
+                continue
+            path = os.path.join(self.cache_dir, name)
+            try:
+                stat = os.stat(path)
+                num_rows = pq.ParquetFile(path).metadata.num_rows
+            except (OSError, pa.ArrowException):
+                continue
+            rows.append({
+                "key": name[:-len(".parquet")],
+                "bytes": stat.st_size,
+                "rows": num_rows,
+                "last_used": pd.Timestamp(stat.st_mtime, unit="s"),
+            })
+        return pd.DataFrame(rows, columns=["key", "bytes", "rows", "last_used"])
+
+    def total_bytes(self):
+        entries = self.entries()
+        return int(entries["bytes"].sum()) if not entries.empty else 0
+
+    def evict(self):
+        """
+        Usuwa wpisy starsze niż max_age oraz najdawniej używane, dopóki łączny rozmiar
+        przekracza max_bytes.
+        """
+        entries = self.entries().sort_values("last_used")
+        total = int(entries["bytes"].sum())
+        expired_before = (pd.Timestamp(time.time() - self.max_age, unit="s") if self.max_age is not None
+                          else None)
+        for _, entry in entries.iterrows():
+            if total <= self.max_bytes and (expired_before is None or entry["last_used"] >= expired_before):
+                break
+            try:
+                os.remove(self._path(entry["key"]))
+            except FileNotFoundError:
+                pass
+            total -= entry["bytes"]
+
+    def clear(self):
+        for name in os.listdir(self.cache_dir):
+            if name.endswith(".parquet") or name.endswith(".tmp") or name == "file_hashes.json":
+                try:
+                    os.remove(os.path.join(self.cache_dir, name))
+                except FileNotFoundError:
+                    pass
+
+
+@functools.lru_cache(maxsize=None)
+def shared_parse_cache() -> ParseCache:
+    """
+    Trwała pamięć podręczna (.cache/parsed) wspólna dla sesji, które włączyły zapis na dysku.
+    """
+    return ParseCache(".cache/parsed", max_age=PERSISTENT_MAX_AGE)
+
+
+def temporary_parse_cache() -> ParseCache:
+    """
+    Pamięć podręczna w katalogu tymczasowym usuwanym razem z obiektem (koniec sesji)
+    lub najpóźniej przy zakończeniu procesu.
+    """
+    cache = ParseCache(tempfile.mkdtemp(prefix="parsed_"))
+    weakref.finalize(cache, shutil.rmtree, cache.cache_dir, True)
+    return cache
+
+
+def session_parse_cache(session_state) -> ParseCache:
+    """
+    Pamięć podręczna sparsowanych plików dla sesji: domyślnie tymczasowa, tylko dla tej sesji;
+    po włączeniu trwałej pamięci podręcznej (PERSISTENT_CACHE_KEY) - wspólna, na dysku.
+    """
+    if session_state.get(PERSISTENT_CACHE_KEY):
+        return shared_parse_cache()
+    cache = session_state.get("parse_cache")
+    if cache is None:
+        cache = temporary_parse_cache()
+        session_state["parse_cache"] = cache
+    return cache
+
+
+class _ChunkWriter:
+    def __init__(self, cache, key):
+        self.cache = cache
+        self.key = key
+        self.tmp_path = f"{cache._path(key)}.{uuid.uuid4().hex}.tmp"
+        self._writer = None
+        self._schema = None
+
+    def write(self, df):
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        if self._writer is None:
+            # Kolumny bez żadnej wartości w pierwszej porcji zapisujemy jako tekst
+            self._schema = pa.schema([
+                field.with_type(pa.string()) if pa.types.is_null(field.type) else field
+                for field in table.schema
+            ])
+            self._writer = pq.ParquetWriter(self.tmp_path, self._schema)
+        self._writer.write_table(table.cast(self._schema))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if self._writer is not None:
+            self._writer.close()
+        if exc_type is None and self._writer is not None:
+            os.replace(self.tmp_path, self.cache._path(self.key))
+            self.cache.evict()
+        elif os.path.exists(self.tmp_path):
+            os.remove(self.tmp_path)
+        return False
@@ -0,0 +1,219 @@
+# classes/pii_scan.py
+"""
+Wykrywanie danych osobowych i wrażliwych: reguły po nazwach kolumn oraz zawartość kolumn
+tekstowych - e-mail, telefon, adres IP, PESEL, NIP, IBAN (numery z sumą kontrolną są weryfikowane).
+
+Wszystkie wzorce połączone są w jedno skompilowane wyrażenie (grupy nazwane), uruchamiane
+tylko na unikalnych wartościach próby kolumny. Próba przeglądana jest porcjami; kolumna
+kończy skanowanie wcześniej, gdy przedział ufności udziału dopasowań każdego typu leży
+w całości powyżej lub poniżej progu min_rate. Kolumny skanowane są równolegle.
+"""
+
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+from scipy.stats import norm
+
+# Typy danych osobowych (grupy wyrażenia) i ich nazwy w raporcie
+PII_TYPES = {
+    "email": "E-mail",
+    "iban": "IBAN",
+    "ip": "Adres IP",
+    "pesel": "PESEL",
+    "nip": "NIP",
+    "phone": "Telefon",
+}
+
+# Kolejność alternatyw ma znaczenie: dłuższe i bardziej specyficzne wzorce przed krótszymi ciągami cyfr
+_PATTERNS = {
+    "email": r"(?i:[a-z0-9._%+-]+@[a-z0-9-]+(?:\.[a-z0-9-]+)*\.[a-z]{2,})",
+    # IBAN z kodem kraju lub polski NRB (26 cyfr), także w grupach po 4 znaki
+    "iban": r"(?<!\w)(?:[A-Z]{2}\d{2}(?: ?[A-Z0-9]{4}){3,7}(?: ?[A-Z0-9]{1,3})?|\d{2}(?: ?\d{4}){6})(?!\w)",
+    "ip": r"(?<![\w.:])(?:(?:(?:25[0-5]|2[0-4]\d|1?\d?\d)\.){3}(?:25[0-5]|2[0-4]\d|1?\d?\d)"
+          r"|(?i:(?:[0-9a-f]{1,4}:){7}[0-9a-f]{1,4}))(?![\w.:])",
+    "pesel": r"(?<!\w)\d{11}(?!\w)",
+    "nip": r"(?<![\w-])(?:PL ?)?(?:\d{3}-\d{3}-\d{2}-\d{2}|\d{3}-\d{2}-\d{2}-\d{3}|\d{10})(?![\w-])",
+    "phone": r"(?<![\w+])(?:(?:\+|00)\d{1,3}[ -]?)?"
+             r"(?:[1-9]\d{2}[ -]?\d{3}[ -]?\d{3}|\(?[1-9]\d\)?[ -]\d{3}[ -]\d{2}[ -]\d{2})(?!\w)",
+}
+PII_PATTERN = re.compile("|".join(f"(?P<{kind}>{pattern})" for kind, pattern in _PATTERNS.items()))
+
+# Reguły po nazwach kolumn (podciągi nazwy pisanej małymi literami)
+SENSITIVE_KEYWORDS = ['health', 'gender', 'religion', 'ethnicity', 'politics', 'income', 'disability', 'sexual']
+PERSONAL_KEYWORDS = ['name', 'firstname', 'lastname', 'email', 'phone', 'address', 'dob', 'pesel', 'nip', 'user', 'ip']
+
+# Kolumny, które mają słowo 'name', ale nie są osobowe
+NAME_EXCEPTIONS = ['productname', 'paymentmethodname', 'deliverymethodname',
+                   'channelname', 'productsubcategoryname', 'productcategoryname']
+
+DEFAULT_SAMPLE_ROWS = 20_000
+DEFAULT_BATCH_ROWS = 1_000
+# Kolumna jest uznawana za zawierającą dany typ, gdy pasuje co najmniej taki udział wartości
+DEFAULT_MIN_RATE = 0.01
+
+_PESEL_WEIGHTS = np.array([1, 3, 7, 9, 1, 3, 7, 9, 1, 3])
+_NIP_WEIGHTS = np.array([6, 5, 7, 2, 3, 4, 5, 6, 7])
+
+
+# Słowa nazwy kolumny: granice camelCase, cyfry i separatory (np. "ClientIP" -> client, ip)
+_NAME_TOKEN_RE = re.compile(r"[A-Z]+(?![a-z])|[A-Z]?[a-z]+|\d+")
+
+
+def name_tokens(column):
+    """
+    Słowa nazwy kolumny pisane małymi literami. Nazwy bez granic słów (np. SHIPDATEKEY) dają
+    jedno słowo - całą nazwę.
+    """
+    return [token.lower() for token in _NAME_TOKEN_RE.findall(str(column))]
+
+
+def _matches(col, keywords, by_tokens):
+    if by_tokens:
+        return any(token in keywords for token in name_tokens(col))
+    col_lower = col.lower()
+    return any(kw in col_lower for kw in keywords)
+
+
+def classify_column_names(columns, by_tokens: bool = False):
+    """
+    Klasyfikacja kolumn po nazwach (z pominięciem wyjątków). Zwraca (osobowe, wrażliwe).
+    Domyślnie słowa kluczowe dopasowywane są jako fragmenty nazwy (kolumny spłaszczonej tabeli);
+    by_tokens=True wymaga całego słowa nazwy - dla dowolnych tabel, w których fragmenty
+    dają fałszywe trafienia (np. "ip" w SHIPDATEKEY, "name" w MONTHNAME).
+    """
+    personal, sensitive = [], []
+    for col in columns:
+        if col.lower() in NAME_EXCEPTIONS:
+            continue  # pomijamy mylące nazwy
+        if _matches(col, SENSITIVE_KEYWORDS, by_tokens):
+            sensitive.append(col)
+        if _matches(col, PERSONAL_KEYWORDS, by_tokens):
+            personal.append(col)
+    return personal, sensitive
+
+
+def privacy_risk_level(columns, personal, sensitive, by_tokens: bool = False):
+    """
+    Poziom ryzyka prywatności zbioru kolumn na podstawie wykrytych danych osobowych i wrażliwych.
+    by_tokens jak w classify_column_names (dla słowa "id" kolumn pseudonimizowanych).
+    """
+    if sensitive or personal:
+        return "🚨 Wysokie - dane wrażliwe lub identyfikujące"
+    if any(_matches(col, ["id"], by_tokens) for col in columns if col.lower() not in NAME_EXCEPTIONS):
+        return "⚠️ Średnie - dane pseudonimizowane"
+    return "✅ Niskie - brak danych osobowych/wrażliwych"
+
+
+def _digit_matrix(found: pd.Series, length: int):
+    digits = found.str.replace(r"\D", "", regex=True)
+    # Dopasowania mają stałą liczbę cyfr - jedna tablica (dopasowania × cyfry) zamiast pętli
+    return np.frombuffer("".join(digits).encode("ascii"), dtype=np.uint8).reshape(-1, length).astype(np.int64) - 48
+
+
+def _valid_pesel(found: pd.Series):
+    d = _digit_matrix(found, 11)
+    check = (10 - (d[:, :10] @ _PESEL_WEIGHTS) % 10) % 10
+    # Miesiąc koduje też stulecie (+20, +40, ...); dzień 01-31
+    month, day = (d[:, 2] * 10 + d[:, 3]) % 20, d[:, 4] * 10 + d[:, 5]
+    return (check == d[:, 10]) & (month >= 1) & (month <= 12) & (day >= 1) & (day <= 31)
+
+
+def _valid_nip(found: pd.Series):
+    d = _digit_matrix(found.str.replace(r"^PL ?", "", regex=True), 10)
+    return (d[:, :9] @ _NIP_WEIGHTS) % 11 == d[:, 9]
+
+
+def _valid_iban(found: pd.Series):
+    def check(value):
+        value = value.replace(" ", "").upper()
+        if value.isdigit():
+            value = "PL" + value
+        rearranged = value[4:] + value[:4]
+        return int("".join(str(int(ch, 36)) for ch in rearranged)) % 97 == 1
+    return found.map(check).to_numpy(dtype=bool)
+
+
+_VALIDATORS = {"pesel": _valid_pesel, "nip": _valid_nip, "iban": _valid_iban}
+
+
+def scan_values(values: pd.Series):
+    """
+    Dopasowuje wyrażenie do każdej wartości (zwykle unikalnej) i zwraca maski bitowe typów
+    (bit i = i-ty typ z PII_TYPES). Numery z sumą kontrolną liczą się tylko, gdy jest poprawna.
+    """
+    values = pd.Series(values, dtype=object).reset_index(drop=True).astype(str)
+    masks = np.zeros(len(values), dtype=np.int64)
+    if not len(values):
+        return masks
+    matches = values.str.extractall(PII_PATTERN)
+    for bit, kind in enumerate(PII_TYPES):
+        found = matches[kind].dropna()
+        if kind in _VALIDATORS and len(found):
+            found = found[_VALIDATORS[kind](found)]
+        if len(found):
+            np.bitwise_or.at(masks, found.index.get_level_values(0).to_numpy(dtype=np.int64), 1 << bit)
+    return masks
+
+
+def _wilson(k, n, z):
+    p = k / n
+    denom = 1 + z * z / n
+    centre = (p + z * z / (2 * n)) / denom
+    half = z * np.sqrt(p * (1 - p) / n + z * z / (4 * n * n)) / denom
+    return centre - half, centre + half
+
+
+def scan_column(values: pd.Series, min_rate: float = DEFAULT_MIN_RATE, batch_rows: int = DEFAULT_BATCH_ROWS,
+                confidence: float = 0.95):
+    """
+    Skanuje próbę wartości kolumny (w losowej kolejności) porcjami po batch_rows wierszy.
+    Wyrażenie uruchamiane jest raz na unikalną wartość (wyniki zapamiętywane między porcjami).
+    Zwraca: liczba przeskanowanych wierszy i unikalnych wartości, udział dopasowań każdego typu
+    oraz informację, czy skanowanie zakończono przed końcem próby.
+    """
+    values = values.dropna()
+    z = norm.ppf(0.5 + confidence / 2)
+    seen = {}
+    matched = np.zeros(len(PII_TYPES))
+    bits = 1 << np.arange(len(PII_TYPES))
+    scanned = 0
+    for start in range(0, len(values), batch_rows):
+        counts = values.iloc[start:start + batch_rows].astype(str).value_counts(sort=False)
+        new = [v for v in counts.index if v not in seen]
+        seen.update(zip(new, scan_values(pd.Series(new, dtype=object))))
+        masks = np.fromiter((seen[v] for v in counts.index), dtype=np.int64, count=len(counts))
+        matched += ((masks[:, None] & bits) != 0).T @ counts.to_numpy()
+        scanned += int(counts.sum())
+        low, high = _wilson(matched, scanned, z)
+        if np.all((low > min_rate) | (high < min_rate)):
+            break
+    rates = matched / scanned if scanned else np.zeros(len(PII_TYPES))
+    return {
+        "Przeskanowane wiersze": scanned,
+        "Unikalne wartości": len(seen),
+        "Zakończono wcześnie": scanned < len(values),
+        **{f"Udział {label}": round(float(rate), 4) for label, rate in zip(PII_TYPES.values(), rates)},
+    }
+
+
+def scan_columns(samples: dict, min_rate: float = DEFAULT_MIN_RATE, batch_rows: int = DEFAULT_BATCH_ROWS,
+                 confidence: float = 0.95, max_workers=None):
+    """
+    Skanuje próby wielu kolumn ({kolumna: Series}) równolegle. Zwraca listę wierszy raportu,
+    po jednym na kolumnę, z wykrytymi typami (udział dopasowań >= min_rate).
+    """
+    def scan(item):
+        column, values = item
+        result = scan_column(values, min_rate, batch_rows, confidence)
+        found = [label for label in PII_TYPES.values() if result[f"Udział {label}"] >= min_rate]
+        return {"Kolumna": column, "Wykryte typy": found, **result}
+
+    items = list(samples.items())
+    workers = max_workers or min(len(items), os.cpu_count() or 1)
+    if len(items) > 1 and workers > 1:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            return list(executor.map(scan, items))
+    return [scan(item) for item in items]
@@ -0,0 +1,519 @@
+# classes/result_cache.py
+
+import datetime
+import functools
+import hashlib
+import io
+import json
+import os
+import pickle
+import struct
+import threading
+import time
+import uuid
+import weakref
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from classes.data_loader import get_load_meta
+from classes.flat_table import FLAT_TABLE, flat_state
+from classes.instrumentation import span
+from classes.parse_cache import PERSISTENT_CACHE_KEY, PERSISTENT_MAX_AGE
+
+# Zmiana wersji unieważnia wszystkie wpisy (np. po zmianie sposobu liczenia wskaźników)
+RESULT_CACHE_VERSION = 5
+
+_ENTRY_SUFFIX = ".rc"
+_ENTRY_MAGIC = b"RC01"
+
+
+def dataset_fingerprint(df: pd.DataFrame) -> str:
+    """
+    Odcisk zbioru danych: kształt, nazwy i typy kolumn oraz suma 64-bitowych skrótów wierszy
+    (jeden zwektoryzowany przebieg). Liczony raz po wczytaniu ramki i przechowywany w sesji.
+    """
+    hashes = pd.util.hash_pandas_object(df, index=False).to_numpy()
+    payload = json.dumps({
+        "shape": list(df.shape),
+        "columns": [str(c) for c in df.columns],
+        "dtypes": [str(t) for t in df.dtypes],
+        "rows": int(hashes.sum(dtype=np.uint64)),
+        "rows_weighted": int((hashes * np.arange(1, len(hashes) + 1, dtype=np.uint64)).sum(dtype=np.uint64)),
+    })
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def db_fingerprint(conn, table: str) -> str:
+    """
+    Odcisk tabeli w bazie: metadane wczytań (wersje, znaczniki czasu) i liczba wierszy.
+    Każde wczytanie lub upsert zmienia wersję w _load_meta, więc nie trzeba czytać danych.
+    Dla zmaterializowanej spłaszczonej tabeli uwzględniany jest też stan jej odświeżenia -
+    wczytanie źródła zmienia jej zawartość dopiero po refresh_flat_table.
+    """
+    quoted = '"' + table.replace('"', '""') + '"'
+    payload = json.dumps({
+        "table": table,
+        "rows": conn.execute(f"SELECT COUNT(*) FROM {quoted}").fetchone()[0],
+        "loads": get_load_meta(conn),
+        "flat_state": flat_state(conn) if table.lower() == FLAT_TABLE.lower() else None,
+    }, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+# --- Zapis wyników bez pickle ---
+#
+# Wpis na dysku to nagłówek JSON (drzewo wartości z oznaczonymi typami) i bloki binarne:
+# ramki i serie jako Parquet, tablice numpy jako surowe bajty. Odczyt nie wykonuje kodu,
+# więc podmieniony plik w katalogu pamięci podręcznej może co najwyżej dać chybienie.
+
+def _encode_frame(df: pd.DataFrame, blobs):
+    frame = df.copy(deep=False)
+    frame.columns = [f"c{i}" for i in range(df.shape[1])]
+    # Kolumny object z wartościami innych typów niż tekst (np. liczby całkowite obok ułamkowych
+    # w describe()) lub z brakami NaN Parquet sprowadziłby do jednego typu (NaN do None) -
+    # zapisywane są wartość po wartości
+    objects = {}
+    for i in range(df.shape[1]):
+        column = frame.iloc[:, i]
+        if column.dtype != object:
+            continue
+        text = pd.api.types.infer_dtype(column, skipna=True) in ("string", "empty")
+        if not text or any(value is not None for value in column[column.isna()]):
+            try:
+                objects[str(i)] = _encode(column.to_numpy(), blobs)
+            except TypeError:
+                continue
+    frame = frame.drop(columns=[f"c{i}" for i in objects])
+    buffer = io.BytesIO()
+    try:
+        pq.write_table(pa.Table.from_pandas(frame, preserve_index=True), buffer)
+    except (pa.ArrowException, ValueError, TypeError) as e:
+        raise TypeError(f"Ramki nie można zapisać w formacie Parquet: {e}") from e
+    columns = df.columns
+    return {
+        "data": _add_blob(blobs, buffer.getvalue()),
+        "columns": _encode(list(columns), blobs),
+        "columns_name": _encode(columns.name if not isinstance(columns, pd.MultiIndex) else list(columns.names), blobs),
+        "multi": isinstance(columns, pd.MultiIndex),
+        "objects": objects,
+    }
+
+
+def _decode_frame(node, blobs):
+    frame = pq.read_table(pa.BufferReader(blobs[node["data"]])).to_pandas()
+    for i, values in sorted(((int(i), values) for i, values in node["objects"].items())):
+        frame.insert(i, f"c{i}", _decode(values, blobs))
+    labels = _decode(node["columns"], blobs)
+    name = _decode(node["columns_name"], blobs)
+    frame.columns = (pd.MultiIndex.from_tuples(labels, names=name) if node["multi"]
+                     else pd.Index(labels, name=name, dtype=object if not labels else None))
+    return frame
+
+
+def _add_blob(blobs, data):
+    blobs.append(bytes(data))
+    return len(blobs) - 1
+
+
+def _encode(value, blobs):
+    """
+    Zamienia wartość na drzewo JSON; nieobsługiwany typ kończy się TypeError.
+    """
+    if value is None or isinstance(value, (bool, str)):
+        return value
+    if isinstance(value, (int, float)) and not isinstance(value, (np.generic, bool)):
+        return value
+    if isinstance(value, dict):
+        if all(isinstance(k, str) for k in value) and "__t" not in value:
+            return {k: _encode(v, blobs) for k, v in value.items()}
+        return {"__t": "dict", "items": [[_encode(k, blobs), _encode(v, blobs)] for k, v in value.items()]}
+    if isinstance(value, list):
+        return [_encode(v, blobs) for v in value]
+    if isinstance(value, (tuple, set, frozenset)):
+        kind = type(value).__name__ if type(value) in (tuple, set, frozenset) else None
+        if kind is None:
+            raise TypeError(f"Nieobsługiwany typ w pamięci podręcznej: {type(value).__name__}")
+        return {"__t": kind, "items": [_encode(v, blobs) for v in value]}
+    if isinstance(value, pd.DataFrame):
+        return {"__t": "frame", **_encode_frame(value, blobs)}
+    if isinstance(value, pd.Series):
+        return {"__t": "series", "name": _encode(value.name, blobs), **_encode_frame(value.to_frame(), blobs)}
+    if isinstance(value, pd.Index) and not isinstance(value, pd.MultiIndex):
+        return {"__t": "index", **_encode_frame(pd.Series(value, name=value.name).to_frame(), blobs)}
+    if isinstance(value, pd.Timestamp):
+        return {"__t": "timestamp", "value": value.isoformat()}
+    if isinstance(value, pd.Timedelta):
+        return {"__t": "timedelta", "value": int(value.value)}
+    if isinstance(value, pd.Interval):
+        return {"__t": "interval", "left": _encode(value.left, blobs), "right": _encode(value.right, blobs),
+                "closed": value.closed}
+    if isinstance(value, (np.ndarray, np.generic)):
+        array = np.asarray(value)
+        if array.dtype.hasobject:
+            return {"__t": "object_array", "shape": list(array.shape), "scalar": isinstance(value, np.generic),
+                    "items": [_encode(v, blobs) for v in array.ravel().tolist()]}
+        if array.dtype.kind not in "biufcmMSU":
+            raise TypeError(f"Nieobsługiwany typ tablicy w pamięci podręcznej: {array.dtype}")
+        return {"__t": "array", "dtype": array.dtype.str, "shape": list(array.shape),
+                "scalar": isinstance(value, np.generic),
+                "data": _add_blob(blobs, np.ascontiguousarray(array).tobytes())}
+    if isinstance(value, datetime.datetime):
+        return {"__t": "datetime", "value": value.isoformat()}
+    if isinstance(value, datetime.date):
+        return {"__t": "date", "value": value.isoformat()}
+    if isinstance(value, (bytes, bytearray)):
+        return {"__t": "bytes", "data": _add_blob(blobs, value)}
+    if isinstance(value, io.BytesIO):
+        return {"__t": "bytesio", "data": _add_blob(blobs, value.getvalue())}
+    raise TypeError(f"Nieobsługiwany typ w pamięci podręcznej: {type(value).__name__}")
+
+
+def _decode(node, blobs):
+    if isinstance(node, list):
+        return [_decode(v, blobs) for v in node]
+    if not isinstance(node, dict):
+        return node
+    kind = node.get("__t")
+    if kind is None:
+        return {k: _decode(v, blobs) for k, v in node.items()}
+    if kind == "dict":
+        return {_hashable(_decode(k, blobs)): _decode(v, blobs) for k, v in node["items"]}
+    if kind in ("tuple", "set", "frozenset"):
+        items = [_decode(v, blobs) for v in node["items"]]
+        return {"tuple": tuple, "set": set, "frozenset": frozenset}[kind](
+            items if kind == "tuple" else map(_hashable, items))
+    if kind == "frame":
+        return _decode_frame(node, blobs)
+    if kind == "series":
+        return _decode_frame(node, blobs).iloc[:, 0].rename(_decode(node["name"], blobs))
+    if kind == "index":
+        return pd.Index(_decode_frame(node, blobs).iloc[:, 0])
+    if kind == "timestamp":
+        return pd.Timestamp(node["value"])
+    if kind == "timedelta":
+        return pd.Timedelta(node["value"])
+    if kind == "interval":
+        return pd.Interval(_decode(node["left"], blobs), _decode(node["right"], blobs), closed=node["closed"])
+    if kind == "array":
+        array = np.frombuffer(blobs[node["data"]], dtype=np.dtype(node["dtype"])).reshape(node["shape"]).copy()
+        return array[()] if node["scalar"] else array
+    if kind == "object_array":
+        array = np.empty(len(node["items"]), dtype=object)
+        array[:] = [_decode(v, blobs) for v in node["items"]]
+        array = array.reshape(node["shape"])
+        return array[()] if node["scalar"] else array
+    if kind == "datetime":
+        return datetime.datetime.fromisoformat(node["value"])
+    if kind == "date":
+        return datetime.date.fromisoformat(node["value"])
+    if kind == "bytes":
+        return blobs[node["data"]]
+    if kind == "bytesio":
+        return io.BytesIO(blobs[node["data"]])
+    raise ValueError(f"Nieznany typ we wpisie pamięci podręcznej: {kind}")
+
+
+def _hashable(value):
+    # Klucze słowników i elementy zbiorów zapisane jako listy (np. krotki w kluczach) wracają jako krotki
+    return tuple(_hashable(v) for v in value) if isinstance(value, list) else value
+
+
+def encode_result(value) -> bytes:
+    """
+    Serializuje wynik analizy do bajtów bez pickle; TypeError, gdy typ nie jest obsługiwany.
+    """
+    blobs = []
+    header = json.dumps({"value": _encode(value, blobs), "blobs": [len(b) for b in blobs]}).encode("utf-8")
+    return b"".join([_ENTRY_MAGIC, struct.pack("<Q", len(header)), header, *blobs])
+
+
+def decode_result(blob: bytes):
+    if blob[:len(_ENTRY_MAGIC)] != _ENTRY_MAGIC:
+        raise ValueError("Nieprawidłowy wpis pamięci podręcznej.")
+    offset = len(_ENTRY_MAGIC) + 8
+    (header_len,) = struct.unpack("<Q", blob[len(_ENTRY_MAGIC):offset])
+    header = json.loads(blob[offset:offset + header_len].decode("utf-8"))
+    offset += header_len
+    blobs = []
+    for size in header["blobs"]:
+        blobs.append(blob[offset:offset + size])
+        offset += size
+    return _decode(header["value"], blobs)
+
+
+class ResultCache:
+    """
+    Dwupoziomowa pamięć podręczna wyników analiz: w pamięci procesu i - opcjonalnie, gdy podano
+    cache_dir - na dysku (przetrwa restart aplikacji). Klucz to odcisk zbioru danych, klasa i metoda
+    analizatora oraz argumenty wywołania. Oba poziomy mają limit rozmiaru w bajtach
+    i usuwają najdawniej używane wpisy (LRU). Wyniki przechowywane są w postaci zserializowanej
+    (encode_result: JSON i Parquet, bez pickle), więc każde trafienie zwraca nową kopię (np. bufor
+    obrazka czytany od początku). Wartości, których nie da się tak zapisać, trafiają tylko do pamięci.
+    """
+
+    def __init__(self, cache_dir=None, max_bytes=512 * 1024 ** 2, memory_max_bytes=128 * 1024 ** 2,
+                 max_age=None):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.memory_max_bytes = memory_max_bytes
+        self.hits_memory = 0
+        self.hits_disk = 0
+        self.misses = 0
+        self._memory = OrderedDict()
+        self._memory_bytes = 0
+        self._lock = threading.Lock()
+        if self.cache_dir is not None:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            self._remove_files((".pkl",))  # wpisy starszych wersji (pickle) nie są nigdy wczytywane
+            self.evict()
+
+    # --- Klucze ---
+
+    @staticmethod
+    def make_key(fingerprint, name, *args, **kwargs):
+        payload = json.dumps({
+            "version": RESULT_CACHE_VERSION,
+            "fingerprint": fingerprint,
+            "name": name,
+            "args": args,
+            "kwargs": kwargs,
+        }, sort_keys=True, default=repr)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    # --- Odczyt i zapis ---
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, f"{key}{_ENTRY_SUFFIX}")
+
+    def _remember(self, key, entry):
+        """
+        entry to (zserializowany wynik, czy zapisany przez encode_result).
+        """
+        with self._lock:
+            if key in self._memory:
+                self._memory_bytes -= len(self._memory.pop(key)[0])
+            if len(entry[0]) > self.memory_max_bytes:
+                return
+            self._memory[key] = entry
+            self._memory_bytes += len(entry[0])
+            while self._memory_bytes > self.memory_max_bytes:
+                _, evicted = self._memory.popitem(last=False)
+                self._memory_bytes -= len(evicted[0])
+
+    def get(self, key, default=None):
+        """
+        Zwraca wynik z pamięci, a w drugiej kolejności z dysku; default, jeśli wpisu nie ma.
+        """
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                self._memory.move_to_end(key)
+                self.hits_memory += 1
+        if entry is not None:
+            blob, encoded = entry
+            # pickle wyłącznie dla bajtów wytworzonych w tym procesie (nigdy z dysku)
+            return decode_result(blob) if encoded else pickle.loads(blob)
+
+        if self.cache_dir is None:
+            with self._lock:
+                self.misses += 1
+            return default
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                blob = f.read()
+            value = decode_result(blob)
+        except FileNotFoundError:
+            with self._lock:
+                self.misses += 1
+            return default
+        except (OSError, ValueError, KeyError, IndexError, TypeError, struct.error, pa.ArrowException):
+            # Uszkodzony lub niezgodny wpis traktujemy jak brak
+            with self._lock:
+                self.misses += 1
+            return default
+        now = time.time()
+        os.utime(path, (now, now))
+        self._remember(key, (blob, True))
+        with self._lock:
+            self.hits_disk += 1
+        return value
+
+    def put(self, key, value):
+        try:
+            blob = encode_result(value)
+        except TypeError:
+            self._remember(key, (pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL), False))
+            return
+        self._remember(key, (blob, True))
+        if self.cache_dir is None:
+            return
+        tmp_path = f"{self._path(key)}.{uuid.uuid4().hex}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(blob)
+        os.replace(tmp_path, self._path(key))
+        self.evict()
+
+    def get_or_compute(self, key, compute):
+        missing = object()
+        value = self.get(key, missing)
+        if value is missing:
+            value = compute()
+            self.put(key, value)
+        return value
+
+    # --- Zarządzanie ---
+
+    def entries(self):
+        """
+        Zwraca listę wpisów na dysku: klucz, rozmiar w bajtach, czas ostatniego użycia.
+        """
+        rows = []
+        for name in os.listdir(self.cache_dir) if self.cache_dir is not None else []:
+            if not name.endswith(_ENTRY_SUFFIX):
+                continue
+            try:
+                stat = os.stat(os.path.join(self.cache_dir, name))
+            except OSError:
+                continue
+            rows.append({"key": name[:-len(_ENTRY_SUFFIX)], "bytes": stat.st_size,
+                         "last_used": pd.Timestamp(stat.st_mtime, unit="s")})
+        return pd.DataFrame(rows, columns=["key", "bytes", "last_used"])
+
+    def evict(self):
+        """
+        Usuwa z dysku wpisy starsze niż max_age oraz najdawniej używane, dopóki łączny rozmiar
+        przekracza max_bytes.
+        """
+        entries = self.entries().sort_values("last_used")
+        total = int(entries["bytes"].sum())
+        expired_before = (pd.Timestamp(time.time() - self.max_age, unit="s") if self.max_age is not None
+                          else None)
+        for _, entry in entries.iterrows():
+            if total <= self.max_bytes and (expired_before is None or entry["last_used"] >= expired_before):
+                break
+            try:
+                os.remove(self._path(entry["key"]))
+            except FileNotFoundError:
+                pass
+            total -= entry["bytes"]
+
+    def stats(self):
+        entries = self.entries()
+        with self._lock:
+            requests = self.hits_memory + self.hits_disk + self.misses
+            return {
+                "hits_memory": self.hits_memory,
+                "hits_disk": self.hits_disk,
+                "misses": self.misses,
+                "hit_rate_%": (self.hits_memory + self.hits_disk) / requests * 100 if requests else 0.0,
+                "memory_entries": len(self._memory),
+                "memory_bytes": self._memory_bytes,
+                "disk_entries": len(entries),
+                "disk_bytes": int(entries["bytes"].sum()) if not entries.empty else 0,
+            }
+
+    def _remove_files(self, suffixes):
+        for name in os.listdir(self.cache_dir):
+            if name.endswith(suffixes):
+                try:
+                    os.remove(os.path.join(self.cache_dir, name))
+                except FileNotFoundError:
+                    pass
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            self._memory_bytes = 0
+        if self.cache_dir is not None:
+            self._remove_files((_ENTRY_SUFFIX, ".tmp", ".pkl"))
+
+
+@functools.lru_cache(maxsize=None)
+def shared_result_cache() -> ResultCache:
+    """
+    Jedna instancja na proces z zapisem na dysku (.cache/results) - wspólna dla wszystkich sesji,
+    które włączyły trwałą pamięć podręczną.
+    """
+    return ResultCache(".cache/results", max_age=PERSISTENT_MAX_AGE)
+
+
+def session_result_cache(session_state) -> ResultCache:
+    """
+    Pamięć podręczna wyników dla sesji. Domyślnie tylko w pamięci i tylko dla tej sesji - znika
+    razem z sesją; po włączeniu trwałej pamięci podręcznej (PERSISTENT_CACHE_KEY) - wspólna,
+    zapisywana na dysku.
+    """
+    if session_state.get(PERSISTENT_CACHE_KEY):
+        return shared_result_cache()
+    cache = session_state.get("result_cache")
+    if cache is None:
+        cache = ResultCache()
+        session_state["result_cache"] = cache
+    return cache
+
+
+class CachedAnalyzer:
+    """
+    Pośrednik wywołujący metody analizatora przez ResultCache. Klucz to odcisk danych, klasa
+    analizatora, nazwa metody, argumenty oraz wartości atrybutów z key_attrs (np. target_column).
+    Atrybuty zapisane przez metodę (np. class_labels) oraz wpisy dodane do słownika memo
+    analizatora (wyniki pośrednie) są odtwarzane przy trafieniu.
+    """
+
+    def __init__(self, analyzer, cache: ResultCache, fingerprint: str, key_attrs=()):
+        self._analyzer = analyzer
+        self._cache = cache
+        self._fingerprint = fingerprint
+        self._key_attrs = tuple(key_attrs)
+
+    def __getattr__(self, name):
+        attr = getattr(self._analyzer, name)
+        if not callable(attr) or name.startswith("_"):
+            return attr
+
+        @functools.wraps(attr)
+        def cached(*args, **kwargs):
+            state = {a: getattr(self._analyzer, a, None) for a in self._key_attrs}
+            key = self._cache.make_key(self._fingerprint, f"{type(self._analyzer).__name__}.{name}",
+                                       state, *args, **kwargs)
+
+            computed = []
+
+            def compute():
+                computed.append(True)
+                before = dict(vars(self._analyzer))
+                memo_before = set(getattr(self._analyzer, "memo", ()))
+                result = attr(*args, **kwargs)
+                changed = {k: v for k, v in vars(self._analyzer).items()
+                           if k not in before or before[k] is not v}
+                memo = {k: v for k, v in getattr(self._analyzer, "memo", {}).items() if k not in memo_before}
+                return result, changed, memo
+
+            with span(f"pamięć podręczna: {type(self._analyzer).__name__}.{name}", "pamięć podręczna") as s:
+                result, changed, memo = self._cache.get_or_compute(key, compute)
+                s.set(hit=not computed)
+            for k, v in changed.items():
+                setattr(self._analyzer, k, v)
+            if memo and not computed:
+                self._analyzer.memo.update(memo)
+            return result
+        return cached
+
+
+def session_fingerprint(session_state, df: pd.DataFrame) -> str:
+    """
+    Odcisk ramki z sesji liczony raz na obiekt DataFrame (zapamiętany w session_state).
+    Ramka rozpoznawana jest przez słabą referencję, a nie id(df) - identyfikator zwolnionego
+    obiektu może zostać ponownie użyty przez nową ramkę.
+    """
+    stored = session_state.get("df_fingerprint")
+    if stored is None or stored[0]() is not df:
+        stored = (weakref.ref(df), dataset_fingerprint(df))
+        session_state["df_fingerprint"] = stored
+    return stored[1]
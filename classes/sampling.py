@@ -0,0 +1,367 @@
+# classes/sampling.py
+
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+from scipy.stats import norm
+
+from classes.flat_table import FLAT_TABLE
+from classes.instrumentation import traced
+from classes.sql_pushdown import SQLDataQualityAnalyzer
+
+# Wątek obliczeń dokładnych ("Oblicz dokładnie") sesji - poza wątkiem strony
+EXACT_EXECUTOR_KEY = "exact_executor"
+
+CI_COLUMNS = ["Estymacja", "Dolna granica", "Górna granica"]
+
+
+def _quote(name):
+    return '"' + str(name).replace('"', '""') + '"'
+
+
+def _stratum_key(value):
+    return "∅" if value is None or (isinstance(value, float) and np.isnan(value)) else str(value)
+
+
+def _table_columns(conn, table):
+    columns = [row[1] for row in conn.execute(f"PRAGMA table_info({_quote(table)})") if not row[1].startswith('_')]
+    if not columns:
+        raise ValueError(f"Tabela '{table}' nie istnieje w bazie lub nie ma kolumn.")
+    return columns
+
+
+# --- Pobieranie próby ---
+
+def _allocate(population, n, min_per_stratum=30):
+    """
+    Alokacja proporcjonalna liczności próby do warstw, z minimum min_per_stratum na warstwę
+    (ograniczonym liczebnością warstwy).
+    """
+    total = sum(population.values())
+    allocation = {}
+    for key, size in population.items():
+        share = int(round(n * size / total)) if total else 0
+        allocation[key] = min(size, max(share, min(min_per_stratum, size)))
+    return allocation
+
+
+@traced(category="próbkowanie", shape=lambda result, *args, **kwargs: result[0].shape)
+def sample_flat_table(conn, table: str = FLAT_TABLE, n: int = 50_000, method: str = "reservoir", strata: str = None):
+    """
+    Próba losowa pobierana w SQLite (do Pythona trafia tylko próba):
+    - reservoir   - prosta próba losowa bez zwracania (ORDER BY random() LIMIT n;
+                    SQLite utrzymuje przy tym tylko n najlepszych wierszy),
+    - stratified  - próba warstwowa z alokacją proporcjonalną wg kolumny strata
+                    (ROW_NUMBER() OVER (PARTITION BY ...) w jednym przebiegu).
+    Zwraca (próba, liczebności warstw w populacji {warstwa: N_h}).
+    """
+    columns = _table_columns(conn, table)
+    select = ", ".join(_quote(c) for c in columns)
+    if method == "reservoir":
+        population = {"∅": conn.execute(f"SELECT COUNT(*) FROM {_quote(table)}").fetchone()[0]}
+        sample = pd.read_sql(f"SELECT {select} FROM {_quote(table)} ORDER BY random() LIMIT ?", conn, params=(int(n),))
+        return sample, population
+    if method != "stratified":
+        raise ValueError("Nieznana metoda próbkowania (dozwolone: 'reservoir', 'stratified').")
+    if strata not in columns:
+        raise ValueError(f"Kolumna warstw '{strata}' nie istnieje w tabeli '{table}'.")
+
+    s = _quote(strata)
+    counts = conn.execute(f"SELECT {s}, COUNT(*) FROM {_quote(table)} GROUP BY {s}").fetchall()
+    population = {_stratum_key(value): size for value, size in counts}
+    allocation = _allocate(population, n)
+    # Limit warstwy dołączany jest przez CASE - warstwy to zwykle kilka-kilkadziesiąt wartości
+    cases = " ".join(f"WHEN {s} IS ? THEN ?" for _ in counts)
+    params = [p for value, _ in counts for p in (value, allocation[_stratum_key(value)])]
+    sample = pd.read_sql(
+        f"SELECT {select} FROM (SELECT {select}, "
+        f"ROW_NUMBER() OVER (PARTITION BY {s} ORDER BY random()) AS _rn, "
+        f"CASE {cases} ELSE 0 END AS _limit FROM {_quote(table)}) WHERE _rn <= _limit",
+        conn, params=params
+    )
+    return sample, population
+
+
+@traced(category="próbkowanie", shape=lambda result, *args, **kwargs: result[0].shape)
+def sample_frame(df: pd.DataFrame, n: int = 50_000, method: str = "reservoir", strata: str = None, seed=None):
+    """
+    Odpowiednik sample_flat_table dla ramki w pamięci.
+    """
+    if method == "reservoir":
+        return df.sample(n=min(n, len(df)), random_state=seed), {"∅": len(df)}
+    if method != "stratified":
+        raise ValueError("Nieznana metoda próbkowania (dozwolone: 'reservoir', 'stratified').")
+    if strata not in df.columns:
+        raise ValueError(f"Kolumna warstw '{strata}' nie istnieje w danych.")
+    keys = df[strata].map(_stratum_key)
+    population = keys.value_counts().to_dict()
+    allocation = _allocate(population, n)
+    parts = [df[keys == key].sample(n=size, random_state=seed) for key, size in allocation.items() if size]
+    return pd.concat(parts), population
+
+
+# --- Estymacja z przedziałami ufności ---
+
+class SampleEstimator:
+    """
+    Estymatory KPI z próby (prostej lub warstwowej) z przedziałami ufności.
+    Każdy wskaźnik to iloraz sum ważonych R = Σ w·y / Σ w·x (udział, średnia w grupie), a jego
+    wariancja liczona jest linearyzacją z poprawką na skończoną populację w każdej warstwie.
+    Dla próby równej populacji (N_h = n_h) przedziały mają zerową szerokość - estymator
+    zwraca wtedy wartości dokładne.
+    """
+
+    def __init__(self, sample: pd.DataFrame, population: dict, strata: str = None, confidence: float = 0.95):
+        self.sample = sample.reset_index(drop=True)
+        self.strata = strata
+        self.z = norm.ppf(0.5 + confidence / 2)
+        keys = self.sample[strata].map(_stratum_key) if strata else pd.Series("∅", index=self.sample.index)
+        codes, uniques = pd.factorize(keys)
+        self.codes = codes
+        self.n_h = np.bincount(codes, minlength=len(uniques)).astype(float)
+        self.N_h = np.array([population.get(key, 0) for key in uniques], dtype=float)
+        self.weights = (self.N_h / np.maximum(self.n_h, 1))[codes]
+        self.population_rows = int(sum(population.values()))
+
+    def _ratio(self, y, x):
+        """
+        (estymacja, błąd standardowy) ilorazu Σ w·y / Σ w·x.
+        """
+        y = np.nan_to_num(np.asarray(y, dtype=float))
+        x = np.asarray(x, dtype=float)
+        X = np.sum(self.weights * x)
+        if X == 0:
+            return np.nan, np.nan
+        R = np.sum(self.weights * y) / X
+        u = (y - R * x) / X
+        sums = np.bincount(self.codes, weights=u, minlength=len(self.n_h))
+        squares = np.bincount(self.codes, weights=u ** 2, minlength=len(self.n_h))
+        with np.errstate(invalid="ignore", divide="ignore"):
+            s2 = np.where(self.n_h > 1, (squares - sums ** 2 / self.n_h) / (self.n_h - 1), 0.0)
+            fpc = np.clip(1 - self.n_h / np.maximum(self.N_h, 1), 0, 1)
+            variance = np.sum(self.N_h ** 2 * fpc * s2 / np.maximum(self.n_h, 1))
+        return R, np.sqrt(max(variance, 0.0))
+
+    def _interval(self, estimate, se, scale=1.0, bounds=None):
+        low, high = estimate - self.z * se, estimate + self.z * se
+        if bounds is not None:
+            low, high = max(low, bounds[0]), min(high, bounds[1])
+        return [estimate * scale, low * scale, high * scale]
+
+    def _frame(self, rows):
+        return pd.DataFrame.from_dict(rows, orient="index", columns=CI_COLUMNS)
+
+    def _weighted_quantile(self, values, weights, qs):
+        order = np.argsort(values)
+        cumulative = np.cumsum(weights[order])
+        positions = np.searchsorted(cumulative, np.asarray(qs) * cumulative[-1])
+        return values[order][np.minimum(positions, len(values) - 1)]
+
+    def missing_values(self):
+        """
+        Procent braków: dla całej tabeli i dla każdej kolumny.
+        """
+        nulls = self.sample.isnull()
+        ones = np.ones(len(self.sample))
+        rows = {"Cała tabela": self._interval(*self._ratio(nulls.sum(axis=1), ones * nulls.shape[1]), 100, (0, 1))}
+        for col in self.sample.columns:
+            rows[col] = self._interval(*self._ratio(nulls[col], ones), 100, (0, 1))
+        return self._frame(rows)
+
+    def outliers(self):
+        """
+        Procent obserwacji odstających (reguła 1.5 IQR; kwartyle ważone z próby).
+        Przedział uwzględnia losowość udziału przy ustalonych progach, ale nie niepewność
+        samych progów IQR wyznaczonych z próby - bywa więc nieco zbyt wąski.
+        """
+        numeric = self.sample.select_dtypes(include=np.number)
+        flags, valid, rows = {}, {}, {}
+        for col in numeric.columns:
+            values = numeric[col].to_numpy(dtype=float)
+            present = ~np.isnan(values)
+            if not present.any():
+                continue
+            q1, q3 = self._weighted_quantile(values[present], self.weights[present], [0.25, 0.75])
+            iqr = q3 - q1
+            flags[col] = present & ((values < q1 - 1.5 * iqr) | (values > q3 + 1.5 * iqr))
+            valid[col] = present
+            rows[col] = self._interval(*self._ratio(flags[col], present), 100, (0, 1))
+        if flags:
+            total = self._ratio(np.sum(list(flags.values()), axis=0), np.sum(list(valid.values()), axis=0))
+            rows = {"Cała tabela": self._interval(*total, 100, (0, 1)), **rows}
+        return self._frame(rows)
+
+    def group_means(self, group_col, target):
+        """
+        Średnia zmiennej target w grupach group_col.
+        """
+        values = pd.to_numeric(self.sample[target], errors="coerce").to_numpy(dtype=float)
+        present = ~np.isnan(values)
+        groups = self.sample[group_col]
+        rows = {}
+        for group in groups.dropna().unique():
+            member = (groups == group).to_numpy() & present
+            rows[group] = self._interval(*self._ratio(np.where(member, values, 0.0), member))
+        return self._frame(rows).sort_index()
+
+    def class_balance(self, column):
+        """
+        Udział klas kolumny (bez braków), jak value_counts(normalize=True).
+        """
+        values = self.sample[column]
+        present = values.notna().to_numpy()
+        rows = {}
+        for value in values.dropna().unique():
+            rows[value] = self._interval(*self._ratio((values == value).to_numpy(), present), 1, (0, 1))
+        return self._frame(rows).sort_values("Estymacja", ascending=False)
+
+    def effective_size(self, mask):
+        """
+        Efektywna liczebność próby Kisha (Σw)² / Σw² - dla prób ważonych.
+        """
+        w = self.weights[mask]
+        return (w.sum() ** 2) / (w ** 2).sum() if len(w) else 0.0
+
+    def correlations(self, min_abs=0.0):
+        """
+        Współczynniki korelacji Pearsona (ważone) par zmiennych liczbowych z przedziałem
+        ufności Fishera (z = atanh r, błąd 1 / sqrt(n_eff - 3)).
+        """
+        numeric = self.sample.select_dtypes(include=np.number)
+        columns = list(numeric.columns)
+        rows = {}
+        for i in range(len(columns)):
+            for j in range(i):
+                a = numeric[columns[i]].to_numpy(dtype=float)
+                b = numeric[columns[j]].to_numpy(dtype=float)
+                mask = ~np.isnan(a) & ~np.isnan(b)
+                w = self.weights[mask]
+                if mask.sum() < 4:
+                    continue
+                a, b = a[mask], b[mask]
+                da, db = a - np.average(a, weights=w), b - np.average(b, weights=w)
+                denominator = np.sqrt(np.sum(w * da ** 2) * np.sum(w * db ** 2))
+                if denominator == 0:
+                    continue
+                r = float(np.sum(w * da * db) / denominator)
+                if abs(r) < min_abs:
+                    continue
+                n_eff = self.effective_size(mask)
+                if n_eff <= 3 or self.population_rows == len(self.sample):
+                    low, high = r, r
+                else:
+                    z, se = np.arctanh(np.clip(r, -0.999999, 0.999999)), 1 / np.sqrt(n_eff - 3)
+                    low, high = np.tanh(z - self.z * se), np.tanh(z + self.z * se)
+                rows[f"{columns[i]} ~ {columns[j]}"] = [r, low, high]
+        return self._frame(rows)
+
+    def report(self, group_col=None, target=None, class_col=None):
+        report = {
+            "missing_values": self.missing_values(),
+            "outliers": self.outliers(),
+            "correlations": self.correlations(),
+        }
+        if group_col and target:
+            report["group_means"] = self.group_means(group_col, target)
+        if class_col:
+            report["class_balance"] = self.class_balance(class_col)
+        return report
+
+
+# --- Wartości dokładne (w tle) ---
+
+def _exact_sql(conn, table, group_col=None, target=None, class_col=None):
+    """
+    Wskaźniki dokładne policzone zapytaniami w SQLite (bez ładowania tabeli do pamięci).
+    """
+    analyzer = SQLDataQualityAnalyzer(conn, table)
+    t = _quote(table)
+
+    missing = analyzer.missing_values()
+    report = {"missing_values": pd.concat([
+        pd.Series({"Cała tabela": missing["percent_missing_total"]}), missing["missing_per_column_%"]
+    ])}
+
+    outliers = analyzer.outliers()
+    per_column = {col: v["Procent obserwacji odstających"] for col, v in outliers["outliers_per_column"].items()}
+    report["outliers"] = pd.Series({"Cała tabela": outliers["percent_outliers_total"], **per_column}) \
+        if per_column else pd.Series(dtype=float)
+
+    # Korelacje: średnie kolumn, a potem sumy iloczynów odchyleń dla par (dwa przebiegi)
+    columns = list(analyzer._numeric_columns())
+    pairs = [(columns[i], columns[j]) for i in range(len(columns)) for j in range(i)]
+    correlations = {}
+    if pairs:
+        means = conn.execute(f"SELECT {', '.join(f'AVG({_quote(c)})' for c in columns)} FROM {t}").fetchone()
+        center = dict(zip(columns, [m or 0.0 for m in means]))
+        parts = []
+        for a, b in pairs:
+            both = f"{_quote(a)} IS NOT NULL AND {_quote(b)} IS NOT NULL"
+            da, db = f"({_quote(a)} - {center[a]!r})", f"({_quote(b)} - {center[b]!r})"
+            parts += [f"SUM(CASE WHEN {both} THEN 1 ELSE 0 END)",
+                      f"SUM(CASE WHEN {both} THEN {da} END)", f"SUM(CASE WHEN {both} THEN {db} END)",
+                      f"SUM(CASE WHEN {both} THEN {da} * {da} END)", f"SUM(CASE WHEN {both} THEN {db} * {db} END)",
+                      f"SUM(CASE WHEN {both} THEN {da} * {db} END)"]
+        sums = conn.execute(f"SELECT {', '.join(parts)} FROM {t}").fetchone()
+        for k, (a, b) in enumerate(pairs):
+            n, sa, sb, saa, sbb, sab = [v or 0.0 for v in sums[6 * k:6 * k + 6]]
+            if n < 4:
+                continue
+            var_a, var_b = saa - sa * sa / n, sbb - sb * sb / n
+            if var_a > 0 and var_b > 0:
+                correlations[f"{a} ~ {b}"] = (sab - sa * sb / n) / np.sqrt(var_a * var_b)
+    report["correlations"] = pd.Series(correlations, dtype=float)
+
+    if group_col and target:
+        g, y = _quote(group_col), _quote(target)
+        rows = conn.execute(f"SELECT {g}, AVG({y}) FROM {t} WHERE {g} IS NOT NULL AND {y} IS NOT NULL "
+                            f"GROUP BY {g} ORDER BY {g}").fetchall()
+        report["group_means"] = pd.Series(dict(rows), dtype=float)
+    if class_col:
+        c = _quote(class_col)
+        rows = conn.execute(f"SELECT {c}, COUNT(*) * 1.0 / SUM(COUNT(*)) OVER () AS share FROM {t} "
+                            f"WHERE {c} IS NOT NULL GROUP BY {c} ORDER BY share DESC").fetchall()
+        report["class_balance"] = pd.Series(dict(rows), dtype=float)
+    return report
+
+
+def exact_report(source, group_col=None, target=None, class_col=None):
+    """
+    Te same wskaźniki co SampleEstimator.report() policzone na pełnych danych.
+    source to DataFrame (estymator na „próbie" równej populacji - przedziały się zerują)
+    albo (ścieżka bazy, tabela) - wtedy liczone są zapytaniami w SQLite.
+    """
+    if isinstance(source, pd.DataFrame):
+        estimator = SampleEstimator(source, {"∅": len(source)})
+        return {name: frame["Estymacja"] for name, frame in
+                estimator.report(group_col=group_col, target=target, class_col=class_col).items()}
+    db_path, table = source
+    # Osobne połączenie - obliczenie działa w wątku roboczym
+    conn = sqlite3.connect(db_path)
+    try:
+        return _exact_sql(conn, table, group_col=group_col, target=target, class_col=class_col)
+    finally:
+        conn.close()
+
+
+def session_executor(session_state):
+    """
+    Jednowątkowa pula obliczeń dokładnych sesji, tworzona przy pierwszym użyciu. Obliczenia jednej
+    sesji wykonywane są po kolei i nie zajmują wątków innych sesji; po usunięciu stanu sesji
+    pula jest zwalniana, a jej bezczynny wątek kończy pracę.
+    """
+    executor = session_state.get(EXACT_EXECUTOR_KEY)
+    if executor is None:
+        executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="exact_kpi")
+        session_state[EXACT_EXECUTOR_KEY] = executor
+    return executor
+
+
+def submit_exact(session_state, source, group_col=None, target=None, class_col=None):
+    """
+    Uruchamia exact_report w tle (w puli sesji); zwraca Future sprawdzane przy kolejnych
+    przebiegach strony.
+    """
+    return session_executor(session_state).submit(exact_report, source, group_col, target, class_col)
@@ -0,0 +1,411 @@
+# classes/sql_pushdown.py
+
+import math
+
+import numpy as np
+import pandas as pd
+
+from classes.ai_compliance import AIComplianceAnalyzer
+from classes.bias_cube import BiasCube
+from classes.catalog_scan import sample_table
+from classes.data_quality import DataQualityAnalyzer
+from classes.flat_table import FLAT_TABLE
+from classes.instrumentation import instrument
+from classes.pii_scan import DEFAULT_SAMPLE_ROWS
+
+
+def _quote(name):
+    return '"' + str(name).replace('"', '""') + '"'
+
+
+# Typ wartości SQLite (typeof) -> typ kolumny pandas
+_STORAGE_DTYPES = {'integer': 'Int64', 'real': 'float64'}
+
+
+def _declared_dtype(declared):
+    """
+    Typ pandas wynikający z koligacji (affinity) zadeklarowanego typu kolumny SQLite
+    (reguły z dokumentacji SQLite); None, gdy koligacja nie wyznacza typu (NUMERIC, BLOB, brak typu).
+    """
+    declared = declared.upper()
+    if "INT" in declared:
+        return 'Int64'
+    if any(text in declared for text in ("CHAR", "CLOB", "TEXT")):
+        return 'object'
+    if any(real in declared for real in ("REAL", "FLOA", "DOUB")):
+        return 'float64'
+    return None
+
+
+def _schema_frame(conn, table, sample_rows):
+    """
+    Niewielka próbka tabeli (podgląd) z typami kolumn ustalonymi na podstawie schematu
+    (PRAGMA table_info), a nie wartości z próbki. Kolumny bez typu (np. wyliczane w CREATE TABLE ... AS)
+    otrzymują typ pierwszej niepustej wartości. Kolumny techniczne (z prefiksem '_') są pomijane.
+    """
+    declared = {row[1]: row[2] for row in conn.execute(f"PRAGMA table_info({_quote(table)})")
+                if not row[1].startswith('_')}
+    if not declared:
+        raise ValueError(f"Tabela '{table}' nie istnieje w bazie lub nie ma kolumn.")
+    select = ", ".join(_quote(c) for c in declared)
+    df = pd.read_sql(f"SELECT {select} FROM {_quote(table)} LIMIT {int(sample_rows)}", conn)
+
+    for col, declared_type in declared.items():
+        dtype = _declared_dtype(declared_type)
+        if dtype is None:
+            storage = conn.execute(
+                f"SELECT typeof({_quote(col)}) FROM {_quote(table)} WHERE {_quote(col)} IS NOT NULL LIMIT 1"
+            ).fetchone()
+            dtype = _STORAGE_DTYPES.get(storage[0], 'object') if storage else 'object'
+        try:
+            df[col] = df[col].astype(dtype)
+        except (TypeError, ValueError):
+            # Wartość niezgodna z deklarowanym typem (SQLite tego nie wymusza) - typ z próbki
+            pass
+    return df
+
+
+@instrument("jakość danych")
+class SQLDataQualityAnalyzer(DataQualityAnalyzer):
+    """
+    Wariant DataQualityAnalyzer, który kompiluje agregacje do SQL i wykonuje je w SQLite.
+    Do Pythona trafiają tylko małe wyniki, więc rozmiar tabeli nie jest ograniczony pamięcią RAM.
+    self.df zawiera jedynie próbkę (schemat kolumn i typy), a nie pełne dane.
+    """
+
+    def __init__(self, conn, table: str = FLAT_TABLE, expected_types: dict = None, sample_rows: int = 1000):
+        super().__init__(_schema_frame(conn, table, sample_rows), expected_types)
+        self.conn = conn
+        self.table = table
+
+    def _span_shape(self):
+        # self.df to próbka - liczba wierszy tabeli nie jest liczona tylko na potrzeby pomiaru
+        return None, len(self.df.columns)
+
+    # --- Pomocnicze zapytania ---
+
+    def _scalar(self, query, params=()):
+        return self.conn.execute(query, params).fetchone()[0]
+
+    def _row_count(self):
+        return self._scalar(f"SELECT COUNT(*) FROM {_quote(self.table)}")
+
+    def _numeric_columns(self, include=np.number):
+        return self.df.select_dtypes(include=include).columns
+
+    def _count(self, col):
+        return self._scalar(f"SELECT COUNT({_quote(col)}) FROM {_quote(self.table)}")
+
+    def _quantiles(self, col, qs, n=None):
+        """
+        Kwantyle z interpolacją liniową (jak pandas.Series.quantile) - jedno sortowanie kolumny
+        (ROW_NUMBER() OVER), z którego odczytywane są sąsiednie wartości dla wszystkich kwantyli.
+        """
+        n = self._count(col) if n is None else n
+        if n == 0:
+            return [None] * len(qs)
+        positions = [(n - 1) * q for q in qs]
+        ranks = sorted({r for p in positions for r in (math.floor(p), min(math.floor(p) + 1, n - 1))})
+        values = dict(self.conn.execute(
+            f"SELECT rn, v FROM (SELECT {_quote(col)} AS v, ROW_NUMBER() OVER (ORDER BY {_quote(col)}) - 1 AS rn "
+            f"FROM {_quote(self.table)} WHERE {_quote(col)} IS NOT NULL) "
+            f"WHERE rn IN ({', '.join('?' for _ in ranks)})", ranks
+        ).fetchall())
+        result = []
+        for position in positions:
+            lower = math.floor(position)
+            low, high = values[lower], values[min(lower + 1, n - 1)]
+            result.append(float(low + (position - lower) * (high - low)) if position != lower else float(low))
+        return result
+
+    def _quantile(self, col, q, n=None):
+        return self._quantiles(col, [q], n)[0]
+
+    def _moments(self, col):
+        """
+        Zwraca (n, średnia, suma kwadratów odchyleń, suma sześcianów odchyleń, min, max).
+        Momenty centralne liczone są w drugim przebiegu, co zapewnia stabilność numeryczną.
+        """
+        c = _quote(col)
+        n, mean, vmin, vmax = self.conn.execute(
+            f"SELECT COUNT({c}), AVG({c}), MIN({c}), MAX({c}) FROM {_quote(self.table)}"
+        ).fetchone()
+        if not n:
+            return 0, None, None, None, None, None
+        m2, m3 = self.conn.execute(
+            f"SELECT SUM(({c} - ?) * ({c} - ?)), SUM(({c} - ?) * ({c} - ?) * ({c} - ?)) "
+            f"FROM {_quote(self.table)} WHERE {c} IS NOT NULL", (mean,) * 5
+        ).fetchone()
+        return n, mean, m2, m3, vmin, vmax
+
+    # --- KPI ---
+
+    def column_report(self, fused=False):
+        # Zintegrowane jądro działa na DataFrame w pamięci - tu każda metoda to zapytanie SQL
+        return super().column_report(fused=False)
+
+    def generate_report(self, fused=False, with_type_conformance=True):
+        return super().generate_report(fused=False, with_type_conformance=with_type_conformance)
+
+    def missing_values(self):
+        columns = list(self.df.columns)
+        counts = self.conn.execute(
+            f"SELECT COUNT(*), {', '.join(f'COUNT({_quote(c)})' for c in columns)} FROM {_quote(self.table)}"
+        ).fetchone()
+        n_rows, non_null = counts[0], np.array(counts[1:], dtype=float)
+        missing = n_rows - non_null
+        missing_per_col = pd.Series(missing / n_rows * 100 if n_rows else np.full(len(columns), np.nan),
+                                    index=columns)
+        total_values = n_rows * len(columns)
+        percent_missing_total = (missing.sum() / total_values) * 100 if total_values else np.nan
+        return {
+            'missing_per_column_%': missing_per_col,
+            'percent_missing_total': percent_missing_total
+        }
+
+    def duplicate_rows(self, subset=None, mode='exact', max_examples=5):
+        # GROUP BY traktuje NULL jako równe sobie - tak jak DataFrame.duplicated();
+        # w SQLite liczenie jest zawsze dokładne, więc mode nie zmienia wyniku
+        columns = list(self.df.columns) if subset is None else list(subset)
+        missing = [c for c in columns if c not in self.df.columns]
+        if missing:
+            raise ValueError(f"Brak kolumn w danych: {missing}")
+        group_by = ", ".join(_quote(c) for c in columns)
+        num_duplicates, duplicate_groups = self.conn.execute(
+            f"SELECT IFNULL(SUM(cnt - 1), 0), COUNT(*) FROM "
+            f"(SELECT COUNT(*) AS cnt FROM {_quote(self.table)} GROUP BY {group_by} HAVING COUNT(*) > 1)"
+        ).fetchone()
+        n_rows = self._row_count()
+        percent_duplicates = (num_duplicates / n_rows) * 100 if n_rows > 0 else 0
+
+        # Przykłady wszystkich grup jednym zapytaniem (jeden przebieg tabeli zamiast jednego na grupę):
+        # ramki grup łączone przez pd.concat różniły się typami kolumn z samymi NULL-ami
+        keys = ", ".join(f"{_quote(c)} AS k{i}" for i, c in enumerate(columns))
+        match = " AND ".join(f"t.{_quote(c)} IS g.k{i}" for i, c in enumerate(columns))
+        select = ", ".join(f"t.{_quote(c)}" for c in self.df.columns)
+        examples = pd.read_sql(
+            f"SELECT Grupa, {', '.join(_quote(c) for c in self.df.columns)} FROM ("
+            f"SELECT g.Grupa, {select}, t.rowid AS _rowid, "
+            f"ROW_NUMBER() OVER (PARTITION BY g.Grupa ORDER BY t.rowid) AS _nr "
+            f"FROM {_quote(self.table)} t JOIN ("
+            f"SELECT {keys}, ROW_NUMBER() OVER (ORDER BY MIN(rowid)) AS Grupa FROM {_quote(self.table)} "
+            f"GROUP BY {group_by} HAVING COUNT(*) > 1 ORDER BY MIN(rowid) LIMIT ?) g ON {match}"
+            f") WHERE _nr <= 5 ORDER BY Grupa, _rowid",
+            self.conn, params=(max_examples,))
+
+        return {
+            'num_duplicates': num_duplicates,
+            'percent_duplicates': percent_duplicates,
+            'duplicate_groups': duplicate_groups,
+            'examples': examples if len(examples) else pd.DataFrame()
+        }
+
+    def outliers(self, method='iqr', zscore_threshold=3):
+        outlier_summary = {}
+        total_outliers = 0
+        total_values = 0
+
+        for col in self._numeric_columns():
+            c = _quote(col)
+            n = self._count(col)
+            if n == 0:
+                continue
+
+            if method == 'iqr':
+                q1, q3 = self._quantiles(col, [0.25, 0.75], n)
+                iqr = q3 - q1
+                params = (q1 - 1.5 * iqr, q3 + 1.5 * iqr)
+                condition = f"{c} < ? OR {c} > ?"
+            elif method == 'zscore':
+                _, mean, m2, _, _, _ = self._moments(col)
+                std = math.sqrt(m2 / n)
+                if std == 0:
+                    num_outliers = 0
+                    condition = None
+                else:
+                    params = (mean, zscore_threshold * std)
+                    condition = f"ABS({c} - ?) > ?"
+            else:
+                raise ValueError("Invalid method for outlier detection")
+
+            if condition is not None:
+                num_outliers = self._scalar(
+                    f"SELECT COUNT(*) FROM {_quote(self.table)} WHERE {condition}", params
+                )
+            outlier_summary[col] = {
+                'Liczba obserwacji odstających': num_outliers,
+                'Procent obserwacji odstających': (num_outliers / n) * 100
+            }
+            total_outliers += num_outliers
+            total_values += n
+
+        percent_total_outliers = (total_outliers / total_values) * 100 if total_values > 0 else 0
+
+        return {
+            'outliers_per_column': outlier_summary,
+            'percent_outliers_total': percent_total_outliers
+        }
+
+    def distributions(self, bins=20):
+        """
+        Histogramy zmiennych ciągłych liczone w SQLite (GROUP BY numeru przedziału).
+        Przedziały jak w np.histogram: równe, a ostatni domknięty z prawej strony.
+        """
+        distributions = {}
+        for col in self._numeric_columns(include=[np.floating]):
+            c = _quote(col)
+            n, mean, m2, m3, vmin, vmax = self._moments(col)
+            if not n:
+                distributions[col] = {
+                    'counts': [0] * bins, 'bin_edges': np.linspace(0, 1, bins + 1).tolist(),
+                    'min': None, 'max': None, 'mean': None, 'median': None, 'skewness': np.nan
+                }
+                continue
+
+            low, high = (vmin - 0.5, vmax + 0.5) if vmin == vmax else (vmin, vmax)
+            bin_edges = np.linspace(low, high, bins + 1)
+            width = (high - low) / bins
+            counts = np.zeros(bins, dtype=int)
+            for bucket, count in self.conn.execute(
+                f"SELECT MIN(CAST(({c} - ?) / ? AS INTEGER), ?) AS bucket, COUNT(*) "
+                f"FROM {_quote(self.table)} WHERE {c} IS NOT NULL GROUP BY bucket", (low, width, bins - 1)
+            ):
+                counts[int(bucket)] += count
+
+            variance = m2 / n
+            distributions[col] = {
+                'counts': counts.tolist(),
+                'bin_edges': bin_edges.tolist(),
+                'min': float(vmin),
+                'max': float(vmax),
+                'mean': float(mean),
+                'median': self._quantile(col, 0.5, n),
+                'skewness': (m3 / n) / variance ** 1.5 if variance > 0 else np.nan
+            }
+        return distributions
+
+    def basic_stats(self):
+        """
+        Statystyki opisowe w układzie DataFrame.describe(include='all'), liczone w SQLite.
+        """
+        numeric = set(self._numeric_columns())
+        stats = {}
+        for col in self.df.columns:
+            c = _quote(col)
+            if col in numeric:
+                n, mean, m2, _, vmin, vmax = self._moments(col)
+                q1, median, q3 = self._quantiles(col, [0.25, 0.5, 0.75], n)
+                stats[col] = {
+                    'count': float(n),
+                    'mean': mean,
+                    'std': math.sqrt(m2 / (n - 1)) if n and n > 1 else np.nan,
+                    'min': vmin,
+                    '25%': q1,
+                    '50%': median,
+                    '75%': q3,
+                    'max': vmax,
+                }
+            else:
+                n, unique = self.conn.execute(
+                    f"SELECT COUNT({c}), COUNT(DISTINCT {c}) FROM {_quote(self.table)}"
+                ).fetchone()
+                top = self.conn.execute(
+                    f"SELECT {c}, COUNT(*) AS freq FROM {_quote(self.table)} WHERE {c} IS NOT NULL "
+                    f"GROUP BY {c} ORDER BY freq DESC LIMIT 1"
+                ).fetchone()
+                stats[col] = {
+                    'count': float(n),
+                    'unique': unique,
+                    'top': top[0] if top else np.nan,
+                    'freq': top[1] if top else np.nan,
+                }
+
+        order = ['count', 'unique', 'top', 'freq', 'mean', 'std', 'min', '25%', '50%', '75%', 'max']
+        desc = pd.DataFrame.from_dict(stats, orient='index')
+        desc = desc[[c for c in order if c in desc.columns]]
+        desc.insert(0, "typ", self.df.dtypes.astype(str))
+        return desc
+
+
+@instrument("zgodność z AI Act")
+class SQLAIComplianceAnalyzer(AIComplianceAnalyzer):
+    """
+    Wariant AIComplianceAnalyzer, w którym analiza biasu (udziały kategorii i średnie
+    w grupach) wykonywana jest jednym zapytaniem GROUP BY w SQLite na grupę.
+    Kolumny grupujące liczone są po kolei - połączenie SQLite nie jest współdzielone między wątkami.
+    self.df zawiera jedynie próbkę (schemat kolumn i typy), a nie pełne dane.
+    """
+
+    parallel_groups = False
+
+    def __init__(self, conn, table: str = FLAT_TABLE, sample_rows: int = 1000, memo: dict = None):
+        super().__init__(_schema_frame(conn, table, sample_rows), memo)
+        self.conn = conn
+        self.table = table
+
+    def _span_shape(self):
+        return None, len(self.df.columns)
+
+    def group_statistics(self, group_col, target_cols):
+        targets = [t for t in dict.fromkeys(target_cols) if t in self.df.columns]
+        g = _quote(group_col)
+        # Wariancja w drugim przebiegu z odchyleń od średniej grupy (jak w _moments): sumy
+        # kwadratów odejmowane od siebie tracą precyzję, a dla kolumn INTEGER SQLite dzieli całkowicie
+        means = "".join(f", AVG({t}) AS m{i}" for i, t in enumerate(map(_quote, targets)))
+        aggregates = "".join(
+            f", MAX(M.m{i}), COUNT(T.{t}), TOTAL((T.{t} - M.m{i}) * (T.{t} - M.m{i})) / NULLIF(COUNT(T.{t}) - 1, 0)"
+            for i, t in enumerate(map(_quote, targets))
+        )
+        rows = self.conn.execute(
+            f"WITH M AS (SELECT {g} AS g{means} FROM {_quote(self.table)} WHERE {g} IS NOT NULL GROUP BY {g}) "
+            f"SELECT M.g, COUNT(*){aggregates} FROM {_quote(self.table)} T JOIN M ON T.{g} = M.g "
+            f"GROUP BY M.g ORDER BY M.g"
+        ).fetchall()
+        index = pd.Index([row[0] for row in rows], name=group_col)
+        sizes = pd.Series([row[1] for row in rows], index=index, name="count")
+        columns = pd.MultiIndex.from_product([targets, ["mean", "count", "var"]]) if targets else None
+        stats = pd.DataFrame([row[2:] for row in rows], index=index, columns=columns, dtype=float)
+        # Liczności jak w groupby().count()
+        return sizes, stats.astype({(t, "count"): np.int64 for t in targets})
+
+    def rank_statistics(self, group_col, target_cols):
+        targets = [t for t in dict.fromkeys(target_cols) if t in self.df.columns]
+        g = _quote(group_col)
+        rank_sums, ties = {}, {}
+        for target in targets:
+            t = _quote(target)
+            where = f"WHERE {g} IS NOT NULL AND {t} IS NOT NULL"
+            # Ranga średnia remisu: RANK() + (liczba remisów - 1) / 2
+            rows = self.conn.execute(
+                f"SELECT {g}, TOTAL(rk) FROM (SELECT {g}, RANK() OVER (ORDER BY {t}) "
+                f"+ (COUNT(*) OVER (PARTITION BY {t}) - 1) / 2.0 AS rk FROM {_quote(self.table)} {where}) "
+                f"GROUP BY {g} ORDER BY {g}"
+            ).fetchall()
+            rank_sums[target] = pd.Series({row[0]: row[1] for row in rows}, dtype=float)
+            ties[target] = self.conn.execute(
+                f"SELECT TOTAL(c * c * c - c) FROM (SELECT COUNT(*) * 1.0 AS c FROM {_quote(self.table)} "
+                f"{where} GROUP BY {t})"
+            ).fetchone()[0]
+        frame = pd.DataFrame(rank_sums, columns=targets)
+        frame.index.name = group_col
+        return frame, pd.Series(ties, dtype=float)
+
+    def pii_samples(self, columns, sample_rows: int = DEFAULT_SAMPLE_ROWS):
+        # Losowe zakresy rowid jak w skanie katalogu - bez sortowania całej tabeli po random()
+        rows = self.conn.execute(f"SELECT COUNT(*) FROM {_quote(self.table)}").fetchone()[0]
+        sample = sample_table(self.conn, self.table, columns, rows, sample_rows, seed=0)
+        return {c: sample[c] for c in columns}
+
+    def bias_cube(self, group_cols, target_cols):
+        targets = [t for t in dict.fromkeys(target_cols) if t in self.df.columns]
+        keys = ", ".join(map(_quote, group_cols))
+        not_null = " AND ".join(f"{_quote(c)} IS NOT NULL" for c in group_cols)
+        # TOTAL zamiast SUM: 0.0 zamiast NULL dla komórek bez wartości zmiennej
+        aggregates = "".join(f", COUNT({t}), TOTAL({t}), TOTAL({t} * {t})" for t in map(_quote, targets))
+        rows = self.conn.execute(
+            f"SELECT {keys}, COUNT(*){aggregates} FROM {_quote(self.table)} WHERE {not_null} GROUP BY {keys}"
+        ).fetchall()
+        k = len(group_cols)
+        cells = pd.DataFrame([row[:k] for row in rows], columns=group_cols)
+        values = np.array([row[k:] for row in rows], dtype=np.float64).reshape(len(rows), 1 + 3 * len(targets))
+        return BiasCube.from_aggregates(cells, values[:, 0], targets, values[:, 1::3], values[:, 2::3], values[:, 3::3])
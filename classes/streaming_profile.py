@@ -0,0 +1,451 @@
+# classes/streaming_profile.py
+
+import numpy as np
+import pandas as pd
+
+from classes.data_loader import iter_converted_chunks, read_options_for
+from classes.data_quality import DataQualityAnalyzer
+from classes.duplicates import DuplicateDetector, ExampleRows, example_rows
+from classes.flat_table import FLAT_TABLE
+from classes.instrumentation import instrument
+
+
+def _quote(name):
+    return '"' + str(name).replace('"', '""') + '"'
+
+
+# --- Źródła porcji danych (funkcje bezargumentowe, każde wywołanie to nowy przebieg) ---
+
+def sql_chunks(conn, table: str = FLAT_TABLE, chunksize: int = 100_000):
+    """
+    Porcje tabeli SQLite odczytywane kursorem (bez kolumn technicznych z prefiksem '_').
+    """
+    columns = [row[1] for row in conn.execute(f"PRAGMA table_info({_quote(table)})") if not row[1].startswith('_')]
+    if not columns:
+        raise ValueError(f"Tabela '{table}' nie istnieje w bazie lub nie ma kolumn.")
+    query = f"SELECT {', '.join(_quote(c) for c in columns)} FROM {_quote(table)}"
+
+    def chunks():
+        return pd.read_sql(query, conn, chunksize=chunksize)
+    return chunks
+
+
+def csv_chunks(csv_path, table_name=None, sep=";", decimal=",", encoding="utf-8", header=0, chunksize: int = 100_000):
+    """
+    Porcje pliku CSV; dla znanych tabel (table_name) z konwersją typów jak przy wczytywaniu do bazy.
+    """
+    def chunks():
+        if table_name is not None:
+            return iter_converted_chunks(csv_path, table_name, read_options_for(sep, decimal, encoding, header),
+                                         chunksize=chunksize)
+        return pd.read_csv(csv_path, sep=sep, decimal=decimal, encoding=encoding, header=header,
+                           chunksize=chunksize)
+    return chunks
+
+
+# --- Szkice łączliwe (mergeable) ---
+
+class KLLSketch:
+    """
+    Szkic kwantyli KLL (Karnin, Lang, Liberty). Pamięć O(k log(n/k)), niezależna od liczby wierszy.
+    Błąd rangi zwracanego kwantyla wynosi z dużym prawdopodobieństwem ok. 1.7 / k
+    (dla k=400: ok. 0.4% liczby obserwacji). Szkice z różnych porcji lub procesów można łączyć (merge).
+    """
+
+    def __init__(self, k: int = 400, seed=None):
+        self.k = k
+        self.n = 0
+        self.levels = [np.empty(0)]
+        self._rng = np.random.default_rng(seed)
+
+    def _capacity(self, level):
+        depth = len(self.levels) - level - 1
+        return max(2, int(np.ceil(self.k * (2 / 3) ** depth)))
+
+    def _compress(self):
+        level = 0
+        while level < len(self.levels):
+            items = self.levels[level]
+            if len(items) > self._capacity(level):
+                if level + 1 == len(self.levels):
+                    self.levels.append(np.empty(0))
+                items = np.sort(items)
+                # Przy nieparzystej liczbie elementów największy zostaje na bieżącym poziomie
+                keep = items[len(items) - len(items) % 2:]
+                paired = items[:len(items) - len(keep)]
+                promoted = paired[self._rng.integers(2)::2]
+                self.levels[level + 1] = np.concatenate([self.levels[level + 1], promoted])
+                self.levels[level] = keep
+            level += 1
+
+    def update(self, values):
+        values = np.asarray(values, dtype=np.float64)
+        values = values[~np.isnan(values)]
+        if len(values) == 0:
+            return
+        self.n += len(values)
+        self.levels[0] = np.concatenate([self.levels[0], values])
+        self._compress()
+
+    def merge(self, other: "KLLSketch"):
+        while len(self.levels) < len(other.levels):
+            self.levels.append(np.empty(0))
+        for level, items in enumerate(other.levels):
+            self.levels[level] = np.concatenate([self.levels[level], items])
+        self.n += other.n
+        self.k = min(self.k, other.k)
+        self._compress()
+        return self
+
+    def quantiles(self, qs):
+        """
+        Przybliżone kwantyle (pozycja jak w pandas: q * (n - 1)); None dla pustego szkicu.
+        """
+        if self.n == 0:
+            return [None for _ in qs]
+        items = np.concatenate(self.levels)
+        weights = np.concatenate([np.full(len(items_), 2 ** level, dtype=np.int64)
+                                  for level, items_ in enumerate(self.levels)])
+        order = np.argsort(items, kind="stable")
+        items, cumulative = items[order], np.cumsum(weights[order])
+        positions = np.searchsorted(cumulative, np.asarray(qs) * (self.n - 1), side="right")
+        return [float(items[min(p, len(items) - 1)]) for p in positions]
+
+
+class StreamingProfile:
+    """
+    Łączliwy stan częściowy profilu (pierwszy przebieg): liczba wierszy i braków dla wszystkich
+    kolumn, a dla kolumn liczbowych momenty (Welford/Pébay: n, średnia, M2, M3), min/max i szkic KLL.
+    Dla kolumn tekstowych liczności wartości - do limitu max_distinct unikalnych wartości.
+    Stany z różnych porcji lub procesów łączy się metodą merge().
+    """
+
+    def __init__(self, columns, numeric_columns, k: int = 400, max_distinct: int = 100_000, seed=0):
+        self.columns = list(columns)
+        self.numeric_columns = list(numeric_columns)
+        self.text_columns = [c for c in self.columns if c not in set(self.numeric_columns)]
+        self.max_distinct = max_distinct
+        self.rows = 0
+        self.nulls = np.zeros(len(self.columns), dtype=np.int64)
+        m = len(self.numeric_columns)
+        self.n = np.zeros(m, dtype=np.int64)
+        self.mean = np.zeros(m)
+        self.m2 = np.zeros(m)
+        self.m3 = np.zeros(m)
+        self.vmin = np.full(m, np.nan)
+        self.vmax = np.full(m, np.nan)
+        self.float_columns = set()
+        self.sketches = [KLLSketch(k, seed=None if seed is None else seed + i) for i in range(m)]
+        self.value_counts = {col: pd.Series(dtype=np.int64) for col in self.text_columns}
+
+    @staticmethod
+    def numeric_block(chunk, columns):
+        return np.column_stack([
+            pd.to_numeric(chunk[col], errors="coerce").to_numpy(dtype=np.float64, na_value=np.nan)
+            for col in columns
+        ]) if columns else np.empty((len(chunk), 0))
+
+    def _merge_moments(self, n_b, mean_b, m2_b, m3_b):
+        n_a, mean_a, m2_a, m3_a = self.n, self.mean, self.m2, self.m3
+        n = n_a + n_b
+        with np.errstate(invalid="ignore", divide="ignore"):
+            delta = mean_b - mean_a
+            safe_n = np.maximum(n, 1)
+            self.mean = np.where(n > 0, mean_a + delta * n_b / safe_n, 0.0)
+            self.m2 = m2_a + m2_b + delta ** 2 * n_a * n_b / safe_n
+            self.m3 = (m3_a + m3_b + delta ** 3 * n_a * n_b * (n_a - n_b) / safe_n ** 2
+                       + 3 * delta * (n_a * m2_b - n_b * m2_a) / safe_n)
+        self.n = n
+
+    def update(self, chunk: pd.DataFrame):
+        self.rows += len(chunk)
+        self.nulls += chunk[self.columns].isnull().sum().to_numpy(dtype=np.int64)
+        self.float_columns.update(c for c in self.numeric_columns if pd.api.types.is_float_dtype(chunk[c].dtype))
+
+        block = self.numeric_block(chunk, self.numeric_columns)
+        valid = ~np.isnan(block)
+        n_b = valid.sum(axis=0)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mean_b = np.where(n_b > 0, np.where(valid, block, 0.0).sum(axis=0) / np.maximum(n_b, 1), 0.0)
+            dev = np.where(valid, block - mean_b, 0.0)
+            self._merge_moments(n_b, mean_b, (dev ** 2).sum(axis=0), (dev ** 3).sum(axis=0))
+            self.vmin = np.fmin(self.vmin, np.nanmin(np.where(valid, block, np.nan), axis=0, initial=np.inf))
+            self.vmax = np.fmax(self.vmax, np.nanmax(np.where(valid, block, np.nan), axis=0, initial=-np.inf))
+        self.vmin[self.n == 0], self.vmax[self.n == 0] = np.nan, np.nan
+        for i, sketch in enumerate(self.sketches):
+            sketch.update(block[:, i])
+
+        for col in self.text_columns:
+            if self.value_counts[col] is not None:
+                self._add_counts(col, chunk[col].value_counts())
+        return self
+
+    def _add_counts(self, col, counts):
+        merged = self.value_counts[col].add(counts, fill_value=0).astype(np.int64)
+        self.value_counts[col] = merged if len(merged) <= self.max_distinct else None
+
+    def merge(self, other: "StreamingProfile"):
+        if other.columns != self.columns or other.numeric_columns != self.numeric_columns:
+            raise ValueError("Nie można połączyć profili o różnych zestawach kolumn.")
+        self.rows += other.rows
+        self.nulls += other.nulls
+        self.float_columns |= other.float_columns
+        self._merge_moments(other.n, other.mean, other.m2, other.m3)
+        self.vmin = np.fmin(self.vmin, other.vmin)
+        self.vmax = np.fmax(self.vmax, other.vmax)
+        for sketch, other_sketch in zip(self.sketches, other.sketches):
+            sketch.merge(other_sketch)
+        for col in self.text_columns:
+            if self.value_counts[col] is not None and other.value_counts[col] is not None:
+                self._add_counts(col, other.value_counts[col])
+            else:
+                self.value_counts[col] = None
+        return self
+
+
+class BinCounts:
+    """
+    Łączliwy stan drugiego przebiegu: histogramy o stałych przedziałach (zakres z min/max
+    pierwszego przebiegu) oraz liczby obserwacji odstających wg progów IQR i z-score.
+    """
+
+    def __init__(self, profile: StreamingProfile, bins: int = 20, zscore_threshold=3):
+        self.numeric_columns = profile.numeric_columns
+        self.float_idx = [i for i, c in enumerate(profile.numeric_columns) if c in profile.float_columns]
+        self.bins = bins
+        self.bin_range = (profile.vmin[self.float_idx], profile.vmax[self.float_idx])
+        quartiles = np.array([[np.nan if q is None else q for q in sketch.quantiles([0.25, 0.75])]
+                              for sketch in profile.sketches]).reshape(-1, 2)
+        iqr = quartiles[:, 1] - quartiles[:, 0]
+        self.iqr_bounds = (quartiles[:, 0] - 1.5 * iqr, quartiles[:, 1] + 1.5 * iqr)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            self.std_pop = np.sqrt(profile.m2 / profile.n)
+        self.mean = profile.mean
+        self.zscore_threshold = zscore_threshold
+        self.hist_counts = np.zeros((len(self.float_idx), bins), dtype=np.int64)
+        self.iqr_outliers = np.zeros(len(self.numeric_columns), dtype=np.int64)
+        self.zscore_outliers = np.zeros(len(self.numeric_columns), dtype=np.int64)
+
+    def update(self, chunk: pd.DataFrame):
+        block = StreamingProfile.numeric_block(chunk, self.numeric_columns)
+        counts, self.bin_edges = DataQualityAnalyzer._histograms(block[:, self.float_idx], self.bins, self.bin_range)
+        self.hist_counts += counts
+        low, high = self.iqr_bounds
+        self.iqr_outliers += ((block < low) | (block > high)).sum(axis=0)
+        with np.errstate(invalid="ignore"):
+            z_out = (np.abs(block - self.mean) > self.zscore_threshold * self.std_pop).sum(axis=0)
+        self.zscore_outliers += np.where(self.std_pop > 0, z_out, 0)
+        return self
+
+    def merge(self, other: "BinCounts"):
+        self.hist_counts += other.hist_counts
+        self.iqr_outliers += other.iqr_outliers
+        self.zscore_outliers += other.zscore_outliers
+        return self
+
+    def edges(self):
+        _, edges = DataQualityAnalyzer._histograms(np.empty((0, len(self.float_idx))), self.bins, self.bin_range)
+        return edges
+
+
+@instrument("jakość danych")
+class StreamingDataQualityAnalyzer(DataQualityAnalyzer):
+    """
+    Wariant DataQualityAnalyzer profilujący dane porcjami, bez ładowania całej tabeli do pamięci.
+    chunks to funkcja bezargumentowa zwracająca nowy iterator porcji (np. sql_chunks, csv_chunks);
+    potrzebne są dwa przebiegi. self.df zawiera jedynie próbkę (schemat kolumn i typy).
+
+    Zgodność z raportem liczonym w pamięci:
+    - braki, liczba wierszy, min/max, średnia, odchylenie i skośność - dokładne (z dokładnością
+      do zaokrągleń zmiennoprzecinkowych),
+    - histogramy - dokładne (przedziały z globalnego min/max, jak np.histogram),
+    - kwartyle i mediana - przybliżone szkicem KLL (błąd rangi ok. 1.7 / k),
+    - outliery IQR - dokładnie policzone względem progów z przybliżonych kwartyli,
+      outliery z-score - dokładne,
+    - top/freq kolumn tekstowych - dokładne do max_distinct unikalnych wartości, powyżej NaN,
+    - duplikaty - na podstawie 128-bitowych skrótów wierszy (kolizje praktycznie wykluczone);
+      przy dużych tabelach skróty partycjonowane są na dysk (classes.duplicates). Wiersze grup
+      przykładowych zbierane są w drugim przebiegu (razem z histogramami).
+    """
+
+    def __init__(self, chunks, expected_types: dict = None, bins: int = 20, k: int = 400,
+                 max_distinct: int = 100_000, sample_rows: int = 1000):
+        sample = None
+        for chunk in chunks():
+            sample = chunk.head(sample_rows)
+            break
+        if sample is None:
+            raise ValueError("Źródło danych nie zwróciło żadnej porcji.")
+        super().__init__(sample, expected_types)
+        self.chunks = chunks
+        self.bins = bins
+        self.k = k
+        self.max_distinct = max_distinct
+        self._profile = None
+        self._counts = {}
+        self._duplicates = None
+        self._duplicate_examples = None
+
+    def _span_shape(self):
+        # Liczba wierszy znana dopiero po pierwszym przebiegu (_profile nie istnieje jeszcze w __init__ klasy bazowej)
+        return getattr(getattr(self, "_profile", None), "rows", None), len(self.df.columns)
+
+    def _numeric_columns(self):
+        return [c for c in self.df.select_dtypes(include=np.number).columns
+                if not pd.api.types.is_bool_dtype(self.df[c].dtype)]
+
+    def new_profile(self):
+        return StreamingProfile(self.df.columns, self._numeric_columns(), k=self.k, max_distinct=self.max_distinct)
+
+    def profile(self):
+        """
+        Pierwszy przebieg: stan częściowy StreamingProfile i detektor duplikatów całych wierszy.
+        """
+        if self._profile is None:
+            profile = self.new_profile()
+            detector = DuplicateDetector(max_examples=5)
+            for chunk in self.chunks():
+                profile.update(chunk)
+                detector.update(chunk[list(self.df.columns)])
+            self._profile = profile
+            self._duplicates = detector.result()
+        return self._profile
+
+    def bin_counts(self, bins=None):
+        """
+        Drugi przebieg: histogramy i liczby outlierów względem progów z pierwszego przebiegu.
+        """
+        bins = self.bins if bins is None else bins
+        if bins not in self._counts:
+            counts = BinCounts(self.profile(), bins=bins)
+            examples = (ExampleRows(self._duplicates['example_groups'])
+                        if self._duplicate_examples is None else None)
+            for chunk in self.chunks():
+                counts.update(chunk)
+                if examples is not None:
+                    examples.update(chunk[list(self.df.columns)])
+            self._counts[bins] = counts
+            if examples is not None:
+                self._duplicate_examples = examples.result()
+        return self._counts[bins]
+
+    # --- KPI ---
+
+    def missing_values(self):
+        profile = self.profile()
+        missing_per_col = pd.Series(profile.nulls / profile.rows * 100 if profile.rows else np.nan,
+                                    index=profile.columns)
+        total_values = profile.rows * len(profile.columns)
+        return {
+            'missing_per_column_%': missing_per_col,
+            'percent_missing_total': (profile.nulls.sum() / total_values) * 100 if total_values else np.nan
+        }
+
+    def duplicate_rows(self, subset=None, mode='exact', max_examples=5):
+        if subset is None and mode == 'exact' and max_examples <= 5:
+            # Grupy z pierwszego przebiegu, wiersze przykładowe z drugiego (wspólnego z histogramami)
+            self.bin_counts()
+            result = self._duplicates
+            examples = self._duplicate_examples
+            if len(examples):
+                examples = examples[examples["Grupa"] <= max_examples]
+        else:
+            detector = DuplicateDetector(subset=subset, mode=mode, max_examples=max_examples)
+            for chunk in self.chunks():
+                detector.update(chunk[list(self.df.columns)])
+            result = detector.result()
+            examples = example_rows(self.chunks(), result['example_groups'])
+        return {
+            'num_duplicates': result['num_duplicates'],
+            'percent_duplicates': result['percent_duplicates'],
+            'duplicate_groups': result['duplicate_groups'],
+            'examples': examples
+        }
+
+    def outliers(self, method='iqr', zscore_threshold=3):
+        if method not in ('iqr', 'zscore'):
+            raise ValueError("Invalid method for outlier detection")
+        profile = self.profile()
+        counts = self.bin_counts()
+        if method == 'zscore' and zscore_threshold != counts.zscore_threshold:
+            counts = BinCounts(profile, bins=self.bins, zscore_threshold=zscore_threshold)
+            for chunk in self.chunks():
+                counts.update(chunk)
+        found = counts.iqr_outliers if method == 'iqr' else counts.zscore_outliers
+
+        outlier_summary = {}
+        for i, col in enumerate(profile.numeric_columns):
+            n = profile.n[i]
+            if n == 0:
+                continue
+            outlier_summary[col] = {
+                'Liczba obserwacji odstających': found[i],
+                'Procent obserwacji odstających': (found[i] / n) * 100
+            }
+        total_values = sum(profile.n[i] for i, col in enumerate(profile.numeric_columns) if col in outlier_summary)
+        total_outliers = sum(v['Liczba obserwacji odstających'] for v in outlier_summary.values())
+        return {
+            'outliers_per_column': outlier_summary,
+            'percent_outliers_total': (total_outliers / total_values) * 100 if total_values > 0 else 0
+        }
+
+    def distributions(self, bins=20):
+        profile = self.profile()
+        counts = self.bin_counts(bins)
+        edges = counts.edges()
+        distributions = {}
+        for j, i in enumerate(counts.float_idx):
+            n = profile.n[i]
+            variance = profile.m2[i] / n if n else 0.0
+            distributions[profile.numeric_columns[i]] = {
+                'counts': counts.hist_counts[j].tolist(),
+                'bin_edges': edges[j].tolist(),
+                'min': float(profile.vmin[i]) if n else None,
+                'max': float(profile.vmax[i]) if n else None,
+                'mean': float(profile.mean[i]) if n else None,
+                'median': profile.sketches[i].quantiles([0.5])[0],
+                'skewness': (profile.m3[i] / n) / variance ** 1.5 if variance > 0 else np.nan
+            }
+        return distributions
+
+    def basic_stats(self):
+        profile = self.profile()
+        numeric = {col: i for i, col in enumerate(profile.numeric_columns)}
+        stats = {}
+        for j, col in enumerate(profile.columns):
+            count = float(profile.rows - profile.nulls[j])
+            if col in numeric:
+                i = numeric[col]
+                n = profile.n[i]
+                q1, q2, q3 = profile.sketches[i].quantiles([0.25, 0.5, 0.75])
+                stats[col] = {
+                    'count': float(n),
+                    'mean': profile.mean[i] if n else np.nan,
+                    'std': np.sqrt(profile.m2[i] / (n - 1)) if n > 1 else np.nan,
+                    'min': profile.vmin[i],
+                    '25%': q1, '50%': q2, '75%': q3,
+                    'max': profile.vmax[i],
+                }
+            else:
+                value_counts = profile.value_counts[col]
+                known = value_counts is not None and len(value_counts) > 0
+                value_counts = value_counts.sort_values(ascending=False, kind="stable") if known else None
+                stats[col] = {
+                    'count': count,
+                    'unique': len(value_counts) if known else np.nan,
+                    'top': value_counts.index[0] if known else np.nan,
+                    'freq': value_counts.iloc[0] if known else np.nan,
+                }
+
+        order = ['count', 'unique', 'top', 'freq', 'mean', 'std', 'min', '25%', '50%', '75%', 'max']
+        desc = pd.DataFrame.from_dict(stats, orient='index')
+        desc = desc[[c for c in order if c in desc.columns]]
+        desc.insert(0, "typ", self.df.dtypes.astype(str))
+        return desc
+
+    def column_report(self, fused=False):
+        # Oba przebiegi wykonywane są raz; kolejne metody korzystają z zapamiętanego stanu
+        return super().column_report(fused=False)
+
+    def generate_report(self, fused=False, with_type_conformance=True):
+        return super().generate_report(fused=False, with_type_conformance=with_type_conformance)
@@ -0,0 +1,60 @@
+# classes/task_graph.py
+"""
+Wykonanie małego grafu zadań: każde zadanie to funkcja i lista zadań, od których zależy
+(ich wyniki dostaje jako argumenty, w kolejności listy). Zadanie uruchamiane jest, gdy
+gotowe są wszystkie jego zależności, a niezależne zadania wykonywane są równolegle w puli wątków.
+"""
+
+import os
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+
+def required_tasks(tasks: dict, targets=None):
+    """
+    Zadania potrzebne do policzenia targets (domyślnie wszystkich) razem z zależnościami,
+    w kolejności definicji w tasks.
+    """
+    required, stack = set(), list(tasks if targets is None else targets)
+    while stack:
+        name = stack.pop()
+        if name in required:
+            continue
+        if name not in tasks:
+            raise ValueError(f"Nieznane zadanie w grafie: {name}")
+        required.add(name)
+        stack += tasks[name][1]
+    return [name for name in tasks if name in required]
+
+
+def run_tasks(tasks: dict, targets=None, max_workers=None):
+    """
+    Wykonuje graf {nazwa: (funkcja, [zależności])} i zwraca {nazwa: wynik} dla targets
+    i ich zależności. max_workers=1 - zadania po kolei w bieżącym wątku (np. gdy dzielą
+    połączenie SQLite). Wyjątek zadania przerywa wykonanie grafu.
+    """
+    needed = required_tasks(tasks, targets)
+    workers = max_workers or min(len(needed), os.cpu_count() or 1) or 1
+    executor = ThreadPoolExecutor(max_workers=workers) if workers > 1 else None
+    results, pending = {}, {}
+    try:
+        while len(results) < len(needed):
+            running = set(pending.values())
+            ready = [name for name in needed if name not in results and name not in running
+                     and all(dep in results for dep in tasks[name][1])]
+            if not ready and not pending:
+                raise ValueError("Graf zadań zawiera cykl.")
+            for name in ready:
+                fn, deps = tasks[name]
+                args = [results[dep] for dep in deps]
+                if executor is None:
+                    results[name] = fn(*args)
+                else:
+                    pending[executor.submit(fn, *args)] = name
+            if pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    results[pending.pop(future)] = future.result()
+    finally:
+        if executor is not None:
+            executor.shutdown(wait=True, cancel_futures=True)
+    return results
@@ -5,16 +5,56 @@ import pandas as pd
 import numpy as np
 import altair as alt
 from classes.data_quality import DataQualityAnalyzer
+from classes.sql_pushdown import SQLDataQualityAnalyzer
+from classes.streaming_profile import StreamingDataQualityAnalyzer, sql_chunks
+from classes.db_schema import session_connection
+from classes.flat_table import FLAT_TABLE
+from classes.result_cache import CachedAnalyzer, db_fingerprint, session_fingerprint, session_result_cache
+from classes.instrumentation import session_tracer
+from classes.lineage import LineageResults, column_fingerprints, lineage_graph, session_column_fingerprints
 
 st.set_page_config(page_title="Analiza jakości danych", layout="wide")
+session_tracer(st.session_state).begin_run("Analiza jakości danych")
 st.title("Analiza jakości danych")
 
+execution_mode = st.session_state.get("execution_mode")
+sql_mode = execution_mode in ("sql", "stream")
+
+if sql_mode:
+    # Tryb SQL / porcjami: KPI liczone bez pełnej tabeli w pamięci, tylko próbka do podglądu i wyboru kolumn
+    try:
+        conn = session_connection(st.session_state)
+        data_fingerprint = db_fingerprint(conn, FLAT_TABLE)
+        if execution_mode == "stream":
+            # Stan przebiegów strumieniowych (profil, histogramy, duplikaty) zachowywany między
+            # uruchomieniami strony, dopóki dane w bazie się nie zmienią
+            stream_fingerprint, sql_analyzer = st.session_state.get("stream_analyzer", (None, None))
+            if stream_fingerprint != data_fingerprint:
+                sql_analyzer = StreamingDataQualityAnalyzer(sql_chunks(conn))
+                st.session_state["stream_analyzer"] = (data_fingerprint, sql_analyzer)
+        else:
+            sql_analyzer = SQLDataQualityAnalyzer(conn)
+        fingerprint = f"{execution_mode}:{data_fingerprint}"
+        # Tryb SQL: odciski kolumn z grafu pochodzenia (tryb porcjami czyta tabelę jednym przebiegiem)
+        column_fps = (column_fingerprints(conn, sql_analyzer.df.columns, graph=lineage_graph(conn))
+                      if execution_mode == "sql" else None)
+    except Exception:
+        st.warning("Nie znaleziono danych! Wróć do strony głównej i wczytaj dane.")
+        st.stop()
+    df = sql_analyzer.df
+    if execution_mode == "stream":
+        st.info("Tryb porcjami: wskaźniki liczone są strumieniowo na pełnej tabeli; "
+                "kwartyle i mediana są przybliżone (szkic KLL).")
+    else:
+        st.info("Tryb SQL: wskaźniki liczone są w bazie SQLite na pełnej tabeli.")
 # Sprawdź, czy dane zostały już wczytane w app.py
-if "df" not in st.session_state:
+elif "df" not in st.session_state:
     st.warning("Nie znaleziono danych! Wróć do strony głównej i wczytaj dane.")
     st.stop()
-
-df = st.session_state["df"]
+else:
+    df = st.session_state["df"]
+    fingerprint = session_fingerprint(st.session_state, df)
+    column_fps = session_column_fingerprints(st.session_state, df)
 
 st.subheader("Podgląd danych")
 st.dataframe(df.head())
@@ -43,8 +83,27 @@ with st.expander("Kliknij aby ustawić typy kolumn"):
             expected_types[col] = type_map[selected_type]
 
 st.markdown("---")
-analyzer = DataQualityAnalyzer(df, expected_types)
-report = analyzer.generate_report()
+if sql_mode:
+    analyzer = sql_analyzer
+    analyzer.expected_types = expected_types
+else:
+    analyzer = DataQualityAnalyzer(df, expected_types)
+
+# Raport z pamięci podręcznej (klucz: odcisk danych); zgodność typów zależy tylko od
+# expected_types, więc zmiana wyboru typu przelicza wyłącznie ją
+result_cache = session_result_cache(st.session_state)
+cached_analyzer = CachedAnalyzer(analyzer, result_cache, fingerprint)
+if column_fps is not None:
+    # Części raportu z kluczem z odcisków kolumn: po ponownym wczytaniu wymiaru przeliczane są
+    # tylko jego kolumny (i duplikaty, które zależą od całych wierszy)
+    lineage_results = LineageResults(result_cache, column_fps, scope=execution_mode or "pandas")
+    report = lineage_results.quality_report(analyzer)
+    if lineage_results.misses:
+        st.caption(f"Przeliczone części raportu: {len(lineage_results.misses)} z "
+                   f"{len(lineage_results.misses) + len(lineage_results.hits)} (pozostałe z pamięci podręcznej).")
+else:
+    report = cached_analyzer.generate_report(with_type_conformance=False)
+report['type_conformance'] = analyzer.type_conformance()
 
 # Po wygenerowaniu raportu: report = analyzer.generate_report()
 st.session_state["kpi_data_quality"] = {
@@ -52,7 +111,7 @@ st.session_state["kpi_data_quality"] = {
     "Duplikaty [%]": report['duplicates']['percent_duplicates'],
     "Outliery [%]": report['outliers']['percent_outliers_total'],
     "Zgodność typów": (
-        sum(1 for v in report['type_conformance'].values() if v['conforms']) /
+        sum(1 for v in report['type_conformance'].values() if v['Zgodność typów']) /
         max(1, len(report['type_conformance']))
     ) * 100 if report['type_conformance'] else None
 }
@@ -64,6 +123,32 @@ col2.metric("Procent duplikatów", f"{report['duplicates']['percent_duplicates']
 col3.metric("Procent outlierów", f"{report['outliers']['percent_outliers_total']:.2f}%")
 col4.metric("Liczba duplikatów", f"{report['duplicates']['num_duplicates']}")
 
+st.markdown("---")
+st.subheader("Duplikaty")
+col1, col2 = st.columns([3, 1])
+duplicate_subset = col1.multiselect(
+    "Kolumny klucza (puste = cały wiersz)",
+    options=list(df.columns),
+    help="Np. ORDERKEY + ORDERLINENUMBER - wiersze o tym samym kluczu traktowane są jako duplikaty."
+)
+approximate_duplicates = col2.checkbox(
+    "Tryb przybliżony (filtr Blooma)",
+    value=False,
+    help="Stała pamięć niezależnie od liczby wierszy; wynik może być nieznacznie zawyżony."
+)
+if duplicate_subset or approximate_duplicates:
+    duplicates = cached_analyzer.duplicate_rows(subset=duplicate_subset or None,
+                                                mode="approx" if approximate_duplicates else "exact")
+else:
+    duplicates = report['duplicates']
+col1, col2, col3 = st.columns(3)
+col1.metric("Liczba duplikatów", f"{duplicates['num_duplicates']}")
+col2.metric("Procent duplikatów", f"{duplicates['percent_duplicates']:.2f}%")
+col3.metric("Grupy duplikatów", duplicates['duplicate_groups'] if duplicates['duplicate_groups'] is not None else "—")
+if len(duplicates['examples']):
+    st.caption("Przykładowe grupy duplikatów")
+    st.dataframe(duplicates['examples'])
+
 st.markdown("---")
 st.subheader("Procent brakujących wartości (per kolumna)")
 st.dataframe(report['missing_values']['missing_per_column_%'].to_frame("Procent braków"))
@@ -4,16 +4,54 @@ import streamlit as st
 import pandas as pd
 import numpy as np
 from classes.ai_compliance import AIComplianceAnalyzer
+from classes.bias_cube import DEFAULT_MIN_CELL
+from classes.catalog_scan import scan_catalog
+from classes.sql_pushdown import SQLAIComplianceAnalyzer
+from classes.compaction import TEXT_DTYPES
+from classes.db_schema import session_connection
+from classes.flat_table import FLAT_TABLE
+from classes.result_cache import CachedAnalyzer, db_fingerprint, session_fingerprint, session_result_cache
+from classes.instrumentation import session_tracer
+from classes.lineage import LineageResults, column_fingerprints, lineage_graph, session_column_fingerprints
 
 st.set_page_config(page_title="Zgodność z AI Act", layout="wide")
+session_tracer(st.session_state).begin_run("Zgodność z AI Act")
 st.title("Analiza zgodności z AI Act")
 
-if "df" not in st.session_state:
+if st.session_state.get("execution_mode") in ("sql", "stream"):
+    # Tryb SQL (także w trybie porcjami): analiza biasu wykonywana w SQLite, w pamięci tylko próbka do wyboru kolumn
+    try:
+        conn = session_connection(st.session_state)
+        analyzer = SQLAIComplianceAnalyzer(conn)
+        fingerprint = f"sql:{db_fingerprint(conn, FLAT_TABLE)}"
+        column_fps = column_fingerprints(conn, analyzer.df.columns, graph=lineage_graph(conn))
+        scope = "sql"
+    except Exception:
+        st.warning("Nie znaleziono danych! Wróć do strony głównej i wczytaj dane.")
+        st.stop()
+    df = analyzer.df
+elif "df" not in st.session_state:
     st.warning("Nie znaleziono danych! Wróć do strony głównej i wczytaj dane.")
     st.stop()
-
-df = st.session_state["df"]
-analyzer = AIComplianceAnalyzer(df)
+else:
+    df = st.session_state["df"]
+    analyzer = AIComplianceAnalyzer(df)
+    fingerprint = session_fingerprint(st.session_state, df)
+    column_fps = session_column_fingerprints(st.session_state, df)
+    scope = "pandas"
+
+# Wyniki pośrednie analizatora (memo) zachowywane między uruchomieniami strony dla tych samych
+# danych - ocena ryzyka korzysta z analiz wykonanych wcześniej przyciskami
+memo_fingerprint, memo = st.session_state.get("compliance_memo", (None, None))
+if memo_fingerprint != fingerprint:
+    memo = {}
+    st.session_state["compliance_memo"] = (fingerprint, memo)
+analyzer.memo = memo
+
+# Wyniki (bias, dane wrażliwe, ryzyko) z pamięci podręcznej sesji (lub trwałej, jeśli włączono)
+base_analyzer = analyzer
+result_cache = session_result_cache(st.session_state)
+analyzer = CachedAnalyzer(analyzer, result_cache, fingerprint)
 
 st.markdown("""
 ### 🔍 Co mierzymy?
@@ -37,7 +75,7 @@ with st.expander("Wybierz parametry analizy biasu"):
     """)
 
     group_cols = st.multiselect("Kolumny grupujące (kategorie):", 
-                                 options=df.select_dtypes(include="object").columns.tolist(),
+                                 options=df.select_dtypes(include=TEXT_DTYPES).columns.tolist(),
                                  default=[col for col in ["COUNTRYNAME", "ChannelName", "PaymentMethodName"] if col in df.columns])
 
     st.markdown("""
@@ -54,8 +92,21 @@ with st.expander("Wybierz parametry analizy biasu"):
                                   options=numeric_cols,
                                   default=default_targets)
 
+def _interval(stats, name):
+    low, high = stats.get(f"{name} - dolna granica"), stats.get(f"{name} - górna granica")
+    if low is None or pd.isna(low):
+        return None
+    return f"{low:.4f} - {high:.4f}"
+
+
 if st.button("Wykonaj analizę biasu"):
-    bias_result = analyzer.analyze_bias(group_cols=group_cols, target_cols=target_cols)
+    if column_fps is not None:
+        # Wynik każdej kolumny grupującej z kluczem z odcisków jej kolumn i kolumn celu:
+        # po ponownym wczytaniu wymiaru przeliczane są tylko grupy zależne od tego wymiaru
+        bias_result = LineageResults(result_cache, column_fps, scope=scope).analyze_bias(
+            base_analyzer, group_cols=group_cols, target_cols=target_cols)
+    else:
+        bias_result = analyzer.analyze_bias(group_cols=group_cols, target_cols=target_cols)
 
     st.subheader("📊 Podsumowanie rozkładu kategorii")
     summary_rows = []
@@ -68,11 +119,37 @@ if st.button("Wykonaj analizę biasu"):
                 "Max udział": cat["Max udział"],
                 "Min udział": cat["Min udział"],
                 "Rozstęp udziałów": cat["Rozstęp udziałów"],
-                "Liczba grup": cat["Liczba grup"]
+                "Liczba grup": cat["Liczba grup"],
+                "p-value χ²": cat.get("p-value χ² (równe udziały)"),
+                "Rozstęp udziałów - 95% CI": _interval(cat, "Rozstęp udziałów"),
             })
 
     if summary_rows:
         st.dataframe(pd.DataFrame(summary_rows))
+        st.caption("p-value χ² - test zgodności liczności grup z równym podziałem; "
+                   "CI - bootstrapowy przedział ufności 95%.")
+
+    test_rows = []
+    for group_col, results in bias_result.items():
+        for key, val in results.items():
+            if key.startswith("Istotność różnic "):
+                target = key[len("Istotność różnic "):]
+                test_rows.append({
+                    "Kolumna": group_col,
+                    "Zmienna": target,
+                    "Rozstęp średnich": results.get(f"Rozstęp średnich {target}"),
+                    "Rozstęp średnich - 95% CI": _interval(val, "Rozstęp średnich"),
+                    "ANOVA p-value": val["ANOVA p-value"],
+                    "Kruskal-Wallis p-value": val["Kruskal-Wallis p-value"],
+                })
+    if test_rows:
+        st.subheader("🧪 Istotność różnic średnich")
+        st.dataframe(pd.DataFrame(test_rows), hide_index=True,
+                     column_config={c: st.column_config.NumberColumn(format="%.4f")
+                                    for c in ["ANOVA p-value", "Kruskal-Wallis p-value"]})
+        st.caption("p-value < 0,05 oznacza, że różnice średnich między grupami są mało prawdopodobne "
+                   "jako efekt losowy (ANOVA - porównanie średnich, Kruskal-Wallis - porównanie rang, "
+                   "odporne na wartości odstające).")
 
     st.markdown("---")
     st.subheader("📈 Szczegółowe średnie wg grup")
@@ -87,6 +164,43 @@ if st.button("Wykonaj analizę biasu"):
 else:
     st.info("Wybierz kolumny i uruchom analizę, aby zobaczyć wyniki.")
 
+st.markdown("---")
+st.markdown("## 🧩 Bias w przekrojach grup")
+
+st.markdown("""Grupy mogą być traktowane równo osobno, a nierówno dopiero w połączeniu — np. klienci z jednego kraju
+płacący określoną metodą przez jeden kanał. Analiza obejmuje wszystkie kombinacje wybranych kolumn grupujących
+(powyżej) i jest liczona z jednej kostki statystyk, bez osobnego grupowania dla każdej kombinacji.
+Komórki o zbyt małej liczności są **ukrywane** — ich średnie są niewiarygodne i mogłyby ujawniać dane pojedynczych osób.""")
+
+col1, col2 = st.columns(2)
+if len(group_cols) > 1:
+    max_order = col1.slider("Maksymalna liczba kolumn w przekroju", min_value=1,
+                            max_value=len(group_cols), value=len(group_cols))
+else:
+    max_order = 1
+min_cell = col2.number_input("Minimalna liczność komórki", min_value=1, value=DEFAULT_MIN_CELL)
+
+if st.button("Wykonaj analizę przekrojową"):
+    if not group_cols:
+        st.warning("Wybierz co najmniej jedną kolumnę grupującą.")
+    else:
+        intersectional = analyzer.analyze_intersectional_bias(group_cols=group_cols, target_cols=target_cols,
+                                                              max_order=max_order, min_cell=int(min_cell))
+        cells = intersectional["Komórki"]
+
+        st.subheader("📊 Podsumowanie przekrojów")
+        st.dataframe(intersectional["Podsumowanie"], hide_index=True)
+        hidden = int(cells["Ukryta"].sum())
+        if hidden:
+            st.info(f"Ukryto {hidden} z {len(cells)} komórek o liczności poniżej {int(min_cell)}.")
+
+        st.subheader("📈 Komórki przekrojów")
+        for name, part in cells.groupby("Przekrój", sort=False):
+            with st.expander(name):
+                dims = name.split(" × ")
+                st.dataframe(part.drop(columns=["Przekrój", "Rząd"] + [c for c in group_cols if c not in dims]),
+                             hide_index=True)
+
 st.markdown("---")
 st.markdown("## 🔐 Analiza danych osobowych i wrażliwych")
 
@@ -114,9 +228,40 @@ if st.button("Wykryj dane osobowe i wrażliwe"):
         st.info("Brak danych wrażliwych.")
 
 
+    scan = pd.DataFrame(sensitive_report.get("Skan zawartości", []))
+    if not scan.empty:
+        st.subheader("🔎 Skan zawartości kolumn tekstowych")
+        scan["Wykryte typy"] = scan["Wykryte typy"].map(", ".join)
+        st.dataframe(scan, hide_index=True)
+        st.caption("Wartości kolumn (na losowej próbie) sprawdzane są pod kątem adresów e-mail, telefonów, "
+                   "adresów IP oraz numerów PESEL, NIP i IBAN (z weryfikacją sumy kontrolnej). "
+                   "Skanowanie kolumny kończy się wcześniej, gdy wynik jest już jednoznaczny.")
+
     st.subheader("🛡️ Poziom ryzyka")
     st.success(sensitive_report["Poziom ryzyka"])
 
+st.markdown("### 🗂️ Skan wszystkich tabel bazy")
+st.markdown("""Analiza powyżej obejmuje tylko spłaszczoną tabelę. Skan bazy sprawdza każdą tabelę w `sales.db`
+(także wymiary, np. dane klientów, które nie trafiają do tabeli spłaszczonej) na ograniczonej próbie wierszy.
+Wyniki tabel, które nie zmieniły się od poprzedniego skanu, pochodzą z pamięci podręcznej.""")
+
+if st.button("Skanuj wszystkie tabele"):
+    catalog = scan_catalog("sales.db", cache=result_cache)
+    tables = catalog["Tabele"].copy()
+    for col in ["Kolumny osobowe", "Kolumny wrażliwe"]:
+        tables[col] = tables[col].map(", ".join)
+    st.dataframe(tables, hide_index=True)
+
+    columns = catalog["Kolumny"]
+    flagged = columns[columns["Dane osobowe"] | columns["Dane wrażliwe"]]
+    st.markdown("#### Kolumny z danymi osobowymi lub wrażliwymi")
+    if flagged.empty:
+        st.info("Nie wykryto danych osobowych ani wrażliwych.")
+    else:
+        st.dataframe(flagged, hide_index=True)
+    with st.expander("Wszystkie kolumny"):
+        st.dataframe(columns, hide_index=True)
+
 st.markdown("---")
 st.markdown("## 🌐 Mapowanie przepływu danych (Data Lineage)")
 
@@ -130,6 +275,11 @@ df_lineage = pd.DataFrame(lineage_info)
 
 st.dataframe(df_lineage)
 
+with st.expander("Graf pochodzenia: kolumny źródłowe i klucze joinów"):
+    st.caption("Odczytany z zapytania spłaszczającego. Kolumna zależy od tabel swoich kolumn źródłowych "
+               "i kluczy joinów - ponowne wczytanie tabeli unieważnia tylko wyniki zależnych kolumn.")
+    st.dataframe(lineage_graph().edges(df.columns), hide_index=True)
+
 st.markdown("---")
 st.markdown("## 🧾 Ocena końcowego ryzyka zgodności z AI Act")
 
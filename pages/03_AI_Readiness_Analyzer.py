@@ -1,9 +1,13 @@
 import streamlit as st
 import pandas as pd
-from classes.ai_readiness_analyzer import AIReadinessAnalyzer
+from classes.ai_readiness_analyzer import SGD_MIN_ROWS, AIReadinessAnalyzer
+from classes.compaction import TEXT_DTYPES
+from classes.result_cache import CachedAnalyzer, session_fingerprint, session_result_cache
+from classes.instrumentation import session_tracer
 from sklearn.utils.multiclass import type_of_target
 
 st.set_page_config(page_title="Zaawansowana analiza danych do AI", layout="wide")
+session_tracer(st.session_state).begin_run("Zaawansowana analiza danych do AI")
 st.title("Zaawansowana analiza danych do AI")
 
 if "df" not in st.session_state:
@@ -11,7 +15,9 @@ if "df" not in st.session_state:
     st.stop()
 
 df = st.session_state["df"]
-analyzer = AIReadinessAnalyzer(df)
+fingerprint = session_fingerprint(st.session_state, df)
+result_cache = session_result_cache(st.session_state)
+analyzer = CachedAnalyzer(AIReadinessAnalyzer(df), result_cache, fingerprint, key_attrs=("target_column",))
 
 # 📄 Podgląd danych
 st.subheader("📄 Podgląd danych")
@@ -78,7 +84,7 @@ for col in numeric_cols.columns:
 # Ogólne rekomendacje
 if numeric_cols.shape[1] >= 2:
     recommendations.append("- Zastanów się nad **standaryzacją lub normalizacją** zmiennych liczbowych.")
-if df.select_dtypes(include="object").shape[1] > 0:
+if df.select_dtypes(include=TEXT_DTYPES).shape[1] > 0:
     recommendations.append("- Zakoduj zmienne tekstowe przy użyciu **LabelEncoder** lub **OneHotEncoder**.")
 if insights:
     recommendations.append("- Zredukuj zmienne silnie skorelowane, np. używając PCA lub selekcji cech.")
@@ -98,7 +104,8 @@ balance_kpi = "Brak lub nie dotyczy"
 model_kpi = "Brak"
 
 if target_column:
-    analyzer = AIReadinessAnalyzer(df, target_column)
+    analyzer = CachedAnalyzer(AIReadinessAnalyzer(df, target_column), result_cache, fingerprint,
+                              key_attrs=("target_column",))
     target_type = type_of_target(df[target_column])
 
     if target_type in ["binary", "multiclass"]:
@@ -115,8 +122,19 @@ if target_column:
 
         # 🤖 Model
         st.subheader("🤖 Trenowanie prostego modelu")
+        training_mode = st.radio(
+            "Tryb trenowania",
+            options=["auto", "sgd", "full"],
+            format_func=lambda x: {"auto": f"Automatyczny (porcjami od {SGD_MIN_ROWS} wierszy)",
+                                   "sgd": "Porcjami na próbie warstwowej (SGD, rzadkie cechy)",
+                                   "full": "Pełny (LogisticRegression na 70% wierszy)"}[x],
+            horizontal=True,
+            help="Porcjami: model uczony jest kolejnymi porcjami wierszy, aż dokładność na zbiorze "
+                 "walidacyjnym (część wierszy treningowych) przestanie rosnąć; zbiór testowy służy "
+                 "tylko do końcowej oceny. Kolumny kategoryczne o wielu wartościach są haszowane."
+        )
         with st.spinner("⏳ Trwa trenowanie modelu..."):
-            result = analyzer.train_simple_model()
+            result = analyzer.train_simple_model(mode=training_mode)
             if isinstance(result, dict) and "accuracy" in result:
                 accuracy = result["accuracy"]
                 model_kpi = f"{accuracy:.2%}"
@@ -125,6 +143,14 @@ if target_column:
 
         if isinstance(result, dict):
             st.metric("Dokładność", f"{result['accuracy']:.2%}")
+            if result.get("convergence") is not None:
+                st.subheader("📈 Zbieżność dokładności")
+                convergence = result["convergence"]
+                st.line_chart(convergence.set_index("Wiersze treningowe")["Dokładność walidacyjna"])
+                status = ("dokładność ustabilizowała się." if result["converged"]
+                          else "osiągnięto limit przebiegów przed ustabilizowaniem dokładności.")
+                st.caption(f"Wykorzystano {int(convergence['Wiersze treningowe'].iloc[-1])} wierszy treningowych "
+                           f"w {convergence['Czas [s]'].iloc[-1]:.2f} s; {status}")
 
             st.subheader("📋 Raport klasyfikacji")
             report = pd.DataFrame(result["report"]).drop(columns=["accuracy"], errors="ignore").T
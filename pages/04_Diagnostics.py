@@ -0,0 +1,102 @@
+# pages/04_Diagnostics.py
+
+import json
+import streamlit as st
+import pandas as pd
+import altair as alt
+from classes.instrumentation import MEMORY_MODES, session_tracer, span_table
+
+st.set_page_config(page_title="Diagnostyka wydajności", layout="wide")
+st.title("Diagnostyka wydajności")
+
+tracer = session_tracer(st.session_state)
+# Strona diagnostyki nie mierzy samej siebie
+tracer.end_run()
+
+col1, col2 = st.columns(2)
+tracer.enabled = col1.toggle(
+    "Mierz wykonanie stron",
+    value=tracer.enabled,
+    help="Każde uruchomienie strony zapisuje drzewo etapów: wczytywanie, spłaszczanie, "
+         "metody analizatorów, trenowanie modelu i wykresy - z czasem, CPU, pamięcią "
+         "i rozmiarem danych. Wyłączony pomiar nie spowalnia aplikacji."
+)
+memory_mode = col2.radio(
+    "Pomiar pamięci",
+    options=list(MEMORY_MODES),
+    format_func=lambda x: {"rss": "RSS procesu (tani)",
+                           "tracemalloc": "tracemalloc (dokładny szczyt, wolniejszy)"}[x],
+    index=MEMORY_MODES.index(tracer.memory),
+    horizontal=True,
+)
+tracer.set_memory_mode(memory_mode)
+
+runs = list(tracer.runs)[::-1]
+if not runs:
+    st.info("Brak pomiarów. Włącz pomiar i przejdź do wybranej strony analizy.")
+    st.stop()
+
+run_index = st.selectbox(
+    "Wykonanie",
+    options=range(len(runs)),
+    format_func=lambda i: f"{pd.Timestamp(runs[i].started_at, unit='s'):%H:%M:%S} - {runs[i].label} "
+                          f"({runs[i].wall * 1000:.0f} ms)",
+)
+run = runs[run_index]
+spans = span_table(run)
+
+if spans.empty:
+    st.info("W tym wykonaniu nie zarejestrowano żadnych etapów (np. wyniki pochodziły z pamięci podręcznej strony).")
+else:
+    c1, c2, c3 = st.columns(3)
+    top = spans[spans["Głębokość"] == 0]
+    c1.metric("Czas wykonania", f"{run.wall * 1000:.0f} ms")
+    c2.metric("Etapy najwyższego poziomu", len(top))
+    c3.metric("Najdłuższy etap (czas własny)", spans.loc[spans["Czas własny [ms]"].idxmax(), "Nazwa"])
+
+    st.subheader("⏱️ Oś czasu")
+    timeline = spans.assign(**{"Koniec [ms]": spans["Start [ms]"] + spans["Czas [ms]"]})
+    chart = alt.Chart(timeline.reset_index()).mark_bar().encode(
+        x=alt.X("Start [ms]:Q", title="Czas od początku wykonania [ms]"),
+        x2="Koniec [ms]:Q",
+        y=alt.Y("index:O", title=None, axis=alt.Axis(labels=False, ticks=False)),
+        color=alt.Color("Kategoria:N"),
+        tooltip=["Nazwa", "Kategoria", alt.Tooltip("Czas [ms]:Q", format=".1f"),
+                 alt.Tooltip("CPU [ms]:Q", format=".1f"), alt.Tooltip("Pamięć Δ [MB]:Q", format=".2f"),
+                 "Wiersze", "Kolumny"],
+    ).properties(height=max(120, 18 * len(timeline)))
+    st.altair_chart(chart, use_container_width=True)
+
+    st.subheader("📋 Etapy")
+    st.dataframe(
+        spans.drop(columns=["Głębokość", "Nazwa"]),
+        hide_index=True,
+        column_config={c: st.column_config.NumberColumn(format="%.1f")
+                       for c in ["Start [ms]", "Czas [ms]", "Czas własny [ms]", "CPU [ms]"]}
+        | {c: st.column_config.NumberColumn(format="%.2f") for c in ["Pamięć Δ [MB]", "Szczyt Δ [MB]"]},
+    )
+
+    st.subheader("🧮 Czas własny wg kategorii")
+    st.dataframe(
+        spans.groupby("Kategoria")[["Czas własny [ms]"]].sum()
+        .sort_values("Czas własny [ms]", ascending=False)
+    )
+
+st.subheader("💾 Eksport (Chrome Trace / Perfetto)")
+col1, col2, col3 = st.columns(3)
+col1.download_button(
+    "Pobierz wybrane wykonanie",
+    data=json.dumps(tracer.to_chrome_trace([run]), ensure_ascii=False),
+    file_name="trace.json",
+    mime="application/json",
+)
+col2.download_button(
+    "Pobierz wszystkie wykonania",
+    data=json.dumps(tracer.to_chrome_trace(), ensure_ascii=False),
+    file_name="trace_all.json",
+    mime="application/json",
+)
+if col3.button("Wyczyść pomiary"):
+    tracer.clear()
+    st.rerun()
+st.caption("Plik można otworzyć w chrome://tracing lub ui.perfetto.dev.")
@@ -0,0 +1,84 @@
+# tests/test_bias_cube.py
+import numpy as np
+import pandas as pd
+import pytest
+
+from classes.bias_cube import BiasCube
+
+GROUP_COLS = ["Kraj", "Kanał", "Płatność"]
+TARGETS = ["Cena", "Rabat"]
+
+
+@pytest.fixture
+def sales():
+    rng = np.random.default_rng(0)
+    n = 2_000
+    df = pd.DataFrame({
+        "Kraj": rng.choice(["PL", "DE", "FR", "CZ"], n),
+        "Kanał": pd.Categorical(rng.choice(["Sklep", "Online"], n)),
+        "Płatność": rng.choice(["Karta", "Gotówka", "BLIK"], n).astype(object),
+        "Cena": rng.normal(1_000, 250, n),
+        "Rabat": rng.integers(0, 30, n).astype(float),
+    })
+    # Braki w kolumnach grupujących i w zmiennych celu
+    df.loc[rng.choice(n, 50, replace=False), "Płatność"] = None
+    df.loc[rng.choice(n, 80, replace=False), "Cena"] = np.nan
+    return df
+
+
+def _expected(df, dims):
+    valid = df.dropna(subset=GROUP_COLS)
+    grouped = valid.groupby(list(dims), observed=True, sort=True)
+    frame = grouped.size().rename("Liczność").to_frame()
+    for target in TARGETS:
+        frame[(target, "mean")] = grouped[target].mean()
+        frame[(target, "count")] = grouped[target].count()
+        frame[(target, "var")] = grouped[target].var()
+    return frame
+
+
+@pytest.mark.parametrize("dims", [("Kraj",), ("Kanał",), ("Płatność",), ("Kraj", "Kanał"),
+                                  ("Kanał", "Płatność"), tuple(GROUP_COLS)])
+def test_rollup_matches_groupby(sales, dims):
+    cube = BiasCube.from_frame(sales, GROUP_COLS, TARGETS)
+    rollup = cube.rollup(dims).set_index(list(dims)).sort_index()
+    expected = _expected(sales, dims)
+
+    assert list(rollup.index) == list(expected.index)
+    np.testing.assert_array_equal(rollup["Liczność"], expected["Liczność"])
+    for target in TARGETS:
+        np.testing.assert_array_equal(rollup[(target, "count")], expected[(target, "count")])
+        np.testing.assert_allclose(rollup[(target, "mean")], expected[(target, "mean")], rtol=1e-10)
+        np.testing.assert_allclose(rollup[(target, "var")], expected[(target, "var")], rtol=1e-8)
+
+
+def test_total_rollup(sales):
+    cube = BiasCube.from_frame(sales, GROUP_COLS, TARGETS)
+    total = cube.rollup()
+    valid = sales.dropna(subset=GROUP_COLS)
+    assert total["Liczność"].tolist() == [len(valid)]
+    np.testing.assert_allclose(total[("Cena", "mean")], valid["Cena"].mean(), rtol=1e-10)
+    np.testing.assert_allclose(total[("Cena", "var")], valid["Cena"].var(), rtol=1e-8)
+
+
+def test_from_aggregates_matches_from_frame(sales):
+    valid = sales.dropna(subset=GROUP_COLS)
+    grouped = valid.groupby(GROUP_COLS, observed=True, sort=False)
+    keys = grouped.size().reset_index()[GROUP_COLS]
+    counts = grouped.size().to_numpy()
+    n = grouped[TARGETS].count().to_numpy()
+    sums = grouped[TARGETS].sum().to_numpy()
+    sumsqs = (valid[TARGETS] ** 2).groupby([valid[c] for c in GROUP_COLS], observed=True, sort=False).sum().to_numpy()
+
+    from_sql = BiasCube.from_aggregates(keys, counts, TARGETS, n, sums, sumsqs).rollup(("Kraj",)).set_index("Kraj")
+    from_frame = BiasCube.from_frame(sales, GROUP_COLS, TARGETS).rollup(("Kraj",)).set_index("Kraj")
+    from_sql, from_frame = from_sql.sort_index(), from_frame.sort_index()
+    np.testing.assert_array_equal(from_sql["Liczność"], from_frame["Liczność"])
+    for target in TARGETS:
+        np.testing.assert_allclose(from_sql[(target, "mean")], from_frame[(target, "mean")], rtol=1e-10)
+        np.testing.assert_allclose(from_sql[(target, "var")], from_frame[(target, "var")], rtol=1e-6)
+
+
+def test_requires_group_columns(sales):
+    with pytest.raises(ValueError):
+        BiasCube.from_frame(sales, [], TARGETS)
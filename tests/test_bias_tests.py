@@ -0,0 +1,75 @@
+# tests/test_bias_tests.py
+import sqlite3
+
+import numpy as np
+import pandas as pd
+import pytest
+from scipy.stats import f_oneway, kruskal
+
+from classes.ai_compliance import AIComplianceAnalyzer
+from classes.bias_tests import anova_from_statistics, chi_square_shares, kruskal_from_rank_sums
+from classes.sql_pushdown import SQLAIComplianceAnalyzer
+
+
+@pytest.fixture
+def sales():
+    rng = np.random.default_rng(1)
+    n = 3_000
+    df = pd.DataFrame({
+        "Kanał": rng.choice(["Sklep", "Online", "Telefon", "Katalog"], n, p=[0.4, 0.3, 0.2, 0.1]),
+        "Cena": rng.gamma(2.0, 300.0, n),
+        # Wartości całkowite z wieloma remisami
+        "Rabat": rng.integers(0, 10, n).astype(float),
+    })
+    df.loc[df["Kanał"] == "Online", "Cena"] *= 1.1
+    df.loc[rng.choice(n, 100, replace=False), "Cena"] = np.nan
+    df.loc[rng.choice(n, 40, replace=False), "Kanał"] = None
+    return df
+
+
+def _samples(df, group_col, target):
+    valid = df.dropna(subset=[group_col, target])
+    return [values.to_numpy() for _, values in valid.groupby(group_col, sort=True)[target]]
+
+
+@pytest.mark.parametrize("target", ["Cena", "Rabat"])
+def test_anova_matches_scipy(sales, target):
+    _, stats = AIComplianceAnalyzer(sales).group_statistics("Kanał", [target])
+    f_stat, p_value = anova_from_statistics(stats[(target, "count")], stats[(target, "mean")], stats[(target, "var")])
+    expected = f_oneway(*_samples(sales, "Kanał", target))
+    assert f_stat == pytest.approx(expected.statistic, rel=1e-9)
+    assert p_value == pytest.approx(expected.pvalue, rel=1e-6, abs=1e-300)
+
+
+@pytest.mark.parametrize("target", ["Cena", "Rabat"])
+def test_kruskal_matches_scipy(sales, target):
+    analyzer = AIComplianceAnalyzer(sales)
+    _, stats = analyzer.group_statistics("Kanał", [target])
+    rank_sums, ties = analyzer.rank_statistics("Kanał", [target])
+    h_stat, p_value = kruskal_from_rank_sums(stats[(target, "count")], rank_sums[target], ties[target])
+    expected = kruskal(*_samples(sales, "Kanał", target))
+    assert h_stat == pytest.approx(expected.statistic, rel=1e-9)
+    assert p_value == pytest.approx(expected.pvalue, rel=1e-6, abs=1e-300)
+
+
+def test_sql_rank_statistics_match_pandas(sales):
+    conn = sqlite3.connect(":memory:")
+    sales.to_sql("Sprzedaz", conn, index=False)
+    targets = ["Cena", "Rabat"]
+    expected_sums, expected_ties = AIComplianceAnalyzer(sales).rank_statistics("Kanał", targets)
+    rank_sums, ties = SQLAIComplianceAnalyzer(conn, "Sprzedaz").rank_statistics("Kanał", targets)
+    pd.testing.assert_frame_equal(rank_sums, expected_sums, check_exact=False, rtol=1e-12)
+    pd.testing.assert_series_equal(ties, expected_ties)
+
+
+def test_degenerate_groups():
+    assert np.isnan(anova_from_statistics([5], [1.0], [2.0])[0])
+    assert np.isnan(kruskal_from_rank_sums([5], [15.0], 0.0)[0])
+    # Brak zmienności wewnątrz grup przy różnych średnich
+    assert anova_from_statistics([3, 3], [1.0, 2.0], [0.0, 0.0]) == (np.inf, 0.0)
+
+
+def test_chi_square_shares():
+    statistic, p_value = chi_square_shares([50, 50, 50])
+    assert statistic == 0 and p_value == pytest.approx(1.0)
+    assert chi_square_shares([90, 10])[1] < 1e-10
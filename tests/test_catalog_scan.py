@@ -0,0 +1,88 @@
+# tests/test_catalog_scan.py
+import sqlite3
+
+import pandas as pd
+import pytest
+
+from classes.catalog_scan import sample_table, scan_catalog
+from classes.pii_scan import classify_column_names
+from classes.result_cache import ResultCache
+
+HIGH, MEDIUM, LOW = "🚨 Wysokie", "⚠️ Średnie", "✅ Niskie"
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    path = tmp_path / "catalog.db"
+    conn = sqlite3.connect(path)
+    n = 500
+    pd.DataFrame({
+        "DATEKEY": range(n),
+        "MONTHNAME": ["Styczeń", "Luty"] * (n // 2),
+        "DAYNAMEOFWEEK": ["Poniedziałek"] * n,
+    }).to_sql("DimDate", conn, index=False)
+    pd.DataFrame({"GEOGRAPHYKEY": range(n), "CITYNAME": ["Kraków"] * n, "COUNTRYNAME": ["Polska"] * n}).to_sql(
+        "DimGeography", conn, index=False)
+    pd.DataFrame({"ORDERKEY": range(n), "SHIPDATEKEY": range(n), "QUANTITY": [1] * n}).to_sql(
+        "FactOnlineSales", conn, index=False)
+    pd.DataFrame({"CUSTOMERKEY": range(n), "FIRSTNAME": ["Jan"] * n, "LASTNAME": ["Nowak"] * n}).to_sql(
+        "DimCustomer", conn, index=False)
+    # Dane osobowe wykrywane wyłącznie po zawartości
+    pd.DataFrame({"Key": range(n), "Contact": [f"klient{i}@example.com" for i in range(n)]}).to_sql(
+        "Contacts", conn, index=False)
+    pd.DataFrame({"SessionId": range(n), "Score": [0.5] * n}).to_sql("Scores", conn, index=False)
+    conn.commit()
+    conn.close()
+    return str(path)
+
+
+def _levels(result):
+    return {row["Tabela"]: row["Poziom ryzyka"].split(" -")[0] for _, row in result["Tabele"].iterrows()}
+
+
+def test_name_rules_use_whole_words():
+    personal, sensitive = classify_column_names(["SHIPDATEKEY", "MONTHNAME", "CITYNAME", "FIRSTNAME",
+                                                 "ClientIP", "CustomerName", "ProductName"], by_tokens=True)
+    assert personal == ["FIRSTNAME", "ClientIP", "CustomerName"]
+    assert sensitive == []
+    # Kolumny spłaszczonej tabeli - reguły fragmentów nazw bez zmian
+    assert "SHIPDATEKEY" in classify_column_names(["SHIPDATEKEY"])[0]
+
+
+def test_catalog_risk_levels(db_path):
+    result = scan_catalog(db_path, max_workers=1)
+    assert _levels(result) == {
+        "Contacts": HIGH,
+        "DimCustomer": HIGH,
+        "DimDate": LOW,
+        "DimGeography": LOW,
+        "FactOnlineSales": LOW,
+        "Scores": MEDIUM,
+    }
+    columns = result["Kolumny"].set_index(["Tabela", "Kolumna"])
+    assert columns.loc[("Contacts", "Contact"), "Wykryte typy"] == "E-mail"
+    assert columns.loc[("Contacts", "Contact"), "Dane osobowe"]
+    assert not columns.loc[("FactOnlineSales", "SHIPDATEKEY"), "Dane osobowe"]
+
+
+def test_catalog_cache(db_path, tmp_path):
+    cache = ResultCache(str(tmp_path / "cache"))
+    first = scan_catalog(db_path, cache=cache)
+    assert not first["Tabele"]["Z pamięci podręcznej"].any()
+    assert scan_catalog(db_path, cache=cache)["Tabele"]["Z pamięci podręcznej"].all()
+
+    with sqlite3.connect(db_path) as conn:
+        conn.execute("INSERT INTO Scores VALUES (1000, 0.1)")
+    conn.close()
+    third = scan_catalog(db_path, cache=cache)["Tabele"].set_index("Tabela")
+    assert not third.loc["Scores", "Z pamięci podręcznej"]
+    assert third.loc["Scores", "Wiersze"] == 501
+    assert third.drop(index="Scores")["Z pamięci podręcznej"].all()
+
+
+def test_sample_table_limits(db_path):
+    conn = sqlite3.connect(db_path)
+    sample = sample_table(conn, "Contacts", ["Key", "Contact"], rows=500, sample_rows=100, seed=0)
+    assert len(sample) == 100 and sample["Key"].is_unique
+    assert len(sample_table(conn, "Contacts", ["Key"], rows=500, sample_rows=1_000)) == 500
+    conn.close()
@@ -0,0 +1,82 @@
+# tests/test_data_loader.py
+import sqlite3
+
+import pandas as pd
+import pytest
+
+from classes.data_loader import get_load_meta, load_data, upsert_data
+
+FACT_COLUMNS = ["ORDERKEY", "ORDERLINENUMBER", "ORDERDATEKEY", "SHIPDATEKEY", "CUSTOMERKEY", "PRODUCTKEY",
+                "SALESTERRITORYKEY", "CHANNELKEY", "PAYMENTMETHODKEY", "DELIVERYMETHODKEY", "QUANTITY",
+                "CATALOGPRICE", "DISCOUNTAMOUNT", "DISCOUNTPCTG", "TRANSACTIONPRICE", "DELIVERYCOST", "PRODUCTCOST"]
+
+
+def _fact_row(order, line, quantity, date=20240101):
+    return [order, line, date, date + 2, 1, 1, 1, 1, 1, 1, quantity, "10,5", "0,5", "0,05", "10", "1,25", "6"]
+
+
+def _write_facts(path, rows):
+    pd.DataFrame(rows, columns=FACT_COLUMNS).to_csv(path, sep=";", index=False)
+    return str(path)
+
+
+def _facts(conn):
+    return dict(((order, line), quantity) for order, line, quantity in conn.execute(
+        "SELECT OrderKey, OrderLineNumber, Quantity FROM FactOnlineSales"))
+
+
+@pytest.fixture
+def conn():
+    conn = sqlite3.connect(":memory:")
+    yield conn
+    conn.close()
+
+
+def test_upsert_repeated_keys_within_file(conn, tmp_path):
+    rows = [_fact_row(1, 1, 1), _fact_row(1, 2, 1), _fact_row(1, 1, 2), _fact_row(2, 1, 1),
+            _fact_row(1, 1, 3), _fact_row(2, 1, 5), _fact_row(3, 1, 1)]
+    # Porcje po 3 wiersze: powtórzenia w tej samej porcji i w kolejnych porcjach
+    stats = upsert_data(_write_facts(tmp_path / "facts.csv", rows), "FactOnlineSales", conn, chunksize=3)
+
+    assert _facts(conn) == {(1, 1): 3, (1, 2): 1, (2, 1): 5, (3, 1): 1}
+    assert stats["inserted"] == 4
+    assert stats["updated"] >= 0
+    assert stats["inserted"] + stats["updated"] + stats["unchanged"] + stats["duplicate_keys"] == len(rows)
+    assert get_load_meta(conn)["FactOnlineSales"]["rows"] == 4
+
+
+def test_upsert_twice(conn, tmp_path):
+    first = [_fact_row(1, 1, 1), _fact_row(1, 2, 1), _fact_row(1, 1, 2), _fact_row(2, 1, 1)]
+    upsert_data(_write_facts(tmp_path / "first.csv", first), "FactOnlineSales", conn, chunksize=10)
+
+    second = [_fact_row(1, 1, 2), _fact_row(1, 2, 7), _fact_row(4, 1, 1), _fact_row(4, 1, 9), _fact_row(5, 1, 1)]
+    stats = upsert_data(_write_facts(tmp_path / "second.csv", second), "FactOnlineSales", conn, chunksize=10)
+
+    assert _facts(conn) == {(1, 1): 2, (1, 2): 7, (2, 1): 1, (4, 1): 9, (5, 1): 1}
+    assert (stats["inserted"], stats["updated"], stats["unchanged"], stats["duplicate_keys"]) == (2, 1, 1, 1)
+    meta = get_load_meta(conn)["FactOnlineSales"]
+    assert meta["rows"] == conn.execute("SELECT COUNT(*) FROM FactOnlineSales").fetchone()[0] == 5
+    assert meta["mode"] == "upsert" and meta["version"] == 2
+
+
+def test_upsert_null_keys_and_watermark(conn, tmp_path):
+    first = [_fact_row(1, 1, 1, date=20240101), _fact_row(2, 1, 1, date=20240105)]
+    upsert_data(_write_facts(tmp_path / "first.csv", first), "FactOnlineSales", conn)
+    assert get_load_meta(conn)["FactOnlineSales"]["watermark"] == 20240105
+
+    second = [_fact_row(1, 1, 5, date=20240101), _fact_row(3, 1, 1, date=20240106)]
+    stats = upsert_data(_write_facts(tmp_path / "second.csv", second), "FactOnlineSales", conn,
+                        since_watermark=True)
+    assert (stats["skipped"], stats["inserted"]) == (1, 1)
+    assert _facts(conn)[(1, 1)] == 1
+
+
+def test_replace_load_skips_duplicate_dimension_keys(conn, tmp_path):
+    path = tmp_path / "DimPaymentMethod.csv"
+    path.write_text("PaymentMethodKey;PaymentMethodName\n1;PayPal\n2;Karta\n1;Gotówka\n", encoding="utf-8")
+    load_data(str(path), "DimPaymentMethod", conn)
+
+    assert conn.execute("SELECT PaymentMethodKey, PaymentMethodName FROM DimPaymentMethod "
+                        "ORDER BY 1").fetchall() == [(1, "PayPal"), (2, "Karta")]
+    meta = get_load_meta(conn)["DimPaymentMethod"]
+    assert (meta["rows"], meta["duplicate_keys"], meta["mode"]) == (2, 1, "replace")
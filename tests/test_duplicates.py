@@ -0,0 +1,92 @@
+# tests/test_duplicates.py
+import numpy as np
+import pandas as pd
+import pytest
+
+from classes.duplicates import DuplicateDetector, example_rows, exact_duplicates, find_duplicates
+
+# Tryb dokładny w pamięci, tryb dokładny z partycjami na dysku i filtr Blooma
+MODES = {
+    "exact": {"mode": "exact"},
+    "spill": {"mode": "exact", "memory_rows": 700, "partitions": 8},
+    "bloom": {"mode": "approx", "capacity": 20_000, "error_rate": 0.001},
+}
+
+
+@pytest.fixture
+def df():
+    rng = np.random.default_rng(5)
+    n = 6_000
+    df = pd.DataFrame({
+        "ORDERKEY": rng.integers(0, 2_500, n),
+        "ORDERLINENUMBER": rng.integers(1, 3, n),
+        "Cena": rng.choice([1.5, 2.0, 3.25, np.nan], n),
+        "Kanał": rng.choice(["Sklep", "Online", None], n),
+    })
+    return df
+
+
+def _chunks(df, size=1_000):
+    return [df.iloc[i:i + size] for i in range(0, len(df), size)]
+
+
+def _earliest_groups(df, subset, limit):
+    group_ids = df.groupby(subset or list(df.columns), dropna=False, sort=False).ngroup().to_numpy()
+    counts = np.bincount(group_ids)
+    return [np.flatnonzero(group_ids == g).tolist() for g in np.flatnonzero(counts > 1)[:limit]]
+
+
+@pytest.mark.parametrize("mode", list(MODES))
+@pytest.mark.parametrize("subset", [None, ["ORDERKEY", "ORDERLINENUMBER"], ["Cena", "Kanał"]])
+def test_matches_duplicated(df, mode, subset):
+    expected = int(df.duplicated(subset=subset).sum())
+    result = find_duplicates(_chunks(df), subset=subset, max_examples=5, **MODES[mode])
+
+    if mode == "bloom":
+        # Filtr Blooma nie gubi duplikatów, może jedynie zawyżyć wynik o fałszywe trafienia
+        unique = len(df) - expected
+        assert expected <= result["num_duplicates"] <= expected + max(5, 3 * 0.001 * unique)
+        assert result["duplicate_groups"] is None
+        return
+    assert result["num_duplicates"] == expected
+    assert result["percent_duplicates"] == pytest.approx(expected / len(df) * 100)
+    groups = _earliest_groups(df, subset, 5)
+    assert result["example_groups"] == groups
+    assert result["example_sizes"] == [len(g) for g in groups]
+    assert exact_duplicates(df, subset=subset) == result
+
+
+@pytest.mark.parametrize("mode", list(MODES))
+def test_int_and_float_across_chunks(mode):
+    first = pd.DataFrame({"a": np.array([1, 2, 3], dtype=np.int64), "b": ["x", None, "z"]})
+    second = pd.DataFrame({"a": [1.0, 2.0, np.nan], "b": ["x", None, "z"]})
+    third = pd.DataFrame({"a": [np.nan, -0.0], "b": ["z", "y"]})
+    expected = pd.concat([first, second, third], ignore_index=True)
+
+    result = find_duplicates([first, second, third], **MODES[mode])
+    assert result["num_duplicates"] == int(expected.duplicated().sum()) == 3
+    if mode != "bloom":
+        assert result["example_groups"] == [[0, 3], [1, 4], [5, 6]]
+
+
+def test_spill_writes_partitions(df, tmp_path):
+    detector = DuplicateDetector(memory_rows=700, partitions=8, spill_dir=str(tmp_path))
+    for chunk in _chunks(df):
+        detector.update(chunk)
+    assert len(list(tmp_path.iterdir())) == 1
+    assert detector.result()["num_duplicates"] == int(df.duplicated().sum())
+    # Pliki partycji są usuwane po policzeniu wyniku
+    assert not list(tmp_path.iterdir())
+
+
+def test_example_rows(df):
+    result = find_duplicates(_chunks(df), subset=["ORDERKEY", "ORDERLINENUMBER"], max_examples=3)
+    rows = example_rows(_chunks(df, 250), result["example_groups"], max_rows_per_group=2)
+    assert rows["Grupa"].tolist() == [1, 1, 2, 2, 3, 3]
+    expected = [row for group in result["example_groups"] for row in group[:2]]
+    pd.testing.assert_frame_equal(rows.drop(columns="Grupa"), df.iloc[expected])
+
+
+def test_rejects_unknown_mode():
+    with pytest.raises(ValueError):
+        DuplicateDetector(mode="bloom")
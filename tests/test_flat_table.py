@@ -0,0 +1,82 @@
+# tests/test_flat_table.py
+import sqlite3
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+from classes.data_loader import load_data, upsert_data
+from classes.flat_table import (
+    DROPPED_FACT_COLUMNS, FACT_TABLE, FLAT_JOINS, FLAT_QUERY, flat_state, get_flat_fact_table, refresh_flat_table,
+)
+
+DATA_DIR = Path(__file__).resolve().parent.parent / "data"
+
+FACT_COLUMNS = ["ORDERKEY", "ORDERLINENUMBER", "ORDERDATEKEY", "SHIPDATEKEY", "CUSTOMERKEY", "PRODUCTKEY",
+                "SALESTERRITORYKEY", "CHANNELKEY", "PAYMENTMETHODKEY", "DELIVERYMETHODKEY", "QUANTITY",
+                "CATALOGPRICE", "DISCOUNTAMOUNT", "DISCOUNTPCTG", "TRANSACTIONPRICE", "DELIVERYCOST", "PRODUCTCOST"]
+
+
+def _fact_row(order, line, payment=1, channel=1, quantity=2):
+    return [order, line, 20240101, 20240103, 11264, 1, 1, channel, payment, 1, quantity,
+            "10,5", "0,5", "0,05", "10", "1,25", "6"]
+
+
+def _write_facts(path, rows):
+    pd.DataFrame(rows, columns=FACT_COLUMNS).to_csv(path, sep=";", index=False)
+    return str(path)
+
+
+def _expected(conn):
+    # Pierwotne zapytanie spłaszczające bez kolumn kluczy i kolumn zastąpionych wyliczeniami
+    df = pd.read_sql(FLAT_QUERY, conn)
+    return df[[c for c in df.columns if "key" not in c.lower() and c.upper() not in DROPPED_FACT_COLUMNS]]
+
+
+def _assert_matches_join(conn):
+    pd.testing.assert_frame_equal(get_flat_fact_table(conn), _expected(conn), check_dtype=False)
+
+
+@pytest.fixture
+def conn(tmp_path):
+    conn = sqlite3.connect(":memory:")
+    csv_files = {path.stem.lower(): path for path in DATA_DIR.glob("*.csv")}
+    for _, table, _, _, _ in FLAT_JOINS:
+        load_data(str(csv_files[table.lower()]), table, conn)
+    # Ostatni wiersz ma klucz metody płatności spoza wymiaru (LEFT JOIN daje NULL)
+    rows = [_fact_row(1, 1), _fact_row(1, 2, payment=2, channel=2), _fact_row(2, 1, quantity=5),
+            _fact_row(3, 1, payment=99)]
+    load_data(_write_facts(tmp_path / "facts.csv", rows), FACT_TABLE, conn)
+    yield conn
+    conn.close()
+
+
+def test_full_load_matches_join(conn):
+    _assert_matches_join(conn)
+    flat = get_flat_fact_table(conn)
+    assert len(flat) == 4 and flat["PaymentMethodName"].isna().tolist() == [False, False, False, True]
+    assert flat["TotalTransactionPrice"].tolist() == [20.0, 20.0, 50.0, 20.0]
+
+
+def test_dimension_upsert_matches_join(conn, tmp_path):
+    _assert_matches_join(conn)
+    path = tmp_path / "DimPaymentMethod.csv"
+    path.write_text("PaymentMethodKey;PaymentMethodName\n1;Karta\n", encoding="utf-8")
+    upsert_data(str(path), "DimPaymentMethod", conn)
+
+    assert refresh_flat_table(conn) == {"mode": "incremental", "fact_rows": 0, "dimensions": ["DimPaymentMethod"]}
+    _assert_matches_join(conn)
+    assert get_flat_fact_table(conn)["PaymentMethodName"].tolist()[:3] == ["Karta", "Bank wire transfer", "Karta"]
+    # Kolejne odświeżenie bez zmian w źródłach nic nie przelicza
+    assert refresh_flat_table(conn)["mode"] == "none"
+
+
+def test_fact_upsert_matches_join(conn, tmp_path):
+    _assert_matches_join(conn)
+    rows = [_fact_row(2, 1, quantity=7), _fact_row(4, 1, payment=2)]
+    upsert_data(_write_facts(tmp_path / "facts2.csv", rows), FACT_TABLE, conn)
+
+    assert flat_state(conn)["pending"] == 2
+    assert refresh_flat_table(conn)["mode"] == "incremental"
+    _assert_matches_join(conn)
+    assert len(get_flat_fact_table(conn)) == 5
@@ -0,0 +1,119 @@
+# tests/test_lineage.py
+import numpy as np
+import pandas as pd
+import pytest
+
+from classes.data_quality import DataQualityAnalyzer
+from classes.flat_table import COMPUTED_COLUMNS, FACT_TABLE, FLAT_JOINS, FLAT_QUERY
+from classes.lineage import LineageResults, merge_column_reports, parse_flat_query
+from classes.result_cache import ResultCache
+
+
+@pytest.fixture
+def graph():
+    return parse_flat_query(FLAT_QUERY)
+
+
+def test_flat_query_tables(graph):
+    assert graph.fact_table == FACT_TABLE
+    assert graph.wildcard == FACT_TABLE
+    assert graph.joins == {table: (fact_key, dim_key) for _, table, fact_key, dim_key, _ in FLAT_JOINS}
+
+
+def test_flat_query_columns(graph):
+    expected = [name for name, _ in COMPUTED_COLUMNS] + [name for *_, columns in FLAT_JOINS for name, _ in columns]
+    assert list(graph.columns) == expected
+
+
+def test_dimension_column(graph):
+    info = graph.column("PaymentMethodName")
+    assert info["refs"] == [("DimPaymentMethod", "PaymentMethodName")]
+    assert info["keys"] == [(FACT_TABLE, "PAYMENTMETHODKEY")]
+    assert graph.sources("PaymentMethodName") == ("DimPaymentMethod", FACT_TABLE)
+    assert graph.describe("PaymentMethodName") == ("DimPaymentMethod", "join przez PaymentMethodKey")
+
+
+def test_computed_columns(graph):
+    info = graph.column("CustomerName")
+    assert info["refs"] == [("DimCustomer", "FIRSTNAME"), ("DimCustomer", "LASTNAME")]
+    assert graph.describe("CustomerName")[1].startswith("join przez CUSTOMERKEY + przekształcenie")
+    assert graph.column("TotalTransactionPrice")["refs"] == [(FACT_TABLE, "TRANSACTIONPRICE"), (FACT_TABLE, "QUANTITY")]
+    assert graph.describe("TotalTransactionPrice") == (FACT_TABLE, "wyliczona (TRANSACTIONPRICE * QUANTITY)")
+
+
+def test_fact_columns_from_wildcard(graph):
+    # Kolumny faktów nie są wymienione w zapytaniu (F.*)
+    assert graph.sources("DISCOUNTPCTG") == (FACT_TABLE,)
+    assert graph.describe("DISCOUNTPCTG") == (FACT_TABLE, "oryginalna")
+    assert "ProductName" in graph.dependents("DimProduct")
+    assert "ProductName" not in graph.dependents("DimCustomer")
+
+
+def test_rejects_other_queries():
+    with pytest.raises(ValueError):
+        parse_flat_query("UPDATE FactOnlineSales SET QUANTITY = 1")
+
+
+@pytest.fixture
+def flat():
+    rng = np.random.default_rng(2)
+    n = 1_500
+    df = pd.DataFrame({
+        "DISCOUNTPCTG": rng.integers(0, 40, n).astype(float),
+        "TotalTransactionPrice": rng.lognormal(6, 1, n),
+        "ProductName": rng.choice(["Laptop", "Telefon", "Monitor"], n),
+        "CustomerName": rng.choice([f"Klient {i}" for i in range(50)], n),
+        "PaymentMethodName": pd.Categorical(rng.choice(["Karta", "BLIK"], n)),
+        "COUNTRYNAME": rng.choice(["Polska", "Niemcy"], n),
+        "DATEKEY": pd.date_range("2024-01-01", periods=n, freq="h"),
+    })
+    df.loc[rng.choice(n, 60, replace=False), "TotalTransactionPrice"] = np.nan
+    df.loc[rng.choice(n, 30, replace=False), "ProductName"] = None
+    df.iloc[-10:] = df.iloc[:10].to_numpy()
+    return df
+
+
+def _assert_reports_equal(actual, expected):
+    pd.testing.assert_series_equal(actual['missing_values']['missing_per_column_%'],
+                                   expected['missing_values']['missing_per_column_%'])
+    assert actual['missing_values']['percent_missing_total'] == pytest.approx(
+        expected['missing_values']['percent_missing_total'])
+    assert actual['outliers']['outliers_per_column'] == expected['outliers']['outliers_per_column']
+    assert actual['outliers']['percent_outliers_total'] == pytest.approx(expected['outliers']['percent_outliers_total'])
+    pd.testing.assert_frame_equal(actual['basic_stats'], expected['basic_stats'])
+    assert list(actual['distributions']) == list(expected['distributions'])
+    for col, dist in expected['distributions'].items():
+        for a, b in zip(actual['distributions'][col], dist):
+            np.testing.assert_array_equal(a, b)
+
+
+@pytest.mark.parametrize("fused", [True, False])
+def test_merged_report_matches_generate_report(graph, flat, fused):
+    analyzer = DataQualityAnalyzer(flat)
+    groups = {}
+    for col in flat.columns:
+        groups.setdefault(graph.sources(col), []).append(col)
+    assert len(groups) > 1
+    parts = [DataQualityAnalyzer(flat[cols]).column_report(fused=fused) for cols in groups.values()]
+    merged = merge_column_reports(parts, list(flat.columns))
+    _assert_reports_equal(merged, analyzer.generate_report(fused=fused, with_type_conformance=False))
+
+
+def test_quality_report_from_cache(flat, tmp_path):
+    analyzer = DataQualityAnalyzer(flat)
+    fingerprints = {col: f"v1:{col}" for col in flat.columns}
+    results = LineageResults(ResultCache(str(tmp_path)), fingerprints)
+    expected = analyzer.generate_report(with_type_conformance=False)
+    first = results.quality_report(analyzer)
+    _assert_reports_equal(first, expected)
+    for key, value in expected['duplicates'].items():
+        if isinstance(value, pd.DataFrame):
+            pd.testing.assert_frame_equal(first['duplicates'][key], value)
+        else:
+            assert first['duplicates'][key] == value
+
+    # Zmiana wersji jednego wymiaru przelicza tylko grupę jego kolumn
+    results = LineageResults(results.cache, {**fingerprints, "PaymentMethodName": "v2"})
+    second = results.quality_report(analyzer)
+    _assert_reports_equal(second, expected)
+    assert [columns for name, columns in results.misses if name == "column_report"] == [("PaymentMethodName",)]
@@ -0,0 +1,85 @@
+# tests/test_model_training.py
+import numpy as np
+import pandas as pd
+import pytest
+
+from classes.model_training import SparseFeatureEncoder, stratified_order, train_sgd_classifier
+
+
+@pytest.fixture
+def frame():
+    return pd.DataFrame({
+        "Cena": [10.0, 20.0, np.nan, 30.0],
+        "Kanał": ["Sklep", "Online", None, "Sklep"],
+        "Klient": ["a", "b", "c", "d"],
+    })
+
+
+def test_encoder_layout(frame):
+    encoder = SparseFeatureEncoder(max_onehot=2, hash_features=8).fit(frame)
+    assert encoder.numeric == ["Cena"]
+    assert list(encoder.categories) == ["Kanał"]
+    assert encoder.hashed == ["Klient"]
+    assert encoder.n_features == 1 + 2 + 8
+
+    dense = encoder.transform(frame).toarray()
+    # Standaryzacja; brak = średnia (0)
+    np.testing.assert_allclose(dense[:, 0], [-1.224744871, 0.0, 0.0, 1.224744871])
+    np.testing.assert_array_equal(dense[:, 1:3], [[1, 0], [0, 1], [0, 0], [1, 0]])
+    # Każda wartość haszowanej kolumny aktywuje dokładnie jeden kubełek
+    np.testing.assert_array_equal(dense[:, 3:].sum(axis=1), [1, 1, 1, 1])
+
+
+def test_encoder_unseen_values(frame):
+    encoder = SparseFeatureEncoder(max_onehot=2, hash_features=8).fit(frame)
+    new = pd.DataFrame({"Cena": [20.0], "Kanał": ["Telefon"], "Klient": ["zzz"]})
+    dense = encoder.transform(new).toarray()
+    # Nieznana kategoria one-hot jak brak, nieznana wartość haszowana - do swojego kubełka
+    assert dense[0, 1:3].sum() == 0
+    assert dense[0, 3:].sum() == 1
+    repeated = encoder.transform(pd.concat([new, frame.iloc[[1]]], ignore_index=True)).toarray()
+    np.testing.assert_array_equal(repeated[0], dense[0])
+
+
+def test_encoder_categorical_dtype_matches_object(frame):
+    encoder = SparseFeatureEncoder(max_onehot=2, hash_features=8).fit(frame)
+    categorical = frame.astype({"Kanał": "category", "Klient": "category"})
+    np.testing.assert_array_equal(encoder.transform(categorical).toarray(), encoder.transform(frame).toarray())
+    # Druga porcja z innym zestawem kategorii
+    part = categorical.iloc[[3, 0]].copy()
+    part["Klient"] = part["Klient"].cat.remove_unused_categories()
+    np.testing.assert_array_equal(encoder.transform(part).toarray(), encoder.transform(frame.iloc[[3, 0]]).toarray())
+
+
+def test_stratified_order_prefixes():
+    rng = np.random.default_rng(0)
+    y = rng.choice(3, 10_000, p=[0.6, 0.3, 0.1])
+    order = stratified_order(y, seed=1)
+    assert np.array_equal(np.sort(order), np.arange(len(y)))
+    shares = np.bincount(y) / len(y)
+    for size in (100, 1_000, 5_000):
+        prefix = np.bincount(y[order[:size]], minlength=3) / size
+        np.testing.assert_allclose(prefix, shares, atol=2 / size + 1e-9)
+    assert np.array_equal(stratified_order(y, seed=1), order)
+
+
+def test_sgd_without_signal_is_not_below_majority():
+    rng = np.random.default_rng(2)
+    n = 20_000
+    X = pd.DataFrame({"x": rng.normal(size=n), "k": rng.choice(list("abcde"), n)})
+    y = rng.choice(2, n, p=[0.56, 0.44])
+    _, y_test, y_pred, convergence, converged = train_sgd_classifier(X, y, 2, batch_rows=1_000)
+    majority = np.bincount(y_test).max() / len(y_test)
+    assert (y_pred == y_test).mean() >= majority - 0.01
+    assert "Dokładność walidacyjna" in convergence.columns
+    assert len(y_test) == round(n * 0.3)
+
+
+def test_sgd_learns_signal():
+    rng = np.random.default_rng(3)
+    n = 20_000
+    X = pd.DataFrame({"x": rng.normal(size=n), "k": rng.choice(list("abcde"), n)})
+    y = ((X["x"] > 0) ^ (X["k"] == "a")).astype(int).to_numpy()
+    _, y_test, y_pred, _, converged = train_sgd_classifier(X, y, 2, batch_rows=1_000)
+    assert (y_pred == y_test).mean() > 0.75
+    assert converged
@@ -0,0 +1,89 @@
+# tests/test_pii_scan.py
+import sqlite3
+
+import pandas as pd
+import pytest
+
+from classes.pii_scan import PII_TYPES, scan_column, scan_values
+from classes.sql_pushdown import SQLAIComplianceAnalyzer
+
+
+def _found(value):
+    mask = scan_values(pd.Series([value], dtype=object))[0]
+    return {kind for bit, kind in enumerate(PII_TYPES) if mask & (1 << bit)}
+
+
+@pytest.mark.parametrize("value", [
+    "44051401359",
+    "02270803624",          # urodzeni po 2000 r. (miesiąc + 20)
+    "PESEL: 44051401359.",
+])
+def test_valid_pesel(value):
+    assert _found(value) == {"pesel"}
+
+
+@pytest.mark.parametrize("value", [
+    "44051401358",          # zła cyfra kontrolna
+    "44135001358",          # miesiąc 13
+    "44050001352",          # dzień 00
+    "440514013590",         # 12 cyfr
+])
+def test_invalid_pesel(value):
+    assert "pesel" not in _found(value)
+
+
+@pytest.mark.parametrize("value", ["1234563218", "123-456-32-18", "123-45-63-218", "PL1234563218", "PL 1234563218"])
+def test_valid_nip(value):
+    assert _found(value) == {"nip"}
+
+
+@pytest.mark.parametrize("value", ["1234563219", "123-456-32-19", "PL1234563210"])
+def test_invalid_nip(value):
+    assert "nip" not in _found(value)
+
+
+@pytest.mark.parametrize("value", [
+    "PL61109010140000071219812874",
+    "PL61 1090 1014 0000 0712 1981 2874",
+    "61109010140000071219812874",          # NRB bez kodu kraju
+    "61 1090 1014 0000 0712 1981 2874",
+    "DE89370400440532013000",
+    "GB82 WEST 1234 5698 7654 32",
+])
+def test_valid_iban(value):
+    assert _found(value) == {"iban"}
+
+
+@pytest.mark.parametrize("value", [
+    "PL61109010140000071219812875",
+    "61 1090 1014 0000 0712 1981 2875",
+    "DE89370400440532013001",
+])
+def test_invalid_iban(value):
+    assert "iban" not in _found(value)
+
+
+def test_mixed_values():
+    values = pd.Series(["jan.kowalski@example.com", "192.168.0.1", "+48 601 234 567",
+                        "Zamówienie 1234", None, "44051401359 / 1234563218"], dtype=object)
+    masks = scan_values(values.astype(str))
+    kinds = [{kind for bit, kind in enumerate(PII_TYPES) if mask & (1 << bit)} for mask in masks]
+    assert kinds == [{"email"}, {"ip"}, {"phone"}, set(), set(), {"pesel", "nip"}]
+
+
+def test_scan_column_rates():
+    values = pd.Series(["44051401359"] * 30 + ["44051401358"] * 30 + ["brak"] * 40)
+    result = scan_column(values, min_rate=0.01, batch_rows=1_000)
+    assert result["Przeskanowane wiersze"] == 100
+    assert result["Unikalne wartości"] == 3
+    assert result["Udział PESEL"] == 0.3
+    assert result["Udział NIP"] == 0
+
+
+def test_sql_samples_are_distinct_rows():
+    conn = sqlite3.connect(":memory:")
+    pd.DataFrame({"Id": range(10_000), "Email": [f"u{i}@example.com" for i in range(10_000)]}).to_sql("T", conn, index=False)
+    samples = SQLAIComplianceAnalyzer(conn, "T").pii_samples(["Id", "Email"], sample_rows=500)
+    assert 0 < len(samples["Id"]) <= 500
+    assert samples["Id"].is_unique
+    assert (samples["Email"] == "u" + samples["Id"].astype(str) + "@example.com").all()
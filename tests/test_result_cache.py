@@ -0,0 +1,134 @@
+# tests/test_result_cache.py
+import io
+import sqlite3
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from classes.ai_compliance import AIComplianceAnalyzer
+from classes.data_loader import load_data, upsert_data
+from classes.data_quality import DataQualityAnalyzer
+from classes.flat_table import FACT_TABLE, FLAT_JOINS, FLAT_TABLE, refresh_flat_table
+from classes.result_cache import ResultCache, db_fingerprint, decode_result, encode_result
+
+DATA_DIR = Path(__file__).resolve().parent.parent / "data"
+
+
+@pytest.fixture
+def df():
+    rng = np.random.default_rng(7)
+    n = 2_000
+    df = pd.DataFrame({
+        "DISCOUNTPCTG": rng.integers(0, 40, n).astype(float),
+        "TotalTransactionPrice": rng.lognormal(6, 1, n),
+        "ProductName": rng.choice(["Laptop", "Telefon", "Monitor"], n),
+        "PaymentMethodName": pd.Categorical(rng.choice(["Karta", "BLIK", "PayPal"], n)),
+        "COUNTRYNAME": rng.choice(["Polska", "Niemcy"], n),
+    })
+    df.loc[rng.choice(n, 80, replace=False), "TotalTransactionPrice"] = np.nan
+    df.loc[rng.choice(n, 40, replace=False), "ProductName"] = None
+    df.iloc[-10:] = df.iloc[:10].to_numpy()
+    return df
+
+
+def _assert_same(actual, expected, path="wynik"):
+    if isinstance(expected, pd.DataFrame):
+        pd.testing.assert_frame_equal(actual, expected, obj=path)
+    elif isinstance(expected, pd.Series):
+        pd.testing.assert_series_equal(actual, expected, obj=path)
+    elif isinstance(expected, np.ndarray):
+        assert isinstance(actual, np.ndarray) and actual.dtype == expected.dtype, path
+        np.testing.assert_array_equal(actual, expected, err_msg=path)
+    elif isinstance(expected, io.BytesIO):
+        assert actual.getvalue() == expected.getvalue(), path
+    elif isinstance(expected, dict):
+        assert type(actual) is dict and list(actual) == list(expected), path
+        for key, value in expected.items():
+            _assert_same(actual[key], value, f"{path}[{key!r}]")
+    elif isinstance(expected, (list, tuple)):
+        assert type(actual) is type(expected) and len(actual) == len(expected), path
+        for i, (a, b) in enumerate(zip(actual, expected)):
+            _assert_same(a, b, f"{path}[{i}]")
+    else:
+        assert type(actual) is type(expected), path
+        assert actual == expected or (pd.isna(expected) and pd.isna(actual)), path
+
+
+def test_quality_report_round_trip(df):
+    report = DataQualityAnalyzer(df).generate_report()
+    _assert_same(decode_result(encode_result(report)), report)
+
+
+def test_bias_report_round_trip(df):
+    report = AIComplianceAnalyzer(df).analyze_bias(
+        group_cols=["PaymentMethodName", "COUNTRYNAME"], target_cols=["TotalTransactionPrice", "DISCOUNTPCTG"],
+        n_boot=100)
+    _assert_same(decode_result(encode_result(report)), report)
+
+
+def test_disk_entry_round_trip(df, tmp_path):
+    report = DataQualityAnalyzer(df).generate_report()
+    key = ResultCache.make_key("odcisk", "generate_report")
+    ResultCache(str(tmp_path)).put(key, report)
+    # Nowa instancja (np. po restarcie aplikacji) czyta wpis z dysku
+    cache = ResultCache(str(tmp_path))
+    _assert_same(cache.get(key), report)
+    assert cache.hits_disk == 1
+
+    path = next(tmp_path.glob("*.rc"))
+    path.write_bytes(b"RC01" + b"\x00" * 3)
+    assert ResultCache(str(tmp_path)).get(key, "brak") == "brak"
+
+
+def test_rejects_unsupported_types():
+    with pytest.raises(TypeError):
+        encode_result({"analizator": object()})
+    with pytest.raises(ValueError):
+        decode_result(b"nie jest wpisem")
+
+
+def test_db_fingerprint_changes_after_load_and_upsert(tmp_path):
+    conn = sqlite3.connect(":memory:")
+    path = tmp_path / "DimPaymentMethod.csv"
+    path.write_text("PaymentMethodKey;PaymentMethodName\n1;PayPal\n2;Karta\n", encoding="utf-8")
+    load_data(str(path), "DimPaymentMethod", conn)
+    first = db_fingerprint(conn, "DimPaymentMethod")
+    assert db_fingerprint(conn, "DimPaymentMethod") == first
+
+    # Ponowne wczytanie tych samych danych też zmienia wersję
+    load_data(str(path), "DimPaymentMethod", conn)
+    second = db_fingerprint(conn, "DimPaymentMethod")
+    assert second != first
+
+    path.write_text("PaymentMethodKey;PaymentMethodName\n2;BLIK\n", encoding="utf-8")
+    upsert_data(str(path), "DimPaymentMethod", conn)
+    assert db_fingerprint(conn, "DimPaymentMethod") not in (first, second)
+    conn.close()
+
+
+def test_flat_fingerprint_follows_refresh(tmp_path):
+    conn = sqlite3.connect(":memory:")
+    csv_files = {path.stem.lower(): path for path in DATA_DIR.glob("*.csv")}
+    for _, table, _, _, _ in FLAT_JOINS:
+        load_data(str(csv_files[table.lower()]), table, conn)
+    facts = tmp_path / "facts.csv"
+    facts.write_text("ORDERKEY;ORDERLINENUMBER;ORDERDATEKEY;SHIPDATEKEY;CUSTOMERKEY;PRODUCTKEY;SALESTERRITORYKEY;"
+                     "CHANNELKEY;PAYMENTMETHODKEY;DELIVERYMETHODKEY;QUANTITY;CATALOGPRICE;DISCOUNTAMOUNT;"
+                     "DISCOUNTPCTG;TRANSACTIONPRICE;DELIVERYCOST;PRODUCTCOST\n"
+                     "1;1;20240101;20240103;11264;1;1;1;1;1;2;10,5;0,5;0,05;10;1,25;6\n", encoding="utf-8")
+    load_data(str(facts), FACT_TABLE, conn)
+    refresh_flat_table(conn)
+    before = db_fingerprint(conn, FLAT_TABLE)
+    assert db_fingerprint(conn, FLAT_TABLE) == before
+
+    path = tmp_path / "DimPaymentMethod.csv"
+    path.write_text("PaymentMethodKey;PaymentMethodName\n1;Karta\n", encoding="utf-8")
+    upsert_data(str(path), "DimPaymentMethod", conn)
+    changed = db_fingerprint(conn, FLAT_TABLE)
+    assert changed != before
+    # Odświeżenie zapisuje nowe wersje źródeł w stanie tabeli spłaszczonej
+    refresh_flat_table(conn)
+    assert db_fingerprint(conn, FLAT_TABLE) not in (before, changed)
+    conn.close()
@@ -0,0 +1,83 @@
+# tests/test_sampling.py
+import sqlite3
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from classes.sampling import CI_COLUMNS, SampleEstimator, _allocate, sample_flat_table, sample_frame
+
+
+@pytest.fixture
+def df():
+    rng = np.random.default_rng(4)
+    n = 10_000
+    df = pd.DataFrame({
+        "Kanał": rng.choice(["Sklep", "Online", "Telefon"], n, p=[0.9, 0.09, 0.01]),
+        "Cena": rng.lognormal(3, 1, n),
+        "Rabat": rng.uniform(0, 0.3, n),
+        "Metoda": rng.choice(["Karta", "BLIK", "PayPal"], n),
+    })
+    df["Cena"] += 50 * (df["Kanał"] == "Telefon")
+    df.loc[rng.choice(n, 300, replace=False), "Cena"] = np.nan
+    df.loc[rng.choice(n, 100, replace=False), "Metoda"] = None
+    return df
+
+
+def _assert_zero_width(frame):
+    assert list(frame.columns) == CI_COLUMNS and len(frame)
+    np.testing.assert_allclose(frame["Dolna granica"], frame["Estymacja"], rtol=1e-12, atol=1e-9)
+    np.testing.assert_allclose(frame["Górna granica"], frame["Estymacja"], rtol=1e-12, atol=1e-9)
+
+
+@pytest.mark.parametrize("strata", [None, "Kanał"])
+def test_full_sample_gives_exact_values(df, strata):
+    method = "stratified" if strata else "reservoir"
+    sample, population = sample_frame(df, n=len(df), method=method, strata=strata, seed=0)
+    assert len(sample) == len(df)
+    report = SampleEstimator(sample, population, strata=strata).report(
+        group_col="Kanał", target="Cena", class_col="Metoda")
+
+    for frame in report.values():
+        _assert_zero_width(frame)
+    missing = report["missing_values"]["Estymacja"]
+    assert missing.drop("Cała tabela").to_dict() == pytest.approx((df.isnull().mean() * 100).to_dict())
+    assert missing["Cała tabela"] == pytest.approx(df.isnull().to_numpy().mean() * 100)
+    assert report["group_means"]["Estymacja"].to_dict() == pytest.approx(df.groupby("Kanał")["Cena"].mean().to_dict())
+    assert report["class_balance"]["Estymacja"].to_dict() == pytest.approx(
+        df["Metoda"].value_counts(normalize=True).to_dict())
+    assert report["correlations"].loc["Rabat ~ Cena", "Estymacja"] == pytest.approx(df["Cena"].corr(df["Rabat"]))
+
+
+def test_stratified_allocation(df):
+    population = df["Kanał"].value_counts().to_dict()
+    allocation = _allocate(population, 500)
+    # Alokacja proporcjonalna z minimum 30 wierszy na warstwę
+    assert allocation == {key: max(30, round(500 * size / len(df))) for key, size in population.items()}
+    assert allocation["Telefon"] == 30 and allocation["Telefon"] < population["Telefon"]
+    assert _allocate({"A": 1_000, "B": 12}, 100) == {"A": 99, "B": 12}
+
+    conn = sqlite3.connect(":memory:")
+    df.to_sql("Sprzedaz", conn, index=False)
+    for sample, counts in (sample_frame(df, n=500, method="stratified", strata="Kanał", seed=1),
+                           sample_flat_table(conn, "Sprzedaz", n=500, method="stratified", strata="Kanał")):
+        assert counts == population
+        assert sample["Kanał"].value_counts().to_dict() == allocation
+
+        estimator = SampleEstimator(sample, counts, strata="Kanał")
+        # Wagi odtwarzają liczebności warstw, więc udziały warstw są dokładne mimo nadreprezentacji
+        balance = estimator.class_balance("Kanał")
+        assert balance["Estymacja"].to_dict() == pytest.approx({k: v / len(df) for k, v in population.items()})
+        _assert_zero_width(balance)
+        # Średnia w warstwie estymowana tylko z jej wierszy - przedział z poprawką na skończoną populację
+        means = estimator.group_means("Kanał", "Cena")
+        assert (means["Dolna granica"] < means["Estymacja"]).all()
+        assert (means["Estymacja"] < means["Górna granica"]).all()
+    conn.close()
+
+
+def test_rejects_unknown_method(df):
+    with pytest.raises(ValueError):
+        sample_frame(df, method="systematyczna")
+    with pytest.raises(ValueError):
+        sample_frame(df, method="stratified", strata="Brak")
@@ -0,0 +1,84 @@
+# tests/test_sql_pushdown.py
+import sqlite3
+import warnings
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from classes.ai_compliance import AIComplianceAnalyzer
+from classes.data_quality import DataQualityAnalyzer
+from classes.sql_pushdown import SQLAIComplianceAnalyzer, SQLDataQualityAnalyzer
+
+TARGETS = ["Linia", "Ilość", "Cena"]
+
+
+@pytest.fixture
+def sales():
+    rng = np.random.default_rng(3)
+    n = 4_000
+    df = pd.DataFrame({
+        "Kanał": rng.choice(["Sklep", "Online", "Telefon"], n),
+        # Kolumny INTEGER w SQLite: małe liczby i duże wartości z małym rozrzutem
+        "Linia": rng.integers(1, 4, n),
+        "Ilość": rng.integers(1_000_000, 1_000_005, n),
+        "Cena": rng.normal(100.0, 20.0, n),
+    })
+    df.loc[rng.choice(n, 100, replace=False), "Cena"] = np.nan
+    df.loc[rng.choice(n, 50, replace=False), "Kanał"] = None
+    return df
+
+
+@pytest.fixture
+def analyzers(sales):
+    conn = sqlite3.connect(":memory:")
+    conn.execute('CREATE TABLE Sprzedaz ("Kanał" TEXT, "Linia" INTEGER, "Ilość" INTEGER, "Cena" REAL)')
+    conn.executemany("INSERT INTO Sprzedaz VALUES (?, ?, ?, ?)",
+                     sales.astype(object).where(sales.notna(), None).itertuples(index=False))
+    return AIComplianceAnalyzer(sales), SQLAIComplianceAnalyzer(conn, "Sprzedaz")
+
+
+def test_group_statistics_match_pandas(analyzers):
+    pandas_analyzer, sql_analyzer = analyzers
+    expected_sizes, expected = pandas_analyzer.group_statistics("Kanał", TARGETS)
+    sizes, stats = sql_analyzer.group_statistics("Kanał", TARGETS)
+    pd.testing.assert_series_equal(sizes, expected_sizes, check_dtype=False)
+    pd.testing.assert_frame_equal(stats, expected, check_exact=False, rtol=1e-9)
+
+
+def test_small_integer_variance():
+    conn = sqlite3.connect(":memory:")
+    conn.execute("CREATE TABLE T (g TEXT, x INTEGER)")
+    conn.executemany("INSERT INTO T VALUES (?, ?)", [("a", 1), ("a", 2), ("a", 2), ("b", 1), ("b", 3), ("c", 5)])
+    _, stats = SQLAIComplianceAnalyzer(conn, "T").group_statistics("g", ["x"])
+    assert stats[("x", "var")].tolist()[:2] == pytest.approx([1 / 3, 2.0])
+    assert np.isnan(stats[("x", "var")].iloc[2])
+
+
+def test_analyze_bias_matches_pandas(analyzers):
+    pandas_analyzer, sql_analyzer = analyzers
+    expected = pandas_analyzer.analyze_bias(group_cols=["Kanał"], target_cols=TARGETS, n_boot=200)["Kanał"]
+    report = sql_analyzer.analyze_bias(group_cols=["Kanał"], target_cols=TARGETS, n_boot=200)["Kanał"]
+    assert isinstance(report, dict)
+    assert list(report) == list(expected)
+    for section, values in expected.items():
+        if isinstance(values, dict):
+            assert report[section] == pytest.approx(values, rel=1e-6), section
+        else:
+            assert report[section] == pytest.approx(values, rel=1e-6), section
+
+
+def test_duplicate_rows_match_pandas():
+    df = pd.DataFrame({"a": [1, 1, 2, 2, 5, 1, 3], "c": [None, None, 0.2, 0.2, 1, None, None],
+                       "d": [1.5, 1.5, None, None, 2, 1.5, None]})
+    conn = sqlite3.connect(":memory:")
+    df.to_sql("T", conn, index=False)
+    with warnings.catch_warnings():
+        # Grupy z kolumnami samych NULL-i nie mogą dawać FutureWarning z pd.concat
+        warnings.simplefilter("error")
+        report = SQLDataQualityAnalyzer(conn, "T").duplicate_rows()
+    expected = DataQualityAnalyzer(df).duplicate_rows()
+    for key in ("num_duplicates", "duplicate_groups", "percent_duplicates"):
+        assert report[key] == pytest.approx(expected[key])
+    pd.testing.assert_frame_equal(report["examples"], expected["examples"].reset_index(drop=True))
+    assert SQLDataQualityAnalyzer(conn, "T").duplicate_rows(subset=["a"], max_examples=1)["examples"]["a"].tolist() == [1] * 3
@@ -0,0 +1,123 @@
+# tests/test_streaming_profile.py
+import numpy as np
+import pandas as pd
+import pytest
+
+from classes.streaming_profile import KLLSketch, StreamingProfile
+
+QS = [0.01, 0.1, 0.25, 0.5, 0.75, 0.9, 0.99]
+NUMERIC = ["Cena", "Ilość"]
+
+
+def _rank_errors(values, sketch):
+    # Błąd rangi: odległość pozycji zwróconej wartości od pozycji żądanego kwantyla (ułamek obserwacji)
+    values = np.sort(values)
+    errors = []
+    for q, estimate in zip(QS, sketch.quantiles(QS)):
+        low = np.searchsorted(values, estimate, side="left") / len(values)
+        high = np.searchsorted(values, estimate, side="right") / len(values)
+        errors.append(max(0.0, low - q, q - high))
+    return np.array(errors)
+
+
+def _assert_rank_errors(values, sketch, k):
+    # Udokumentowany błąd ok. 1.7 / k obowiązuje z dużym prawdopodobieństwem dla pojedynczego kwantyla;
+    # sąsiednie kwantyle mają skorelowane błędy, więc pojedyncze przekroczenia są dopuszczalne
+    errors = _rank_errors(values, sketch)
+    assert np.median(errors) <= 1.7 / k, errors * k
+    assert errors.max() <= 2 * 1.7 / k, errors * k
+
+
+@pytest.fixture
+def frame():
+    rng = np.random.default_rng(11)
+    n = 60_000
+    df = pd.DataFrame({
+        "Cena": rng.lognormal(3, 1, n),
+        "Ilość": rng.integers(1, 20, n),
+        "Kanał": rng.choice(["Sklep", "Online", "Telefon"], n),
+    })
+    df.loc[rng.choice(n, 2_000, replace=False), "Cena"] = np.nan
+    df.loc[rng.choice(n, 500, replace=False), "Kanał"] = None
+    return df
+
+
+@pytest.mark.parametrize("k", [100, 400])
+def test_kll_quantiles_within_rank_error(k):
+    values = np.random.default_rng(k).normal(size=200_000)
+    sketch = KLLSketch(k, seed=0)
+    for chunk in np.array_split(values, 37):
+        sketch.update(chunk)
+    assert sketch.n == len(values)
+    _assert_rank_errors(values, sketch, k)
+    # Pamięć niezależna od liczby obserwacji
+    assert sum(len(items) for items in sketch.levels) < 4 * k
+
+
+def test_kll_merge_within_rank_error():
+    rng = np.random.default_rng(3)
+    parts = [rng.exponential(size=n) for n in (50_000, 7, 120_000, 30_000)]
+    sketches = []
+    for i, part in enumerate(parts):
+        sketches.append(KLLSketch(200, seed=i))
+        sketches[-1].update(part)
+    merged = sketches[0]
+    for sketch in sketches[1:]:
+        merged.merge(sketch)
+    assert merged.n == sum(len(p) for p in parts)
+    _assert_rank_errors(np.concatenate(parts), merged, 200)
+
+
+def test_kll_small_and_empty():
+    sketch = KLLSketch(400)
+    assert sketch.quantiles([0.5]) == [None]
+    sketch.update([3.0, np.nan, 1.0, 2.0])
+    # Bez kompresji wynik jest dokładny
+    assert sketch.quantiles([0.0, 0.5, 1.0]) == [1.0, 2.0, 3.0]
+
+
+def _profile(chunks, seed=0):
+    profile = StreamingProfile(["Cena", "Ilość", "Kanał"], NUMERIC, k=200, seed=seed)
+    for chunk in chunks:
+        profile.update(chunk)
+    return profile
+
+
+def _assert_profile_matches(profile, df):
+    values = df[NUMERIC].to_numpy(dtype=np.float64)
+    assert profile.rows == len(df)
+    assert profile.nulls.tolist() == df.isnull().sum().tolist()
+    for i, col in enumerate(NUMERIC):
+        x = values[:, i][~np.isnan(values[:, i])]
+        assert profile.n[i] == len(x)
+        assert profile.mean[i] == pytest.approx(x.mean(), rel=1e-12)
+        assert profile.m2[i] == pytest.approx(((x - x.mean()) ** 2).sum(), rel=1e-9)
+        assert profile.m3[i] == pytest.approx(((x - x.mean()) ** 3).sum(), rel=1e-9)
+        assert (profile.vmin[i], profile.vmax[i]) == (x.min(), x.max())
+        _assert_rank_errors(x, profile.sketches[i], 200)
+    pd.testing.assert_series_equal(profile.value_counts["Kanał"].sort_index(),
+                                   df["Kanał"].value_counts().sort_index(), check_names=False)
+
+
+def test_profile_merge_associative(frame):
+    a, b, c = frame.iloc[:25_000], frame.iloc[25_000:25_003], frame.iloc[25_003:]
+    left = _profile([a], seed=0).merge(_profile([b], seed=10)).merge(_profile([c], seed=20))
+    right = _profile([a], seed=0).merge(_profile([b], seed=10).merge(_profile([c], seed=20)))
+    single = _profile([a, b, c])
+
+    for profile in (left, right, single):
+        _assert_profile_matches(profile, frame)
+    np.testing.assert_allclose(left.m2, right.m2, rtol=1e-12)
+    np.testing.assert_allclose(left.m3, right.m3, rtol=1e-9)
+    assert left.float_columns == right.float_columns == {"Cena"}
+
+
+def test_profile_merge_empty_part(frame):
+    merged = _profile([frame.iloc[:0]]).merge(_profile([frame]))
+    _assert_profile_matches(merged, frame)
+
+
+def test_profile_merge_rejects_other_columns(frame):
+    other = StreamingProfile(["Cena", "Kanał"], ["Cena"])
+    with pytest.raises(ValueError):
+        _profile([frame]).merge(other)